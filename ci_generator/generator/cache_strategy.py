@@ -0,0 +1,204 @@
+"""
+cache_strategy.py
+
+Кэш зависимостей в задачах GitLab-пайплайна (проход dependency_cache).
+
+Шаблоны стадий кэшируют зависимости по ветке (key: ${CI_COMMIT_REF_SLUG}):
+каждая новая ветка начинает с пустого кэша, а каждая задача заново
+загружает кэш в хранилище. Проход заменяет это стратегией по экосистеме:
+
+- ключ кэша - хэш lock-файлов (package-lock.json, poetry.lock, go.sum,
+  pom.xml, gradle.lockfile), поэтому ветки с теми же зависимостями, что и
+  основная ветка, сразу получают готовый кэш;
+- если кэша для lock-файлов еще нет (зависимости изменились), берется
+  запасной кэш основной ветки (fallback_keys);
+- кэш загружает в хранилище одна задача (pull-push, предпочтительно test),
+  остальные только скачивают (pull);
+- запасной кэш основной ветки загружает отдельная задача
+  dependency_cache_fallback, которая запускается только в основной ветке:
+  кэш в GitLab нельзя включить условием, поэтому запасной ключ в задаче
+  с pull-push загружался бы в каждом пайплайне второй раз;
+- кэшируются каталоги менеджера пакетов (.npm, кэш pip, GOMODCACHE и
+  GOCACHE, репозиторий Maven, кэши и build cache Gradle), а не
+  node_modules, который npm ci все равно удаляет.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from .pipeline_model import Job, Pipeline
+except ImportError:
+    from generator.pipeline_model import Job, Pipeline
+
+
+@dataclass(frozen=True)
+class CacheSpec:
+    """Кэш зависимостей экосистемы."""
+
+    # Префикс ключа кэша
+    prefix: str
+    # Lock-файлы для ключа (GitLab учитывает не больше двух)
+    files: Tuple[str, ...]
+    # Каталоги кэша (относительно CI_PROJECT_DIR)
+    paths: Tuple[str, ...]
+    # Переменные, направляющие менеджер пакетов в эти каталоги
+    variables: Dict[str, str] = field(default_factory=dict)
+
+
+_PIP_VARIABLES = {"PIP_CACHE_DIR": "$CI_PROJECT_DIR/.cache/pip"}
+
+CACHE_SPECS: Dict[str, CacheSpec] = {
+    "npm": CacheSpec("npm", ("package-lock.json",), (".npm/",),
+                     {"npm_config_cache": "$CI_PROJECT_DIR/.npm"}),
+    "yarn": CacheSpec("yarn", ("yarn.lock",), (".yarn-cache/",),
+                      {"YARN_CACHE_FOLDER": "$CI_PROJECT_DIR/.yarn-cache"}),
+    "pnpm": CacheSpec("pnpm", ("pnpm-lock.yaml",), (".pnpm-store/",),
+                      {"npm_config_store_dir": "$CI_PROJECT_DIR/.pnpm-store"}),
+    "pip": CacheSpec("pip", ("requirements.txt", "requirements-dev.txt"), (".cache/pip/",), _PIP_VARIABLES),
+    "poetry": CacheSpec("poetry", ("poetry.lock",), (".cache/pip/", ".cache/pypoetry/"),
+                        dict(_PIP_VARIABLES, POETRY_CACHE_DIR="$CI_PROJECT_DIR/.cache/pypoetry")),
+    "pipenv": CacheSpec("pipenv", ("Pipfile.lock",), (".cache/pip/",), _PIP_VARIABLES),
+    "go": CacheSpec("go", ("go.sum",), (".go/pkg/mod/", ".cache/go-build/"),
+                    {"GOMODCACHE": "$CI_PROJECT_DIR/.go/pkg/mod", "GOCACHE": "$CI_PROJECT_DIR/.cache/go-build"}),
+    "maven": CacheSpec("maven", ("pom.xml",), (".m2/repository/",),
+                       {"MAVEN_OPTS": "-Dmaven.repo.local=$CI_PROJECT_DIR/.m2/repository"}),
+    "gradle": CacheSpec("gradle", ("gradle.lockfile", "gradle/wrapper/gradle-wrapper.properties"),
+                        (".gradle/caches/", ".gradle/wrapper/"),
+                        {"GRADLE_USER_HOME": "$CI_PROJECT_DIR/.gradle", "GRADLE_OPTS": "-Dorg.gradle.caching=true"}),
+}
+
+# Стадии, задачи которых устанавливают зависимости проекта
+DEPENDENCY_STAGES = ("lint", "type_check", "security", "test", "build", "migration", "sonarcube")
+
+# Задача, загружающая запасной кэш основной ветки
+FALLBACK_JOB = "dependency_cache_fallback"
+
+# Ключи задачи, при которых ее может не быть в пайплайне
+_CONDITIONAL_KEYS = ("rules", "only", "except")
+
+# Каталоги зависимостей из шаблонов стадий (заменяются кэшем экосистемы)
+_TEMPLATE_DEPENDENCY_PATHS = {
+    "node_modules", ".npm", ".cache/pip", ".go/pkg/mod", ".m2/repository", ".gradle/caches",
+}
+
+
+def select_cache_spec(ctx: Dict) -> Optional[CacheSpec]:
+    """Кэш зависимостей по языку, сборщику и менеджеру пакетов проекта."""
+    language = (ctx.get("language") or "").lower()
+    package_manager = ((ctx.get("analysis") or {}).get("package_manager") or "").lower()
+    if language == "python":
+        return CACHE_SPECS.get(package_manager, CACHE_SPECS["pip"])
+    if language in ("typescript", "javascript"):
+        return CACHE_SPECS.get(package_manager, CACHE_SPECS["npm"])
+    if language in ("go", "golang"):
+        return CACHE_SPECS["go"]
+    if language in ("java", "kotlin"):
+        # Без указанного сборщика шаблоны берут образ maven для Java и gradle для Kotlin
+        build_tool = (ctx.get("build_tool") or ("gradle" if language == "kotlin" else "maven")).lower()
+        return CACHE_SPECS.get(build_tool) if build_tool in ("maven", "gradle") else None
+    return None
+
+
+def _cache_entries(value: Any) -> List[Dict[str, Any]]:
+    if isinstance(value, dict):
+        return [value]
+    if isinstance(value, list):
+        return [entry for entry in value if isinstance(entry, dict)]
+    return []
+
+
+def _other_caches(job: Job) -> List[Dict[str, Any]]:
+    """Кэши задачи, не относящиеся к зависимостям (например, .sonar/cache)."""
+    result = []
+    for entry in _cache_entries(job.cache):
+        paths = [path for path in entry.get("paths") or []
+                 if str(path).rstrip("/") not in _TEMPLATE_DEPENDENCY_PATHS]
+        if paths:
+            result.append(dict(entry, paths=paths))
+    return result
+
+
+def _dependency_cache(spec: CacheSpec, policy: str) -> Dict[str, Any]:
+    return {
+        "key": {"files": list(spec.files), "prefix": spec.prefix},
+        "paths": list(spec.paths),
+        "policy": policy,
+        "fallback_keys": [f"{spec.prefix}-$CI_DEFAULT_BRANCH"],
+    }
+
+
+def _fallback_job(spec: CacheSpec, pusher: Job) -> Dict[str, Any]:
+    """
+    Задача основной ветки: скачивает кэш lock-файлов, загруженный pusher,
+    и сохраняет его под запасным ключом основной ветки.
+    """
+    need = ({"job": pusher.name, "optional": True}
+            if any(key in pusher.spec for key in _CONDITIONAL_KEYS) else pusher.name)
+    job: Dict[str, Any] = {"stage": pusher.stage, "needs": [need]}
+    # Образ и раннеры задачи pusher: образ уже есть на раннере
+    for key in ("image", "tags"):
+        if key in pusher.spec:
+            job[key] = pusher.spec[key]
+    job.update({
+        "variables": {"GIT_STRATEGY": "none"},
+        "cache": [
+            _dependency_cache(spec, "pull"),
+            {"key": f"{spec.prefix}-$CI_DEFAULT_BRANCH", "paths": list(spec.paths), "policy": "push"},
+        ],
+        "script": [f"echo 'Запасной кэш зависимостей {spec.prefix}-$CI_DEFAULT_BRANCH'"],
+        "rules": [{"if": "$CI_COMMIT_BRANCH == $CI_DEFAULT_BRANCH"}],
+    })
+    return job
+
+
+def dependency_cache(pipeline: Pipeline, ctx: Dict):
+    """
+    Настроить кэш зависимостей задач по CACHE_SPECS и добавить задачу
+    FALLBACK_JOB, загружающую запасной кэш в основной ветке.
+
+    Отключается настройкой user_settings.dependency_cache = false.
+    """
+    if not (ctx.get("user_settings") or {}).get("dependency_cache", True):
+        return
+    spec = select_cache_spec(ctx)
+    if spec is None:
+        return
+
+    jobs = [job for job in pipeline.jobs.values() if not job.hidden and job.stage in DEPENDENCY_STAGES]
+    if not jobs:
+        return
+    pusher = next((job for job in jobs if job.stage == "test"), jobs[0])
+
+    for job in jobs:
+        job.cache = [_dependency_cache(spec, "pull-push" if job is pusher else "pull")] + _other_caches(job)
+
+        variables = job.spec.get("variables")
+        if isinstance(variables, dict):
+            for name, value in spec.variables.items():
+                variables.setdefault(name, value)
+            continue
+        # variables - сразу после cache
+        job.spec.pop("variables", None)
+        job_spec = {}
+        for key, value in job.spec.items():
+            job_spec[key] = value
+            if key == "cache":
+                job_spec["variables"] = dict(spec.variables)
+        job.spec = job_spec
+
+    if FALLBACK_JOB not in pipeline.jobs:
+        # Задача - сразу после pusher
+        fallback = Job(FALLBACK_JOB, _fallback_job(spec, pusher))
+        jobs_by_name = {}
+        for name, job in pipeline.jobs.items():
+            jobs_by_name[name] = job
+            if job is pusher:
+                jobs_by_name[FALLBACK_JOB] = fallback
+        pipeline.jobs = jobs_by_name
+
+
+# Пути контекста, которые читает проход (для зависимостей пайплайна)
+dependency_cache.context_keys = (
+    "language", "build_tool", "analysis.package_manager", "user_settings.dependency_cache",
+)
@@ -0,0 +1,117 @@
+"""
+dependencies.py
+
+Зависимости отрендеренного пайплайна.
+
+Пайплайн зависит от файлов шаблонов, которые участвовали в рендеринге, и
+от значений контекста, которые эти шаблоны читают. Пути контекста
+(например, ctx.language или ctx.analysis.frameworks) определяются
+статически по AST шаблона: цепочки обращений к атрибутам, ключам-
+константам и ctx.get('ключ'). Если шаблон использует переменную иначе
+(передает целиком, обращается по вычисляемому ключу, перебирает), он
+зависит от переменной целиком.
+
+Сохраненный вместе с пайплайном набор зависимостей (хэши шаблонов и
+значений) позволяет при перегенерации пропускать проекты, у которых ни
+один шаблон и ни одно прочитанное значение не изменились.
+"""
+
+import hashlib
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from jinja2 import Environment, meta, nodes
+
+try:
+    from .render_cache import canonical_json
+except ImportError:
+    from generator.render_cache import canonical_json
+
+# Путь значения в контексте: ("ctx", "analysis", "frameworks")
+ContextPath = Tuple[str, ...]
+
+# Методы словаря: обращение через них читает весь словарь
+_DICT_METHODS = frozenset({"items", "keys", "values", "get"})
+
+# Значение отсутствует в контексте (отличается от None)
+_MISSING = object()
+
+
+def content_hash(text: str) -> str:
+    """Хэш текста (исходника шаблона, отрендеренного пайплайна)."""
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+
+def value_hash(value: Any) -> str:
+    """Хэш канонической формы значения контекста."""
+    if value is _MISSING:
+        return "missing"
+    return content_hash(canonical_json(value))
+
+
+def template_context_paths(env: Environment, source: str) -> FrozenSet[ContextPath]:
+    """Пути контекста, которые читает шаблон (по AST, без рендеринга)."""
+    ast = env.parse(source)
+    roots = meta.find_undeclared_variables(ast) - set(env.globals)
+    found: set = set()
+    _collect(ast, roots, found)
+    return frozenset(found)
+
+
+def _static_path(node: nodes.Node) -> Optional[List[str]]:
+    """Статический путь обращения: ctx.a['b'].get('c') -> ['ctx', 'a', 'b', 'c']."""
+    if isinstance(node, nodes.Name):
+        return [node.name] if node.ctx == "load" else None
+    if isinstance(node, nodes.Getattr):
+        if node.attr in _DICT_METHODS:
+            return None
+        base = _static_path(node.node)
+        return base + [node.attr] if base else None
+    if isinstance(node, nodes.Getitem):
+        if not (isinstance(node.arg, nodes.Const) and isinstance(node.arg.value, str)):
+            return None
+        base = _static_path(node.node)
+        return base + [node.arg.value] if base else None
+    if (isinstance(node, nodes.Call) and isinstance(node.node, nodes.Getattr) and node.node.attr == "get"
+            and node.args and isinstance(node.args[0], nodes.Const) and isinstance(node.args[0].value, str)):
+        base = _static_path(node.node.node)
+        return base + [node.args[0].value] if base else None
+    return None
+
+
+def _collect(node: nodes.Node, roots: set, found: set):
+    path = _static_path(node)
+    if path and path[0] in roots:
+        found.add(tuple(path))
+        if isinstance(node, nodes.Call):
+            # Значение по умолчанию в ctx.get('ключ', ...) тоже может читать контекст
+            for arg in list(node.args[1:]) + [kwarg.value for kwarg in node.kwargs]:
+                _collect(arg, roots, found)
+        return
+    for child in node.iter_child_nodes():
+        _collect(child, roots, found)
+
+
+def lookup(namespace: Dict[str, Any], path: ContextPath) -> Any:
+    """Значение по пути контекста (как его прочитает шаблон)."""
+    value: Any = namespace
+    for key in path:
+        if isinstance(value, dict):
+            value = value.get(key, _MISSING)
+        else:
+            value = getattr(value, key, _MISSING)
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+
+def context_hashes(namespace: Dict[str, Any], paths: Iterable[ContextPath]) -> Dict[str, str]:
+    """Хэши значений контекста по путям: {"ctx.language": хэш}."""
+    # Путь, вложенный в уже учтенный (ctx.analysis.frameworks при ctx.analysis), не нужен
+    result = {}
+    covered: List[ContextPath] = []
+    for path in sorted(set(paths), key=len):
+        if any(path[:len(prefix)] == prefix for prefix in covered):
+            continue
+        covered.append(path)
+        result[".".join(path)] = value_hash(lookup(namespace, path))
+    return dict(sorted(result.items()))
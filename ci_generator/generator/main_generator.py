@@ -12,7 +12,7 @@ from pathlib import Path
 # Используем относительные импорты, чтобы модуль корректно работал при запуске
 # через `python -m generator.main_generator` из корня проекта.
 from .stage_selector import select_stages
-from .renderer import PipelineRenderer
+from .renderer import get_renderer
 
 def load_input(path=None):
     if path:
@@ -107,7 +107,7 @@ def main(argv=None):
 
     base_dir = Path(__file__).resolve().parents[1] / "pipelines"
 
-    renderer = PipelineRenderer(templates_root=str(base_dir))
+    renderer = get_renderer(templates_root=str(base_dir))
 
     if platform == "gitlab":
         out = renderer.render_gitlab(stages, ctx)
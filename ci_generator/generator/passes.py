@@ -0,0 +1,130 @@
+"""
+passes.py
+
+Проходы над моделью GitLab-пайплайна (pipeline_model.PipelinePass).
+
+dag_needs - граф зависимостей задач через `needs:` вместо строгой
+последовательности стадий. Независимые проверки (lint, type_check,
+security, test) запускаются одновременно, docker_build ждет только сборку,
+а публикация образа и развертывание - все проверки.
+
+Задача сборки образа, которая сама публикует его (docker push в скрипте),
+считается публикацией: она ждет все проверки, иначе образ (в том числе
+latest) попадет в registry до завершения тестов.
+"""
+
+from typing import Any, Dict, List, Set
+
+try:
+    from .pipeline_model import Job, Pipeline
+except ImportError:
+    from generator.pipeline_model import Job, Pipeline
+
+# Стадии, от которых действительно зависит стадия. Если в пайплайне нет
+# задач стадии-предшественника, вместо нее берутся ее предшественники.
+# Задачи стадий, которых здесь нет (например, cleanup), не получают
+# needs и, как обычно, ждут завершения всех предыдущих стадий.
+STAGE_NEEDS: Dict[str, tuple] = {
+    "pre_checks": (),
+    "lint": (),
+    "type_check": (),
+    "security": (),
+    "test": (),
+    "build": (),
+    "sonarcube": ("lint", "test"),
+    "docker_build": ("build",),
+    "docker_push": ("docker_build", "pre_checks", "lint", "type_check", "security", "test"),
+    "integration": ("docker_build",),
+    "migration": ("pre_checks", "lint", "type_check", "security", "test", "build", "integration"),
+    "deploy": ("docker_push", "integration", "migration"),
+    "post_deploy": ("deploy",),
+}
+
+# Проверки, которые должны пройти до публикации образа
+CHECK_STAGES = ("pre_checks", "lint", "type_check", "security", "test")
+
+# Ключи задачи, при которых ее может не быть в пайплайне
+_CONDITIONAL_KEYS = ("rules", "only", "except")
+
+# Ключи задачи со скриптами
+_SCRIPT_KEYS = ("before_script", "script", "after_script")
+
+
+def _publishes_image(job: Job) -> bool:
+    for key in _SCRIPT_KEYS:
+        commands = job.spec.get(key)
+        if isinstance(commands, str):
+            commands = [commands]
+        if isinstance(commands, list) and any("docker push" in str(command) for command in commands):
+            return True
+    return False
+
+
+def _stage_prerequisites(stage: str, present: Set[str], seen: Set[str], extra: tuple = ()) -> List[str]:
+    """Ближайшие стадии-предшественники с задачами в пайплайне."""
+    result: List[str] = []
+    for prerequisite in STAGE_NEEDS.get(stage, ()) + extra:
+        if prerequisite in seen:
+            continue
+        seen.add(prerequisite)
+        if prerequisite in present:
+            result.append(prerequisite)
+        else:
+            result.extend(_stage_prerequisites(prerequisite, present, seen))
+    return result
+
+
+def _need(job: Job) -> Any:
+    if any(key in job.spec for key in _CONDITIONAL_KEYS):
+        # Условная задача может не попасть в пайплайн
+        return {"job": job.name, "optional": True}
+    return job.name
+
+
+def _need_name(need: Any) -> Any:
+    return need.get("job") if isinstance(need, dict) else need
+
+
+def dag_needs(pipeline: Pipeline, ctx: Dict):
+    """
+    Проставить задачам `needs:` по STAGE_NEEDS.
+
+    Задачи с needs из шаблона не изменяются. Задачи из `dependencies:`
+    (артефакты) добавляются в needs; зависимости от задач, которых нет в
+    пайплайне, удаляются. Отключается настройкой user_settings.dag = false.
+    """
+    if not (ctx.get("user_settings") or {}).get("dag", True):
+        return
+
+    by_stage: Dict[str, List[Job]] = {}
+    for job in pipeline.jobs.values():
+        if not job.hidden and job.stage:
+            by_stage.setdefault(job.stage, []).append(job)
+    present = set(by_stage)
+
+    for job in pipeline.jobs.values():
+        if job.hidden or job.stage not in STAGE_NEEDS or job.needs is not None:
+            continue
+        extra = CHECK_STAGES if job.stage == "docker_build" and _publishes_image(job) else ()
+        needs = [
+            _need(needed)
+            for stage in _stage_prerequisites(job.stage, present, {job.stage}, extra)
+            for needed in by_stage[stage]
+        ]
+        dependencies = job.spec.get("dependencies")
+        if isinstance(dependencies, list):
+            existing = [name for name in dependencies if name in pipeline.jobs]
+            job.spec["dependencies"] = existing
+            names = {_need_name(need) for need in needs}
+            needs += [_need(pipeline.jobs[name]) for name in existing if name not in names]
+        # needs - сразу после stage, как в шаблонах
+        spec = {}
+        for key, value in job.spec.items():
+            spec[key] = value
+            if key == "stage":
+                spec["needs"] = needs
+        job.spec = spec
+
+
+# Пути контекста, которые читает проход (для зависимостей пайплайна)
+dag_needs.context_keys = ("user_settings.dag",)
@@ -0,0 +1,299 @@
+"""
+pipeline_model.py
+
+Структурная модель пайплайна GitLab CI.
+
+Шаблоны стадий по-прежнему пишутся на Jinja, но результат рендеринга не
+склеивается текстом: каждый фрагмент один раз загружается в модель
+(стадии, workflow, переменные, задачи), над моделью выполняются проходы
+(PipelinePass), и YAML формируется один раз в конце (Pipeline.to_yaml).
+
+Задача хранит свою спецификацию как словарь; для часто изменяемых полей
+(stage, needs, cache, rules, artifacts) есть свойства.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import yaml
+
+# libyaml (если доступна) разбирает фрагменты заметно быстрее
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Глобальные ключи верхнего уровня (все остальные ключи - задачи)
+GLOBAL_KEYS = (
+    "stages", "workflow", "variables", "default", "include",
+    "image", "services", "cache", "before_script", "after_script",
+)
+
+# Комментарий верхнего уровня во фрагменте и строка ключа верхнего уровня
+_TOP_COMMENT = re.compile(r"^#\s?(.*)$")
+_TOP_KEY = re.compile(r"^[^\s#-]")
+
+
+class PipelineModelError(ValueError):
+    """Фрагмент шаблона не является описанием пайплайна."""
+
+
+@dataclass
+class Job:
+    """Задача пайплайна."""
+
+    name: str
+    spec: Dict[str, Any]
+    comments: List[str] = field(default_factory=list)
+
+    def _get(self, key: str) -> Any:
+        return self.spec.get(key)
+
+    def _set(self, key: str, value: Any):
+        if value is None:
+            self.spec.pop(key, None)
+        else:
+            self.spec[key] = value
+
+    @property
+    def stage(self) -> Optional[str]:
+        return self._get("stage")
+
+    @stage.setter
+    def stage(self, value: Optional[str]):
+        self._set("stage", value)
+
+    @property
+    def needs(self) -> Optional[List[Any]]:
+        return self._get("needs")
+
+    @needs.setter
+    def needs(self, value: Optional[List[Any]]):
+        self._set("needs", value)
+
+    @property
+    def cache(self) -> Any:
+        return self._get("cache")
+
+    @cache.setter
+    def cache(self, value: Any):
+        self._set("cache", value)
+
+    @property
+    def rules(self) -> Optional[List[Dict[str, Any]]]:
+        return self._get("rules")
+
+    @rules.setter
+    def rules(self, value: Optional[List[Dict[str, Any]]]):
+        self._set("rules", value)
+
+    @property
+    def artifacts(self) -> Optional[Dict[str, Any]]:
+        return self._get("artifacts")
+
+    @artifacts.setter
+    def artifacts(self, value: Optional[Dict[str, Any]]):
+        self._set("artifacts", value)
+
+    @property
+    def hidden(self) -> bool:
+        """Скрытая задача (шаблон для extends), GitLab ее не запускает."""
+        return self.name.startswith(".")
+
+
+@dataclass
+class Pipeline:
+    """Пайплайн GitLab CI: глобальные секции и задачи в порядке добавления."""
+
+    stages: List[str] = field(default_factory=list)
+    globals: Dict[str, Any] = field(default_factory=dict)
+    jobs: Dict[str, Job] = field(default_factory=dict)
+    # Комментарии верхнего уровня перед глобальными секциями
+    comments: Dict[str, List[str]] = field(default_factory=dict)
+    # Комментарии в конце файла (например, стадии без шаблона)
+    notes: List[str] = field(default_factory=list)
+
+    def add_fragment(self, text: str):
+        """
+        Загрузить отрендеренный фрагмент шаблона в модель.
+
+        Повторное определение задачи или секции заменяет предыдущее (как при
+        склейке текста, где в YAML побеждает последний ключ), переменные
+        объединяются. Комментарии верхнего уровня относятся к следующему за
+        ними ключу; вложенные комментарии YAML не сохраняются.
+        """
+        try:
+            data = yaml.load(text, Loader=_Loader)
+        except yaml.YAMLError as e:
+            raise PipelineModelError(f"Некорректный YAML во фрагменте шаблона: {e}")
+        comments = _top_level_comments(text)
+        if data is None:
+            # Фрагмент без задач (например, только комментарий)
+            self.notes.extend(comments.get(None, []))
+            return
+        if not isinstance(data, dict):
+            raise PipelineModelError("Фрагмент шаблона должен быть словарем задач и секций")
+
+        for key, value in data.items():
+            key = str(key)
+            if key == "stages":
+                self.stages = list(value or [])
+            elif key == "variables" and isinstance(self.globals.get("variables"), dict) and isinstance(value, dict):
+                self.globals["variables"].update(value)
+            elif key in GLOBAL_KEYS:
+                self.globals[key] = value
+            elif key in self.jobs:
+                self.jobs[key].spec = value
+            else:
+                if not isinstance(value, dict):
+                    raise PipelineModelError(f"Задача {key} должна быть словарем")
+                self.jobs[key] = Job(key, value)
+
+            if key in comments:
+                if key in self.jobs:
+                    self.jobs[key].comments = comments[key]
+                else:
+                    self.comments[key] = comments[key]
+        self.notes.extend(comments.get(None, []))
+
+    def apply(self, passes: Iterable["PipelinePass"], ctx: Dict):
+        """Выполнить проходы над моделью (по порядку)."""
+        for pipeline_pass in passes:
+            pipeline_pass(self, ctx)
+
+    def jobs_in_stage(self, stage: str) -> List[Job]:
+        return [job for job in self.jobs.values() if job.stage == stage and not job.hidden]
+
+    def to_yaml(self) -> str:
+        """Сформировать .gitlab-ci.yml."""
+        sections = []
+        if self.stages or "stages" in self.comments:
+            sections.append(_emit_section("stages", self.stages, self.comments.get("stages")))
+        for key, value in self.globals.items():
+            sections.append(_emit_section(key, value, self.comments.get(key)))
+        for job in self.jobs.values():
+            sections.append(_emit_section(job.name, job.spec, job.comments))
+        if self.notes:
+            sections.append("".join(f"# {note}\n" for note in self.notes))
+        return "\n".join(sections)
+
+
+# Проход над моделью: изменяет пайплайн на месте, получает контекст шаблонов
+PipelinePass = Callable[[Pipeline, Dict], None]
+
+
+def _top_level_comments(text: str) -> Dict[Optional[str], List[str]]:
+    """Комментарии верхнего уровня, сгруппированные по следующему за ними ключу (None - в конце)."""
+    result: Dict[Optional[str], List[str]] = {}
+    pending: List[str] = []
+    for line in text.splitlines():
+        match = _TOP_COMMENT.match(line)
+        if match:
+            pending.append(match.group(1))
+        elif pending and _TOP_KEY.match(line):
+            key = line.split(":", 1)[0].strip().strip("'\"")
+            result.setdefault(key, []).extend(pending)
+            pending = []
+    if pending:
+        result[None] = pending
+    return result
+
+
+# Эмиттер YAML. Модель содержит только словари, списки и скаляры, поэтому
+# вместо yaml.dump (чистый Python, самая медленная часть рендеринга)
+# используется простой эмиттер в стиле шаблонов: списки с отступом,
+# многострочные строки - блоком `|`, строки в кавычках только при
+# необходимости (одинарных; для управляющих символов - JSON-строка, она же
+# корректная строка YAML в двойных кавычках).
+_resolver = yaml.resolver.Resolver()
+_STR_TAG = "tag:yaml.org,2002:str"
+_NON_PRINTABLE = re.compile(r"[\x00-\x08\x0b-\x1f\x7f\u0085\u2028\u2029\ufeff]")
+_PLAIN_UNSAFE = re.compile(r"""^[\s\-?:,\[\]{}#&*!|>'"%@`]|\s$|:$|: |\s#|[\x00-\x1f\x7f\u0085\u2028\u2029\ufeff]""")
+
+
+def _scalar(value: Any) -> str:
+    if value is None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        if value != value:
+            return ".nan"
+        if value in (float("inf"), float("-inf")):
+            return ".inf" if value > 0 else "-.inf"
+        # В YAML 1.1 число с экспонентой без точки (1e-09) - строка
+        text = repr(value)
+        return text if "." in text or "e" not in text else text.replace("e", ".0e", 1)
+    value = str(value)
+    if (value and not _PLAIN_UNSAFE.search(value)
+            and _resolver.resolve(yaml.ScalarNode, value, (True, False)) == _STR_TAG):
+        return value
+    if "\n" in value or _NON_PRINTABLE.search(value):
+        return json.dumps(value)
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _block_scalar(value: str, indent: int) -> Optional[List[str]]:
+    """Многострочная строка блоком `|` (None - строку так не записать)."""
+    if value[:1] in (" ", "\n") or _NON_PRINTABLE.search(value):
+        return None
+    if value.endswith("\n\n"):
+        header = "|+"
+    elif value.endswith("\n"):
+        header = "|"
+    else:
+        header = "|-"
+    body = value[:-1] if value.endswith("\n") else value
+    pad = " " * indent
+    return [header] + [pad + line if line else "" for line in body.split("\n")]
+
+
+def _emit_value(prefix: str, value: Any, indent: int, lines: List[str]):
+    """Записать значение после prefix ("key:" или "-") с вложенным отступом indent."""
+    if isinstance(value, dict) and value:
+        lines.append(prefix)
+        _emit_mapping(value, indent, lines)
+    elif isinstance(value, list) and value:
+        lines.append(prefix)
+        _emit_sequence(value, indent, lines)
+    elif isinstance(value, dict):
+        lines.append(f"{prefix} {{}}")
+    elif isinstance(value, list):
+        lines.append(f"{prefix} []")
+    elif isinstance(value, str) and "\n" in value:
+        block = _block_scalar(value, indent)
+        if block is None:
+            lines.append(f"{prefix} {_scalar(value)}")
+        else:
+            lines.append(f"{prefix} {block[0]}")
+            lines.extend(block[1:])
+    else:
+        lines.append(f"{prefix} {_scalar(value)}")
+
+
+def _emit_mapping(mapping: Dict[Any, Any], indent: int, lines: List[str]):
+    pad = " " * indent
+    for key, value in mapping.items():
+        _emit_value(f"{pad}{_scalar(key)}:", value, indent + 2, lines)
+
+
+def _emit_sequence(items: List[Any], indent: int, lines: List[str]):
+    pad = " " * indent
+    for item in items:
+        if isinstance(item, dict) and item:
+            # Первый ключ словаря - на строке элемента списка
+            nested: List[str] = []
+            _emit_mapping(item, indent + 2, nested)
+            lines.append(f"{pad}- {nested[0][indent + 2:]}")
+            lines.extend(nested[1:])
+        else:
+            _emit_value(f"{pad}-", item, indent + 2, lines)
+
+
+def _emit_section(key: str, value: Any, comments: Optional[List[str]] = None) -> str:
+    lines = [f"# {comment}" for comment in comments or []]
+    _emit_value(f"{_scalar(key)}:", value, 2, lines)
+    return "\n".join(lines) + "\n"
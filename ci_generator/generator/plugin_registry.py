@@ -0,0 +1,161 @@
+"""
+plugin_registry.py
+
+Реестр плагинов выбора стадий.
+
+Плагины описываются метаданными (plugins.PLUGINS и entry points группы
+"ci_generator.plugins"): ключи анализа, на которые плагин реагирует, и
+стадии, которые он может добавить. Реестр индексирует плагины по ключам
+анализа; для анализа проверяются только плагины, чьи триггеры в нем есть,
+и только их модули импортируются (один раз на процесс). Окончательное
+решение по-прежнему принимает enabled() плагина.
+"""
+
+import importlib
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Группа entry points для плагинов из отдельных пакетов
+ENTRY_POINT_GROUP = "ci_generator.plugins"
+
+
+class PluginError(ValueError):
+    """Некорректное описание плагина."""
+
+
+@dataclass
+class PluginSpec:
+    """Описание плагина (без импорта его модуля)."""
+
+    name: str
+    module: str
+    # Ключ анализа -> значения (None - значение ключа непустое)
+    triggers: Dict[str, Optional[FrozenSet[str]]]
+    stages: Tuple[str, ...] = ()
+    _plugin: Any = field(default=None, init=False, repr=False, compare=False)
+
+    @classmethod
+    def from_manifest(cls, manifest: Dict[str, Any]) -> "PluginSpec":
+        try:
+            name, module, raw_triggers = manifest["name"], manifest["module"], manifest["triggers"]
+        except (KeyError, TypeError) as e:
+            raise PluginError(f"Описание плагина должно содержать name, module и triggers: {manifest!r}") from e
+        if not raw_triggers:
+            raise PluginError(f"Плагин {name}: не указаны триггеры")
+        triggers: Dict[str, Optional[FrozenSet[str]]] = {}
+        for key, values in raw_triggers.items():
+            if values is True:
+                triggers[key] = None
+            elif isinstance(values, str):
+                triggers[key] = frozenset({values.lower()})
+            else:
+                triggers[key] = frozenset(str(value).lower() for value in values)
+        return cls(name, module, triggers, tuple(manifest.get("stages", ())))
+
+    def triggered(self, key: str, value: Any) -> bool:
+        """Срабатывает ли триггер плагина на значение ключа анализа."""
+        expected = self.triggers[key]
+        if expected is None:
+            return bool(str(value).strip()) if isinstance(value, str) else bool(value)
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return any(str(item).lower() in expected for item in value)
+        return value is not None and str(value).lower() in expected
+
+    def load(self):
+        """Модуль плагина (импортируется при первом обращении)."""
+        if self._plugin is None:
+            self._plugin = importlib.import_module(self.module)
+        return self._plugin
+
+
+class PluginRegistry:
+    """Плагины, проиндексированные по ключам анализа."""
+
+    def __init__(self, specs: Iterable[PluginSpec]):
+        self.specs: List[PluginSpec] = []
+        self._index: Dict[str, List[PluginSpec]] = {}
+        for spec in specs:
+            self.register(spec)
+
+    def register(self, spec: PluginSpec):
+        if any(existing.name == spec.name for existing in self.specs):
+            raise PluginError(f"Плагин {spec.name} уже зарегистрирован")
+        self.specs.append(spec)
+        for key in spec.triggers:
+            self._index.setdefault(key, []).append(spec)
+
+    def candidates(self, analysis: Dict) -> List[PluginSpec]:
+        """Плагины, чьи триггеры есть в анализе (в порядке регистрации)."""
+        matched = set()
+        for key, specs in self._index.items():
+            value = analysis.get(key)
+            if value is None:
+                continue
+            for spec in specs:
+                if spec.name not in matched and spec.triggered(key, value):
+                    matched.add(spec.name)
+        return [spec for spec in self.specs if spec.name in matched]
+
+    def collect_stages(self, analysis: Dict, user_settings: Dict,
+                       wanted: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Стадии от включенных плагинов.
+
+        Args:
+            wanted: Нужные стадии (None - все); плагины, которые не могут
+                добавить ни одну из них, не импортируются
+        """
+        wanted = set(wanted) if wanted else None
+        stages: List[str] = []
+        for spec in self.candidates(analysis):
+            if wanted is not None and spec.stages and not wanted.intersection(spec.stages):
+                continue
+            plugin = spec.load()
+            if plugin.enabled(analysis):
+                stages += plugin.get_stages(analysis, user_settings)
+        return stages
+
+
+def _builtin_specs() -> List[PluginSpec]:
+    from plugins import PLUGINS
+
+    return [PluginSpec.from_manifest(manifest) for manifest in PLUGINS]
+
+
+def _entry_point_specs() -> List[PluginSpec]:
+    """Плагины из отдельных пакетов (ошибочные пропускаются с предупреждением)."""
+    from importlib.metadata import entry_points
+
+    specs = []
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            manifests = entry_point.load()
+            if isinstance(manifests, dict):
+                manifests = [manifests]
+            specs.extend(PluginSpec.from_manifest(manifest) for manifest in manifests)
+        except Exception as e:
+            logger.warning(f"Плагин {entry_point.name} ({entry_point.value}) не загружен: {e}")
+    return specs
+
+
+_registry: Optional[PluginRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_plugin_registry() -> PluginRegistry:
+    """Общий для процесса реестр: встроенные плагины и плагины из entry points."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            registry = PluginRegistry(_builtin_specs())
+            for spec in _entry_point_specs():
+                try:
+                    registry.register(spec)
+                except PluginError as e:
+                    logger.warning(str(e))
+            _registry = registry
+        return _registry
@@ -0,0 +1,251 @@
+"""
+render_cache.py
+
+Кэш отрендеренных пайплайнов.
+
+Множество проектов имеют одинаковый анализ и настройки (например, сервис
+на Spring Boot + Maven + Docker), поэтому рендеринг для них дает один и тот
+же результат. Ключ кэша - хэш канонической формы (платформа, стадии,
+контекст шаблонов) и отпечатка рендерера (шаблоны, проходы модели, код
+модели пайплайна). Записи хранятся в памяти процесса (LRU) и, если задан
+путь, в SQLite - тогда кэш общий для процессов и переживает перезапуск.
+Соединения SQLite открываются при первом обращении в каждом потоке; после
+fork дочерний процесс открывает свои.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Количество записей в памяти процесса
+DEFAULT_MEMORY_ENTRIES = 1024
+
+# Максимальное количество записей на диске
+DEFAULT_MAX_ENTRIES = 20_000
+
+# Таймаут ожидания блокировки базы другим процессом (секунды)
+_BUSY_TIMEOUT = 5.0
+
+
+def _canonical_default(value: Any) -> Any:
+    """Значения, которых нет в JSON: множества - отсортированные списки, остальное - строки."""
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+
+def canonical_json(value: Any) -> str:
+    """Каноническая JSON-форма значения (одинаковые данные - одинаковая строка)."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_canonical_default)
+
+
+def render_key(fingerprint: str, platform: str, stages, ctx: Dict[str, Any]) -> str:
+    """Ключ записи: хэш канонической формы входных данных рендеринга."""
+    payload = canonical_json([platform, list(stages), ctx])
+    digest = hashlib.blake2b(payload.encode("utf-8", "surrogatepass"), digest_size=20).hexdigest()
+    return f"{fingerprint}:{digest}"
+
+
+class RenderCache:
+    """Кэш результатов рендеринга (LRU в памяти + необязательный SQLite)."""
+
+    def __init__(self, path: Optional[Path] = None, memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            path: Путь к файлу базы SQLite (None - только память)
+            memory_entries: Количество записей в памяти процесса
+            max_entries: Максимальное количество записей на диске
+        """
+        self.path = Path(path) if path else None
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._local = threading.local()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        _instances.add(self)
+
+        if self.path:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Кэш рендеринга {self.path} недоступен, используется только память: {e}")
+                self.path = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory_entries > 0 or self.path is not None
+
+    def get(self, key: str) -> Optional[str]:
+        """Результат рендеринга по ключу (None - промах)."""
+        with self._lock:
+            output = self._memory.get(key)
+            if output is not None:
+                self._memory.move_to_end(key)
+                self._stats["hits"] += 1
+                return output
+
+        output = self._load(key)
+        with self._lock:
+            if output is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._stats["disk_hits"] += 1
+            self._remember(key, output)
+        return output
+
+    def put(self, key: str, output: str):
+        """Сохранить результат рендеринга."""
+        with self._lock:
+            self._stats["stores"] += 1
+            self._remember(key, output)
+        if not self.path:
+            return
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO render_cache (key, output, last_used) VALUES (?, ?, ?)",
+                    (key, output, time.time()),
+                )
+                self._evict(conn)
+        except sqlite3.Error as e:
+            # Кэш не критичен для генерации - при конфликте просто теряем запись
+            logger.debug(f"Не удалось сохранить кэш рендеринга: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика: попадания (в т.ч. с диска), промахи, сохранения, записей в памяти."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["persistent"] = self.path is not None
+        return stats
+
+    def clear(self):
+        """Очистить кэш в памяти и статистику (записи на диске не удаляются)."""
+        with self._lock:
+            self._memory.clear()
+            self._stats = dict.fromkeys(self._stats, 0)
+
+    def _remember(self, key: str, output: str):
+        self._memory[key] = output
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[str]:
+        if not self.path:
+            return None
+        try:
+            conn = self._connection()
+            row = conn.execute("SELECT output FROM render_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                with conn:
+                    conn.execute("UPDATE render_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error as e:
+            logger.debug(f"Ошибка чтения кэша рендеринга: {e}")
+            return None
+        return row[0] if row is not None else None
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Удалить давно не использованные записи сверх лимита (с запасом 10%)."""
+        count = conn.execute("SELECT COUNT(*) FROM render_cache").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * 0.9)
+        conn.execute(
+            "DELETE FROM render_cache WHERE key IN "
+            "(SELECT key FROM render_cache ORDER BY last_used, rowid LIMIT ?)",
+            (excess,),
+        )
+        logger.info(f"Кэш рендеринга: удалено {excess} старых записей")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Отдельное соединение для каждого потока (открывается при первом обращении)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                conn = sqlite3.connect(str(self.path), timeout=_BUSY_TIMEOUT)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                self._init_schema(conn)
+            except sqlite3.Error as e:
+                logger.warning(f"Кэш рендеринга {self.path} недоступен, используется только память: {e}")
+                self.path = None
+                raise
+            self._local.conn = conn
+        return conn
+
+    def _reset_after_fork(self):
+        """
+        Сбросить соединения, унаследованные от родителя при fork: дочерний
+        процесс откроет свои. Соединения родителя не закрываются (закрытие
+        может выполнить checkpoint WAL из чужого процесса).
+        """
+        _inherited_connections.append(self._local)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _init_schema(conn: sqlite3.Connection):
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS render_cache ("
+                "key TEXT PRIMARY KEY, output TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_render_cache_last_used ON render_cache (last_used)")
+
+
+_render_cache: Optional[RenderCache] = None
+_render_cache_lock = threading.Lock()
+
+# Все кэши процесса (для сброса соединений после fork)
+_instances: "weakref.WeakSet[RenderCache]" = weakref.WeakSet()
+
+# Соединения, унаследованные от родительского процесса (не используются и не закрываются)
+_inherited_connections: List[threading.local] = []
+
+
+def _reset_caches_after_fork():
+    global _render_cache_lock
+    for cache in list(_instances):
+        cache._reset_after_fork()
+    _render_cache_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_caches_after_fork)
+
+
+def get_render_cache() -> RenderCache:
+    """
+    Общий для процесса кэш рендеринга.
+
+    Настройки из переменных окружения:
+    CI_GENERATOR_RENDER_CACHE - путь к базе SQLite (по умолчанию только память),
+    CI_GENERATOR_RENDER_CACHE_SIZE - количество записей в памяти (0 - кэш отключен).
+    """
+    global _render_cache
+    with _render_cache_lock:
+        if _render_cache is None:
+            path = os.environ.get("CI_GENERATOR_RENDER_CACHE")
+            memory_entries = int(os.environ.get("CI_GENERATOR_RENDER_CACHE_SIZE", DEFAULT_MEMORY_ENTRIES))
+            _render_cache = RenderCache(Path(path).expanduser() if path else None, memory_entries)
+        return _render_cache
@@ -9,16 +9,194 @@ renderer.py
   templates_root/<platform>/stages/shared/<stage>.<ext>
 
 Если шаблона для стадии нет — стадия пропускается (маловероятно).
+
+Результаты рендеринга кэшируются (render_cache): одинаковые стадии и
+контекст дают готовый пайплайн без рендеринга шаблонов.
+
+Фрагменты GitLab-шаблонов загружаются в структурную модель пайплайна
+(pipeline_model.Pipeline), над ней выполняются проходы, и YAML формируется
+один раз в конце.
+
+Шаблоны компилируются один раз на процесс: реестр (get_template_registry)
+хранит общее Jinja-окружение для каждой директории шаблонов, заранее
+компилирует все шаблоны и индекс их путей. Скомпилированный код шаблонов
+сохраняется в кэш байткода на диске, поэтому новый процесс не разбирает
+шаблоны заново. Реестр используется и генератором docker-compose.
+
+Рендерер может без рендеринга перечислить зависимости пайплайна
+(dependencies): использованные шаблоны с хэшами исходников и прочитанные
+ими значения контекста с хэшами. По ним перегенерация определяет, какие
+пайплайны могли измениться.
 """
 
+import hashlib
 import os
-from jinja2 import Environment, FileSystemLoader
-from typing import List, Dict
+import sys
+import threading
+from pathlib import Path
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, TemplateRuntimeError
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+try:
+    from .dependencies import ContextPath, content_hash, context_hashes, template_context_paths
+    from .cache_strategy import dependency_cache
+    from .passes import dag_needs
+    from .pipeline_model import Pipeline, PipelinePass
+    from .render_cache import RenderCache, get_render_cache, render_key
+except ImportError:
+    from generator.dependencies import ContextPath, content_hash, context_hashes, template_context_paths
+    from generator.cache_strategy import dependency_cache
+    from generator.passes import dag_needs
+    from generator.pipeline_model import Pipeline, PipelinePass
+    from generator.render_cache import RenderCache, get_render_cache, render_key
+
+# Проходы над моделью GitLab-пайплайна по умолчанию (выполняются по порядку)
+DEFAULT_PASSES: List[PipelinePass] = [dag_needs, dependency_cache]
+
+# Директория кэша байткода шаблонов по умолчанию
+DEFAULT_BYTECODE_DIR = Path.home() / ".cache" / "ci_generator" / "jinja"
+
+
+def _bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    """Кэш байткода шаблонов (CI_GENERATOR_BYTECODE_DIR; пустое значение - отключен)."""
+    value = os.environ.get("CI_GENERATOR_BYTECODE_DIR")
+    if value is None:
+        directory = DEFAULT_BYTECODE_DIR
+    elif value:
+        directory = Path(value).expanduser()
+    else:
+        return None
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return None
+    return FileSystemBytecodeCache(str(directory))
+
+
+def _raise_error(message: str):
+    """Прервать рендеринг с ошибкой (функция raise_error в шаблонах)."""
+    raise TemplateRuntimeError(message)
+
+
+class TemplateRegistry:
+    """
+    Скомпилированные шаблоны одной директории.
+
+    Все шаблоны компилируются при создании реестра. Окружение не проверяет
+    изменения файлов (auto_reload=False): шаблоны - часть поставки, и после
+    их изменения процесс перезапускается.
+    """
+
+    def __init__(self, templates_root: str):
+        self.templates_root = templates_root
+        self.env = Environment(
+            loader=FileSystemLoader(templates_root),
+            trim_blocks=True,
+            lstrip_blocks=True,
+            auto_reload=False,
+            cache_size=-1,
+            bytecode_cache=_bytecode_cache(),
+        )
+        self.env.globals["raise_error"] = _raise_error
+        # Индекс путей шаблонов (относительно templates_root, через "/")
+        self.templates: FrozenSet[str] = frozenset(self.env.list_templates())
+        # Хэши исходников шаблонов и отпечаток всего набора (хэш имен и исходников)
+        self.template_hashes: Dict[str, str] = {}
+        digest = hashlib.sha256()
+        for name in sorted(self.templates):
+            source, _, _ = self.env.loader.get_source(self.env, name)
+            self.template_hashes[name] = content_hash(source)
+            digest.update(f"{name}\0{source}\0".encode("utf-8", "surrogatepass"))
+            if name.endswith(".j2"):
+                self.env.get_template(name)
+        self.fingerprint = digest.hexdigest()[:16]
+        # Пути контекста, которые читают шаблоны (разбираются при первом запросе)
+        self._context_paths: Dict[str, FrozenSet[ContextPath]] = {}
+
+    def has_template(self, name: str) -> bool:
+        return name in self.templates
+
+    def context_paths(self, name: str) -> FrozenSet[ContextPath]:
+        """Пути контекста, которые читает шаблон name."""
+        paths = self._context_paths.get(name)
+        if paths is None:
+            source, _, _ = self.env.loader.get_source(self.env, name)
+            paths = template_context_paths(self.env, source)
+            self._context_paths[name] = paths
+        return paths
+
+
+_registries: Dict[str, TemplateRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_template_registry(templates_root: str) -> TemplateRegistry:
+    """Общий для процесса реестр шаблонов директории templates_root."""
+    key = os.path.realpath(templates_root)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = TemplateRegistry(str(templates_root))
+            _registries[key] = registry
+        return registry
+
+
+_renderers: Dict[str, "PipelineRenderer"] = {}
+_renderers_lock = threading.Lock()
+
+
+def get_renderer(templates_root: str = "pipelines") -> "PipelineRenderer":
+    """Общий для процесса рендерер пайплайнов для директории templates_root."""
+    key = os.path.realpath(templates_root)
+    with _renderers_lock:
+        renderer = _renderers.get(key)
+        if renderer is None:
+            renderer = PipelineRenderer(templates_root, cache=get_render_cache())
+            _renderers[key] = renderer
+        return renderer
+
+
+def _code_fingerprint(passes: List[PipelinePass]) -> str:
+    """Отпечаток кода рендеринга: проходы модели и код рендерера, модели пайплайна и модулей проходов."""
+    digest = hashlib.sha256()
+    generator_dir = Path(__file__).resolve().parent
+    files = [generator_dir / "renderer.py", generator_dir / "pipeline_model.py"]
+    for pipeline_pass in passes:
+        digest.update(f"{pipeline_pass.__module__}.{pipeline_pass.__qualname__}\0".encode())
+        module_file = getattr(sys.modules.get(pipeline_pass.__module__), "__file__", None)
+        if module_file and Path(module_file).resolve() not in files:
+            files.append(Path(module_file).resolve())
+    for path in files:
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def _pass_context_paths(pipeline_pass: PipelinePass) -> List[ContextPath]:
+    """
+    Пути контекста, которые читает проход модели.
+
+    Проход объявляет их атрибутом context_keys (например, ("language",
+    "analysis.docker")); проход без объявления зависит от всего контекста.
+    """
+    keys = getattr(pipeline_pass, "context_keys", None)
+    if keys is None:
+        return [("ctx",)]
+    return [("ctx",) + tuple(key.split(".")) for key in keys]
+
 
 class PipelineRenderer:
-    def __init__(self, templates_root: str = "pipelines"):
+    def __init__(self, templates_root: str = "pipelines", passes: Optional[Iterable[PipelinePass]] = None,
+                 cache: Optional[RenderCache] = None):
         self.templates_root = templates_root
-        self.env = Environment(loader=FileSystemLoader(templates_root), trim_blocks=True, lstrip_blocks=True)
+        self.passes = list(DEFAULT_PASSES if passes is None else passes)
+        self.registry = get_template_registry(templates_root)
+        self.env = self.registry.env
+        # Кэш результатов рендеринга (None - без кэша)
+        self.cache = cache if cache is not None and cache.enabled else None
+        self.code_fingerprint = _code_fingerprint(self.passes)
+        self.fingerprint = hashlib.sha256(
+            f"{self.registry.fingerprint}\0{self.code_fingerprint}".encode()
+        ).hexdigest()[:16]
 
         # search order for stage templates
         # tests вынесены в отдельную директорию "tests"
@@ -31,12 +209,12 @@ class PipelineRenderer:
         ext: 'gitlab.j2' or 'jenkins.j2' suffix.
         Сначала ищет в директории языка из ctx.language, затем в общих директориях.
         """
-        base = os.path.join(platform, "stages")
+        base = f"{platform}/stages"
         
         # Специальная логика для deploy: если use_docker_compose = True, используем shared/deploy
         if stage == "deploy" and ctx and ctx.get("use_docker_compose", False):
-            candidate = os.path.join(base, "shared", f"{stage}.{ext}")
-            if os.path.exists(os.path.join(self.templates_root, candidate)):
+            candidate = f"{base}/shared/{stage}.{ext}"
+            if self.registry.has_template(candidate):
                 return candidate
         
         # Определяем приоритетный язык из контекста
@@ -57,8 +235,8 @@ class PipelineRenderer:
         
         # Сначала проверяем директорию языка, если она определена
         if language_dir and language_dir in self.stage_dirs:
-            candidate = os.path.join(base, language_dir, f"{stage}.{ext}")
-            if os.path.exists(os.path.join(self.templates_root, candidate)):
+            candidate = f"{base}/{language_dir}/{stage}.{ext}"
+            if self.registry.has_template(candidate):
                 return candidate
         
         # Затем проверяем остальные директории в порядке приоритета
@@ -77,30 +255,82 @@ class PipelineRenderer:
             # Пропускаем уже проверенную директорию языка
             if d == language_dir:
                 continue
-            candidate = os.path.join(base, d, f"{stage}.{ext}")
-            if os.path.exists(os.path.join(self.templates_root, candidate)):
+            candidate = f"{base}/{d}/{stage}.{ext}"
+            if self.registry.has_template(candidate):
                 return candidate
         return None
 
-    def render_gitlab(self, stages: List[str], ctx: Dict) -> str:
-        parts = []
-        # base header (stages list + variables)
+    def build_gitlab(self, stages: List[str], ctx: Dict) -> Pipeline:
+        """Собрать модель GitLab-пайплайна из шаблонов (без проходов)."""
+        pipeline = Pipeline()
+        # base header (stages list + workflow + variables)
         header_tpl = self.env.get_template("gitlab/base_header.j2")
-        parts.append(header_tpl.render(stages=stages, ctx=ctx))
+        pipeline.add_fragment(header_tpl.render(stages=stages, ctx=ctx))
 
-        # append each stage template content
+        # each stage template adds its jobs
         for s in stages:
             tpl_path = self._find_stage_template("gitlab", s, "gitlab.j2", ctx)
             if tpl_path:
                 tpl = self.env.get_template(tpl_path)
-                parts.append(tpl.render(ctx=ctx))
+                pipeline.add_fragment(tpl.render(ctx=ctx))
             else:
                 # skip silently if no template (extensible)
-                parts.append(f"# NOTE: no template for stage: {s}\n")
+                pipeline.notes.append(f"NOTE: no template for stage: {s}")
 
-        return "\n".join(parts)
+        return pipeline
+
+    def dependencies(self, platform: str, stages: List[str], ctx: Dict) -> Dict[str, Any]:
+        """
+        Зависимости пайплайна без рендеринга.
+
+        Returns:
+            {"renderer": отпечаток кода рендеринга,
+             "templates": {шаблон: хэш исходника},
+             "context": {путь контекста: хэш значения}}
+            Одинаковые зависимости означают одинаковый результат рендеринга.
+        """
+        templates = [f"{platform}/base_header.j2"]
+        for s in stages:
+            tpl_path = self._find_stage_template(platform, s, f"{platform}.j2", ctx)
+            if tpl_path:
+                templates.append(tpl_path)
+
+        # Список стадий определяет порядок задач и заметки о стадиях без шаблона
+        paths: List[ContextPath] = [("stages",)]
+        for name in templates:
+            paths.extend(self.registry.context_paths(name))
+        if platform == "gitlab":
+            for pipeline_pass in self.passes:
+                paths.extend(_pass_context_paths(pipeline_pass))
+
+        return {
+            "renderer": self.code_fingerprint,
+            "templates": {name: self.registry.template_hashes.get(name, "missing") for name in templates},
+            "context": context_hashes({"stages": list(stages), "ctx": ctx}, paths),
+        }
+
+    def _cached(self, platform: str, stages: List[str], ctx: Dict, render) -> str:
+        if self.cache is None:
+            return render(stages, ctx)
+        key = render_key(self.fingerprint, platform, stages, ctx)
+        output = self.cache.get(key)
+        if output is None:
+            output = render(stages, ctx)
+            self.cache.put(key, output)
+        return output
+
+    def render_gitlab(self, stages: List[str], ctx: Dict) -> str:
+        return self._cached("gitlab", stages, ctx, self._render_gitlab)
 
     def render_jenkins(self, stages: List[str], ctx: Dict) -> str:
+        return self._cached("jenkins", stages, ctx, self._render_jenkins)
+
+    def _render_gitlab(self, stages: List[str], ctx: Dict) -> str:
+        pipeline = self.build_gitlab(stages, ctx)
+        pipeline.apply(self.passes, ctx)
+        return pipeline.to_yaml()
+
+    def _render_jenkins(self, stages: List[str], ctx: Dict) -> str:
         parts = []
         header_tpl = self.env.get_template("jenkins/base_header.j2")
         parts.append(header_tpl.render(ctx=ctx))
@@ -2,18 +2,16 @@
 stage_selector.py
 
 Собирает список стадий, используя плагины (languages + technologies).
+Плагины выбираются по триггерам из их описаний (plugin_registry): модули
+плагинов, не относящихся к анализу, не импортируются.
 """
 
 from typing import List, Dict
 
-# import plugins (абсолютные импорты от корня проекта)
-from plugins.languages import python as python_plugin
-from plugins.languages import java as java_plugin
-from plugins.languages import go as go_plugin
-from plugins.languages import typescript as typescript_plugin
-from plugins.technologies import docker as docker_plugin
-from plugins.technologies import kubernetes as k8s_plugin
-from plugins.tests import pytest as pytest_tests_plugin
+try:
+    from .plugin_registry import get_plugin_registry
+except ImportError:
+    from generator.plugin_registry import get_plugin_registry
 
 # canonical order
 ALL_STAGES = [
@@ -38,26 +36,7 @@ def select_stages(analysis: Dict, user_settings: Dict) -> List[str]:
     """
     user_defined = user_settings.get("stages") or []
 
-    stages = []
-
-    # language plugins
-    if python_plugin.enabled(analysis):
-        stages += python_plugin.get_stages(analysis, user_settings)
-    if java_plugin.enabled(analysis):
-        stages += java_plugin.get_stages(analysis, user_settings)
-    if go_plugin.enabled(analysis):
-        stages += go_plugin.get_stages(analysis, user_settings)
-    if typescript_plugin.enabled(analysis):
-        stages += typescript_plugin.get_stages(analysis, user_settings)
-    # tests (зависят только от test_runner, а не от языка)
-    if pytest_tests_plugin.enabled(analysis):
-        stages += pytest_tests_plugin.get_stages(analysis, user_settings)
-    # docker
-    if docker_plugin.enabled(analysis):
-        stages += docker_plugin.get_stages(analysis, user_settings)
-    # kubernetes
-    if k8s_plugin.enabled(analysis):
-        stages += k8s_plugin.get_stages(analysis, user_settings)
+    stages = get_plugin_registry().collect_stages(analysis, user_settings, wanted=user_defined or None)
 
     # always include pre_checks from shared if user allows
     if "pre_checks" not in stages:
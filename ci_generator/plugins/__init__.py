@@ -1,5 +1,64 @@
 """
 Пакет с плагинами для генератора CI (языки, технологии и т.п.).
-"""
 
+PLUGINS - описания встроенных плагинов. Модуль плагина импортируется
+только если в анализе есть его триггеры (generator.plugin_registry), поэтому
+описание не должно импортировать сами плагины.
+
+Описание плагина:
+  name     - имя плагина
+  module   - модуль с функциями enabled(analysis) и get_stages(analysis, user_settings)
+  triggers - ключи анализа, на которые реагирует плагин: список значений
+             (для списка в анализе - любое из значений, без учета регистра)
+             или True (значение ключа непустое)
+  stages   - стадии, которые плагин может добавить
+
+Плагины, поставляемые отдельными пакетами, регистрируют такое же описание
+(или список описаний) в группе entry points "ci_generator.plugins".
+"""
 
+PLUGINS = [
+    {
+        "name": "python",
+        "module": "plugins.languages.python",
+        "triggers": {"languages": ["python"]},
+        "stages": ["lint", "type_check", "security", "build", "migration"],
+    },
+    {
+        "name": "java",
+        "module": "plugins.languages.java",
+        "triggers": {"languages": ["java"]},
+        "stages": ["lint", "type_check", "security", "build", "migration"],
+    },
+    {
+        "name": "go",
+        "module": "plugins.languages.go",
+        "triggers": {"languages": ["go"]},
+        "stages": ["lint", "type_check", "security", "build", "migration"],
+    },
+    {
+        "name": "typescript",
+        "module": "plugins.languages.typescript",
+        "triggers": {"languages": ["typescript", "javascript"]},
+        "stages": ["lint", "type_check", "security", "build", "migration"],
+    },
+    # Тесты зависят только от test_runner, а не от языка
+    {
+        "name": "tests",
+        "module": "plugins.tests.pytest",
+        "triggers": {"test_runner": True},
+        "stages": ["test"],
+    },
+    {
+        "name": "docker",
+        "module": "plugins.technologies.docker",
+        "triggers": {"docker": True},
+        "stages": ["docker_build", "docker_push", "cleanup", "integration", "deploy"],
+    },
+    {
+        "name": "kubernetes",
+        "module": "plugins.technologies.kubernetes",
+        "triggers": {"kubernetes": True},
+        "stages": ["deploy", "post_deploy"],
+    },
+]
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Тесты импортируют generator так же, как core-service (из директории ci_generator)
+CI_GENERATOR = Path(__file__).resolve().parents[1]
+if str(CI_GENERATOR) not in sys.path:
+    sys.path.insert(0, str(CI_GENERATOR))
@@ -0,0 +1,135 @@
+from generator.passes import dag_needs
+from generator.pipeline_model import Pipeline
+
+
+def _pipeline(text):
+    pipeline = Pipeline()
+    pipeline.add_fragment(text)
+    return pipeline
+
+
+def _needs(pipeline, name):
+    return pipeline.jobs[name].needs
+
+
+PIPELINE = """
+.template:
+  stage: lint
+lint:
+  stage: lint
+  script: [ruff .]
+test:
+  stage: test
+  script: [pytest]
+security:
+  stage: security
+  script: [bandit -r .]
+  rules:
+    - if: $CI_COMMIT_BRANCH == $CI_DEFAULT_BRANCH
+build:
+  stage: build
+  script: [make]
+docker_build:
+  stage: docker_build
+  script: [docker build .]
+  dependencies: [build, missing]
+docker_push:
+  stage: docker_push
+  script: [docker push image]
+deploy:
+  stage: deploy
+  script: [kubectl apply -f k8s]
+cleanup:
+  stage: cleanup
+  script: [echo done]
+"""
+
+
+def test_checks_run_in_parallel_and_later_stages_wait():
+    pipeline = _pipeline(PIPELINE)
+    dag_needs(pipeline, {})
+
+    assert _needs(pipeline, "lint") == []
+    assert _needs(pipeline, "test") == []
+    assert _needs(pipeline, "docker_build") == ["build"]
+    # Условная задача может не попасть в пайплайн - optional
+    assert _needs(pipeline, "docker_push") == [
+        "docker_build", "lint", {"job": "security", "optional": True}, "test",
+    ]
+    # Вместо отсутствующих integration и migration - их предшественники
+    assert _needs(pipeline, "deploy") == [
+        "docker_push", "docker_build", "lint", {"job": "security", "optional": True}, "test", "build",
+    ]
+    # Стадии без правил и скрытые задачи не изменяются
+    assert _needs(pipeline, "cleanup") is None
+    assert _needs(pipeline, ".template") is None
+
+
+def test_needs_follow_stage_after_missing_prerequisites():
+    pipeline = _pipeline("""
+test:
+  stage: test
+  script: [pytest]
+deploy:
+  stage: deploy
+  script: [deploy]
+""")
+    dag_needs(pipeline, {})
+    # Нет docker_push, integration и migration - берутся их предшественники
+    assert _needs(pipeline, "deploy") == ["test"]
+    assert list(pipeline.jobs["deploy"].spec) == ["stage", "needs", "script"]
+
+
+def test_dependencies_are_merged_and_pruned():
+    pipeline = _pipeline(PIPELINE)
+    dag_needs(pipeline, {})
+    assert pipeline.jobs["docker_build"].spec["dependencies"] == ["build"]
+
+    pipeline = _pipeline("""
+test:
+  stage: test
+  script: [pytest]
+integration:
+  stage: integration
+  script: [run]
+  dependencies: [test]
+""")
+    dag_needs(pipeline, {})
+    assert _needs(pipeline, "integration") == ["test"]
+
+
+def test_image_pushed_by_build_job_waits_for_checks():
+    pipeline = _pipeline("""
+lint:
+  stage: lint
+  script: [ruff .]
+build:
+  stage: build
+  script: [make]
+docker_build_web:
+  stage: docker_build
+  script:
+    - docker build -t $IMAGE .
+    - docker push $IMAGE
+""")
+    dag_needs(pipeline, {})
+    assert _needs(pipeline, "docker_build_web") == ["build", "lint"]
+
+
+def test_template_needs_are_kept_and_dag_can_be_disabled():
+    text = """
+test:
+  stage: test
+  script: [pytest]
+deploy:
+  stage: deploy
+  needs: []
+  script: [deploy]
+"""
+    pipeline = _pipeline(text)
+    dag_needs(pipeline, {})
+    assert _needs(pipeline, "deploy") == []
+
+    pipeline = _pipeline(PIPELINE)
+    dag_needs(pipeline, {"user_settings": {"dag": False}})
+    assert all(job.needs is None for job in pipeline.jobs.values())
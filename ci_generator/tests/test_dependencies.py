@@ -0,0 +1,71 @@
+from pathlib import Path
+
+from jinja2 import Environment
+
+from generator.dependencies import context_hashes, lookup, template_context_paths
+from generator.renderer import PipelineRenderer
+
+PIPELINES = Path(__file__).resolve().parents[1] / "pipelines"
+
+
+def _paths(source, **globals_):
+    env = Environment()
+    env.globals.update(globals_)
+    return {".".join(path) for path in template_context_paths(env, source)}
+
+
+def test_static_paths_are_extracted():
+    source = (
+        "{{ ctx.language }}"
+        "{% if ctx['analysis'].frameworks %}{% endif %}"
+        "{{ ctx.get('build_tool', ctx.user_settings.get('build_tool')) }}"
+        "{% set local = 1 %}{{ local }}"
+    )
+    assert _paths(source) == {
+        "ctx.language", "ctx.analysis.frameworks", "ctx.build_tool", "ctx.user_settings.build_tool",
+    }
+
+
+def test_dynamic_access_depends_on_whole_value():
+    assert _paths("{% for key, value in ctx.variables.items() %}{% endfor %}") == {"ctx.variables"}
+    assert _paths("{{ ctx.analysis[ctx.key] }}") == {"ctx.analysis", "ctx.key"}
+    assert _paths("{{ helper(ctx) }}", helper=len) == {"ctx"}
+
+
+def test_lookup_dicts_objects_and_missing():
+    class Analysis:
+        frameworks = ["django"]
+
+    namespace = {"ctx": {"analysis": Analysis(), "empty": None}}
+    assert lookup(namespace, ("ctx", "analysis", "frameworks")) == ["django"]
+    assert lookup(namespace, ("ctx", "empty")) is None
+    assert lookup(namespace, ("ctx", "empty", "x")) is not None
+    assert lookup(namespace, ("ctx", "absent")) is lookup(namespace, ("ctx", "other"))
+
+
+def test_context_hashes_skip_nested_paths_and_distinguish_missing():
+    namespace = {"ctx": {"analysis": {"frameworks": ["django"]}, "language": None}}
+    hashes = context_hashes(namespace, [("ctx", "analysis", "frameworks"), ("ctx", "analysis"),
+                                        ("ctx", "language"), ("ctx", "absent")])
+    assert list(hashes) == ["ctx.absent", "ctx.analysis", "ctx.language"]
+    assert hashes["ctx.absent"] == "missing"
+    assert hashes["ctx.language"] != "missing"
+
+
+def _ctx(**overrides):
+    ctx = {"language": "python", "python_version": "3.11", "analysis": {"languages": ["Python"]},
+           "user_settings": {}, "variables": {}, "triggers": {}}
+    ctx.update(overrides)
+    return ctx
+
+
+def test_pipeline_dependencies_follow_values_read_by_templates():
+    renderer = PipelineRenderer(templates_root=str(PIPELINES), cache=None)
+    stages = ["lint", "test"]
+    base = renderer.dependencies("gitlab", stages, _ctx())
+
+    # Значение, которое шаблоны не читают, не меняет зависимости
+    assert renderer.dependencies("gitlab", stages, _ctx(unused_setting="x")) == base
+    assert renderer.dependencies("gitlab", stages, _ctx(python_version="3.12")) != base
+    assert set(base["templates"]) >= {"gitlab/base_header.j2"}
+    assert all(name in renderer.registry.template_hashes for name in base["templates"])
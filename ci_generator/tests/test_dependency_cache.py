@@ -0,0 +1,116 @@
+from generator.cache_strategy import FALLBACK_JOB, dependency_cache, select_cache_spec
+from generator.pipeline_model import Pipeline
+
+PIPELINE = """
+.base:
+  stage: test
+lint:
+  stage: lint
+  image: python:3.11
+  cache:
+    key: ${CI_COMMIT_REF_SLUG}
+    paths: [.cache/pip/]
+  script: [ruff .]
+test:
+  stage: test
+  image: python:3.11
+  tags: [docker]
+  variables:
+    PIP_CACHE_DIR: /custom
+  script: [pytest]
+sonarcube:
+  stage: sonarcube
+  cache:
+    key: sonar
+    paths: [.sonar/cache, node_modules/]
+  script: [sonar-scanner]
+deploy:
+  stage: deploy
+  script: [deploy]
+"""
+
+CTX = {"language": "python", "analysis": {"package_manager": "pip"}, "user_settings": {}}
+
+
+def _pipeline(text=PIPELINE):
+    pipeline = Pipeline()
+    pipeline.add_fragment(text)
+    return pipeline
+
+
+def _policies(job):
+    return [entry.get("policy") for entry in job.cache]
+
+
+def test_only_pusher_uploads_lockfile_cache():
+    pipeline = _pipeline()
+    dependency_cache(pipeline, CTX)
+
+    lint, test = pipeline.jobs["lint"], pipeline.jobs["test"]
+    assert _policies(test) == ["pull-push"]
+    assert _policies(lint) == ["pull"]
+    assert lint.cache[0]["key"] == {"files": ["requirements.txt", "requirements-dev.txt"], "prefix": "pip"}
+    assert lint.cache[0]["fallback_keys"] == ["pip-$CI_DEFAULT_BRANCH"]
+    # Кэш не зависимостей сохраняется, каталоги зависимостей из шаблона - нет
+    assert pipeline.jobs["sonarcube"].cache[1] == {"key": "sonar", "paths": [".sonar/cache"]}
+    assert "cache" not in pipeline.jobs["deploy"].spec
+    assert pipeline.jobs[".base"].cache is None
+
+
+def test_variables_are_merged_after_cache():
+    pipeline = _pipeline()
+    dependency_cache(pipeline, CTX)
+
+    assert pipeline.jobs["test"].spec["variables"] == {"PIP_CACHE_DIR": "/custom"}
+    lint = pipeline.jobs["lint"].spec
+    assert list(lint) == ["stage", "image", "cache", "variables", "script"]
+    assert lint["variables"] == {"PIP_CACHE_DIR": "$CI_PROJECT_DIR/.cache/pip"}
+
+
+def test_fallback_cache_is_pushed_only_from_default_branch():
+    pipeline = _pipeline()
+    dependency_cache(pipeline, CTX)
+
+    assert list(pipeline.jobs).index(FALLBACK_JOB) == list(pipeline.jobs).index("test") + 1
+    fallback = pipeline.jobs[FALLBACK_JOB].spec
+    assert fallback["rules"] == [{"if": "$CI_COMMIT_BRANCH == $CI_DEFAULT_BRANCH"}]
+    assert fallback["needs"] == ["test"]
+    assert fallback["image"] == "python:3.11" and fallback["tags"] == ["docker"]
+    assert [entry["policy"] for entry in fallback["cache"]] == ["pull", "push"]
+    assert fallback["cache"][1]["key"] == "pip-$CI_DEFAULT_BRANCH"
+
+    # Во всех остальных задачах нет кэша, который только загружается
+    pushes = [job.name for job in pipeline.jobs.values()
+              if any(entry.get("policy") == "push" for entry in job.cache or [])]
+    assert pushes == [FALLBACK_JOB]
+
+
+def test_conditional_pusher_is_optional_need():
+    pipeline = _pipeline("""
+lint:
+  stage: lint
+  script: [ruff .]
+  rules:
+    - if: $CI_MERGE_REQUEST_ID
+""")
+    dependency_cache(pipeline, CTX)
+    assert pipeline.jobs[FALLBACK_JOB].needs == [{"job": "lint", "optional": True}]
+
+
+def test_opt_out_and_unknown_ecosystem():
+    pipeline = _pipeline()
+    dependency_cache(pipeline, dict(CTX, user_settings={"dependency_cache": False}))
+    assert FALLBACK_JOB not in pipeline.jobs
+    assert pipeline.jobs["lint"].cache == {"key": "${CI_COMMIT_REF_SLUG}", "paths": [".cache/pip/"]}
+
+    pipeline = _pipeline()
+    dependency_cache(pipeline, {"language": "rust"})
+    assert FALLBACK_JOB not in pipeline.jobs
+
+
+def test_cache_spec_selection():
+    assert select_cache_spec({"language": "typescript", "analysis": {"package_manager": "pnpm"}}).prefix == "pnpm"
+    assert select_cache_spec({"language": "javascript"}).prefix == "npm"
+    assert select_cache_spec({"language": "java"}).prefix == "maven"
+    assert select_cache_spec({"language": "kotlin"}).prefix == "gradle"
+    assert select_cache_spec({"language": "java", "build_tool": "ant"}) is None
@@ -0,0 +1,73 @@
+from pathlib import Path
+
+import pytest
+from jinja2 import TemplateRuntimeError
+
+from generator.pipeline_model import Pipeline
+from generator.renderer import PipelineRenderer
+
+PIPELINES = Path(__file__).resolve().parents[1] / "pipelines"
+DOCKER_BUILD = "gitlab/stages/docker/docker_build.gitlab.j2"
+
+
+@pytest.fixture(scope="module")
+def renderer():
+    return PipelineRenderer(templates_root=str(PIPELINES), cache=None)
+
+
+def _render(renderer, dockerfile_paths, **ctx):
+    ctx = dict({"language": "python", "user_settings": {}, "dockerfile_paths": dockerfile_paths}, **ctx)
+    pipeline = Pipeline()
+    pipeline.add_fragment(renderer.env.get_template(DOCKER_BUILD).render(ctx=ctx))
+    return pipeline.jobs
+
+
+def _build_jobs(jobs):
+    return {name: job.spec for name, job in jobs.items() if name.startswith("docker_build_")}
+
+
+def test_job_names_use_whole_directory_path(renderer):
+    pipeline = _render(renderer, ["apps/web/Dockerfile", "services/web/Dockerfile", "api/Dockerfile"])
+
+    jobs = _build_jobs(pipeline)
+    assert sorted(jobs) == ["docker_build_api", "docker_build_apps_web", "docker_build_services_web"]
+    script = "\n".join(jobs["docker_build_services_web"]["script"])
+    assert "-f services/web/Dockerfile" in script
+    assert "$CI_REGISTRY_IMAGE-services_web:$CI_COMMIT_SHORT_SHA" in script
+    assert "$DOCKER_CACHE_IMAGE/services_web:" in script
+    assert jobs["docker_build_apps_web"]["rules"][1] == {"changes": {"paths": ["apps/web/**/*"]}}
+
+
+def test_dockerfile_suffix_is_part_of_name(renderer):
+    pipeline = _render(renderer, ["Dockerfile", "Dockerfile.worker", "svc/Dockerfile", "svc/Dockerfile.dev",
+                                  "svc/prod.Dockerfile"])
+    assert sorted(_build_jobs(pipeline)) == [
+        "docker_build_main", "docker_build_svc", "docker_build_svc_dev", "docker_build_svc_prod",
+        "docker_build_worker",
+    ]
+
+
+@pytest.mark.parametrize("dockerfile_paths", [
+    ["svc/Dockerfile.dev", "svc/Dockerfile-dev"],
+    ["apps/web-api/Dockerfile", "apps/web_api/Dockerfile"],
+])
+def test_colliding_names_fail_generation(renderer, dockerfile_paths):
+    with pytest.raises(TemplateRuntimeError, match="docker_build_"):
+        _render(renderer, dockerfile_paths)
+
+
+def test_single_root_dockerfile_keeps_single_job(renderer):
+    pipeline = _render(renderer, ["Dockerfile"], dockerfile_path="Dockerfile")
+    assert "docker_build" in pipeline and not _build_jobs(pipeline)
+
+
+@pytest.mark.parametrize("dockerfile_paths, job", [(["Dockerfile"], "docker_build"), (["svc/Dockerfile"], "docker_build_svc")])
+def test_default_branch_cache_uses_fixed_tag(renderer, dockerfile_paths, job):
+    jobs = _render(renderer, dockerfile_paths, dockerfile_path=dockerfile_paths[0])
+    script = "\n".join(jobs[job].spec["script"])
+
+    assert 'if [ "$CI_COMMIT_BRANCH" = "$CI_DEFAULT_BRANCH" ]; then CACHE_TAG="default-branch"; fi' in script
+    assert ":default-branch \\" in script
+    assert ":$CACHE_TAG,mode=max" in script
+    # Имя основной ветки не используется как тег
+    assert ":$CI_DEFAULT_BRANCH" not in script
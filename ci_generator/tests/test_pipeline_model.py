@@ -0,0 +1,134 @@
+import math
+
+import pytest
+import yaml
+
+from generator.pipeline_model import Pipeline, PipelineModelError
+
+# Строки, которые YAML 1.1 без кавычек прочитал бы не как строки
+YAML11_SCALARS = [
+    "yes", "No", "on", "OFF", "y", "n", "true", "False", "~", "null", "Null", "",
+    "0x1f", "012", "0o17", "1e3", "1_000", "+12", ".5", ".inf", "-.Inf", ".nan", "NaN",
+    "2024-01-01", "2024-01-01 10:00:00", "12:30", "190:20:30", "=", "<<",
+]
+
+SPECIAL_STRINGS = [
+    "- item", "key: value", "value:", "#comment", "a #b", "a# b", "*alias", "&anchor", "!tag",
+    "|", ">", "%TAG", "@at", "`cmd`", "'single'", '"double"', "it's", "[a, b]", "{a: b}",
+    "?", "? key", ",", " leading", "trailing ", "\ttab", "привет", "$CI_COMMIT_REF_SLUG",
+    "echo \"$VAR\" | grep -q 'x: y'",
+]
+
+BLOCK_STRINGS = [
+    "a\nb", "a\nb\n", "a\nb\n\n", "a\nb\n\n\n", "a\n\n\nb", "  leading\nx", "\nfirst empty",
+    "trailing space \nx", "\ttab\ny", "x\n  indented\n", "- not a list\n# not a comment\n",
+    "key: value\nother: 1\n", "'q'\n\"dq\"\n",
+]
+
+CONTROL_STRINGS = [
+    "\x00", "bell\x07", "\x1b[31mred", "line\u2028sep", "para\u2029sep", "\ufeffbom", "next\x85line",
+    "cr\rlf", "multi\x07\nline", "\x7f",
+]
+
+
+def _emit_and_load(value):
+    pipeline = Pipeline()
+    pipeline.add_fragment("job:\n  stage: test\n")
+    pipeline.jobs["job"].spec["value"] = value
+    return yaml.safe_load(pipeline.to_yaml())["job"]["value"]
+
+
+@pytest.mark.parametrize("value", YAML11_SCALARS + SPECIAL_STRINGS + BLOCK_STRINGS + CONTROL_STRINGS)
+def test_strings_round_trip(value):
+    assert _emit_and_load(value) == value
+
+
+@pytest.mark.parametrize("value", YAML11_SCALARS + SPECIAL_STRINGS + CONTROL_STRINGS)
+def test_keys_round_trip(value):
+    assert _emit_and_load({value: 1, "after": [value]}) == {value: 1, "after": [value]}
+
+
+def test_merge_key_is_not_merged():
+    assert _emit_and_load({"<<": {"a": 1}, "b": 2}) == {"<<": {"a": 1}, "b": 2}
+
+
+@pytest.mark.parametrize("value", [
+    None, True, False, 0, -7, 10 ** 20, 1.5, -0.25, 1e-9, float("inf"), float("-inf"),
+    1e20, -2.5e-7, [], {}, [[]], [{}], [1, "two", None], {"a": {"b": {"c": [1, {"d": "e\nf"}]}}},
+    [{"job": "build", "optional": True}, "lint"], [["a", "b"], ["c"]],
+    [{"multi": "line\ntext\n", "next": 1}], {"list": [{"a": [], "b": {}}]},
+])
+def test_values_round_trip(value):
+    assert _emit_and_load(value) == value
+
+
+def test_nan_round_trips():
+    assert math.isnan(_emit_and_load(float("nan")))
+
+
+def test_block_scalars_keep_chomping():
+    pipeline = Pipeline()
+    pipeline.add_fragment("job:\n  stage: test\n")
+    pipeline.jobs["job"].spec["script"] = ["echo a\necho b\n", "echo c\necho d", "e\n\n"]
+    text = pipeline.to_yaml()
+    assert "    - |\n      echo a\n      echo b\n" in text
+    assert "    - |-\n      echo c\n      echo d\n" in text
+    assert "    - |+\n      e\n\n" in text
+    assert yaml.safe_load(text)["job"]["script"] == ["echo a\necho b\n", "echo c\necho d", "e\n\n"]
+
+
+def test_duplicate_job_replaces_previous_definition():
+    pipeline = Pipeline()
+    pipeline.add_fragment("test:\n  stage: test\n  script: [pytest]\nlint:\n  stage: lint\n")
+    pipeline.add_fragment("test:\n  stage: test\n  script: [tox]\n")
+    assert list(pipeline.jobs) == ["test", "lint"]
+    assert pipeline.jobs["test"].spec == {"stage": "test", "script": ["tox"]}
+
+
+def test_variables_are_merged_and_other_globals_replaced():
+    pipeline = Pipeline()
+    pipeline.add_fragment("stages: [build]\nvariables:\n  A: '1'\n  B: '2'\nimage: python:3.11\n")
+    pipeline.add_fragment("stages: [build, test]\nvariables:\n  B: '3'\n  C: '4'\nimage: python:3.12\n")
+    assert pipeline.stages == ["build", "test"]
+    assert pipeline.globals["variables"] == {"A": "1", "B": "3", "C": "4"}
+    assert pipeline.globals["image"] == "python:3.12"
+    assert yaml.safe_load(pipeline.to_yaml()) == {
+        "stages": ["build", "test"], "variables": {"A": "1", "B": "3", "C": "4"}, "image": "python:3.12",
+    }
+
+
+def test_comments_attach_to_next_top_level_key():
+    pipeline = Pipeline()
+    pipeline.add_fragment(
+        "# Common variables\n"
+        "variables:\n"
+        "  # nested comment is dropped\n"
+        "  A: '1'\n"
+        "\n"
+        "# Unit tests\n"
+        "# (pytest)\n"
+        "test:\n"
+        "  stage: test\n"
+        "# stage deploy has no template\n"
+    )
+    assert pipeline.comments == {"variables": ["Common variables"]}
+    assert pipeline.jobs["test"].comments == ["Unit tests", "(pytest)"]
+    assert pipeline.notes == ["stage deploy has no template"]
+    assert pipeline.to_yaml() == (
+        "# Common variables\nvariables:\n  A: '1'\n\n"
+        "# Unit tests\n# (pytest)\ntest:\n  stage: test\n\n"
+        "# stage deploy has no template\n"
+    )
+
+
+def test_fragment_with_only_comments_keeps_them():
+    pipeline = Pipeline()
+    pipeline.add_fragment("\n# Lint is disabled for this project\n")
+    assert not pipeline.jobs
+    assert pipeline.to_yaml() == "# Lint is disabled for this project\n"
+
+
+@pytest.mark.parametrize("text", ["job: [", "- a\n- b\n", "job: echo\n"])
+def test_invalid_fragments_are_rejected(text):
+    with pytest.raises(PipelineModelError):
+        Pipeline().add_fragment(text)
@@ -0,0 +1,135 @@
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from generator.render_cache import RenderCache, render_key
+from generator.renderer import PipelineRenderer
+
+
+PIPELINES = Path(__file__).resolve().parents[1] / "pipelines"
+
+
+def _rows(path):
+    with sqlite3.connect(str(path)) as conn:
+        return dict(conn.execute("SELECT key, output FROM render_cache").fetchall())
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="нужен fork")
+def test_forked_child_opens_its_own_connection(tmp_path):
+    path = tmp_path / "render.sqlite3"
+    cache = RenderCache(path)
+    assert not path.exists()
+    parent_conn = cache._connection()
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_fd)
+            inherited = getattr(cache._local, "conn", None)
+            child_conn = cache._connection()
+            cache.put("child", "stages: []")
+            report = {"inherited": inherited is not None, "same": child_conn is parent_conn}
+            os.write(write_fd, json.dumps(report).encode())
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        report = json.loads(pipe.read())
+    os.waitpid(pid, 0)
+
+    assert report == {"inherited": False, "same": False}
+    assert cache._connection() is parent_conn
+    assert _rows(path) == {"child": "stages: []"}
+
+
+def test_render_key_is_canonical():
+    ctx = {"language": "python", "user_settings": {"b": 2, "a": 1}, "tags": {"x", "y", "z"}}
+    reordered = {"tags": {"z", "y", "x"}, "user_settings": {"a": 1, "b": 2}, "language": "python"}
+    key = render_key("fp", "gitlab", ["lint", "test"], ctx)
+
+    assert render_key("fp", "gitlab", ("lint", "test"), reordered) == key
+    assert key.startswith("fp:")
+    # Порядок стадий, платформа, отпечаток и значения входят в ключ
+    assert render_key("fp", "gitlab", ["test", "lint"], ctx) != key
+    assert render_key("fp", "jenkins", ["lint", "test"], ctx) != key
+    assert render_key("fp2", "gitlab", ["lint", "test"], ctx) != key
+    assert render_key("fp", "gitlab", ["lint", "test"], dict(ctx, language="go")) != key
+    assert render_key("fp", "gitlab", ["lint", "test"], dict(ctx, language=None)) != key
+
+
+def test_memory_lru_evicts_least_recently_used():
+    cache = RenderCache(memory_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+
+
+def test_stats_count_hits_misses_and_stores(tmp_path):
+    path = tmp_path / "render.sqlite3"
+    RenderCache(path).put("k", "output")
+
+    cache = RenderCache(path)
+    assert cache.get("missing") is None
+    assert cache.get("k") == "output"
+    assert cache.get("k") == "output"
+    cache.put("other", "x")
+
+    stats = cache.stats()
+    assert stats == {
+        "hits": 2, "disk_hits": 1, "misses": 1, "stores": 1,
+        "memory_entries": 2, "hit_rate": 0.667, "persistent": True,
+    }
+    cache.clear()
+    assert cache.stats()["hits"] == 0 and cache.stats()["memory_entries"] == 0
+    # Записи на диске после clear остаются
+    assert cache.get("k") == "output"
+
+
+def test_sqlite_entries_survive_restart_and_are_evicted_by_age(tmp_path):
+    path = tmp_path / "render.sqlite3"
+    cache = RenderCache(path, memory_entries=0, max_entries=10)
+    for n in range(10):
+        cache.put(f"k{n}", f"v{n}")
+    # Чтение обновляет last_used: k0 не удаляется первым
+    assert cache.get("k0") == "v0"
+    cache.put("k10", "v10")
+
+    rows = _rows(path)
+    # Сверх лимита удаляются давно не использованные записи (до 90% лимита)
+    assert len(rows) == 9
+    assert "k0" in rows and "k10" in rows
+    assert "k1" not in rows and "k2" not in rows
+
+    restarted = RenderCache(path)
+    assert restarted.get("k10") == "v10"
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_unusable_path_falls_back_to_memory(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = RenderCache(blocker / "render.sqlite3")
+    cache.put("k", "v")
+    assert cache.get("k") == "v"
+    assert cache.stats()["persistent"] is False
+
+
+def test_renderer_reuses_cached_output():
+    cache = RenderCache()
+    renderer = PipelineRenderer(templates_root=str(PIPELINES), cache=cache)
+    ctx = {"language": "python", "python_version": "3.11", "user_settings": {}, "variables": {},
+           "triggers": {"branches": ["main"]}}
+    first = renderer.render_gitlab(["lint"], ctx)
+    second = renderer.render_gitlab(["lint"], dict(reversed(list(ctx.items()))))
+
+    assert first == second
+    assert cache.stats()["hits"] == 1 and cache.stats()["stores"] == 1
@@ -1,17 +1,15 @@
 """CLI интерфейс для Self-Deploy Core Service."""
 import sys
 import json
+import logging
 import time
 from pathlib import Path
 from typing import Optional, Dict, Any
 
 import click
 
-from app import storage
-from app.database import Base, engine, get_db
-from app.schemas import Project, ProjectCreate, PipelineGenerationCreate
-from app.services.analyzer import analyze_repository, get_full_stack
-from app.services.pipeline_generator import generate_pipeline
+# Сервисы (SQLAlchemy, pydantic, Jinja2, stack_recognize) импортируются внутри
+# команд: --help и команды, которым они не нужны, запускаются без их загрузки
 
 
 def format_stack_to_markdown(analysis, full_stack) -> str:
@@ -120,13 +118,28 @@ PROJECT_ROOT = Path(__file__).resolve().parents[2]
 
 def init_db():
     """Инициализировать базу данных."""
-    Base.metadata.create_all(bind=engine)
+    from app import models  # noqa: F401 - регистрирует таблицы в Base.metadata
+    from app.database import Base, get_engine
+
+    Base.metadata.create_all(bind=get_engine())
+
+
+def local_command(command: click.Command) -> click.Command:
+    """
+    Отметить команду, которая выполняется в процессе клиента, а не в демоне.
+
+    Так отмечаются долгие команды (сервер, воркер), команды с лимитами
+    ресурсов процесса и команды, использующие fork.
+    """
+    command.run_locally = True
+    return command
 
 
 @click.group()
 def cli():
     """Self-Deploy CLI - управление проектами и генерация CI/CD пайплайнов."""
-    pass
+    # Логирование настраивает приложение: библиотека stack_recognize его не трогает
+    logging.basicConfig(level=logging.INFO)
 
 
 @cli.command()
@@ -135,6 +148,11 @@ def cli():
 @click.option("--token", default="", help="Токен для клонирования репозитория")
 def add_project(name: str, url: str, token: str):
     """Добавить новый проект и проанализировать его стек."""
+    from app import storage
+    from app.database import get_db
+    from app.schemas import ProjectCreate
+    from app.services.analyzer import analyze_repository
+
     click.echo(f"Анализ репозитория {url}...")
     
     try:
@@ -165,6 +183,9 @@ def add_project(name: str, url: str, token: str):
 @cli.command()
 def list_projects():
     """Показать список всех проектов."""
+    from app import storage
+    from app.database import get_db
+
     db = next(get_db())
     projects = storage.list_projects(db)
     
@@ -187,8 +208,17 @@ def list_projects():
 @click.option("--output", type=click.Path(), help="Путь для сохранения пайплайна (опционально)")
 @click.option("--platform", default="gitlab", help="Платформа CI/CD (gitlab/jenkins)")
 @click.option("--stages", help="Список стадий через запятую (опционально)")
-def generate(project_id: int, output: Optional[str], platform: str, stages: Optional[str]):
+@click.option("--dag/--no-dag", default=True, help="Зависимости задач через needs (по умолчанию) или строгий порядок стадий")
+@click.option("--dependency-cache/--no-dependency-cache", default=True, help="Кэш зависимостей по lock-файлам (по умолчанию) или кэш из шаблонов стадий")
+@click.option("--docker-cache/--no-docker-cache", default=True, help="Кэш слоев BuildKit в registry при сборке образов (по умолчанию) или сборка без кэша")
+def generate(project_id: int, output: Optional[str], platform: str, stages: Optional[str], dag: bool,
+             dependency_cache: bool, docker_cache: bool):
     """Сгенерировать CI/CD пайплайн для проекта."""
+    from app import storage
+    from app.database import get_db
+    from app.schemas import PipelineGenerationCreate
+    from app.services.pipeline_generator import generate_pipeline
+
     db = next(get_db())
     project = storage.get_project(db, project_id)
     
@@ -215,6 +245,9 @@ def generate(project_id: int, output: Optional[str], platform: str, stages: Opti
                 "manual": False,
             },
             "variables": {},
+            "dag": dag,
+            "dependency_cache": dependency_cache,
+            "docker_cache": docker_cache,
         }
         
         # Генерация пайплайна
@@ -226,6 +259,8 @@ def generate(project_id: int, output: Optional[str], platform: str, stages: Opti
             uml=pipeline,
         )
         generation = storage.create_pipeline_generation(db, create_dto)
+        # Настройки генерации нужны для перегенерации проекта (regenerate-all)
+        storage.save_project_settings(db, project_id, user_settings)
         
         # Вывод или сохранение
         if output:
@@ -258,6 +293,9 @@ def generate(project_id: int, output: Optional[str], platform: str, stages: Opti
 @click.option("--on-tags", help="Паттерн для триггера на теги (regex, например: 'v.*')")
 @click.option("--schedule", help="Включить запуск по расписанию (любое значение)")
 @click.option("--manual/--no-manual", default=None, help="Разрешить/запретить ручной запуск пайплайна")
+@click.option("--dag/--no-dag", default=True, help="Зависимости задач через needs (по умолчанию) или строгий порядок стадий")
+@click.option("--dependency-cache/--no-dependency-cache", default=True, help="Кэш зависимостей по lock-файлам (по умолчанию) или кэш из шаблонов стадий")
+@click.option("--docker-cache/--no-docker-cache", default=True, help="Кэш слоев BuildKit в registry при сборке образов (по умолчанию) или сборка без кэша")
 def generate_from_repo(
     url: str, 
     token: str, 
@@ -270,13 +308,19 @@ def generate_from_repo(
     on_merge_request: Optional[bool],
     on_tags: Optional[str],
     schedule: Optional[str],
-    manual: Optional[bool]
+    manual: Optional[bool],
+    dag: bool,
+    dependency_cache: bool,
+    docker_cache: bool
 ):
     """Сгенерировать CI/CD пайплайн напрямую из репозитория.
     
     Стадии: если --stages не указан, используются все возможные стадии.
     Триггеры: если флаги триггеров не указаны, используются значения по умолчанию.
     """
+    from app.services.analyzer import analyze_repository, get_full_stack
+    from app.services.pipeline_generator import generate_pipeline
+
     start_time = time.time()
     click.echo(f"Анализ репозитория {url}...")
     
@@ -387,6 +431,9 @@ def generate_from_repo(
             "dockerfile_path": analysis.dockerfile_path if analysis.docker else "Dockerfile",
             # use_docker_compose: только если флаг явно указан
             "use_docker_compose": docker_compose if docker_compose is not None else False,
+            "dag": dag,
+            "dependency_cache": dependency_cache,
+            "docker_cache": docker_cache,
         }
         
         # Генерация пайплайна
@@ -436,10 +483,9 @@ def generate_from_repo(
             try:
                 # Импортируем генератор docker-compose
                 COMPOSE_GENERATOR_PATH = PROJECT_ROOT / "docker_compose_generator"
-                if str(COMPOSE_GENERATOR_PATH) not in sys.path:
-                    sys.path.insert(0, str(COMPOSE_GENERATOR_PATH))
                 
-                # Используем прямой импорт через importlib
+                # Используем прямой импорт через importlib (директория не добавляется
+                # в sys.path: ее пакет generator скрыл бы generator из ci_generator)
                 import importlib.util
                 compose_generator_path = COMPOSE_GENERATOR_PATH / "generator" / "compose_generator.py"
                 spec = importlib.util.spec_from_file_location("compose_generator", compose_generator_path)
@@ -496,6 +542,8 @@ def generate_from_repo(
 @click.option("--output", type=click.Path(), help="Путь для сохранения стека (JSON)")
 def analyze_repo(url: str, token: str, output: Optional[str]):
     """Определить стек проекта и вывести его в консоль (или сохранить в файл)."""
+    from app.services.analyzer import get_full_stack
+
     click.echo(f"Анализ репозитория {url}...")
     
     try:
@@ -632,6 +680,9 @@ def analyze_repo(url: str, token: str, output: Optional[str]):
 @cli.command()
 def list_pipelines():
     """Показать историю генерации пайплайнов."""
+    from app import storage
+    from app.database import get_db
+
     db = next(get_db())
     pipelines = storage.list_pipeline_generations(db)
     
@@ -648,6 +699,378 @@ def list_pipelines():
         click.echo()
 
 
+@local_command
+@cli.command()
+@click.option("--socket", "socket_path", type=click.Path(), help="Путь к Unix-сокету (по умолчанию SELF_DEPLOY_DAEMON_SOCKET или $XDG_RUNTIME_DIR)")
+def daemon(socket_path: Optional[str]):
+    """Запустить демон: команды CLI будут выполняться в нем без холодного старта."""
+    from app.daemon import serve, get_socket_path
+
+    socket_path = Path(socket_path) if socket_path else get_socket_path()
+    click.echo(f"Запуск демона на {socket_path} (остановка: Ctrl+C или daemon-stop)")
+    try:
+        serve(socket_path)
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        click.echo(f"✗ Ошибка: {e}", err=True)
+        sys.exit(1)
+    click.echo("✓ Демон остановлен")
+
+
+@local_command
+@cli.command()
+def daemon_stop():
+    """Остановить запущенный демон."""
+    from app.daemon import stop_daemon
+
+    if stop_daemon():
+        click.echo("✓ Демон остановлен")
+    else:
+        click.echo("Демон не запущен")
+
+
+@local_command
+@cli.command()
+def daemon_status():
+    """Проверить, запущен ли демон."""
+    from app.daemon import daemon_status as get_daemon_status, get_socket_path
+
+    status = get_daemon_status()
+    if status:
+        click.echo(f"Демон запущен (PID {status['pid']}, сокет {get_socket_path()})")
+        render_cache = status.get('render_cache')
+        if render_cache:
+            click.echo(
+                f"Кэш рендеринга: попаданий {render_cache['hits']}, промахов {render_cache['misses']} "
+                f"(доля попаданий {render_cache['hit_rate']:.0%}), записей в памяти {render_cache['memory_entries']}"
+            )
+    else:
+        click.echo("Демон не запущен")
+
+
+@local_command
+@cli.command()
+@click.option("--host", default="127.0.0.1", help="Адрес для прослушивания")
+@click.option("--port", type=int, default=8088, help="Порт для прослушивания")
+@click.option("--secret", envvar="SELF_DEPLOY_WEBHOOK_SECRET", help="Секретный токен webhook (заголовок X-Gitlab-Token)")
+@click.option("--workers", type=int, default=1, help="Количество потоков анализа")
+def serve_hooks(host: str, port: int, secret: Optional[str], workers: int):
+    """Принимать push-события GitLab и повторно анализировать проекты."""
+    import logging
+    from app.services.ingest import IngestQueue, reanalyze_projects
+    from app.webhooks import HOOK_PATH, serve_webhooks
+
+    logging.basicConfig(level=logging.INFO)
+    if not secret:
+        click.echo("⚠ Секретный токен не задан: события принимаются без проверки X-Gitlab-Token", err=True)
+
+    click.echo(f"Прием событий на http://{host}:{port}{HOOK_PATH} (остановка: Ctrl+C)")
+    try:
+        serve_webhooks(IngestQueue(reanalyze_projects, workers=workers), host, port, secret)
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        click.echo(f"✗ Ошибка: {e}", err=True)
+        sys.exit(1)
+
+
+@cli.command()
+@click.option("--file", "files", required=True, multiple=True, type=click.Path(exists=True), help="JSON с payload push-события (можно указать несколько)")
+def ingest_event(files: tuple):
+    """Обработать push-события из файлов (локальная замена webhook)."""
+    from app.services.ingest import IngestQueue, parse_push_event, reanalyze_projects
+
+    generation_ids = []
+    queue = IngestQueue(lambda job: generation_ids.extend(reanalyze_projects(job)))
+    for file in files:
+        try:
+            event = parse_push_event(json.loads(Path(file).read_text(encoding="utf-8")))
+        except ValueError as e:
+            click.echo(f"✗ {file}: {e}", err=True)
+            sys.exit(1)
+
+        status = queue.submit(event)
+        reason = f" ({event.skip_reason})" if event.skip_reason else ""
+        click.echo(f"{file}: {status} {event.sha[:8]}{reason}")
+
+    queue.drain()
+    if generation_ids:
+        click.echo(f"✓ Пайплайны перегенерированы (ID генераций: {', '.join(map(str, generation_ids))})")
+    else:
+        click.echo("Пайплайны не изменились")
+
+
+def limit_options(command):
+    """Общие опции лимитов времени этапов и ресурсов для batch и worker."""
+    options = [
+        click.option("--clone-timeout", type=float, help="Лимит времени клонирования репозитория (секунды)"),
+        click.option("--analyze-timeout", type=float, help="Лимит времени анализа репозитория (секунды)"),
+        click.option("--render-timeout", type=float, help="Лимит времени генерации пайплайна (секунды)"),
+        click.option("--max-memory-mb", type=int, help="Лимит памяти процесса (МБ, RLIMIT_AS)"),
+        click.option("--max-cpu-seconds", type=int, help="Лимит процессорного времени процесса (секунды, RLIMIT_CPU)"),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+def build_phase_limits(clone_timeout, analyze_timeout, render_timeout, max_memory_mb, max_cpu_seconds):
+    """Применить лимиты ресурсов процесса и вернуть лимиты времени этапов."""
+    from app.services.limits import PhaseLimits, apply_process_limits
+
+    apply_process_limits(max_memory_mb, max_cpu_seconds)
+    return PhaseLimits(clone_timeout=clone_timeout, analyze_timeout=analyze_timeout, render_timeout=render_timeout)
+
+
+@local_command
+@cli.command()
+@click.option("--repos", "repos_file", required=True, type=click.Path(exists=True), help="Файл со списком репозиториев: по одному на строку, 'URL [имя]'")
+@click.option("--output-dir", required=True, type=click.Path(), help="Директория для пайплайнов и README")
+@click.option("--token", default="", help="Токен для клонирования репозиториев")
+@click.option("--platform", default="gitlab", help="Платформа CI/CD (gitlab)")
+@click.option("--manifest", "manifest_path", type=click.Path(), help="Путь к манифесту запуска (по умолчанию <output-dir>/batch-manifest.json)")
+@click.option("--resume", is_flag=True, help="Пропустить репозитории, успешно обработанные в предыдущем запуске")
+@click.option("--workers", type=int, default=1, help="Количество репозиториев, обрабатываемых параллельно")
+@click.option("--history", "history_path", type=click.Path(), help="Путь к истории длительностей (по умолчанию <output-dir>/batch-history.json)")
+@click.option("--window", "window_minutes", type=float, help="Окно запуска в минутах: долгие репозитории начинаются так, чтобы уложиться в него")
+@click.option("--save-db", is_flag=True, help="Сохранять проекты и пайплайны в базу данных")
+@limit_options
+def batch(repos_file: str, output_dir: str, token: str, platform: str, manifest_path: Optional[str],
+          resume: bool, workers: int, history_path: Optional[str], window_minutes: Optional[float],
+          save_db: bool, **limit_args):
+    """Сгенерировать пайплайны для списка репозиториев (с возобновлением после сбоя)."""
+    from app.services.batch import prediction_report, read_repo_list, run_batch
+    from app.services.ingest import default_user_settings
+    from app.services.pipeline_generator import render_cache_stats
+
+    repos = read_repo_list(Path(repos_file))
+    if not repos:
+        click.echo("✗ Список репозиториев пуст", err=True)
+        sys.exit(1)
+
+    click.echo(f"Пакетная обработка: репозиториев {len(repos)}{' (возобновление)' if resume else ''}")
+    start_time = time.time()
+
+    def report(repo, entry):
+        if entry["status"] == "done":
+            click.echo(f"  ✓ {repo.name} ({entry.get('sha', '')[:8]}, {entry['duration']:.1f} сек.)")
+        else:
+            click.echo(f"  ✗ {repo.name}: {entry.get('error')}", err=True)
+
+    manifest = run_batch(
+        repos,
+        Path(output_dir),
+        default_user_settings(platform),
+        token=token,
+        manifest_path=Path(manifest_path) if manifest_path else None,
+        resume=resume,
+        workers=workers,
+        history_path=Path(history_path) if history_path else None,
+        window_seconds=window_minutes * 60 if window_minutes else None,
+        limits=build_phase_limits(**limit_args),
+        save_to_db=save_db,
+        readme_renderer=format_stack_to_markdown,
+        on_result=report,
+    )
+
+    summary = manifest.summary()
+    click.echo(
+        f"Готово: {summary.get('done', 0)}, с ошибками: {summary.get('failed', 0)} "
+        f"({time.time() - start_time:.1f} сек.). Манифест: {manifest.path}"
+    )
+    render_cache = render_cache_stats()
+    if render_cache["hits"] + render_cache["misses"]:
+        click.echo(
+            f"Кэш рендеринга: попаданий {render_cache['hits']}, промахов {render_cache['misses']} "
+            f"(доля попаданий {render_cache['hit_rate']:.0%})"
+        )
+
+    # Сравнение ожидаемых и фактических длительностей
+    report = prediction_report(manifest)
+    if report:
+        errors = [abs(r["observed_seconds"] - r["predicted_seconds"]) for r in report]
+        click.echo(
+            f"Длительность запуска: ожидалась {manifest.data.get('predicted_makespan', 0):.1f} сек., "
+            f"фактически {manifest.data.get('observed_makespan', 0):.1f} сек.; "
+            f"средняя ошибка прогноза по репозиторию {sum(errors) / len(errors):.1f} сек."
+        )
+        worst = sorted(report, key=lambda r: abs(r["observed_seconds"] - r["predicted_seconds"]), reverse=True)
+        for r in worst[:5]:
+            click.echo(f"  {r['name']}: ожидалось {r['predicted_seconds']:.1f} сек., фактически {r['observed_seconds']:.1f} сек.")
+    if summary.get("failed"):
+        click.echo("Повторить упавшие репозитории: добавьте --resume", err=True)
+        sys.exit(1)
+
+
+@local_command
+@cli.command()
+@click.option("--platform", default="gitlab", help="Платформа CI/CD (gitlab/jenkins)")
+@click.option("--workers", type=int, help="Количество процессов рендеринга (по умолчанию - число CPU)")
+@click.option("--batch-size", type=int, default=200, help="Размер порции чтения, рендеринга и записи в БД")
+@click.option("--project-id", "project_ids", type=int, multiple=True, help="Только этот проект (можно указать несколько)")
+@click.option("--dry-run", is_flag=True, help="Только сгенерировать, не сохраняя в БД")
+@click.option("--force", is_flag=True, help="Рендерить все проекты, не сравнивая зависимости")
+@click.option("--quiet", is_flag=True, help="Не выводить время по каждому проекту")
+def regenerate_all(platform: str, workers: Optional[int], batch_size: int, project_ids: tuple,
+                   dry_run: bool, force: bool, quiet: bool):
+    """Перегенерировать пайплайны всех проектов из БД (например, после изменения шаблонов)."""
+    from app.services.ingest import default_user_settings
+    from app.services.regenerate import (
+        STATUS_DONE,
+        STATUS_FAILED,
+        STATUS_IDENTICAL,
+        STATUS_UNCHANGED,
+        regenerate_all as run_regenerate_all,
+    )
+
+    def report(result):
+        if result.status == STATUS_FAILED:
+            click.echo(f"  ✗ {result.name} (ID {result.project_id}): {result.error}", err=True)
+        elif quiet:
+            return
+        elif result.status == STATUS_DONE:
+            click.echo(f"  ✓ {result.name} (ID {result.project_id}, {result.seconds * 1000:.1f} мс)")
+        elif result.status == STATUS_IDENTICAL:
+            click.echo(f"  = {result.name} (ID {result.project_id}): пайплайн не изменился")
+        elif result.status == STATUS_UNCHANGED:
+            return
+        else:
+            click.echo(f"  - {result.name} (ID {result.project_id}): пропущен, {result.error}")
+
+    summary = run_regenerate_all(
+        default_user_settings(platform),
+        workers=workers,
+        batch_size=batch_size,
+        project_ids=project_ids or None,
+        save=not dry_run,
+        force=force,
+        on_result=report,
+    )
+
+    click.echo(
+        f"Готово: {summary.done}, с ошибками: {summary.failed}, без анализа: {summary.skipped}; "
+        f"сохранено генераций: {summary.saved} ({summary.elapsed:.1f} сек., {summary.per_minute:.0f} проектов/мин)"
+    )
+    click.echo(
+        f"Без изменений: зависимости не изменились - {summary.unchanged}, "
+        f"пайплайн совпал с сохраненным - {summary.identical} (обновлено зависимостей: {summary.refreshed})"
+    )
+    if summary.slowest and not quiet:
+        click.echo("Самые долгие проекты:")
+        for seconds, project_id, name in summary.slowest[:5]:
+            click.echo(f"  {name} (ID {project_id}): {seconds * 1000:.1f} мс")
+    if summary.cache_hits + summary.cache_misses:
+        click.echo(
+            f"Кэш рендеринга: попаданий {summary.cache_hits}, промахов {summary.cache_misses} "
+            f"(доля попаданий {summary.cache_hits / (summary.cache_hits + summary.cache_misses):.0%})"
+        )
+    if summary.failed:
+        sys.exit(1)
+
+
+@cli.command()
+@click.option("--project-id", "project_ids", type=int, multiple=True, help="ID проекта (можно указать несколько)")
+@click.option("--all", "all_projects", is_flag=True, help="Поставить в очередь все проекты")
+@click.option("--url", "urls", multiple=True, help="URL Git-репозитория без проекта в БД (можно указать несколько)")
+@click.option("--token", default="", help="Токен для клонирования репозиториев из --url")
+@click.option("--max-attempts", type=int, default=3, help="Максимальное количество попыток выполнения задачи")
+def enqueue(project_ids: tuple, all_projects: bool, urls: tuple, token: str, max_attempts: int):
+    """Поставить задачи анализа в общую очередь (выполняются командой worker)."""
+    from app import storage
+    from app.database import get_db
+    from app.schemas import JobCreate
+
+    db = next(get_db())
+    if all_projects:
+        project_ids = tuple(p.id for p in storage.list_projects(db))
+
+    jobs = [JobCreate(kind="analyze", project_id=pid, max_attempts=max_attempts) for pid in project_ids]
+    jobs += [
+        JobCreate(kind="analyze", payload={"url": url, "token": token}, max_attempts=max_attempts)
+        for url in urls
+    ]
+    if not jobs:
+        click.echo("✗ Укажите --project-id, --all или --url", err=True)
+        sys.exit(1)
+
+    created = storage.create_jobs(db, jobs)
+    click.echo(f"✓ Поставлено задач в очередь: {len(created)} (ID: {', '.join(str(j.id) for j in created)})")
+
+
+@local_command
+@cli.command()
+@click.option("--worker-id", help="Идентификатор воркера (по умолчанию хост:PID)")
+@click.option("--lease", "lease_seconds", type=int, default=120, help="Срок аренды задачи без heartbeat (секунды)")
+@click.option("--poll-interval", type=float, default=2.0, help="Пауза между опросами пустой очереди (секунды)")
+@click.option("--max-jobs", type=int, help="Остановиться после указанного количества задач")
+@click.option("--exit-when-empty", is_flag=True, help="Остановиться, когда очередь опустеет")
+@click.option("--processes", type=int, default=1, help="Количество процессов-воркеров (fork, общий набор правил)")
+@limit_options
+def worker(worker_id: Optional[str], lease_seconds: int, poll_interval: float,
+           max_jobs: Optional[int], exit_when_empty: bool, processes: int, **limit_args):
+    """Обрабатывать задачи из общей очереди (можно запускать на нескольких машинах)."""
+    import logging
+    from app.services.worker import default_worker_id, run_worker, run_worker_processes
+
+    logging.basicConfig(level=logging.INFO)
+    worker_id = worker_id or default_worker_id()
+    click.echo(f"Воркер {worker_id} запущен (остановка: Ctrl+C)")
+
+    def report(job, status):
+        click.echo(f"  Задача {job.id}: {status}")
+
+    worker_args = dict(
+        lease_seconds=lease_seconds,
+        poll_interval=poll_interval,
+        max_jobs=max_jobs,
+        stop_when_empty=exit_when_empty,
+        on_job=report,
+        limits=build_phase_limits(**limit_args),
+    )
+    if processes > 1:
+        failed = run_worker_processes(processes, worker_id, **worker_args)
+        if failed:
+            click.echo(f"✗ Процессов завершилось с ошибкой: {failed}", err=True)
+            sys.exit(1)
+        click.echo(f"✓ Процессы воркера ({processes}) завершены")
+        return
+
+    try:
+        processed = run_worker(worker_id, **worker_args)
+    except KeyboardInterrupt:
+        # Задача, прерванная на середине, вернется в очередь после истечения аренды
+        click.echo("Воркер остановлен")
+        return
+    click.echo(f"✓ Обработано задач: {processed}")
+
+
+@cli.command()
+@click.option("--status", type=click.Choice(["queued", "running", "done", "failed"]), help="Фильтр по статусу")
+def list_jobs(status: Optional[str]):
+    """Показать задачи очереди анализа."""
+    from app import storage
+    from app.database import get_db
+
+    db = next(get_db())
+    jobs = storage.list_jobs(db, status)
+
+    if not jobs:
+        click.echo("Задачи не найдены.")
+        return
+
+    click.echo(f"Найдено задач: {len(jobs)}\n")
+    for job in jobs:
+        target = f"проект {job.project_id}" if job.project_id is not None else job.payload.get("url", "")
+        click.echo(f"ID: {job.id} [{job.status}] {job.kind} {target}")
+        click.echo(f"  Попыток: {job.attempts}/{job.max_attempts}")
+        if job.worker_id:
+            click.echo(f"  Воркер: {job.worker_id}")
+        if job.error and job.status != "done":
+            click.echo(f"  Ошибка: {job.error.splitlines()[0]}")
+        click.echo()
+
+
 @cli.command()
 def init():
     """Инициализировать базу данных."""
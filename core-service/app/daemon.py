@@ -0,0 +1,374 @@
+"""Фоновый процесс (демон) для выполнения команд CLI без холодного старта.
+
+Каждый запуск `python cli.py ...` заново импортирует SQLAlchemy, Jinja2,
+pydantic и stack_recognize, создает подключение к БД и загружает правила
+детектора. Демон держит все это загруженным: команды CLI передаются ему
+через Unix-сокет (HTTP поверх сокета, только стандартная библиотека) и
+выполняются в уже прогретом процессе.
+
+Модуль импортирует только стандартную библиотеку, чтобы клиентская часть
+не тратила время на загрузку зависимостей.
+"""
+import http.client
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import threading
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Переменная окружения для принудительного выполнения команд в текущем процессе
+NO_DAEMON_ENV = 'SELF_DEPLOY_NO_DAEMON'
+
+# Таймаут подключения клиента к демону (секунды)
+_CONNECT_TIMEOUT = 0.5
+
+# Переменные окружения, от которых зависит выполнение команд (БД, кэши, токены)
+_COMMAND_ENV_NAMES = ('DATABASE_URL', 'GITLAB_TOKEN')
+_COMMAND_ENV_PREFIXES = ('STACK_RECOGNIZE_', 'CI_GENERATOR_', 'SELF_DEPLOY_')
+# Переменные, которые нужны только клиенту для выбора демона
+_CLIENT_ENV_NAMES = ('SELF_DEPLOY_DAEMON_SOCKET', NO_DAEMON_ENV)
+
+
+class DaemonError(RuntimeError):
+    """Демон принял запрос, но не вернул ответ (например, завершился во время команды)."""
+
+
+def get_socket_path() -> Path:
+    """
+    Путь к Unix-сокету демона (переопределяется SELF_DEPLOY_DAEMON_SOCKET).
+
+    Без XDG_RUNTIME_DIR сокет создается не прямо в общей временной
+    директории, а в личной поддиректории пользователя (права 0700).
+    """
+    path = os.getenv('SELF_DEPLOY_DAEMON_SOCKET')
+    if path:
+        return Path(path)
+    runtime_dir = os.getenv('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return Path(runtime_dir) / f'self-deploy-{os.getuid()}.sock'
+    return Path(tempfile.gettempdir()) / f'self-deploy-{os.getuid()}' / 'daemon.sock'
+
+
+def _check_private(path: Path, is_socket: bool) -> Optional[str]:
+    """Причина, по которой путь небезопасен (чужой, доступен другим), или None."""
+    try:
+        info = os.lstat(path)
+    except OSError as e:
+        return f"{path}: {e.strerror}"
+    if is_socket and not stat.S_ISSOCK(info.st_mode):
+        return f"{path} не является сокетом"
+    if not is_socket and not stat.S_ISDIR(info.st_mode):
+        return f"{path} не является директорией"
+    if info.st_uid != os.getuid():
+        return f"{path} принадлежит другому пользователю (UID {info.st_uid})"
+    if info.st_mode & 0o077:
+        return f"{path} доступен другим пользователям (права {stat.S_IMODE(info.st_mode):o})"
+    return None
+
+
+def check_socket_path(socket_path: Path) -> Optional[str]:
+    """
+    Проверить, что сокет и его директория принадлежат текущему пользователю
+    и недоступны другим (0600/0700). Клиент передает демону аргументы
+    команды, в том числе токены, поэтому к чужому сокету не подключается.
+
+    Returns:
+        Причина отказа или None, если сокет безопасен
+    """
+    return _check_private(socket_path.parent, is_socket=False) or _check_private(socket_path, is_socket=True)
+
+
+def command_environment() -> Dict[str, str]:
+    """Переменные окружения текущего процесса, влияющие на выполнение команд."""
+    return {
+        name: value for name, value in os.environ.items()
+        if (name in _COMMAND_ENV_NAMES or name.startswith(_COMMAND_ENV_PREFIXES))
+        and name not in _CLIENT_ENV_NAMES
+    }
+
+
+# ---------- Клиент ----------
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP-соединение поверх Unix-сокета."""
+
+    def __init__(self, socket_path: Path, timeout: Optional[float] = None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(_CONNECT_TIMEOUT)
+        self.sock.connect(str(self.socket_path))
+        self.sock.settimeout(self.timeout)
+
+
+def _request(method: str, path: str, payload: Optional[dict] = None,
+             socket_path: Optional[Path] = None) -> Optional[dict]:
+    """
+    Отправить запрос демону.
+
+    Returns:
+        Ответ демона или None, если подключиться к демону не удалось
+
+    Raises:
+        DaemonError: Если запрос отправлен, но ответ не получен - демон мог
+            успеть выполнить его частично, поэтому повторять запрос нельзя
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    socket_path = Path(socket_path or get_socket_path())
+    if not socket_path.exists():
+        return None
+    problem = check_socket_path(socket_path)
+    if problem:
+        print(f"⚠ Сокет демона не используется: {problem}", file=sys.stderr)
+        return None
+
+    conn = _UnixHTTPConnection(socket_path)
+    try:
+        try:
+            conn.connect()
+        except OSError:
+            return None
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        try:
+            conn.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            return json.loads(response.read().decode('utf-8'))
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            raise DaemonError(f"демон не вернул ответ на {method} {path}: {e}") from e
+    finally:
+        conn.close()
+
+
+def run_via_daemon(argv: List[str]) -> Optional[int]:
+    """
+    Выполнить команду CLI в демоне, если он запущен.
+
+    Args:
+        argv: Аргументы командной строки (без имени программы)
+
+    Демону передаются переменные окружения клиента (command_environment):
+    если они отличаются от переменных демона (другая БД, другие кэши),
+    команда выполняется локально. Если демон завершился во время команды,
+    она не повторяется локально - команда могла быть выполнена частично.
+
+    Returns:
+        Код завершения команды или None, если команду нужно выполнить локально
+    """
+    if os.getenv(NO_DAEMON_ENV):
+        return None
+
+    try:
+        result = _request('POST', '/run', {'argv': argv, 'cwd': os.getcwd(), 'env': command_environment()})
+    except DaemonError as e:
+        print(f"✗ Ошибка: {e}. Команда могла быть выполнена частично и не повторяется", file=sys.stderr)
+        return 1
+    if result is None or result.get('local'):
+        # Демон не запущен или команда должна выполняться в процессе клиента
+        return None
+
+    sys.stdout.write(result.get('stdout', ''))
+    sys.stderr.write(result.get('stderr', ''))
+    return int(result.get('exit_code', 1))
+
+
+def daemon_status(socket_path: Optional[Path] = None) -> Optional[dict]:
+    """Состояние демона или None, если он не запущен."""
+    try:
+        return _request('GET', '/health', socket_path=socket_path)
+    except DaemonError:
+        return None
+
+
+def stop_daemon(socket_path: Optional[Path] = None) -> bool:
+    """Остановить демон. False - демон не запущен."""
+    try:
+        return _request('POST', '/shutdown', {}, socket_path=socket_path) is not None
+    except DaemonError:
+        # Демон принял запрос и завершился, не успев ответить
+        return True
+
+
+# ---------- Сервер ----------
+
+
+def runs_locally(argv: List[str]) -> bool:
+    """
+    Должна ли команда выполняться в процессе клиента, а не в демоне.
+
+    Команды отмечаются атрибутом run_locally (app.cli.local_command): они
+    работают до остановки, меняют лимиты ресурсов процесса или используют
+    fork, а демон выполняет команды по одной и буферизует их вывод.
+    """
+    from app.cli import cli
+
+    command = cli.commands.get(argv[0]) if argv else None
+    return bool(getattr(command, 'run_locally', False))
+
+
+class _DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _DaemonHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов к демону."""
+
+    # Команды выполняются по одной: они меняют рабочую директорию процесса
+    # и перенаправляют stdout/stderr
+    _exec_lock = threading.Lock()
+
+    def do_GET(self):
+        if self.path == '/health':
+            from app.services.pipeline_generator import render_cache_stats
+
+            self._reply({'status': 'ok', 'pid': os.getpid(), 'render_cache': render_cache_stats()})
+        else:
+            self._reply({'error': 'not found'}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._reply({'error': 'invalid json'}, status=400)
+            return
+
+        if self.path == '/run':
+            argv = payload.get('argv', [])
+            # Команды с другим окружением (БД, кэши) выполняет клиент
+            if runs_locally(argv) or payload.get('env') != command_environment():
+                self._reply({'local': True})
+                return
+            exit_code, stdout, stderr = self._execute(argv, payload.get('cwd') or os.getcwd())
+            self._reply({'exit_code': exit_code, 'stdout': stdout, 'stderr': stderr})
+        elif self.path == '/shutdown':
+            self._reply({'status': 'stopping'})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        else:
+            self._reply({'error': 'not found'}, status=404)
+
+    def _execute(self, argv: List[str], cwd: str) -> Tuple[int, str, str]:
+        """Выполнить команду CLI в текущем процессе и вернуть ее вывод."""
+        from app.cli import cli
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with self._exec_lock:
+            previous_cwd = os.getcwd()
+            try:
+                os.chdir(cwd)
+                with redirect_stdout(stdout), redirect_stderr(stderr):
+                    try:
+                        cli.main(args=argv, prog_name='cli.py', standalone_mode=True)
+                        exit_code = 0
+                    except SystemExit as e:
+                        if e.code is None:
+                            exit_code = 0
+                        elif isinstance(e.code, int):
+                            exit_code = e.code
+                        else:
+                            print(e.code, file=sys.stderr)
+                            exit_code = 1
+                    except Exception:
+                        traceback.print_exc()
+                        exit_code = 1
+            except OSError as e:
+                stderr.write(f"✗ Ошибка: не удалось перейти в директорию {cwd}: {e}\n")
+                exit_code = 1
+            finally:
+                os.chdir(previous_cwd)
+
+        return exit_code, stdout.getvalue(), stderr.getvalue()
+
+    def _reply(self, data: dict, status: int = 200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # У Unix-сокета нет адреса клиента
+        return 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def warm_up():
+    """Загрузить тяжелые модули и подготовить подключение к БД."""
+    # Команды CLI импортируют сервисы лениво - загружаем их заранее
+    import app.cli  # noqa: F401
+    import app.storage  # noqa: F401 - SQLAlchemy и pydantic
+    import app.services.analyzer  # noqa: F401 - stack_recognize
+    import app.services.pipeline_generator  # noqa: F401 - Jinja2
+    from app.database import get_engine
+    from app.services.analyzer import get_detector
+    from app.services.pipeline_generator import CI_GENERATOR_PATH, get_plugin_registry, get_renderer
+
+    # Детектор и скомпилированный набор правил
+    get_detector()
+    # Реестр плагинов выбора стадий (с плагинами из entry points)
+    get_plugin_registry()
+    # Скомпилированные шаблоны пайплайнов
+    get_renderer(str(CI_GENERATOR_PATH / "pipelines"))
+
+    try:
+        with get_engine().connect():
+            pass
+    except Exception as e:
+        # БД нужна не всем командам - демон работает и без нее
+        logger.warning(f"Не удалось подключиться к БД при запуске демона: {e}")
+
+
+def serve(socket_path: Optional[Path] = None):
+    """
+    Запустить демон и обрабатывать запросы до остановки.
+
+    Args:
+        socket_path: Путь к Unix-сокету (по умолчанию get_socket_path())
+    """
+    socket_path = Path(socket_path or get_socket_path())
+    # Личная директория сокета (для пути по умолчанию без XDG_RUNTIME_DIR)
+    socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    problem = _check_private(socket_path.parent, is_socket=False)
+    if problem:
+        raise RuntimeError(f"Директория сокета небезопасна: {problem}")
+    if socket_path.exists():
+        if daemon_status(socket_path) is not None:
+            raise RuntimeError(f"Демон уже запущен: {socket_path}")
+        # Сокет остался от завершившегося процесса
+        socket_path.unlink()
+
+    warm_up()
+
+    # Сокет доступен только текущему пользователю
+    previous_umask = os.umask(0o177)
+    try:
+        server = _DaemonServer(str(socket_path), _DaemonHandler)
+    finally:
+        os.umask(previous_umask)
+
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        try:
+            socket_path.unlink()
+        except FileNotFoundError:
+            pass
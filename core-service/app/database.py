@@ -1,7 +1,8 @@
 import os
+import threading
 
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
 
 
 class Base(DeclarativeBase):
@@ -16,18 +17,38 @@ def get_database_url() -> str:
     )
 
 
-engine = create_engine(get_database_url(), echo=False, future=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Подключение к БД создается при первом использовании: командам CLI без БД
+# не нужно загружать драйвер и читать DATABASE_URL
+_engine = None
+_engine_lock = threading.Lock()
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
 
 
-def get_db():
-    from sqlalchemy.orm import Session
+def get_engine():
+    """Получить подключение к БД (создается при первом вызове)."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(get_database_url(), echo=False, future=True)
+    return _engine
+
+
+def SessionLocal() -> Session:
+    """Создать сессию БД."""
+    return _session_factory(bind=get_engine())
+
+
+def __getattr__(name):
+    # Совместимость: app.database.engine
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
+
+def get_db():
     db: Session = SessionLocal()
     try:
         yield db
     finally:
         db.close()
-
-
-
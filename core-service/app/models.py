@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -36,4 +36,70 @@ class PipelineGenerationORM(Base):
     project: Mapped[Optional["ProjectORM"]] = relationship(back_populates="pipelines")
 
 
+class PipelineDependenciesORM(Base):
+    """Зависимости сохраненного пайплайна: хэши шаблонов и прочитанных значений контекста."""
 
+    __tablename__ = "pipeline_dependencies"
+
+    generation_id: Mapped[int] = mapped_column(ForeignKey("pipeline_generations.id"), primary_key=True)
+    project_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("projects.id"), nullable=True, index=True
+    )
+    # Хэш текста пайплайна
+    output_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    # {"renderer": ..., "templates": {шаблон: хэш}, "context": {путь: хэш}} в JSON
+    dependencies_json: Mapped[str] = mapped_column(Text, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False), default=datetime.utcnow, nullable=False
+    )
+
+
+class ProjectSettingsORM(Base):
+    """Настройки генерации, с которыми сгенерирован последний пайплайн проекта."""
+
+    __tablename__ = "project_generation_settings"
+
+    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"), primary_key=True)
+    # user_settings генерации в JSON
+    settings_json: Mapped[str] = mapped_column(Text, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False), default=datetime.utcnow, nullable=False
+    )
+
+
+class JobORM(Base):
+    """Задача очереди анализа, общей для воркеров на разных машинах."""
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Выборка следующей задачи и поиск просроченных аренд
+        Index("ix_jobs_status_id", "status", "id"),
+        Index("ix_jobs_status_lease", "status", "lease_expires_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    kind: Mapped[str] = mapped_column(String(64), nullable=False)
+    project_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("projects.id"), nullable=True, index=True
+    )
+    # Параметры задачи в JSON
+    payload_json: Mapped[str] = mapped_column(Text, nullable=False, default="{}")
+    # queued -> running -> done / failed
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="queued")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=3)
+
+    # Аренда задачи воркером: продлевается heartbeat, по истечении задача
+    # возвращается в очередь
+    worker_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=False), nullable=True)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=False), nullable=True)
+
+    result_json: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False), default=datetime.utcnow, nullable=False
+    )
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=False), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=False), nullable=True)
@@ -7,6 +7,35 @@ from pydantic import BaseModel, HttpUrl, Field, field_validator
 # ---------- Проект и анализ репозитория ----------
 
 
+def _first_test_runner(v: Any) -> Optional[str]:
+    """Конвертирует test_runner из списка в строку, если необходимо."""
+    if v is None:
+        return None
+    if isinstance(v, list):
+        # Берем первый элемент списка, если список не пустой
+        return v[0] if v else None
+    if isinstance(v, str):
+        return v
+    # Если это другой тип, конвертируем в строку
+    return str(v) if v else None
+
+
+class ComponentAnalysis(BaseModel):
+    """Стек компонента монорепозитория."""
+    path: str  # Путь относительно корня репозитория
+    languages: List[str] = []
+    frameworks: List[str] = []
+    frontend_frameworks: List[str] = []
+    backend_frameworks: List[str] = []
+    package_manager: Optional[str] = None
+    test_runner: Optional[str] = None
+
+    @field_validator("test_runner", mode="before")
+    @classmethod
+    def convert_test_runner_to_string(cls, v: Any) -> Optional[str]:
+        return _first_test_runner(v)
+
+
 class ProjectAnalysis(BaseModel):
     languages: List[str] = []
     frameworks: List[str] = []
@@ -22,20 +51,13 @@ class ProjectAnalysis(BaseModel):
     kubernetes: bool = False
     terraform: bool = False
     databases: List[str] = []
+    # Компоненты монорепозитория (пусто, если компонентов меньше двух)
+    components: List[ComponentAnalysis] = []
 
     @field_validator("test_runner", mode="before")
     @classmethod
     def convert_test_runner_to_string(cls, v: Any) -> Optional[str]:
-        """Конвертирует test_runner из списка в строку, если необходимо."""
-        if v is None:
-            return None
-        if isinstance(v, list):
-            # Берем первый элемент списка, если список не пустой
-            return v[0] if v else None
-        if isinstance(v, str):
-            return v
-        # Если это другой тип, конвертируем в строку
-        return str(v) if v else None
+        return _first_test_runner(v)
 
 
 class ProjectBase(BaseModel):
@@ -84,6 +106,30 @@ class PipelineGeneration(PipelineGenerationBase):
 
 
 
+# ---------- Очередь задач ----------
+
+
+class JobCreate(BaseModel):
+    kind: str = Field(..., description="Тип задачи (analyze)")
+    project_id: Optional[int] = None
+    payload: dict = {}
+    max_attempts: int = 3
+
+
+class Job(JobCreate):
+    id: int
+    status: str
+    attempts: int
+    worker_id: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
 # ---------- Пользовательские настройки для генерации пайплайна ----------
 
 
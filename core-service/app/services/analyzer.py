@@ -1,8 +1,9 @@
 """Сервис для анализа технологического стека репозитория."""
 import sys
 import os
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 # Добавляем путь к корню проекта в sys.path для правильной работы импортов
 PROJECT_ROOT = Path(__file__).resolve().parents[3]
@@ -38,6 +39,20 @@ except ImportError:
     sys.modules['stack_recognize.config'] = config_module
     sys.modules['config'] = config_module
     config_spec.loader.exec_module(config_module)
+
+    # ruleset
+    ruleset_spec = importlib.util.spec_from_file_location("stack_recognize.ruleset", STACK_RECOGNIZE_PATH / "ruleset.py")
+    ruleset_module = importlib.util.module_from_spec(ruleset_spec)
+    sys.modules['stack_recognize.ruleset'] = ruleset_module
+    sys.modules['ruleset'] = ruleset_module
+    ruleset_spec.loader.exec_module(ruleset_module)
+    
+    # deadline
+    deadline_spec = importlib.util.spec_from_file_location("stack_recognize.deadline", STACK_RECOGNIZE_PATH / "deadline.py")
+    deadline_module = importlib.util.module_from_spec(deadline_spec)
+    sys.modules['stack_recognize.deadline'] = deadline_module
+    sys.modules['deadline'] = deadline_module
+    deadline_spec.loader.exec_module(deadline_module)
     
     # utils
     utils_spec = importlib.util.spec_from_file_location("stack_recognize.utils", STACK_RECOGNIZE_PATH / "utils.py")
@@ -46,6 +61,34 @@ except ImportError:
     sys.modules['utils'] = utils_module
     utils_spec.loader.exec_module(utils_module)
     
+    # manifests
+    manifests_spec = importlib.util.spec_from_file_location("stack_recognize.manifests", STACK_RECOGNIZE_PATH / "manifests.py")
+    manifests_module = importlib.util.module_from_spec(manifests_spec)
+    sys.modules['stack_recognize.manifests'] = manifests_module
+    sys.modules['manifests'] = manifests_module
+    manifests_spec.loader.exec_module(manifests_module)
+    
+    # workspaces
+    workspaces_spec = importlib.util.spec_from_file_location("stack_recognize.workspaces", STACK_RECOGNIZE_PATH / "workspaces.py")
+    workspaces_module = importlib.util.module_from_spec(workspaces_spec)
+    sys.modules['stack_recognize.workspaces'] = workspaces_module
+    sys.modules['workspaces'] = workspaces_module
+    workspaces_spec.loader.exec_module(workspaces_module)
+    
+    # pattern_cache
+    pattern_cache_spec = importlib.util.spec_from_file_location("stack_recognize.pattern_cache", STACK_RECOGNIZE_PATH / "pattern_cache.py")
+    pattern_cache_module = importlib.util.module_from_spec(pattern_cache_spec)
+    sys.modules['stack_recognize.pattern_cache'] = pattern_cache_module
+    sys.modules['pattern_cache'] = pattern_cache_module
+    pattern_cache_spec.loader.exec_module(pattern_cache_module)
+
+    # worktrees
+    worktrees_spec = importlib.util.spec_from_file_location("stack_recognize.worktrees", STACK_RECOGNIZE_PATH / "worktrees.py")
+    worktrees_module = importlib.util.module_from_spec(worktrees_spec)
+    sys.modules['stack_recognize.worktrees'] = worktrees_module
+    sys.modules['worktrees'] = worktrees_module
+    worktrees_spec.loader.exec_module(worktrees_module)
+    
     # analyzers пакет
     analyzers_path = STACK_RECOGNIZE_PATH / "analyzers"
     analyzers_init = importlib.util.spec_from_file_location("stack_recognize.analyzers", analyzers_path / "__init__.py")
@@ -74,7 +117,25 @@ except ImportError:
     sys.modules['detector'] = detector_module
     detector_spec.loader.exec_module(detector_module)
     ProjectStackDetector = detector_module.ProjectStackDetector
-from app.schemas import ProjectAnalysis
+from app.schemas import ComponentAnalysis, ProjectAnalysis
+
+_detector = None
+_detector_lock = threading.Lock()
+
+
+def get_detector():
+    """
+    Общий для процесса детектор стека.
+
+    Детектор не хранит состояние анализа, поэтому один экземпляр (вместе
+    с анализаторами и конфигурацией) используется всеми потоками.
+    """
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                _detector = ProjectStackDetector()
+    return _detector
 
 
 def _build_authenticated_url(repo_url: str, token: Optional[str]) -> str:
@@ -173,29 +234,13 @@ def _convert_stack_to_analysis(stack) -> ProjectAnalysis:
         context_path = str(PathLib(dockerfile_path).parent)
         docker_context = context_path if context_path != "." else ""
     
-    # Конвертация test_runner из списка в строку
-    test_runner = None
-    if stack.test_runner:
-        if isinstance(stack.test_runner, list):
-            test_runner = stack.test_runner[0] if stack.test_runner else None
-        else:
-            test_runner = str(stack.test_runner)
-    
-    # Фильтрация языков: только поддерживаемые
-    allowed_languages = {'python', 'typescript', 'java', 'go'}
-    filtered_languages = []
-    for lang in stack.languages:
-        normalized = 'java' if lang in {'kotlin', 'java'} else lang
-        if normalized in allowed_languages and normalized not in filtered_languages:
-            filtered_languages.append(normalized)
-    
     return ProjectAnalysis(
-        languages=filtered_languages,
+        languages=_supported_languages(stack.languages),
         frameworks=stack.frameworks,
         frontend_frameworks=stack.frontend_frameworks,
         backend_frameworks=stack.backend_frameworks,
         package_manager=stack.package_manager,
-        test_runner=test_runner,
+        test_runner=stack.test_runner,
         java_version=None,  # Будет установлено в analyze_repository
         docker=stack.docker,
         docker_context=docker_context or "",
@@ -204,9 +249,32 @@ def _convert_stack_to_analysis(stack) -> ProjectAnalysis:
         kubernetes=stack.kubernetes,
         terraform=stack.terraform,
         databases=stack.databases,
+        components=[
+            ComponentAnalysis(
+                path=path,
+                languages=_supported_languages(component.languages),
+                frameworks=component.frameworks,
+                frontend_frameworks=component.frontend_frameworks,
+                backend_frameworks=component.backend_frameworks,
+                package_manager=component.package_manager,
+                test_runner=component.test_runner,
+            )
+            for path, component in stack.components.items()
+        ],
     )
 
 
+def _supported_languages(languages: List[str]) -> List[str]:
+    """Фильтрация языков: только поддерживаемые генератором (kotlin - как java)."""
+    allowed_languages = {'python', 'typescript', 'java', 'go'}
+    filtered_languages = []
+    for lang in languages:
+        normalized = 'java' if lang in {'kotlin', 'java'} else lang
+        if normalized in allowed_languages and normalized not in filtered_languages:
+            filtered_languages.append(normalized)
+    return filtered_languages
+
+
 def _extract_java_version_from_pom(repo_path: Path) -> Optional[str]:
     """Извлечь версию Java из pom.xml файлов в репозитории."""
     import re
@@ -255,9 +323,32 @@ def analyze_repository(repo_url: str, token: str = "") -> ProjectAnalysis:
     Returns:
         ProjectAnalysis: Анализ технологического стека
     """
-    detector = ProjectStackDetector()
+    analysis, _ = analyze_repository_full(repo_url, token)
+    return analysis
+
+
+def analyze_repository_full(
+    repo_url: str,
+    token: str = "",
+    clone_timeout: Optional[float] = None,
+    analyze_timeout: Optional[float] = None,
+):
+    """
+    Проанализировать репозиторий за одно клонирование.
+    
+    Args:
+        repo_url: URL Git-репозитория
+        token: Токен для клонирования (опционально)
+        clone_timeout: Лимит времени клонирования (по умолчанию из конфигурации детектора)
+        analyze_timeout: Лимит времени анализа (по умолчанию из конфигурации детектора)
+    
+    Returns:
+        (ProjectAnalysis, ProjectStack): Анализ стека и полный объект стека;
+        если лимит превышен, стек частичный и причина в stack.incomplete_reason
+    """
+    detector = get_detector()
     auth_url = _build_authenticated_url(repo_url, token)
-    stack = detector.detect_stack(auth_url)
+    stack = detector.detect_stack(auth_url, clone_timeout=clone_timeout, analyze_timeout=analyze_timeout)
     
     # Извлекаем версию Java из stack.files_detected (определяется в detector)
     java_version = stack.files_detected.get('java_version') if hasattr(stack, 'files_detected') else None
@@ -268,7 +359,7 @@ def analyze_repository(repo_url: str, token: str = "") -> ProjectAnalysis:
     if java_version:
         analysis.java_version = java_version
     
-    return analysis
+    return analysis, stack
 
 
 def get_full_stack(repo_url: str, token: str = ""):
@@ -282,7 +373,7 @@ def get_full_stack(repo_url: str, token: str = ""):
     Returns:
         ProjectStack: Полный объект стека
     """
-    detector = ProjectStackDetector()
+    detector = get_detector()
     auth_url = _build_authenticated_url(repo_url, token)
     return detector.detect_stack(auth_url)
 
@@ -0,0 +1,417 @@
+"""Пакетная генерация пайплайнов для списка репозиториев с возобновлением.
+
+Ход пакетного запуска записывается в манифест (JSON рядом с результатами):
+для каждого репозитория - статус, хэш входных данных, SHA проанализированного
+коммита и пути к сохраненным файлам. При повторном запуске с resume=True
+репозитории, успешно обработанные с теми же входными данными, пропускаются,
+а упавшие и необработанные обрабатываются заново.
+
+Результаты никогда не остаются записанными наполовину: файлы пишутся во
+временный файл и атомарно переименовываются, запись в БД для каждого
+репозитория выполняется одной транзакцией. Изменения манифеста дописываются
+в журнал (JSON Lines рядом с манифестом) и сворачиваются в манифест,
+который записывается атомарно, - периодически и в конце запуска.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.limits import PhaseLimits, call_with_deadline
+from app.services.scheduling import DEFAULT_HISTORY_NAME, CostHistory, plan_order, predict_costs
+
+logger = logging.getLogger(__name__)
+
+# Версия формата манифеста
+MANIFEST_VERSION = 1
+
+# Имя манифеста по умолчанию (в директории результатов)
+DEFAULT_MANIFEST_NAME = "batch-manifest.json"
+
+# Суффикс журнала изменений манифеста
+JOURNAL_SUFFIX = ".journal"
+
+# Через сколько записей журнала манифест сворачивается
+JOURNAL_COMPACT_EVERY = 1000
+
+# Статусы репозиториев в манифесте
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+@dataclass
+class BatchRepo:
+    """Репозиторий пакетного запуска."""
+    url: str
+    name: str
+
+
+def project_name_from_url(url: str) -> str:
+    """Имя проекта из URL (последний сегмент без .git), пригодное для имени файла."""
+    name = url.rstrip('/').split('/')[-1]
+    if name.endswith('.git'):
+        name = name[:-4]
+    return name.replace('/', '_').replace('\\', '_').replace(' ', '_') or 'project'
+
+
+def read_repo_list(path: Path) -> List[BatchRepo]:
+    """
+    Прочитать список репозиториев: по одному на строку, "URL [имя]".
+
+    Пустые строки и строки, начинающиеся с '#', пропускаются. Повторяющиеся
+    URL учитываются один раз.
+    """
+    repos: List[BatchRepo] = []
+    seen = set()
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        parts = line.split()
+        url = parts[0]
+        if url in seen:
+            continue
+        seen.add(url)
+        repos.append(BatchRepo(url=url, name=parts[1] if len(parts) > 1 else project_name_from_url(url)))
+    return repos
+
+
+def atomic_write_text(path: Path, content: str):
+    """Записать файл атомарно: во временный файл рядом и переименовать."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def compute_input_hash(repo: BatchRepo, user_settings: Dict[str, Any]) -> str:
+    """Хэш входных данных репозитория: URL, имя и настройки генерации."""
+    payload = json.dumps([repo.url, repo.name, user_settings], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class RunManifest:
+    """
+    Манифест пакетного запуска (потокобезопасный).
+
+    Полная перезапись манифеста на каждое изменение стоит O(N) и дает O(N²)
+    на запуск, поэтому изменения записей репозиториев дописываются в журнал
+    (одна строка JSON на изменение, fsync). compact() атомарно записывает
+    манифест целиком и очищает журнал; load() применяет журнал поверх
+    манифеста, поэтому после падения процесса изменения не теряются.
+    """
+
+    def __init__(self, path: Path, data: Optional[Dict[str, Any]] = None):
+        self.path = Path(path)
+        self.journal_path = self.path.with_name(self.path.name + JOURNAL_SUFFIX)
+        now = datetime.utcnow().isoformat()
+        self.data = data or {"version": MANIFEST_VERSION, "created_at": now, "repos": {}}
+        self._lock = threading.Lock()
+        self._journal = None
+        self._journal_entries = 0
+
+    @classmethod
+    def load(cls, path: Path) -> "RunManifest":
+        """Загрузить манифест и журнал; если файла нет или он поврежден - пустой манифест."""
+        path = Path(path)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            data = None
+        except ValueError as e:
+            logger.warning(f"Манифест {path} поврежден, начинаем заново: {e}")
+            data = None
+        if data is not None and (data.get("version") != MANIFEST_VERSION or not isinstance(data.get("repos"), dict)):
+            logger.warning(f"Неподдерживаемый формат манифеста {path}, начинаем заново")
+            data = None
+        manifest = cls(path, data)
+        manifest._replay_journal()
+        return manifest
+
+    def _replay_journal(self):
+        """Применить журнал к данным манифеста."""
+        try:
+            lines = self.journal_path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            return
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Последняя строка могла остаться недописанной при падении
+                logger.warning(f"Пропущена поврежденная запись журнала {self.journal_path}")
+                continue
+            for url, fields in record.get("repos", {}).items():
+                self.data["repos"].setdefault(url, {}).update(fields)
+            self.data["updated_at"] = record.get("at", self.data.get("updated_at"))
+
+    def _append(self, repos: Dict[str, Dict[str, Any]]):
+        """Применить изменения записей и дописать их в журнал (под блокировкой)."""
+        now = datetime.utcnow().isoformat()
+        for url, fields in repos.items():
+            self.data["repos"].setdefault(url, {}).update(fields)
+        self.data["updated_at"] = now
+
+        if self._journal is None:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal.write(json.dumps({"at": now, "repos": repos}, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._journal_entries += 1
+        if self._journal_entries >= JOURNAL_COMPACT_EVERY:
+            self._compact()
+
+    def _compact(self):
+        """Записать манифест целиком и очистить журнал (под блокировкой)."""
+        atomic_write_text(self.path, json.dumps(self.data, indent=2, ensure_ascii=False))
+        # Манифест уже содержит все изменения журнала: повторное применение
+        # журнала после падения в этот момент ничего не меняет
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        try:
+            os.unlink(self.journal_path)
+        except FileNotFoundError:
+            pass
+        self._journal_entries = 0
+
+    def entry(self, url: str) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.data["repos"].get(url) or {})
+
+    def is_complete(self, repo: BatchRepo, input_hash: str) -> bool:
+        """Репозиторий уже обработан с теми же входными данными и его файлы на месте."""
+        entry = self.entry(repo.url)
+        if entry.get("status") != STATUS_DONE or entry.get("input_hash") != input_hash:
+            return False
+        return all(Path(output).exists() for output in entry.get("outputs", []))
+
+    def update(self, url: str, **fields):
+        """Обновить запись репозитория (изменение дописывается в журнал)."""
+        with self._lock:
+            self._append({url: fields})
+
+    def update_many(self, repos: Dict[str, Dict[str, Any]]):
+        """Обновить записи нескольких репозиториев одной записью журнала."""
+        with self._lock:
+            self._append(repos)
+
+    def update_run(self, **fields):
+        """Обновить сведения о запуске в целом и сохранить манифест целиком."""
+        with self._lock:
+            self.data.update(fields)
+            self._compact()
+
+    def compact(self):
+        """Свернуть журнал в манифест."""
+        with self._lock:
+            self._compact()
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for entry in self.data["repos"].values():
+                status = entry.get("status", STATUS_PENDING)
+                counts[status] = counts.get(status, 0) + 1
+            return counts
+
+
+def _process_repo(
+    repo: BatchRepo,
+    token: str,
+    output_dir: Path,
+    user_settings: Dict[str, Any],
+    readme_renderer: Optional[Callable[[Any, Any], str]],
+    save_to_db: bool,
+    limits: PhaseLimits,
+) -> Dict[str, Any]:
+    """Анализ, генерация и сохранение результатов одного репозитория."""
+    from app.services.analyzer import analyze_repository_full
+    from app.services.pipeline_generator import generate_pipeline
+
+    analysis, stack = analyze_repository_full(
+        repo.url, token, clone_timeout=limits.clone_timeout, analyze_timeout=limits.analyze_timeout
+    )
+    if stack.incomplete_reason:
+        # Частичный стек не сохраняется: репозиторий будет повторен при --resume
+        raise RuntimeError(f"Анализ прерван: {stack.incomplete_reason}")
+    if not stack.commit_sha:
+        # Детектор не бросает исключений - ошибка клонирования попадает в hints
+        errors = [hint for hint in stack.hints if hint.startswith("Ошибка")]
+        raise RuntimeError(errors[0] if errors else "Не удалось склонировать репозиторий")
+
+    settings = dict(user_settings)
+    if analysis.docker:
+        settings.setdefault("docker_context", analysis.docker_context)
+        settings.setdefault("dockerfile_path", analysis.dockerfile_path)
+    pipeline = call_with_deadline(generate_pipeline, limits.render_timeout, 'render', analysis, settings)
+
+    # Сначала все файлы, затем БД: если процесс упадет между ними, репозиторий
+    # останется незавершенным в манифесте и будет обработан заново
+    outputs = []
+    pipeline_path = output_dir / f"{repo.name}.gitlab-ci.yml"
+    atomic_write_text(pipeline_path, pipeline)
+    outputs.append(str(pipeline_path))
+    if readme_renderer:
+        readme_path = output_dir / f"README-{repo.name}.md"
+        atomic_write_text(readme_path, readme_renderer(analysis, stack))
+        outputs.append(str(readme_path))
+
+    result: Dict[str, Any] = {"sha": stack.commit_sha, "outputs": outputs, "stats": stack.stats}
+    if save_to_db:
+        from app import storage
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            generation = storage.save_project_pipeline(
+                db, repo.name, repo.url, token, analysis, pipeline, settings=settings
+            )
+        finally:
+            db.close()
+        result["generation_id"] = generation.id
+    return result
+
+
+def run_batch(
+    repos: List[BatchRepo],
+    output_dir: Path,
+    user_settings: Dict[str, Any],
+    token: str = "",
+    manifest_path: Optional[Path] = None,
+    resume: bool = False,
+    workers: int = 1,
+    history_path: Optional[Path] = None,
+    window_seconds: Optional[float] = None,
+    limits: Optional[PhaseLimits] = None,
+    save_to_db: bool = False,
+    readme_renderer: Optional[Callable[[Any, Any], str]] = None,
+    on_result: Optional[Callable[[BatchRepo, Dict[str, Any]], None]] = None,
+) -> RunManifest:
+    """
+    Обработать список репозиториев.
+
+    Args:
+        repos: Репозитории
+        output_dir: Директория для пайплайнов и README
+        user_settings: Настройки генерации пайплайна
+        token: Токен для клонирования
+        manifest_path: Путь к манифесту (по умолчанию output_dir/batch-manifest.json)
+        resume: Пропустить репозитории, завершенные в предыдущем запуске
+        workers: Количество репозиториев, обрабатываемых параллельно
+        history_path: Путь к истории длительностей (по умолчанию output_dir/batch-history.json)
+        window_seconds: Окно запуска: долгие репозитории начинаются так, чтобы уложиться в него
+        limits: Лимиты времени этапов обработки репозитория
+        save_to_db: Сохранять проекты и пайплайны в БД
+        readme_renderer: Функция (analysis, stack) -> Markdown для README
+        on_result: Обратный вызов после каждого репозитория (репозиторий, запись манифеста)
+
+    Returns:
+        Манифест запуска
+    """
+    output_dir = Path(output_dir)
+    manifest_path = Path(manifest_path or output_dir / DEFAULT_MANIFEST_NAME)
+    manifest = RunManifest.load(manifest_path) if resume else RunManifest(manifest_path)
+    history = CostHistory.load(Path(history_path or output_dir / DEFAULT_HISTORY_NAME))
+
+    pending = []
+    for repo in repos:
+        input_hash = compute_input_hash(repo, user_settings)
+        if resume and manifest.is_complete(repo, input_hash):
+            logger.info(f"{repo.url}: уже обработан, пропускаем")
+            continue
+        pending.append((repo, input_hash))
+
+    # Порядок обработки по истории длительностей
+    costs = predict_costs(history, [repo.url for repo, _ in pending])
+    order, makespan = plan_order(costs, workers, window_seconds)
+    by_url = {repo.url: (repo, input_hash) for repo, input_hash in pending}
+    manifest.update_run(predicted_makespan=round(makespan, 3))
+    logger.info(f"Ожидаемая длительность запуска: {makespan:.1f} сек.")
+
+    # Все ожидающие репозитории регистрируются одной записью
+    todo = [by_url[url][0] for url in order]
+    manifest.update_many({
+        url: {
+            "name": by_url[url][0].name, "status": STATUS_PENDING, "input_hash": by_url[url][1],
+            "predicted_seconds": round(costs[url], 3),
+        }
+        for url in order
+    })
+
+    def process(repo: BatchRepo):
+        entry = manifest.entry(repo.url)
+        attempts = entry.get("attempts", 0) + 1
+        started = time.time()
+        manifest.update(
+            repo.url, status=STATUS_RUNNING, attempts=attempts, error=None,
+            started_at=datetime.utcnow().isoformat(),
+        )
+        try:
+            result = _process_repo(
+                repo, token, output_dir, user_settings, readme_renderer, save_to_db, limits or PhaseLimits()
+            )
+        except Exception as e:
+            logger.error(f"{repo.url}: {e}")
+            manifest.update(
+                repo.url, status=STATUS_FAILED, error=str(e),
+                finished_at=datetime.utcnow().isoformat(), duration=round(time.time() - started, 3),
+            )
+        else:
+            manifest.update(
+                repo.url, status=STATUS_DONE, **result,
+                finished_at=datetime.utcnow().isoformat(), duration=round(time.time() - started, 3),
+            )
+        if on_result:
+            on_result(repo, manifest.entry(repo.url))
+
+    started = time.time()
+    # Задачи выдаются воркерам строго в порядке плана
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        list(executor.map(process, todo))
+    manifest.update_run(observed_makespan=round(time.time() - started, 3))
+
+    for repo in todo:
+        entry = manifest.entry(repo.url)
+        if entry.get("status") == STATUS_DONE:
+            history.record(repo.url, entry.get("stats", {}), entry["duration"])
+    history.save()
+
+    return manifest
+
+
+def prediction_report(manifest: RunManifest) -> List[Dict[str, Any]]:
+    """Сравнение ожидаемой и фактической длительности по репозиториям запуска."""
+    report = []
+    for url, entry in manifest.data["repos"].items():
+        if entry.get("status") != STATUS_DONE or entry.get("duration") is None:
+            continue
+        report.append({
+            "url": url,
+            "name": entry.get("name"),
+            "predicted_seconds": entry.get("predicted_seconds"),
+            "observed_seconds": entry["duration"],
+        })
+    return report
@@ -0,0 +1,418 @@
+"""Очередь повторного анализа проектов по push-событиям GitLab.
+
+Push-событие (webhook GitLab, object_kind = push) превращается в задачу
+повторного анализа репозитория. Задачи группируются по репозиторию: пока
+задача ожидает выполнения, новые push-события в тот же репозиторий не
+создают новых задач, а обновляют существующую до последнего SHA. Если
+задача уже выполняется, следующее событие ставит одну повторную задачу.
+
+События, в которых не изменился ни один файл, влияющий на определение
+стека (манифесты, lock-файлы, Dockerfile, CI, инфраструктура, добавление
+или удаление файлов исходного кода), пропускаются без анализа.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# SHA удаленной ветки в push-событии
+_NULL_SHA = '0' * 40
+
+# Файлы, влияющие на результат анализа (сравнение по имени файла в нижнем регистре)
+RELEVANT_FILE_NAMES = {
+    # JavaScript / TypeScript
+    'package.json', 'package-lock.json', 'npm-shrinkwrap.json', 'yarn.lock',
+    'pnpm-lock.yaml', 'pnpm-workspace.yaml', 'bun.lockb', 'tsconfig.json',
+    # Python
+    'requirements.txt', 'pyproject.toml', 'setup.py', 'setup.cfg', 'pipfile',
+    'pipfile.lock', 'poetry.lock', 'tox.ini', 'pytest.ini', 'manage.py',
+    # Java / Kotlin
+    'pom.xml', 'build.gradle', 'build.gradle.kts', 'settings.gradle',
+    'settings.gradle.kts', 'gradle.properties', 'mvnw', 'gradlew',
+    # Go
+    'go.mod', 'go.sum', 'go.work',
+    # Контейнеры и CI
+    'dockerfile', 'docker-compose.yml', 'docker-compose.yaml', 'compose.yml',
+    'compose.yaml', '.dockerignore', '.gitlab-ci.yml', 'jenkinsfile',
+    'chart.yaml', 'values.yaml', 'kustomization.yaml', 'procfile',
+}
+
+# Префиксы имен файлов (requirements-dev.txt, Dockerfile.prod, docker-compose.override.yml)
+RELEVANT_FILE_PREFIXES = ('requirements', 'dockerfile', 'docker-compose', 'compose.')
+
+# Расширения файлов, влияющих на результат анализа
+RELEVANT_EXTENSIONS = {'.tf', '.tfvars', '.dockerfile'}
+
+# Директории, любые изменения в которых влияют на результат анализа
+RELEVANT_DIRS = {'.github', '.circleci', 'k8s', 'kubernetes', 'helm', 'charts', 'terraform', 'deploy'}
+
+# Расширения исходного кода: добавление и удаление таких файлов меняет
+# состав языков и точки входа
+SOURCE_EXTENSIONS = {'.py', '.js', '.jsx', '.mjs', '.cjs', '.ts', '.tsx', '.java', '.kt', '.kts', '.go'}
+
+
+def is_detection_relevant(path: str, added_or_removed: bool = False) -> bool:
+    """
+    Проверить, влияет ли изменение файла на определение стека.
+
+    Args:
+        path: Путь к файлу относительно корня репозитория
+        added_or_removed: Файл был добавлен или удален (а не изменен)
+    """
+    posix = PurePosixPath(path.lower())
+    name = posix.name
+
+    if name in RELEVANT_FILE_NAMES or name.startswith(RELEVANT_FILE_PREFIXES):
+        return True
+    if posix.suffix in RELEVANT_EXTENSIONS:
+        return True
+    if any(part in RELEVANT_DIRS for part in posix.parts[:-1]):
+        return True
+    return added_or_removed and posix.suffix in SOURCE_EXTENSIONS
+
+
+def normalize_repo_url(url: str) -> str:
+    """Ключ репозитория: URL без завершающего '/', суффикса .git и в нижнем регистре."""
+    url = url.strip().rstrip('/')
+    if url.endswith('.git'):
+        url = url[:-4]
+    return url.lower()
+
+
+def repo_url_variants(urls: Iterable[str]) -> List[str]:
+    """Варианты записи URL репозитория для поиска проекта в БД."""
+    variants: List[str] = []
+    for url in urls:
+        if not url:
+            continue
+        base = url.strip().rstrip('/')
+        if base.endswith('.git'):
+            base = base[:-4]
+        for variant in (base, f'{base}/', f'{base}.git'):
+            if variant not in variants:
+                variants.append(variant)
+    return variants
+
+
+@dataclass
+class PushEvent:
+    """Push-событие, приведенное к нужному для анализа виду."""
+    repo_url: str
+    repo_urls: List[str]
+    ref: str
+    sha: str
+    changed_paths: Set[str] = field(default_factory=set)
+    # Изменение затрагивает файлы, важные для анализа
+    relevant: bool = False
+    # Причина пропуска события (None - событие нужно обработать)
+    skip_reason: Optional[str] = None
+
+
+def parse_push_event(payload: Dict[str, Any]) -> PushEvent:
+    """
+    Разобрать payload push-события GitLab.
+
+    Учитываются только push-события в ветку по умолчанию. Удаление ветки
+    и события без изменений важных файлов помечаются как пропущенные.
+
+    Raises:
+        ValueError: Payload не является push-событием или в нем нет URL репозитория
+    """
+    if payload.get('object_kind', 'push') != 'push':
+        raise ValueError(f"Неподдерживаемый тип события: {payload.get('object_kind')}")
+
+    project = payload.get('project') or {}
+    repo_urls = [
+        url for url in (
+            project.get('git_http_url'),
+            project.get('web_url'),
+            (payload.get('repository') or {}).get('homepage'),
+        ) if url
+    ]
+    if not repo_urls:
+        raise ValueError("В событии отсутствует URL репозитория")
+
+    ref = payload.get('ref', '')
+    sha = payload.get('checkout_sha') or payload.get('after') or ''
+    event = PushEvent(repo_url=repo_urls[0], repo_urls=repo_urls, ref=ref, sha=sha)
+
+    default_branch = project.get('default_branch')
+    if default_branch and ref != f'refs/heads/{default_branch}':
+        event.skip_reason = f"push в ветку {ref}, ветка по умолчанию - {default_branch}"
+        return event
+    if not sha or sha == _NULL_SHA:
+        event.skip_reason = "ветка удалена"
+        return event
+
+    commits = payload.get('commits') or []
+    for commit in commits:
+        for path in commit.get('modified') or []:
+            event.changed_paths.add(path)
+            event.relevant = event.relevant or is_detection_relevant(path)
+        for path in (commit.get('added') or []) + (commit.get('removed') or []):
+            event.changed_paths.add(path)
+            event.relevant = event.relevant or is_detection_relevant(path, added_or_removed=True)
+
+    # GitLab передает не более 20 коммитов - список изменений неполный
+    if payload.get('total_commits_count', len(commits)) > len(commits) or not commits:
+        event.relevant = True
+
+    if not event.relevant:
+        event.skip_reason = "изменения не затрагивают файлы, важные для анализа"
+    return event
+
+
+@dataclass
+class IngestJob:
+    """Задача повторного анализа репозитория."""
+    key: str
+    repo_url: str
+    repo_urls: List[str]
+    sha: str
+    ref: str
+    changed_paths: Set[str] = field(default_factory=set)
+    # Количество push-событий, объединенных в задачу
+    events: int = 1
+    created_at: float = field(default_factory=time.time)
+
+    def merge(self, event: PushEvent):
+        """Объединить задачу с более поздним событием того же репозитория."""
+        self.sha = event.sha
+        self.ref = event.ref
+        self.changed_paths |= event.changed_paths
+        for url in event.repo_urls:
+            if url not in self.repo_urls:
+                self.repo_urls.append(url)
+        self.events += 1
+
+
+class IngestQueue:
+    """Потокобезопасная очередь задач анализа с объединением по репозиторию."""
+
+    def __init__(self, handler: Callable[[IngestJob], None], workers: int = 1):
+        """
+        Args:
+            handler: Обработчик задачи (вызывается в рабочем потоке)
+            workers: Количество рабочих потоков
+        """
+        self.handler = handler
+        self.workers = max(workers, 1)
+
+        self._cond = threading.Condition()
+        self._order: Deque[str] = deque()
+        self._pending: Dict[str, IngestJob] = {}
+        self._running: Set[str] = set()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+
+    def submit(self, event: PushEvent) -> str:
+        """
+        Поставить событие в очередь.
+
+        Returns:
+            'skipped' - событие не требует анализа,
+            'coalesced' - событие объединено с ожидающей задачей,
+            'queued' - создана новая задача
+        """
+        if event.skip_reason:
+            logger.info(f"Событие {event.repo_url}@{event.sha[:8]} пропущено: {event.skip_reason}")
+            return 'skipped'
+
+        key = normalize_repo_url(event.repo_url)
+        with self._cond:
+            job = self._pending.get(key)
+            if job is not None:
+                job.merge(event)
+                logger.info(f"Событие {key}@{event.sha[:8]} объединено с задачей ({job.events} событий)")
+                return 'coalesced'
+
+            # Выполняющаяся задача могла уже склонировать старый SHA -
+            # ставим повторную задачу, она начнется после завершения текущей
+            self._pending[key] = IngestJob(
+                key=key,
+                repo_url=event.repo_url,
+                repo_urls=list(event.repo_urls),
+                sha=event.sha,
+                ref=event.ref,
+                changed_paths=set(event.changed_paths),
+            )
+            self._order.append(key)
+            self._cond.notify()
+        logger.info(f"Задача анализа {key}@{event.sha[:8]} поставлена в очередь")
+        return 'queued'
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def start(self):
+        """Запустить рабочие потоки."""
+        with self._cond:
+            self._stopping = False
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'ingest-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Остановить рабочие потоки (текущие задачи завершаются)."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def drain(self):
+        """Выполнить все ожидающие задачи в текущем потоке."""
+        while True:
+            with self._cond:
+                job = self._take()
+            if job is None:
+                return
+            self._run(job)
+
+    def _take(self) -> Optional[IngestJob]:
+        """Взять первую задачу, репозиторий которой сейчас не анализируется (под блокировкой)."""
+        for key in self._order:
+            if key not in self._running:
+                self._order.remove(key)
+                self._running.add(key)
+                return self._pending.pop(key)
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._take()
+                while job is None and not self._stopping:
+                    self._cond.wait()
+                    job = self._take()
+                if job is None:
+                    return
+            self._run(job)
+
+    def _run(self, job: IngestJob):
+        try:
+            self.handler(job)
+        except Exception as e:
+            logger.error(f"Ошибка обработки задачи {job.key}@{job.sha[:8]}: {e}")
+        finally:
+            with self._cond:
+                self._running.discard(job.key)
+                # Повторная задача того же репозитория могла ждать завершения
+                self._cond.notify_all()
+
+
+def default_user_settings(platform: str = 'gitlab') -> Dict[str, Any]:
+    """Настройки генерации пайплайна по умолчанию (как в команде generate)."""
+    return {
+        "platform": platform,
+        "stages": [],
+        "triggers": {
+            "on_push": ["main", "master"],
+            "on_merge_request": False,
+            "on_tags": "",
+            "schedule": "",
+            "manual": False,
+        },
+        "variables": {},
+    }
+
+
+def project_user_settings(
+    name: str, saved: Optional[Dict[str, Any]] = None, defaults: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Настройки перегенерации пайплайна проекта.
+
+    Используются настройки, сохраненные при последней генерации проекта.
+    Для проектов без сохраненных настроек - настройки по умолчанию
+    (defaults или default_user_settings()) с именем проекта в project_name.
+    """
+    if saved is not None:
+        return saved
+    settings = dict(defaults or default_user_settings())
+    settings.setdefault("project_name", name)
+    return settings
+
+
+def refresh_project(db, project, limits=None) -> Optional[int]:
+    """
+    Повторно проанализировать проект и перегенерировать его пайплайн.
+
+    Пайплайн генерируется заново, только если результат анализа изменился.
+
+    Args:
+        db: Сессия БД
+        project: Проект
+        limits: Лимиты времени этапов (PhaseLimits, опционально)
+
+    Returns:
+        ID созданной генерации пайплайна или None, если стек не изменился
+
+    Raises:
+        RuntimeError: Анализ прерван по лимиту (частичный анализ не сохраняется)
+    """
+    from app import storage
+    from app.schemas import PipelineGenerationCreate
+    from app.services.analyzer import analyze_repository_full
+    from app.services.limits import PhaseLimits, call_with_deadline
+    from app.services.pipeline_generator import generate_pipeline
+
+    limits = limits or PhaseLimits()
+    analysis, stack = analyze_repository_full(
+        str(project.url), project.clone_token,
+        clone_timeout=limits.clone_timeout, analyze_timeout=limits.analyze_timeout,
+    )
+    if stack.incomplete_reason:
+        raise RuntimeError(f"Анализ проекта {project.id} прерван: {stack.incomplete_reason}")
+    if project.analysis == analysis:
+        logger.info(f"Стек проекта {project.id} не изменился, пайплайн не перегенерируется")
+        return None
+
+    settings = project_user_settings(project.name, storage.get_project_settings(db, project.id))
+    pipeline = call_with_deadline(generate_pipeline, limits.render_timeout, 'render', analysis, settings)
+    storage.update_project_analysis(db, project.id, analysis)
+    generation = storage.create_pipeline_generation(
+        db, PipelineGenerationCreate(project_id=project.id, uml=pipeline)
+    )
+    storage.save_project_settings(db, project.id, settings)
+    logger.info(f"Пайплайн проекта {project.id} перегенерирован (ID генерации: {generation.id})")
+    return generation.id
+
+
+def reanalyze_projects(job: IngestJob) -> List[int]:
+    """
+    Повторно проанализировать проекты репозитория из задачи.
+
+    Returns:
+        ID созданных генераций пайплайна
+    """
+    from app import storage
+    from app.database import SessionLocal
+
+    generation_ids: List[int] = []
+    db = SessionLocal()
+    try:
+        projects = storage.find_projects_by_urls(db, repo_url_variants(job.repo_urls))
+        if not projects:
+            logger.info(f"Для репозитория {job.repo_url} нет зарегистрированных проектов")
+            return generation_ids
+
+        for project in projects:
+            logger.info(
+                f"Повторный анализ проекта {project.id} ({project.name}) на {job.sha[:8]}, "
+                f"событий: {job.events}, измененных файлов: {len(job.changed_paths)}"
+            )
+            generation_id = refresh_project(db, project)
+            if generation_id is not None:
+                generation_ids.append(generation_id)
+    finally:
+        db.close()
+    return generation_ids
@@ -0,0 +1,75 @@
+"""Лимиты времени этапов и ресурсов процесса для пакетной обработки и воркеров."""
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+class PhaseTimeout(Exception):
+    """Этап не завершился за отведенное время."""
+
+
+@dataclass
+class PhaseLimits:
+    """Лимиты времени этапов обработки репозитория (секунды, None - по умолчанию детектора)."""
+    clone_timeout: Optional[float] = None
+    analyze_timeout: Optional[float] = None
+    render_timeout: Optional[float] = None
+
+
+def apply_process_limits(max_memory_mb: Optional[int] = None, max_cpu_seconds: Optional[int] = None):
+    """
+    Ограничить память и процессорное время текущего процесса (и процессов git).
+
+    При превышении лимита памяти анализ получает MemoryError и возвращает
+    частичный стек; лимит процессорного времени считается на весь процесс
+    воркера (мягкий лимит - SIGXCPU, жесткий - на 5 секунд больше), поэтому
+    его стоит сочетать с перезапуском воркера (--max-jobs).
+    """
+    if resource is None:
+        logger.warning("Ограничения ресурсов не поддерживаются на этой платформе")
+        return
+    if max_memory_mb:
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if max_cpu_seconds:
+        resource.setrlimit(resource.RLIMIT_CPU, (max_cpu_seconds, max_cpu_seconds + 5))
+
+
+def call_with_deadline(fn: Callable[..., Any], seconds: Optional[float], phase: str, *args, **kwargs) -> Any:
+    """
+    Выполнить функцию с лимитом времени.
+
+    Рендеринг шаблонов нельзя прервать на середине, поэтому функция
+    выполняется в отдельном потоке: при превышении лимита вызывающий код
+    получает PhaseTimeout и продолжает работу, а поток завершается в фоне.
+
+    Raises:
+        PhaseTimeout: Функция не завершилась за seconds секунд
+    """
+    if not seconds:
+        return fn(*args, **kwargs)
+
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = fn(*args, **kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, name=f'{phase}-deadline', daemon=True)
+    thread.start()
+    thread.join(seconds)
+    if thread.is_alive():
+        raise PhaseTimeout(f"Превышен лимит времени этапа {phase} ({seconds:g} сек.)")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
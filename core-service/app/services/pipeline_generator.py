@@ -1,7 +1,8 @@
 """Сервис для генерации CI/CD пайплайнов."""
+import json
 import sys
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 
 # Добавляем путь к ci_generator в sys.path
 PROJECT_ROOT = Path(__file__).resolve().parents[3]
@@ -11,7 +12,10 @@ if str(CI_GENERATOR_PATH) not in sys.path:
 
 try:
     from generator.stage_selector import select_stages
-    from generator.renderer import PipelineRenderer
+    from generator.plugin_registry import get_plugin_registry
+    from generator.renderer import get_renderer
+    from generator.render_cache import get_render_cache
+    from generator.dependencies import content_hash
 except ImportError:
     # Попытка прямого импорта
     import importlib.util
@@ -21,13 +25,21 @@ except ImportError:
     stage_selector_module = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(stage_selector_module)
     select_stages = stage_selector_module.select_stages
+    get_plugin_registry = stage_selector_module.get_plugin_registry
     
     # Импорт renderer
     spec = importlib.util.spec_from_file_location("renderer", CI_GENERATOR_PATH / "generator" / "renderer.py")
     renderer_module = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(renderer_module)
-    PipelineRenderer = renderer_module.PipelineRenderer
-from app.schemas import ProjectAnalysis
+    get_renderer = renderer_module.get_renderer
+    get_render_cache = renderer_module.get_render_cache
+    content_hash = renderer_module.content_hash
+from app.schemas import ComponentAnalysis, ProjectAnalysis
+
+
+def render_cache_stats() -> Dict[str, Any]:
+    """Статистика кэша рендеринга пайплайнов (попадания, промахи, записи)."""
+    return get_render_cache().stats()
 
 
 def generate_pipeline(analysis: ProjectAnalysis, user_settings: Dict[str, Any]) -> str:
@@ -41,6 +53,63 @@ def generate_pipeline(analysis: ProjectAnalysis, user_settings: Dict[str, Any])
     Returns:
         str: Сгенерированный пайплайн в формате YAML
     """
+    platform, stages, ctx = _render_input(analysis, user_settings)
+    renderer = _get_pipeline_renderer()
+    if platform == "gitlab":
+        return renderer.render_gitlab(stages, ctx)
+    elif platform == "jenkins":
+        return renderer.render_jenkins(stages, ctx)
+    else:
+        raise ValueError(f"Unsupported platform: {platform}")
+
+
+def pipeline_dependencies(analysis: ProjectAnalysis, user_settings: Dict[str, Any]) -> str:
+    """
+    Зависимости пайплайна (без рендеринга) в канонической JSON-форме.
+
+    Совпадение с зависимостями сохраненного пайплайна означает, что
+    рендеринг даст тот же результат: не изменились ни использованные
+    шаблоны, ни прочитанные ими значения контекста.
+    """
+    platform, stages, ctx = _render_input(analysis, user_settings)
+    if platform not in ("gitlab", "jenkins"):
+        raise ValueError(f"Unsupported platform: {platform}")
+    dependencies = _get_pipeline_renderer().dependencies(platform, stages, ctx)
+    return json.dumps(dependencies, sort_keys=True, separators=(",", ":"))
+
+
+def pipeline_hash(pipeline: str) -> str:
+    """Хэш текста пайплайна (для сравнения с сохраненным)."""
+    return content_hash(pipeline)
+
+
+def _get_pipeline_renderer():
+    return get_renderer(templates_root=str(CI_GENERATOR_PATH / "pipelines"))
+
+
+def _language_view(analysis_dict: Dict[str, Any], components: List[ComponentAnalysis], language: str) -> Dict[str, Any]:
+    """
+    Поля анализа для пайплайна основного языка монорепозитория.
+
+    Сводный стек смешивает компоненты: менеджер пакетов, тестовый фреймворк
+    и фреймворки фронтенда (npm, jest, react) попадают в пайплайн бэкенда на
+    другом языке. Эти поля берутся из компонентов основного языка; Docker,
+    Kubernetes и базы данных остаются общими для репозитория.
+    """
+    matching = [component for component in components if language in component.languages]
+    if not matching:
+        return analysis_dict
+
+    view = dict(analysis_dict)
+    for key in ("frameworks", "frontend_frameworks", "backend_frameworks"):
+        view[key] = list(dict.fromkeys(value for component in matching for value in getattr(component, key)))
+    view["package_manager"] = next((c.package_manager for c in matching if c.package_manager), None)
+    view["test_runner"] = next((c.test_runner for c in matching if c.test_runner), None)
+    return view
+
+
+def _render_input(analysis: ProjectAnalysis, user_settings: Dict[str, Any]) -> Tuple[str, List[str], Dict[str, Any]]:
+    """Платформа, стадии и контекст шаблонов для анализа и настроек."""
     # Конвертация ProjectAnalysis в словарь
     analysis_dict = {
         "languages": analysis.languages,
@@ -64,20 +133,6 @@ def generate_pipeline(analysis: ProjectAnalysis, user_settings: Dict[str, Any])
     # Определение платформы
     platform = (user_settings_dict.get("platform") or "gitlab").lower()
     
-    # Выбор стадий
-    stages = select_stages(analysis_dict, user_settings_dict)
-    
-    # Определяем build_tool для Java
-    build_tool = None
-    if "java" in analysis_dict.get("languages", []):
-        package_manager = analysis_dict.get("package_manager", "").lower()
-        if package_manager in ["maven", "gradle"]:
-            build_tool = package_manager
-        elif package_manager == "ant":
-            build_tool = "ant"
-        else:
-            build_tool = user_settings_dict.get("build_tool", "maven")
-    
     # Определяем основной язык
     languages = [l.lower() for l in analysis_dict.get("languages", [])]
     main_languages = ["python", "java", "kotlin", "go", "golang", "typescript", "javascript"]
@@ -91,6 +146,23 @@ def generate_pipeline(analysis: ProjectAnalysis, user_settings: Dict[str, Any])
     elif not language:
         language = "python"
     
+    # В монорепозитории стадии и шаблоны выбираются по компонентам основного языка
+    analysis_dict = _language_view(analysis_dict, analysis.components, language)
+    
+    # Выбор стадий
+    stages = select_stages(analysis_dict, user_settings_dict)
+    
+    # Определяем build_tool для Java
+    build_tool = None
+    if "java" in analysis_dict.get("languages", []):
+        package_manager = (analysis_dict.get("package_manager") or "").lower()
+        if package_manager in ["maven", "gradle"]:
+            build_tool = package_manager
+        elif package_manager == "ant":
+            build_tool = "ant"
+        else:
+            build_tool = user_settings_dict.get("build_tool", "maven")
+    
     # Создание контекста для шаблонов
     ctx = {
         "language": language,
@@ -140,14 +212,5 @@ def generate_pipeline(analysis: ProjectAnalysis, user_settings: Dict[str, Any])
         "use_docker_compose": user_settings_dict.get("use_docker_compose", False),  # Флаг для генерации docker-compose
     })
     
-    # Рендеринг пайплайна
-    templates_root = CI_GENERATOR_PATH / "pipelines"
-    renderer = PipelineRenderer(templates_root=str(templates_root))
-    
-    if platform == "gitlab":
-        return renderer.render_gitlab(stages, ctx)
-    elif platform == "jenkins":
-        return renderer.render_jenkins(stages, ctx)
-    else:
-        raise ValueError(f"Unsupported platform: {platform}")
+    return platform, stages, ctx
 
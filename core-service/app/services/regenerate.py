@@ -0,0 +1,288 @@
+"""Массовая перегенерация пайплайнов всех проектов из БД.
+
+После изменения шаблонов пайплайны всех проектов нужно сгенерировать
+заново. Проекты читаются из таблицы projects потоково (порциями по id),
+порции рендерятся параллельно в дочерних процессах, а новые записи
+pipeline_generations сохраняются пакетными INSERT.
+
+Шаблоны компилируются в родительском процессе до fork, поэтому все
+дочерние процессы используют один скомпилированный набор шаблонов
+(страницы памяти общие, copy-on-write). Одинаковые анализ и настройки
+рендерятся в процессе один раз (кэш рендеринга).
+
+Каждый проект рендерится со своими настройками генерации - сохраненными
+при последней генерации (generate, batch --save-db, воркер). Проекты без
+сохраненных настроек рендерятся с общими настройками по умолчанию, в
+которых project_name - имя проекта.
+
+Вместе с пайплайном сохраняются его зависимости: хэши использованных
+шаблонов и прочитанных ими значений контекста. Проект, у которого
+зависимости не изменились (например, изменились только шаблоны Go, а
+проект на Python), не рендерится. Если после рендеринга пайплайн совпал
+с сохраненным, новая генерация не записывается - обновляются только
+зависимости.
+"""
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from app import storage
+from app.database import SessionLocal, get_engine
+
+logger = logging.getLogger(__name__)
+
+# Количество проектов в порции чтения, рендеринга и записи
+DEFAULT_BATCH_SIZE = 200
+
+# Статусы проектов
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"
+# Зависимости не изменились - проект не рендерился
+STATUS_UNCHANGED = "unchanged"
+# Отрендерен, пайплайн совпал с сохраненным - новая генерация не записана
+STATUS_IDENTICAL = "identical"
+
+
+@dataclass
+class RegenerationResult:
+    """Результат перегенерации одного проекта."""
+    project_id: int
+    name: str
+    status: str
+    seconds: float
+    error: Optional[str] = None
+
+
+@dataclass
+class RegenerationSummary:
+    """Итоги массовой перегенерации."""
+    total: int = 0
+    done: int = 0
+    failed: int = 0
+    skipped: int = 0
+    unchanged: int = 0
+    identical: int = 0
+    saved: int = 0
+    # Обновлено записей зависимостей без новой генерации
+    refreshed: int = 0
+    elapsed: float = 0.0
+    # Попадания и промахи кэша рендеринга во всех процессах
+    cache_hits: int = 0
+    cache_misses: int = 0
+    # Самые долгие проекты: (секунды, ID, имя)
+    slowest: List[Tuple[float, int, str]] = field(default_factory=list)
+
+    @property
+    def per_minute(self) -> float:
+        """Пропускная способность: проектов в минуту."""
+        return self.total / self.elapsed * 60 if self.elapsed else 0.0
+
+
+# Сохраненное состояние проекта: (хэш пайплайна, JSON зависимостей)
+_State = Tuple[Optional[str], Optional[str]]
+# Результат рендеринга: (пайплайн или None, хэш пайплайна, JSON зависимостей)
+_Rendered = Tuple[Optional[str], str, str]
+# Проект для рендеринга: (ID, имя, JSON анализа, JSON настроек генерации, сохраненное состояние)
+_ChunkRow = Tuple[int, str, Optional[str], Optional[str], Optional[_State]]
+# Новая генерация для записи: (ID проекта, пайплайн, хэш пайплайна, JSON зависимостей)
+_GenerationRow = Tuple[int, str, str, str]
+
+
+def _render_chunk(
+    rows: Sequence[_ChunkRow], user_settings: Dict[str, Any], force: bool
+) -> Tuple[List[Tuple[RegenerationResult, Optional[_Rendered]]], Dict[str, int]]:
+    """
+    Сгенерировать пайплайны для порции проектов (выполняется в дочернем процессе).
+
+    Проект рендерится со своими сохраненными настройками генерации, без
+    них - с user_settings и project_name по имени проекта.
+
+    Returns:
+        (результаты с пайплайнами, попадания и промахи кэша рендеринга за порцию);
+        для STATUS_IDENTICAL пайплайн не возвращается, только хэш и изменившиеся зависимости
+    """
+    from app.schemas import ProjectAnalysis
+    from app.services.ingest import project_user_settings
+    from app.services.pipeline_generator import (
+        generate_pipeline,
+        pipeline_dependencies,
+        pipeline_hash,
+        render_cache_stats,
+    )
+
+    cache_before = render_cache_stats()
+    results = []
+    for project_id, name, analysis_json, settings_json, state in rows:
+        started = time.perf_counter()
+        if not analysis_json:
+            results.append((RegenerationResult(project_id, name, STATUS_SKIPPED, 0.0, "нет анализа"), None))
+            continue
+        saved_hash, saved_dependencies = state or (None, None)
+        try:
+            analysis = ProjectAnalysis.model_validate(json.loads(analysis_json))
+            settings = project_user_settings(
+                name, json.loads(settings_json) if settings_json else None, user_settings
+            )
+            dependencies = pipeline_dependencies(analysis, settings)
+            if not force and dependencies == saved_dependencies:
+                seconds = time.perf_counter() - started
+                results.append((RegenerationResult(project_id, name, STATUS_UNCHANGED, seconds), None))
+                continue
+            pipeline = generate_pipeline(analysis, settings)
+            output_hash = pipeline_hash(pipeline)
+        except Exception as e:
+            seconds = time.perf_counter() - started
+            results.append((RegenerationResult(project_id, name, STATUS_FAILED, seconds, str(e)), None))
+            continue
+        seconds = time.perf_counter() - started
+        if output_hash == saved_hash:
+            # Зависимости обновляются, только если они изменились
+            changed = None if dependencies == saved_dependencies else (None, output_hash, dependencies)
+            results.append((RegenerationResult(project_id, name, STATUS_IDENTICAL, seconds), changed))
+        else:
+            results.append((RegenerationResult(project_id, name, STATUS_DONE, seconds),
+                            (pipeline, output_hash, dependencies)))
+    cache_after = render_cache_stats()
+    return results, {key: cache_after[key] - cache_before[key] for key in ("hits", "misses")}
+
+
+def _worker_initializer():
+    # Дочерний процесс не должен использовать соединения родителя
+    get_engine().dispose(close=False)
+
+
+def _make_executor(workers: int) -> Executor:
+    """Пул дочерних процессов (fork), без fork - пул из одного потока."""
+    if workers > 1 and hasattr(os, "fork"):
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_worker_initializer,
+        )
+    if workers > 1:
+        logger.warning("Параллельная перегенерация требует fork (POSIX) - используется один процесс")
+    return ThreadPoolExecutor(max_workers=1)
+
+
+def regenerate_all(
+    user_settings: Dict[str, Any],
+    workers: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    project_ids: Optional[Sequence[int]] = None,
+    save: bool = True,
+    force: bool = False,
+    on_result: Optional[Callable[[RegenerationResult], None]] = None,
+) -> RegenerationSummary:
+    """
+    Перегенерировать пайплайны всех проектов (или выбранных project_ids).
+
+    Проекты с неизменившимися зависимостями не рендерятся, пайплайны,
+    совпавшие с сохраненными, не записываются повторно.
+
+    Args:
+        user_settings: Настройки генерации для проектов без сохраненных настроек
+        workers: Количество процессов рендеринга (по умолчанию - число CPU)
+        batch_size: Размер порции чтения, рендеринга и пакетной записи
+        project_ids: Только эти проекты (по умолчанию - все)
+        save: Сохранять новые генерации в БД (False - только рендеринг)
+        force: Рендерить все проекты, не сравнивая зависимости
+        on_result: Вызывается для каждого проекта по мере готовности
+
+    Returns:
+        RegenerationSummary
+    """
+    from app.services.pipeline_generator import CI_GENERATOR_PATH, get_plugin_registry, get_renderer, pipeline_hash
+
+    workers = max(workers or os.cpu_count() or 1, 1)
+    summary = RegenerationSummary()
+    started = time.perf_counter()
+
+    # Шаблоны компилируются и плагины находятся до fork - дочерние процессы этого не повторяют
+    get_renderer(str(CI_GENERATOR_PATH / "pipelines"))
+    get_plugin_registry()
+    # Соединения с БД не должны переходить в дочерние процессы
+    get_engine().dispose()
+    gc.freeze()
+
+    db = SessionLocal()
+    pending_rows: List[_GenerationRow] = []
+    pending_dependencies: List[Tuple[int, int, str, str]] = []
+    # ID последних генераций проектов в работе (для обновления их зависимостей)
+    generation_ids: Dict[int, int] = {}
+    in_flight: Deque[Future] = deque()
+
+    def flush():
+        summary.saved += storage.create_pipeline_generations(db, pending_rows)
+        summary.refreshed += storage.save_pipeline_dependencies(db, pending_dependencies)
+        pending_rows.clear()
+        pending_dependencies.clear()
+
+    def collect(future: Future):
+        results, cache_stats = future.result()
+        summary.cache_hits += cache_stats["hits"]
+        summary.cache_misses += cache_stats["misses"]
+        for result, rendered in results:
+            summary.total += 1
+            generation_id = generation_ids.pop(result.project_id, None)
+            if result.status == STATUS_DONE:
+                summary.done += 1
+                if save:
+                    pending_rows.append((result.project_id,) + rendered)
+            elif result.status == STATUS_IDENTICAL:
+                summary.identical += 1
+                if save and rendered is not None:
+                    _, output_hash, dependencies = rendered
+                    pending_dependencies.append((generation_id, result.project_id, output_hash, dependencies))
+            elif result.status == STATUS_UNCHANGED:
+                summary.unchanged += 1
+            elif result.status == STATUS_FAILED:
+                summary.failed += 1
+            else:
+                summary.skipped += 1
+            summary.slowest.append((result.seconds, result.project_id, result.name))
+            if on_result:
+                on_result(result)
+        summary.slowest = sorted(summary.slowest, reverse=True)[:10]
+        if len(pending_rows) + len(pending_dependencies) >= batch_size:
+            flush()
+
+    def with_states(rows):
+        states = storage.get_latest_pipeline_states(db, [row[0] for row in rows])
+        chunk: List[_ChunkRow] = []
+        for project_id, name, analysis_json, settings_json in rows:
+            state = states.get(project_id)
+            if state is None:
+                chunk.append((project_id, name, analysis_json, settings_json, None))
+                continue
+            generation_id, output_hash, dependencies, pipeline = state
+            generation_ids[project_id] = generation_id
+            if output_hash is None:
+                # Генерация без сохраненных зависимостей: сравниваем по тексту пайплайна
+                output_hash = pipeline_hash(pipeline)
+            chunk.append((project_id, name, analysis_json, settings_json, (output_hash, dependencies)))
+        return chunk
+
+    try:
+        with _make_executor(workers) as executor:
+            for rows in storage.iter_project_analyses(db, batch_size, project_ids):
+                in_flight.append(executor.submit(_render_chunk, with_states(rows), user_settings, force))
+                # Ограничиваем количество порций в работе: проекты читаются потоково
+                while len(in_flight) >= workers * 2:
+                    collect(in_flight.popleft())
+            while in_flight:
+                collect(in_flight.popleft())
+        flush()
+    finally:
+        db.close()
+        gc.unfreeze()
+
+    summary.elapsed = time.perf_counter() - started
+    return summary
@@ -0,0 +1,133 @@
+"""Планирование порядка пакетной обработки по истории длительностей.
+
+История хранит для каждого репозитория сглаженные длительности клонирования
+и анализа и размер клона. По ней порядок обработки выбирается так, чтобы
+минимизировать среднее время завершения (сначала короткие задачи, SJF), но
+при этом самые долгие репозитории начинались достаточно рано, чтобы весь
+запуск уложился в окно (долгие задачи переносятся в начало в порядке
+убывания длительности, LPT).
+"""
+import json
+import logging
+import heapq
+import statistics
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Имя файла истории по умолчанию (в директории результатов)
+DEFAULT_HISTORY_NAME = "batch-history.json"
+
+# Вес нового наблюдения в экспоненциальном сглаживании
+_EWMA_ALPHA = 0.5
+
+# Оценка длительности, если истории нет ни для одного репозитория (секунды)
+_DEFAULT_COST = 30.0
+
+
+class CostHistory:
+    """История длительностей обработки репозиториев (JSON-файл)."""
+
+    def __init__(self, path: Optional[Path], repos: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.path = Path(path) if path else None
+        self.repos: Dict[str, Dict[str, Any]] = repos or {}
+
+    @classmethod
+    def load(cls, path: Path) -> "CostHistory":
+        path = Path(path)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return cls(path)
+        except ValueError as e:
+            logger.warning(f"История длительностей {path} повреждена, начинаем заново: {e}")
+            return cls(path)
+        return cls(path, data.get("repos") if isinstance(data.get("repos"), dict) else {})
+
+    def predict(self, url: str) -> Optional[float]:
+        """Ожидаемая длительность обработки репозитория или None, если истории нет."""
+        entry = self.repos.get(url)
+        return entry.get("total_seconds") if entry else None
+
+    def record(self, url: str, stats: Dict[str, Any], total_seconds: float):
+        """Учесть наблюдение: длительности этапов, полную длительность и размер клона."""
+        entry = self.repos.setdefault(url, {"runs": 0})
+        observed = dict(stats, total_seconds=total_seconds)
+        for key in ("clone_seconds", "analyze_seconds", "total_seconds"):
+            value = observed.get(key)
+            if value is None:
+                continue
+            previous = entry.get(key)
+            entry[key] = round(value if previous is None else _EWMA_ALPHA * value + (1 - _EWMA_ALPHA) * previous, 3)
+        if observed.get("repo_bytes") is not None:
+            entry["repo_bytes"] = observed["repo_bytes"]
+        entry["runs"] += 1
+        entry["updated_at"] = datetime.utcnow().isoformat()
+
+    def save(self):
+        from app.services.batch import atomic_write_text
+
+        if self.path:
+            atomic_write_text(self.path, json.dumps({"repos": self.repos}, indent=2, ensure_ascii=False))
+
+
+def simulate_makespan(costs: Sequence[float], workers: int) -> float:
+    """Время завершения всех задач при выдаче по порядку первому освободившемуся воркеру."""
+    finish_times = [0.0] * max(workers, 1)
+    for cost in costs:
+        start = heapq.heappop(finish_times)
+        heapq.heappush(finish_times, start + cost)
+    return max(finish_times)
+
+
+def plan_order(
+    costs: Dict[str, float],
+    workers: int,
+    window_seconds: Optional[float] = None,
+) -> Tuple[List[str], float]:
+    """
+    Порядок обработки: SJF, долгие задачи - в начало, если иначе не уложиться в окно.
+
+    Сначала проверяется чистый SJF. Если его время завершения превышает окно,
+    k самых долгих задач переносятся в начало (в порядке убывания), остальные
+    остаются в порядке SJF; k увеличивается, пока запуск не уложится в окно.
+    Если окно недостижимо, выбирается порядок с минимальным временем завершения.
+
+    Args:
+        costs: Ожидаемая длительность по ключу задачи
+        workers: Количество параллельных воркеров
+        window_seconds: Окно запуска (None - только SJF)
+
+    Returns:
+        (порядок ключей, ожидаемое время завершения всех задач)
+    """
+    sjf = sorted(costs, key=lambda key: (costs[key], key))
+    best = (sjf, simulate_makespan([costs[k] for k in sjf], workers))
+    if window_seconds is None or best[1] <= window_seconds:
+        return best
+
+    longest_first = sjf[::-1]
+    for k in range(1, len(sjf) + 1):
+        head = longest_first[:k]
+        head_keys = set(head)
+        order = head + [key for key in sjf if key not in head_keys]
+        makespan = simulate_makespan([costs[key] for key in order], workers)
+        if makespan < best[1]:
+            best = (order, makespan)
+        if makespan <= window_seconds:
+            return order, makespan
+
+    logger.warning(
+        f"Ожидаемая длительность запуска {best[1]:.0f} сек. превышает окно {window_seconds:.0f} сек."
+    )
+    return best
+
+
+def predict_costs(history: CostHistory, urls: Sequence[str]) -> Dict[str, float]:
+    """Ожидаемые длительности; для новых репозиториев - медиана известных."""
+    known = {url: history.predict(url) for url in urls}
+    values = [cost for cost in known.values() if cost is not None]
+    fallback = statistics.median(values) if values else _DEFAULT_COST
+    return {url: cost if cost is not None else fallback for url, cost in known.items()}
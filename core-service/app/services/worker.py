@@ -0,0 +1,242 @@
+"""Воркер очереди задач анализа (таблица jobs).
+
+Воркеры на любом количестве машин подключаются к общей БД и забирают
+задачи по одной (см. storage.claim_job). Пока задача выполняется, отдельный
+поток продлевает ее аренду (heartbeat); если воркер упал, аренда истекает
+и любой другой воркер возвращает задачу в очередь.
+"""
+import gc
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Optional
+
+from app import storage
+from app.database import SessionLocal, get_engine
+from app.schemas import Job
+from app.services.limits import PhaseLimits
+
+logger = logging.getLogger(__name__)
+
+# Срок аренды задачи без heartbeat (секунды)
+DEFAULT_LEASE_SECONDS = 120
+
+# Пауза между опросами пустой очереди (секунды)
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+def default_worker_id() -> str:
+    """Идентификатор воркера: хост и PID процесса."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _handle_analyze(db, job: Job, limits: PhaseLimits) -> Dict[str, Any]:
+    """Анализ проекта из БД (project_id) или репозитория по URL (payload.url)."""
+    from app.services.analyzer import analyze_repository_full
+    from app.services.ingest import refresh_project
+
+    if job.project_id is not None:
+        project = storage.get_project(db, job.project_id)
+        if project is None:
+            raise ValueError(f"Проект с ID {job.project_id} не найден")
+        return {"project_id": project.id, "generation_id": refresh_project(db, project, limits)}
+
+    url = job.payload.get("url")
+    if not url:
+        raise ValueError("В задаче не указаны project_id или url")
+    analysis, stack = analyze_repository_full(
+        url, job.payload.get("token", ""),
+        clone_timeout=limits.clone_timeout, analyze_timeout=limits.analyze_timeout,
+    )
+    if stack.incomplete_reason:
+        raise RuntimeError(f"Анализ прерван: {stack.incomplete_reason}")
+    return {"url": url, "analysis": analysis.model_dump()}
+
+
+# Обработчики задач по типу
+JOB_HANDLERS: Dict[str, Callable[[Any, Job, PhaseLimits], Any]] = {
+    "analyze": _handle_analyze,
+}
+
+
+class _Heartbeat(threading.Thread):
+    """Фоновое продление аренды задачи."""
+
+    def __init__(self, job_id: int, worker_id: str, lease_seconds: int):
+        super().__init__(name=f"heartbeat-{job_id}", daemon=True)
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.lost = threading.Event()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        interval = max(self.lease_seconds / 3, 1)
+        db = SessionLocal()
+        try:
+            while not self._stop_event.wait(interval):
+                try:
+                    if not storage.heartbeat_job(db, self.job_id, self.worker_id, self.lease_seconds):
+                        logger.warning(f"Аренда задачи {self.job_id} потеряна")
+                        self.lost.set()
+                        return
+                except Exception as e:
+                    # Временная ошибка БД - попробуем на следующем шаге
+                    logger.warning(f"Ошибка heartbeat задачи {self.job_id}: {e}")
+        finally:
+            db.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def run_job(
+    job: Job,
+    worker_id: str,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS,
+    limits: Optional[PhaseLimits] = None,
+) -> str:
+    """
+    Выполнить захваченную задачу и сохранить результат.
+
+    Returns:
+        Итоговый статус задачи (done, queued, failed) или 'lost', если
+        аренда была потеряна
+    """
+    handler = JOB_HANDLERS.get(job.kind)
+    heartbeat = _Heartbeat(job.id, worker_id, lease_seconds)
+    heartbeat.start()
+
+    db = SessionLocal()
+    try:
+        try:
+            if handler is None:
+                raise ValueError(f"Неизвестный тип задачи: {job.kind}")
+            result = handler(db, job, limits or PhaseLimits())
+        except Exception as e:
+            logger.error(f"Ошибка выполнения задачи {job.id}: {e}")
+            heartbeat.stop()
+            return storage.fail_job(db, job.id, worker_id, f"{e}\n{traceback.format_exc()}") or "lost"
+
+        heartbeat.stop()
+        if heartbeat.lost.is_set() or not storage.complete_job(db, job.id, worker_id, result):
+            logger.warning(f"Результат задачи {job.id} не сохранен: аренда потеряна")
+            return "lost"
+        return "done"
+    finally:
+        heartbeat.stop()
+        db.close()
+
+
+def run_worker(
+    worker_id: Optional[str] = None,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    max_jobs: Optional[int] = None,
+    stop_when_empty: bool = False,
+    on_job: Optional[Callable[[Job, str], None]] = None,
+    limits: Optional[PhaseLimits] = None,
+) -> int:
+    """
+    Обрабатывать задачи из очереди.
+
+    Args:
+        worker_id: Идентификатор воркера (по умолчанию хост:PID)
+        lease_seconds: Срок аренды задачи без heartbeat
+        poll_interval: Пауза между опросами пустой очереди
+        max_jobs: Остановиться после указанного количества задач
+        stop_when_empty: Остановиться, когда свободных задач не осталось
+        on_job: Обратный вызов после каждой задачи (задача, итоговый статус)
+        limits: Лимиты времени этапов обработки
+
+    Returns:
+        Количество обработанных задач
+    """
+    worker_id = worker_id or default_worker_id()
+    processed = 0
+
+    db = SessionLocal()
+    try:
+        while max_jobs is None or processed < max_jobs:
+            released = storage.release_stale_jobs(db)
+            if released:
+                logger.info(f"Возвращено в очередь задач с истекшей арендой: {released}")
+
+            job = storage.claim_job(db, worker_id, lease_seconds)
+            if job is None:
+                if stop_when_empty:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            logger.info(f"Воркер {worker_id}: задача {job.id} ({job.kind}), попытка {job.attempts}")
+            status = run_job(job, worker_id, lease_seconds, limits)
+            processed += 1
+            if on_job:
+                on_job(job, status)
+    finally:
+        db.close()
+    return processed
+
+
+def run_worker_processes(processes: int, worker_id: Optional[str] = None, **worker_args) -> int:
+    """
+    Запустить несколько процессов-воркеров на одной машине.
+
+    Детектор со скомпилированным набором правил создается в родительском
+    процессе до fork: дочерние процессы используют его страницы памяти
+    совместно (copy-on-write), не компилируя правила заново. gc.freeze()
+    исключает загруженные объекты из сборки мусора, чтобы ее проходы в
+    дочерних процессах не копировали эти страницы.
+
+    Args:
+        processes: Количество процессов
+        worker_id: Базовый идентификатор (к нему добавляется номер процесса)
+        worker_args: Параметры run_worker
+
+    Returns:
+        Количество процессов, завершившихся с ошибкой
+    """
+    if not hasattr(os, 'fork'):
+        raise RuntimeError("Запуск нескольких процессов-воркеров требует fork (POSIX)")
+
+    from app.services.analyzer import get_detector
+
+    worker_id = worker_id or default_worker_id()
+    get_detector()
+    # Соединения с БД не должны переходить в дочерние процессы
+    get_engine().dispose()
+    gc.freeze()
+
+    children = []
+    for index in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(f"{worker_id}/{index + 1}", **worker_args)
+            except KeyboardInterrupt:
+                pass
+            except BaseException:
+                logger.exception(f"Воркер {worker_id}/{index + 1} завершился с ошибкой")
+                code = 1
+            finally:
+                os._exit(code)
+        children.append(pid)
+
+    failed = 0
+    for pid in children:
+        while True:
+            try:
+                _, status = os.waitpid(pid, 0)
+                break
+            except KeyboardInterrupt:
+                # Ctrl+C получают и дочерние процессы - дожидаемся их завершения
+                continue
+        if os.waitstatus_to_exitcode(status) != 0:
+            failed += 1
+    return failed
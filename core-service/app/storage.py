@@ -1,6 +1,8 @@
 import json
-from typing import List
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
+from sqlalchemy import delete, func, insert
 from sqlalchemy.orm import Session
 
 from app import models
@@ -10,6 +12,8 @@ from app.schemas import (
     PipelineGeneration,
     PipelineGenerationCreate,
     ProjectAnalysis,
+    Job,
+    JobCreate,
 )
 
 
@@ -29,6 +33,16 @@ def _analysis_from_json(data: str | None) -> ProjectAnalysis | None:
     return ProjectAnalysis.model_validate(json.loads(data))
 
 
+def _to_project(p: models.ProjectORM) -> Project:
+    return Project(
+        id=p.id,
+        name=p.name,
+        url=p.url,
+        clone_token=p.clone_token,
+        analysis=_analysis_from_json(p.analysis_json),
+    )
+
+
 def create_project(db: Session, data: ProjectCreate) -> Project:
     try:
         project_orm = models.ProjectORM(
@@ -55,31 +69,129 @@ def create_project(db: Session, data: ProjectCreate) -> Project:
 
 def list_projects(db: Session) -> List[Project]:
     projects = db.query(models.ProjectORM).all()
-    result: List[Project] = []
-    for p in projects:
-        result.append(
-            Project(
-                id=p.id,
-                name=p.name,
-                url=p.url,
-                clone_token=p.clone_token,
-                analysis=_analysis_from_json(p.analysis_json),
-            )
-        )
-    return result
+    return [_to_project(p) for p in projects]
 
 
 def get_project(db: Session, project_id: int) -> Project | None:
     p = db.query(models.ProjectORM).filter(models.ProjectORM.id == project_id).first()
     if p is None:
         return None
-    return Project(
-        id=p.id,
-        name=p.name,
-        url=p.url,
-        clone_token=p.clone_token,
-        analysis=_analysis_from_json(p.analysis_json),
-    )
+    return _to_project(p)
+
+
+def find_projects_by_urls(db: Session, urls: List[str]) -> List[Project]:
+    if not urls:
+        return []
+    projects = db.query(models.ProjectORM).filter(models.ProjectORM.url.in_(urls)).all()
+    return [_to_project(p) for p in projects]
+
+
+def iter_project_analyses(
+    db: Session, batch_size: int = 500, project_ids: Optional[Sequence[int]] = None
+) -> Iterator[List[Tuple[int, str, Optional[str], Optional[str]]]]:
+    """
+    Потоково читать проекты порциями: (id, имя, JSON анализа, JSON настроек генерации).
+
+    Читаются только нужные колонки, постранично по id (без OFFSET), поэтому
+    память не зависит от количества проектов. Настройки генерации - None,
+    если они не сохранялись.
+    """
+    last_id = 0
+    while True:
+        query = (
+            db.query(
+                models.ProjectORM.id,
+                models.ProjectORM.name,
+                models.ProjectORM.analysis_json,
+                models.ProjectSettingsORM.settings_json,
+            )
+            .outerjoin(models.ProjectSettingsORM, models.ProjectSettingsORM.project_id == models.ProjectORM.id)
+            .filter(models.ProjectORM.id > last_id)
+        )
+        if project_ids:
+            query = query.filter(models.ProjectORM.id.in_(list(project_ids)))
+        rows = query.order_by(models.ProjectORM.id).limit(batch_size).all()
+        if not rows:
+            return
+        yield [(row.id, row.name, row.analysis_json, row.settings_json) for row in rows]
+        last_id = rows[-1].id
+
+
+def _set_project_settings(db: Session, project_id: int, settings: Dict[str, Any]):
+    """Записать настройки генерации проекта (без commit)."""
+    settings_json = json.dumps(settings, ensure_ascii=False, sort_keys=True)
+    row = db.get(models.ProjectSettingsORM, project_id)
+    if row is None:
+        db.add(models.ProjectSettingsORM(project_id=project_id, settings_json=settings_json))
+    else:
+        row.settings_json = settings_json
+        row.updated_at = datetime.utcnow()
+
+
+def save_project_settings(db: Session, project_id: int, settings: Dict[str, Any]):
+    """Сохранить настройки генерации проекта (используются при перегенерации)."""
+    try:
+        _set_project_settings(db, project_id, settings)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def get_project_settings(db: Session, project_id: int) -> Optional[Dict[str, Any]]:
+    """Сохраненные настройки генерации проекта или None."""
+    row = db.get(models.ProjectSettingsORM, project_id)
+    return json.loads(row.settings_json) if row is not None else None
+
+
+def update_project_analysis(db: Session, project_id: int, analysis: ProjectAnalysis) -> Project | None:
+    try:
+        p = db.query(models.ProjectORM).filter(models.ProjectORM.id == project_id).first()
+        if p is None:
+            return None
+        p.analysis_json = _analysis_to_json(analysis)
+        db.commit()
+        db.refresh(p)
+        return _to_project(p)
+    except Exception:
+        db.rollback()
+        raise
+
+
+def save_project_pipeline(
+    db: Session, name: str, url: str, clone_token: str, analysis: ProjectAnalysis, pipeline: str,
+    settings: Optional[Dict[str, Any]] = None,
+) -> PipelineGeneration:
+    """
+    Создать или обновить проект по URL и сохранить его пайплайн одной транзакцией.
+
+    Если сохранение прервется, в БД не останется проекта без пайплайна
+    или анализа без соответствующей генерации. settings - настройки
+    генерации пайплайна (сохраняются для перегенерации).
+    """
+    try:
+        p = db.query(models.ProjectORM).filter(models.ProjectORM.url == url).first()
+        if p is None:
+            p = models.ProjectORM(name=name, url=url, clone_token=clone_token)
+            db.add(p)
+        p.analysis_json = _analysis_to_json(analysis)
+        pipeline_orm = models.PipelineGenerationORM(project=p, uml=pipeline)
+        db.add(pipeline_orm)
+        if settings is not None:
+            db.flush()
+            _set_project_settings(db, p.id, settings)
+        db.commit()
+        db.refresh(pipeline_orm)
+
+        return PipelineGeneration(
+            id=pipeline_orm.id,
+            project_id=pipeline_orm.project_id,
+            uml=pipeline_orm.uml,
+            generated_at=pipeline_orm.generated_at,
+        )
+    except Exception:
+        db.rollback()
+        raise
 
 
 # ---------- Pipeline generations ----------
@@ -104,6 +216,122 @@ def create_pipeline_generation(
     )
 
 
+def create_pipeline_generations(
+    db: Session, items: Sequence[Tuple[int, str, Optional[str], Optional[str]]]
+) -> int:
+    """
+    Сохранить пайплайны нескольких проектов одним пакетным INSERT.
+
+    Args:
+        items: (ID проекта, пайплайн, хэш пайплайна, JSON зависимостей);
+            если хэш не указан, зависимости не сохраняются
+
+    Returns:
+        Количество сохраненных генераций
+    """
+    if not items:
+        return 0
+    try:
+        generated_at = datetime.utcnow()
+        generation_ids = db.scalars(
+            insert(models.PipelineGenerationORM).returning(
+                models.PipelineGenerationORM.id, sort_by_parameter_order=True
+            ),
+            [{"project_id": project_id, "uml": pipeline, "generated_at": generated_at}
+             for project_id, pipeline, _, _ in items],
+        ).all()
+        dependencies = [
+            {"generation_id": generation_id, "project_id": project_id, "output_hash": output_hash,
+             "dependencies_json": dependencies_json, "updated_at": generated_at}
+            for generation_id, (project_id, _, output_hash, dependencies_json) in zip(generation_ids, items)
+            if output_hash is not None
+        ]
+        if dependencies:
+            db.execute(insert(models.PipelineDependenciesORM), dependencies)
+        db.commit()
+        return len(items)
+    except Exception:
+        db.rollback()
+        raise
+
+
+def get_latest_pipeline_states(
+    db: Session, project_ids: Sequence[int]
+) -> Dict[int, Tuple[int, Optional[str], Optional[str], Optional[str]]]:
+    """
+    Последние сохраненные пайплайны проектов и их зависимости.
+
+    Returns:
+        {ID проекта: (ID генерации, хэш пайплайна, JSON зависимостей, пайплайн)};
+        текст пайплайна читается только для генераций без сохраненных
+        зависимостей, хэш и зависимости для них - None
+    """
+    if not project_ids:
+        return {}
+    latest = (
+        db.query(func.max(models.PipelineGenerationORM.id))
+        .filter(models.PipelineGenerationORM.project_id.in_(list(project_ids)))
+        .group_by(models.PipelineGenerationORM.project_id)
+        .scalar_subquery()
+    )
+    rows = (
+        db.query(
+            models.PipelineGenerationORM.id,
+            models.PipelineGenerationORM.project_id,
+            models.PipelineDependenciesORM.output_hash,
+            models.PipelineDependenciesORM.dependencies_json,
+        )
+        .outerjoin(
+            models.PipelineDependenciesORM,
+            models.PipelineDependenciesORM.generation_id == models.PipelineGenerationORM.id,
+        )
+        .filter(models.PipelineGenerationORM.id.in_(latest))
+        .all()
+    )
+    states = {row.project_id: (row.id, row.output_hash, row.dependencies_json, None) for row in rows}
+
+    without_dependencies = [generation_id for generation_id, output_hash, _, _ in states.values() if output_hash is None]
+    if without_dependencies:
+        for row in db.query(
+            models.PipelineGenerationORM.project_id, models.PipelineGenerationORM.uml
+        ).filter(models.PipelineGenerationORM.id.in_(without_dependencies)):
+            generation_id = states[row.project_id][0]
+            states[row.project_id] = (generation_id, None, None, row.uml)
+    return states
+
+
+def save_pipeline_dependencies(db: Session, items: Sequence[Tuple[int, int, str, str]]) -> int:
+    """
+    Записать зависимости уже сохраненных пайплайнов (заменяя прежние).
+
+    Args:
+        items: (ID генерации, ID проекта, хэш пайплайна, JSON зависимостей)
+
+    Returns:
+        Количество записей
+    """
+    if not items:
+        return 0
+    try:
+        updated_at = datetime.utcnow()
+        db.execute(
+            delete(models.PipelineDependenciesORM).where(
+                models.PipelineDependenciesORM.generation_id.in_([item[0] for item in items])
+            )
+        )
+        db.execute(
+            insert(models.PipelineDependenciesORM),
+            [{"generation_id": generation_id, "project_id": project_id, "output_hash": output_hash,
+              "dependencies_json": dependencies_json, "updated_at": updated_at}
+             for generation_id, project_id, output_hash, dependencies_json in items],
+        )
+        db.commit()
+        return len(items)
+    except Exception:
+        db.rollback()
+        raise
+
+
 def list_pipeline_generations(db: Session) -> List[PipelineGeneration]:
     pipelines = db.query(models.PipelineGenerationORM).all()
     return [
@@ -117,3 +345,234 @@ def list_pipeline_generations(db: Session) -> List[PipelineGeneration]:
     ]
 
 
+# ---------- Jobs ----------
+#
+# Очередь задач в общей БД: воркеры на разных машинах забирают задачи через
+# SELECT ... FOR UPDATE SKIP LOCKED (PostgreSQL). SQLite не поддерживает
+# FOR UPDATE, поэтому захват задачи дополнительно выполняется условным
+# UPDATE по статусу: задачу получает только тот воркер, чей UPDATE изменил
+# строку. Время аренды считается по часам воркеров (нужна синхронизация
+# времени на машинах, например NTP).
+
+
+def _to_job(j: models.JobORM) -> Job:
+    return Job(
+        id=j.id,
+        kind=j.kind,
+        project_id=j.project_id,
+        payload=json.loads(j.payload_json or "{}"),
+        max_attempts=j.max_attempts,
+        status=j.status,
+        attempts=j.attempts,
+        worker_id=j.worker_id,
+        lease_expires_at=j.lease_expires_at,
+        heartbeat_at=j.heartbeat_at,
+        result=json.loads(j.result_json) if j.result_json else None,
+        error=j.error,
+        created_at=j.created_at,
+        started_at=j.started_at,
+        finished_at=j.finished_at,
+    )
+
+
+def create_jobs(db: Session, jobs: List[JobCreate]) -> List[Job]:
+    try:
+        jobs_orm = [
+            models.JobORM(
+                kind=data.kind,
+                project_id=data.project_id,
+                payload_json=json.dumps(data.payload, ensure_ascii=False),
+                max_attempts=data.max_attempts,
+                status="queued",
+            )
+            for data in jobs
+        ]
+        db.add_all(jobs_orm)
+        db.commit()
+        for j in jobs_orm:
+            db.refresh(j)
+        return [_to_job(j) for j in jobs_orm]
+    except Exception:
+        db.rollback()
+        raise
+
+
+def list_jobs(db: Session, status: Optional[str] = None) -> List[Job]:
+    query = db.query(models.JobORM)
+    if status:
+        query = query.filter(models.JobORM.status == status)
+    return [_to_job(j) for j in query.order_by(models.JobORM.id).all()]
+
+
+def claim_job(db: Session, worker_id: str, lease_seconds: int, batch: int = 5) -> Optional[Job]:
+    """
+    Захватить следующую задачу из очереди.
+
+    Args:
+        worker_id: Идентификатор воркера (хост и PID)
+        lease_seconds: Срок аренды задачи без heartbeat
+        batch: Сколько кандидатов просматривать за одну попытку
+
+    Returns:
+        Захваченная задача или None, если свободных задач нет
+    """
+    Jobs = models.JobORM
+    try:
+        candidates = [
+            row.id
+            for row in db.query(Jobs.id)
+            .filter(Jobs.status == "queued")
+            .order_by(Jobs.id)
+            .limit(batch)
+            .with_for_update(skip_locked=True)
+        ]
+        for job_id in candidates:
+            now = datetime.utcnow()
+            claimed = (
+                db.query(Jobs)
+                .filter(Jobs.id == job_id, Jobs.status == "queued")
+                .update(
+                    {
+                        Jobs.status: "running",
+                        Jobs.worker_id: worker_id,
+                        Jobs.attempts: Jobs.attempts + 1,
+                        Jobs.started_at: now,
+                        Jobs.heartbeat_at: now,
+                        Jobs.lease_expires_at: now + timedelta(seconds=lease_seconds),
+                    },
+                    synchronize_session=False,
+                )
+            )
+            if claimed:
+                db.commit()
+                return _to_job(db.get(Jobs, job_id, populate_existing=True))
+        db.commit()
+        return None
+    except Exception:
+        db.rollback()
+        raise
+
+
+def heartbeat_job(db: Session, job_id: int, worker_id: str, lease_seconds: int) -> bool:
+    """Продлить аренду задачи. False - аренда потеряна (задача передана другому воркеру)."""
+    Jobs = models.JobORM
+    try:
+        now = datetime.utcnow()
+        updated = (
+            db.query(Jobs)
+            .filter(Jobs.id == job_id, Jobs.worker_id == worker_id, Jobs.status == "running")
+            .update(
+                {Jobs.heartbeat_at: now, Jobs.lease_expires_at: now + timedelta(seconds=lease_seconds)},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return bool(updated)
+    except Exception:
+        db.rollback()
+        raise
+
+
+def complete_job(db: Session, job_id: int, worker_id: str, result: Any = None) -> bool:
+    """Отметить задачу выполненной. False - аренда была потеряна, результат не сохранен."""
+    Jobs = models.JobORM
+    try:
+        updated = (
+            db.query(Jobs)
+            .filter(Jobs.id == job_id, Jobs.worker_id == worker_id, Jobs.status == "running")
+            .update(
+                {
+                    Jobs.status: "done",
+                    Jobs.result_json: json.dumps(result, ensure_ascii=False),
+                    Jobs.error: None,
+                    Jobs.finished_at: datetime.utcnow(),
+                    Jobs.lease_expires_at: None,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return bool(updated)
+    except Exception:
+        db.rollback()
+        raise
+
+
+def fail_job(db: Session, job_id: int, worker_id: str, error: str) -> Optional[str]:
+    """
+    Зафиксировать ошибку задачи: вернуть в очередь или пометить failed,
+    если попытки исчерпаны.
+
+    Returns:
+        Новый статус задачи или None, если аренда была потеряна
+    """
+    Jobs = models.JobORM
+    try:
+        j = (
+            db.query(Jobs)
+            .filter(Jobs.id == job_id, Jobs.worker_id == worker_id, Jobs.status == "running")
+            .with_for_update()
+            .first()
+        )
+        if j is None:
+            db.rollback()
+            return None
+        j.error = error
+        j.lease_expires_at = None
+        if j.attempts >= j.max_attempts:
+            j.status = "failed"
+            j.finished_at = datetime.utcnow()
+        else:
+            j.status = "queued"
+            j.worker_id = None
+        db.commit()
+        return j.status
+    except Exception:
+        db.rollback()
+        raise
+
+
+def release_stale_jobs(db: Session) -> int:
+    """
+    Вернуть в очередь задачи с истекшей арендой (воркер упал или потерял связь).
+
+    Задачи, исчерпавшие попытки, помечаются failed.
+
+    Returns:
+        Количество освобожденных задач
+    """
+    Jobs = models.JobORM
+    try:
+        now = datetime.utcnow()
+        stale = (Jobs.status == "running", Jobs.lease_expires_at < now)
+        failed = (
+            db.query(Jobs)
+            .filter(*stale, Jobs.attempts >= Jobs.max_attempts)
+            .update(
+                {
+                    Jobs.status: "failed",
+                    Jobs.error: "Аренда задачи истекла, попытки исчерпаны",
+                    Jobs.finished_at: now,
+                    Jobs.lease_expires_at: None,
+                },
+                synchronize_session=False,
+            )
+        )
+        requeued = (
+            db.query(Jobs)
+            .filter(*stale, Jobs.attempts < Jobs.max_attempts)
+            .update(
+                {
+                    Jobs.status: "queued",
+                    Jobs.worker_id: None,
+                    Jobs.error: "Аренда задачи истекла",
+                    Jobs.lease_expires_at: None,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return failed + requeued
+    except Exception:
+        db.rollback()
+        raise
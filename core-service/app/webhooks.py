@@ -0,0 +1,121 @@
+"""HTTP-сервер для приема push-событий GitLab (webhook).
+
+Принимает POST /hooks/gitlab с payload push-события и ставит задачу
+повторного анализа в IngestQueue. Ответ возвращается сразу (202), анализ
+выполняется в фоновых потоках.
+"""
+import hmac
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from app.services.ingest import IngestQueue, parse_push_event
+
+logger = logging.getLogger(__name__)
+
+# Путь, на который GitLab отправляет события
+HOOK_PATH = '/hooks/gitlab'
+
+# Максимальный размер payload (байты)
+MAX_PAYLOAD_BYTES = 10 * 1024 * 1024
+
+
+class _WebhookServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, queue: IngestQueue, secret: Optional[str]):
+        super().__init__(address, _WebhookHandler)
+        self.queue = queue
+        self.secret = secret
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    """Обработчик webhook-запросов GitLab."""
+
+    server: _WebhookServer
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._reply({'status': 'ok', 'pending': self.server.queue.pending_count()})
+        else:
+            self._reply({'error': 'not found'}, status=404)
+
+    def do_POST(self):
+        if self.path != HOOK_PATH:
+            self._reply({'error': 'not found'}, status=404)
+            return
+
+        secret = self.server.secret
+        if secret and not hmac.compare_digest(self.headers.get('X-Gitlab-Token', ''), secret):
+            self._reply({'error': 'invalid token'}, status=401)
+            return
+
+        length = self._content_length()
+        if length is None:
+            self._reply({'error': 'invalid content-length'}, status=400)
+            return
+        if length > MAX_PAYLOAD_BYTES:
+            self._reply({'error': 'payload too large'}, status=413)
+            return
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._reply({'error': 'invalid json'}, status=400)
+            return
+
+        event_name = self.headers.get('X-Gitlab-Event')
+        if event_name and event_name != 'Push Hook':
+            self._reply({'status': 'ignored', 'reason': f'event {event_name}'}, status=202)
+            return
+
+        try:
+            event = parse_push_event(payload)
+        except ValueError as e:
+            self._reply({'error': str(e)}, status=400)
+            return
+
+        status = self.server.queue.submit(event)
+        response = {'status': status, 'sha': event.sha}
+        if event.skip_reason:
+            response['reason'] = event.skip_reason
+        self._reply(response, status=202)
+
+    def _content_length(self) -> Optional[int]:
+        """Длина тела запроса; None - заголовок Content-Length некорректен."""
+        value = (self.headers.get('Content-Length') or '0').strip()
+        # int() принимает '+10', ' 10' и '1_0' - допускаются только цифры
+        if not value.isdigit() or not value.isascii():
+            return None
+        return int(value)
+
+    def _reply(self, data: dict, status: int = 200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def serve_webhooks(queue: IngestQueue, host: str = '127.0.0.1', port: int = 8088,
+                   secret: Optional[str] = None):
+    """
+    Запустить прием webhook-событий до остановки (Ctrl+C).
+
+    Args:
+        queue: Очередь задач анализа (рабочие потоки запускаются здесь)
+        host: Адрес для прослушивания
+        port: Порт
+        secret: Секретный токен webhook (заголовок X-Gitlab-Token)
+    """
+    server = _WebhookServer((host, port), queue, secret)
+    queue.start()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        queue.stop()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Замер времени запуска CLI (защита от регрессий).
+
+Запускает `python -X importtime -m app.cli <команда>` несколько раз и
+проверяет:
+
+* время запуска (лучшее из запусков) не превышает бюджет;
+* тяжелые зависимости (SQLAlchemy, pydantic, Jinja2, PyYAML, stack_recognize) не
+  импортируются командами, которым они не нужны.
+
+Использование (из директории core-service):
+    python benchmarks/startup.py                  # --help, бюджет 150 мс
+    python benchmarks/startup.py --budget-ms 200 --runs 10
+    python benchmarks/startup.py --top 15         # самые долгие импорты
+
+Код завершения 1 - бюджет превышен или загружен запрещенный модуль.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+CORE_SERVICE_DIR = Path(__file__).resolve().parents[1]
+
+# Бюджет времени запуска по умолчанию (миллисекунды)
+DEFAULT_BUDGET_MS = 150
+
+# Модули, которые не должны загружаться при запуске `--help`
+FORBIDDEN_MODULES = ('sqlalchemy', 'pydantic', 'jinja2', 'yaml', 'stack_recognize', 'app.services.analyzer')
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+
+def run_once(args: List[str]) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """
+    Запустить CLI один раз.
+
+    Returns:
+        (время в мс, {модуль: (накопленное время в мкс, уровень вложенности импорта)})
+    """
+    env = dict(os.environ, SELF_DEPLOY_NO_DAEMON='1')
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-m', 'app.cli', *args],
+        cwd=CORE_SERVICE_DIR, env=env, capture_output=True, text=True,
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"CLI завершился с кодом {result.returncode}:\n{result.stderr[-2000:]}")
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(2)), (len(match.group(3)) - 1) // 2)
+    return elapsed_ms, modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', nargs='*', default=['--help'], help='Аргументы CLI (по умолчанию --help)')
+    parser.add_argument('--runs', type=int, default=5, help='Количество запусков')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help='Бюджет времени запуска (мс)')
+    parser.add_argument('--top', type=int, default=10, help='Показать самые долгие импорты верхнего уровня')
+    options = parser.parse_args()
+
+    timings = []
+    modules: Dict[str, Tuple[int, int]] = {}
+    for _ in range(options.runs):
+        elapsed_ms, modules = run_once(options.command)
+        timings.append(elapsed_ms)
+
+    best = min(timings)
+    command = ' '.join(options.command)
+    print(f"cli {command}: лучшее {best:.0f} мс, медиана {sorted(timings)[len(timings) // 2]:.0f} мс "
+          f"({options.runs} запусков, бюджет {options.budget_ms:.0f} мс)")
+
+    if options.top:
+        print("Самые долгие импорты (накопленное время, мс):")
+        top_level = [(name, cumulative) for name, (cumulative, depth) in modules.items() if depth == 0]
+        for name, cumulative in sorted(top_level, key=lambda item: item[1], reverse=True)[:options.top]:
+            print(f"  {cumulative / 1000:8.1f}  {name}")
+
+    failed = False
+    if options.command == ['--help']:
+        loaded = sorted(
+            name for name in modules
+            if any(name == forbidden or name.startswith(forbidden + '.') for forbidden in FORBIDDEN_MODULES)
+        )
+        if loaded:
+            print(f"✗ При запуске загружены тяжелые модули: {', '.join(loaded[:10])}", file=sys.stderr)
+            failed = True
+    if best > options.budget_ms:
+        print(f"✗ Время запуска {best:.0f} мс превышает бюджет {options.budget_ms:.0f} мс", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
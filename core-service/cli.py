@@ -1,7 +1,14 @@
 #!/usr/bin/env python3
 """Точка входа для CLI приложения."""
-from app.cli import cli
+import sys
+
+from app.daemon import run_via_daemon
 
 if __name__ == "__main__":
-    cli()
+    # Если запущен демон, команда выполняется в нем (без повторной загрузки зависимостей)
+    exit_code = run_via_daemon(sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
 
+    from app.cli import cli
+    cli()
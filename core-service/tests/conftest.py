@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+# Тесты импортируют пакет app так же, как cli.py (из директории core-service)
+CORE_SERVICE = Path(__file__).resolve().parents[1]
+if str(CORE_SERVICE) not in sys.path:
+    sys.path.insert(0, str(CORE_SERVICE))
+
+# Команды не должны уходить в демон, запущенный на машине разработчика
+os.environ.setdefault("SELF_DEPLOY_NO_DAEMON", "1")
@@ -0,0 +1,74 @@
+import json
+
+from app.services import batch
+from app.services.batch import BatchRepo, RunManifest
+
+
+def _count_full_writes(monkeypatch):
+    writes = []
+    original = batch.atomic_write_text
+
+    def counting(path, content):
+        writes.append(path)
+        original(path, content)
+
+    monkeypatch.setattr(batch, "atomic_write_text", counting)
+    return writes
+
+
+def test_updates_go_to_journal_and_survive_reload(tmp_path):
+    manifest = RunManifest(tmp_path / "m.json")
+    manifest.update_many({f"u{i}": {"status": "pending"} for i in range(3)})
+    manifest.update("u1", status="done", outputs=[])
+
+    assert not manifest.path.exists()
+    assert len(manifest.journal_path.read_text(encoding="utf-8").splitlines()) == 2
+
+    loaded = RunManifest.load(manifest.path)
+    assert loaded.summary() == {"pending": 2, "done": 1}
+
+
+def test_compact_writes_manifest_and_drops_journal(tmp_path):
+    manifest = RunManifest(tmp_path / "m.json")
+    manifest.update("u", status="done")
+    manifest.compact()
+
+    assert not manifest.journal_path.exists()
+    assert json.loads(manifest.path.read_text(encoding="utf-8"))["repos"] == {"u": {"status": "done"}}
+
+    manifest.update("u", status="failed")
+    assert RunManifest.load(manifest.path).entry("u") == {"status": "failed"}
+
+
+def test_truncated_journal_line_is_skipped(tmp_path):
+    manifest = RunManifest(tmp_path / "m.json")
+    manifest.update("u", status="running")
+    with open(manifest.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"at": "x", "repos": {"u": {"sta')
+
+    assert RunManifest.load(manifest.path).entry("u") == {"status": "running"}
+
+
+def test_journal_is_compacted_periodically(tmp_path, monkeypatch):
+    writes = _count_full_writes(monkeypatch)
+    monkeypatch.setattr(batch, "JOURNAL_COMPACT_EVERY", 10)
+    manifest = RunManifest(tmp_path / "m.json")
+    for i in range(25):
+        manifest.update(f"u{i}", status="pending")
+
+    assert len(writes) == 2
+    assert len(manifest.journal_path.read_text(encoding="utf-8").splitlines()) == 5
+
+
+def test_run_batch_does_not_rewrite_manifest_per_repo(tmp_path, monkeypatch):
+    writes = _count_full_writes(monkeypatch)
+    monkeypatch.setattr(batch, "_process_repo", lambda repo, *args: {"sha": "abc", "outputs": [], "stats": {}})
+    repos = [BatchRepo(url=f"https://git.example/r{i}.git", name=f"r{i}") for i in range(200)]
+
+    manifest = batch.run_batch(repos, tmp_path, {}, workers=4)
+
+    manifest_writes = [path for path in writes if path == manifest.path]
+    # Ожидаемая длительность и итог запуска, а не по записи на каждое изменение
+    assert len(manifest_writes) == 2
+    assert not manifest.journal_path.exists()
+    assert RunManifest.load(manifest.path).summary() == {"done": 200}
@@ -0,0 +1,22 @@
+import importlib.util
+import sys
+
+from app.services import pipeline_generator
+
+COMPOSE_GENERATOR = pipeline_generator.PROJECT_ROOT / "docker_compose_generator" / "generator" / "compose_generator.py"
+
+
+def _load_compose_generator():
+    # Так же, как команда generate-from-repo --docker-compose
+    spec = importlib.util.spec_from_file_location("compose_generator", COMPOSE_GENERATOR)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_compose_generator_shares_template_registry_with_pipelines():
+    compose_generator = _load_compose_generator()
+
+    renderer = sys.modules["generator.renderer"]
+    assert compose_generator.get_template_registry is renderer.get_template_registry
+    assert not [name for name in sys.modules if name.startswith("ci_generator.")]
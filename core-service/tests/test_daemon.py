@@ -0,0 +1,131 @@
+import os
+import threading
+
+import pytest
+
+from app import daemon
+from app.cli import cli
+
+LOCAL = ["daemon", "daemon-stop", "daemon-status", "serve-hooks", "worker", "batch", "regenerate-all"]
+
+
+@pytest.fixture
+def running_daemon(tmp_path, monkeypatch):
+    """Демон без прогрева на временном сокете; возвращает список выполненных в нем команд."""
+    socket_path = tmp_path / "daemon.sock"
+    monkeypatch.setenv("SELF_DEPLOY_DAEMON_SOCKET", str(socket_path))
+    monkeypatch.delenv(daemon.NO_DAEMON_ENV, raising=False)
+
+    executed = []
+    original = daemon._DaemonHandler._execute
+
+    def execute(self, argv, cwd):
+        executed.append(argv)
+        return original(self, argv, cwd)
+
+    monkeypatch.setattr(daemon._DaemonHandler, "_execute", execute)
+    previous_umask = os.umask(0o177)
+    try:
+        server = daemon._DaemonServer(str(socket_path), daemon._DaemonHandler)
+    finally:
+        os.umask(previous_umask)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield executed
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("command", LOCAL)
+def test_local_commands_are_not_forwarded(running_daemon, command):
+    assert daemon.run_via_daemon([command, "--help"]) is None
+    assert running_daemon == []
+
+
+def test_other_commands_run_in_daemon(running_daemon, capsys):
+    assert daemon.run_via_daemon(["list-jobs", "--help"]) == 0
+    assert running_daemon == [["list-jobs", "--help"]]
+    assert "list-jobs" in capsys.readouterr().out
+
+
+def test_commands_with_process_limits_run_locally():
+    for name, command in cli.commands.items():
+        params = {param.name for param in command.params}
+        if params & {"max_memory_mb", "max_cpu_seconds", "processes"}:
+            assert getattr(command, "run_locally", False), name
+
+
+def test_runs_locally():
+    assert daemon.runs_locally(["worker", "--exit-when-empty"])
+    assert not daemon.runs_locally(["generate", "--project-id", "1"])
+    assert not daemon.runs_locally([])
+    assert not daemon.runs_locally(["no-such-command"])
+
+
+def test_default_socket_is_in_private_directory(monkeypatch, tmp_path):
+    monkeypatch.delenv("SELF_DEPLOY_DAEMON_SOCKET", raising=False)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(daemon.tempfile, "gettempdir", lambda: str(tmp_path))
+    path = daemon.get_socket_path()
+    assert path.parent == tmp_path / f"self-deploy-{os.getuid()}"
+
+
+def test_client_refuses_shared_socket_directory(running_daemon, tmp_path, capsys):
+    tmp_path.chmod(0o755)
+    try:
+        assert daemon.run_via_daemon(["list-jobs", "--help"]) is None
+    finally:
+        tmp_path.chmod(0o700)
+    assert running_daemon == []
+    assert "доступен другим" in capsys.readouterr().err
+
+
+def test_client_refuses_world_writable_socket(running_daemon, tmp_path):
+    (tmp_path / "daemon.sock").chmod(0o666)
+    assert daemon.run_via_daemon(["list-jobs", "--help"]) is None
+    assert running_daemon == []
+
+
+def test_serve_refuses_shared_directory(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir(mode=0o777)
+    shared.chmod(0o777)
+    with pytest.raises(RuntimeError):
+        daemon.serve(shared / "daemon.sock")
+
+
+def test_command_environment_selects_relevant_variables(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///a.db")
+    monkeypatch.setenv("CI_GENERATOR_RENDER_CACHE", "/tmp/render.sqlite3")
+    monkeypatch.setenv("SELF_DEPLOY_DAEMON_SOCKET", "/tmp/daemon.sock")
+    monkeypatch.setenv("HOME_OF_SOMETHING_ELSE", "1")
+    env = daemon.command_environment()
+    assert env["DATABASE_URL"] == "sqlite:///a.db"
+    assert env["CI_GENERATOR_RENDER_CACHE"] == "/tmp/render.sqlite3"
+    assert "SELF_DEPLOY_DAEMON_SOCKET" not in env
+    assert "HOME_OF_SOMETHING_ELSE" not in env
+
+
+def test_command_with_other_environment_runs_locally(running_daemon):
+    env = dict(daemon.command_environment(), DATABASE_URL="sqlite:///other.db")
+    payload = {"argv": ["list-jobs", "--help"], "cwd": os.getcwd()}
+    assert daemon._request("POST", "/run", dict(payload, env=env)) == {"local": True}
+    # Клиент без окружения (старая версия) тоже выполняет команду сам
+    assert daemon._request("POST", "/run", payload) == {"local": True}
+    assert running_daemon == []
+
+
+def test_command_is_not_repeated_when_daemon_dies(running_daemon, monkeypatch, capsys):
+    def die(self, argv, cwd):
+        running_daemon.append(argv)
+        raise ConnectionAbortedError("daemon killed")
+
+    monkeypatch.setattr(daemon._DaemonHandler, "_execute", die)
+    assert daemon.run_via_daemon(["list-jobs", "--help"]) == 1
+    assert running_daemon == [["list-jobs", "--help"]]
+    assert "не повторяется" in capsys.readouterr().err
+
+
+def test_client_runs_locally_when_daemon_is_gone(running_daemon, tmp_path):
+    (tmp_path / "daemon.sock").unlink()
+    assert daemon.run_via_daemon(["list-jobs", "--help"]) is None
@@ -0,0 +1,135 @@
+import threading
+
+import pytest
+
+from app.services.ingest import IngestQueue, parse_push_event
+
+SHA = "a" * 40
+
+
+def _payload(ref="refs/heads/main", default_branch="main", commits=None, total=None, url="https://git.example.com/team/app.git"):
+    commits = [] if commits is None else commits
+    payload = {
+        "object_kind": "push",
+        "ref": ref,
+        "checkout_sha": SHA,
+        "project": {"git_http_url": url, "web_url": url[:-4], "default_branch": default_branch},
+        "commits": commits,
+        "total_commits_count": len(commits) if total is None else total,
+    }
+    return payload
+
+
+def _commit(modified=(), added=(), removed=()):
+    return {"modified": list(modified), "added": list(added), "removed": list(removed)}
+
+
+@pytest.mark.parametrize("ref, default_branch, skipped", [
+    ("refs/heads/main", "main", False),
+    ("refs/heads/feature/x", "main", True),
+    ("refs/heads/main", "develop", True),
+    ("refs/tags/v1.0", "main", True),
+    # Ветка по умолчанию неизвестна - событие не фильтруется
+    ("refs/heads/feature/x", None, False),
+])
+def test_branch_filter(ref, default_branch, skipped):
+    event = parse_push_event(_payload(ref=ref, default_branch=default_branch, commits=[_commit(modified=["Dockerfile"])]))
+    assert (event.skip_reason is not None) is skipped
+
+
+@pytest.mark.parametrize("commit, relevant", [
+    (_commit(modified=["requirements.txt"]), True),
+    (_commit(modified=["services/api/package.json"]), True),
+    (_commit(modified=["Dockerfile.prod"]), True),
+    (_commit(modified=["deploy/notes.md"]), True),
+    (_commit(modified=["infra/main.tf"]), True),
+    (_commit(modified=["app/main.py"]), False),
+    (_commit(modified=["README.md", "docs/index.md"]), False),
+    (_commit(added=["app/new_module.py"]), True),
+    (_commit(removed=["cmd/server/main.go"]), True),
+    (_commit(added=["docs/new.md"]), False),
+])
+def test_relevance(commit, relevant):
+    event = parse_push_event(_payload(commits=[commit]))
+    assert event.relevant is relevant
+    assert (event.skip_reason is None) is relevant
+
+
+def test_truncated_commit_list_is_always_relevant():
+    # GitLab передает не более 20 коммитов: неизвестные изменения могут быть важными
+    commits = [_commit(modified=["README.md"])] * 20
+    assert parse_push_event(_payload(commits=commits)).skip_reason is not None
+
+    event = parse_push_event(_payload(commits=commits, total=35))
+    assert event.relevant and event.skip_reason is None
+
+
+def test_push_without_commits_is_relevant():
+    event = parse_push_event(_payload(commits=[]))
+    assert event.relevant and event.skip_reason is None
+
+
+def test_deleted_branch_is_skipped():
+    payload = _payload(commits=[_commit(modified=["Dockerfile"])])
+    payload["checkout_sha"] = None
+    payload["after"] = "0" * 40
+    assert parse_push_event(payload).skip_reason == "ветка удалена"
+
+
+@pytest.mark.parametrize("payload", [
+    {"object_kind": "merge_request", "project": {"web_url": "https://git.example.com/a"}},
+    {"object_kind": "push", "project": {}},
+])
+def test_invalid_events_raise(payload):
+    with pytest.raises(ValueError):
+        parse_push_event(payload)
+
+
+def test_pending_job_coalesces_events_of_same_repo():
+    jobs = []
+    queue = IngestQueue(jobs.append)
+
+    first = parse_push_event(_payload(commits=[_commit(modified=["Dockerfile"])]))
+    second = parse_push_event(_payload(commits=[_commit(modified=["pyproject.toml"])], url="https://GIT.example.com/team/app.git"))
+    second.sha = "b" * 40
+    other = parse_push_event(_payload(commits=[_commit(modified=["go.mod"])], url="https://git.example.com/team/other.git"))
+    skipped = parse_push_event(_payload(commits=[_commit(modified=["README.md"])]))
+
+    assert [queue.submit(e) for e in (first, second, other, skipped)] == ["queued", "coalesced", "queued", "skipped"]
+    assert queue.pending_count() == 2
+
+    queue.drain()
+    assert [job.key for job in jobs] == ["https://git.example.com/team/app", "https://git.example.com/team/other"]
+    app_job = jobs[0]
+    assert app_job.events == 2 and app_job.sha == "b" * 40
+    assert app_job.changed_paths == {"Dockerfile", "pyproject.toml"}
+
+
+def test_event_during_running_job_queues_one_rerun():
+    started, release = threading.Event(), threading.Event()
+    handled = []
+
+    def handler(job):
+        handled.append(job.sha)
+        if len(handled) == 1:
+            started.set()
+            release.wait(5)
+
+    queue = IngestQueue(handler, workers=2)
+    queue.start()
+    try:
+        assert queue.submit(parse_push_event(_payload(commits=[_commit(modified=["Dockerfile"])]))) == "queued"
+        assert started.wait(5)
+
+        # Выполняющаяся задача не принимает новые события: ставится одна повторная задача,
+        # которую второй рабочий поток не берет до завершения первой
+        for sha in ("b" * 40, "c" * 40):
+            event = parse_push_event(_payload(commits=[_commit(modified=["Dockerfile"])]))
+            event.sha = sha
+            queue.submit(event)
+        assert queue.pending_count() == 1 and handled == [SHA]
+
+        release.set()
+    finally:
+        queue.stop(timeout=5)
+    assert handled == [SHA, "c" * 40]
@@ -0,0 +1,144 @@
+import gc
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import database, models, storage
+from app.database import Base
+from app.schemas import JobCreate
+from app.services import worker
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", future=True)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def _expire_lease(db, job_id):
+    db.query(models.JobORM).filter(models.JobORM.id == job_id).update(
+        {models.JobORM.lease_expires_at: datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+
+
+def test_claim_takes_jobs_in_order_once(db):
+    storage.create_jobs(db, [JobCreate(kind="analyze", payload={"n": n}) for n in range(3)])
+
+    first = storage.claim_job(db, "w1", lease_seconds=60)
+    second = storage.claim_job(db, "w2", lease_seconds=60)
+    third = storage.claim_job(db, "w1", lease_seconds=60)
+
+    assert [first.payload["n"], second.payload["n"], third.payload["n"]] == [0, 1, 2]
+    assert first.status == "running" and first.worker_id == "w1" and first.attempts == 1
+    assert first.lease_expires_at > first.heartbeat_at
+    assert storage.claim_job(db, "w3", lease_seconds=60) is None
+
+
+def test_only_lease_holder_can_heartbeat_and_complete(db):
+    storage.create_jobs(db, [JobCreate(kind="analyze")])
+    job = storage.claim_job(db, "w1", lease_seconds=60)
+
+    assert storage.heartbeat_job(db, job.id, "w2", 60) is False
+    assert storage.complete_job(db, job.id, "w2", {"ok": True}) is False
+    assert storage.heartbeat_job(db, job.id, "w1", 60) is True
+    assert storage.complete_job(db, job.id, "w1", {"ok": True}) is True
+
+    done = storage.list_jobs(db, status="done")
+    assert [j.result for j in done] == [{"ok": True}]
+    assert done[0].lease_expires_at is None
+
+
+def test_fail_requeues_until_attempts_exhausted(db):
+    storage.create_jobs(db, [JobCreate(kind="analyze", max_attempts=2)])
+
+    job = storage.claim_job(db, "w1", lease_seconds=60)
+    assert storage.fail_job(db, job.id, "w2", "boom") is None
+    assert storage.fail_job(db, job.id, "w1", "boom") == "queued"
+
+    job = storage.claim_job(db, "w2", lease_seconds=60)
+    assert job.attempts == 2
+    assert storage.fail_job(db, job.id, "w2", "boom again") == "failed"
+    assert storage.claim_job(db, "w1", lease_seconds=60) is None
+
+
+def test_expired_lease_is_released_and_old_holder_loses_it(db):
+    storage.create_jobs(db, [JobCreate(kind="analyze", max_attempts=2)])
+    job = storage.claim_job(db, "w1", lease_seconds=60)
+
+    assert storage.release_stale_jobs(db) == 0
+    _expire_lease(db, job.id)
+    assert storage.release_stale_jobs(db) == 1
+
+    reclaimed = storage.claim_job(db, "w2", lease_seconds=60)
+    assert reclaimed.id == job.id and reclaimed.attempts == 2
+    # Прежний воркер больше не может ни продлить, ни завершить задачу
+    assert storage.heartbeat_job(db, job.id, "w1", 60) is False
+    assert storage.complete_job(db, job.id, "w1") is False
+
+    _expire_lease(db, job.id)
+    assert storage.release_stale_jobs(db) == 1
+    [failed] = storage.list_jobs(db, status="failed")
+    assert failed.error == "Аренда задачи истекла, попытки исчерпаны"
+
+
+@pytest.fixture
+def shared_database(tmp_path, monkeypatch):
+    """Общая для процессов БД SQLite (подключение через DATABASE_URL, как у воркеров)."""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'queue.db'}")
+    monkeypatch.setenv("STACK_RECOGNIZE_PATTERN_CACHE", str(tmp_path / "pattern_hits.sqlite3"))
+    monkeypatch.setattr(database, "_engine", None)
+    Base.metadata.create_all(bind=database.get_engine())
+    yield
+    database.get_engine().dispose()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="нужен fork")
+def test_worker_processes_complete_each_job_exactly_once(shared_database, tmp_path, monkeypatch):
+    executions = tmp_path / "executions.log"
+
+    def handle(db, job, limits):
+        # O_APPEND: строки разных процессов не перемешиваются
+        fd = os.open(executions, os.O_WRONLY | os.O_CREAT | os.O_APPEND)
+        try:
+            os.write(fd, f"{job.id}\n".encode())
+        finally:
+            os.close(fd)
+        time.sleep(0.01)
+        return {"pid": os.getpid()}
+
+    monkeypatch.setitem(worker.JOB_HANDLERS, "count", handle)
+    db = database.SessionLocal()
+    try:
+        job_ids = [job.id for job in storage.create_jobs(db, [JobCreate(kind="count") for _ in range(40)])]
+    finally:
+        db.close()
+
+    try:
+        failed = worker.run_worker_processes(
+            4, worker_id="test", lease_seconds=60, poll_interval=0.05, stop_when_empty=True,
+        )
+    finally:
+        gc.unfreeze()
+
+    assert failed == 0
+    assert sorted(int(line) for line in executions.read_text().split()) == job_ids
+    db = database.SessionLocal()
+    try:
+        done = storage.list_jobs(db, status="done")
+    finally:
+        db.close()
+    assert sorted(job.id for job in done) == job_ids
+    assert all(job.attempts == 1 for job in done)
+    # Задачи разобраны несколькими процессами
+    assert len({job.worker_id for job in done}) > 1
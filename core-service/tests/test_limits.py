@@ -0,0 +1,26 @@
+import threading
+import time
+
+import pytest
+
+from app.services.limits import PhaseTimeout, call_with_deadline
+
+
+@pytest.mark.parametrize("seconds", [None, 0])
+def test_without_limit_runs_in_caller_thread(seconds):
+    assert call_with_deadline(threading.current_thread, seconds, "render") is threading.current_thread()
+
+
+def test_result_and_error_are_returned_from_thread():
+    assert call_with_deadline(lambda a, b=0: a + b, 5, "render", 1, b=2) == 3
+    with pytest.raises(KeyError):
+        call_with_deadline({}.__getitem__, 5, "render", "missing")
+
+
+def test_slow_call_raises_phase_timeout():
+    release = threading.Event()
+    started = time.monotonic()
+    with pytest.raises(PhaseTimeout, match="render"):
+        call_with_deadline(release.wait, 0.2, "render", 10)
+    assert time.monotonic() - started < 5
+    release.set()
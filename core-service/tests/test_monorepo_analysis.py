@@ -0,0 +1,72 @@
+from app.schemas import ComponentAnalysis, ProjectAnalysis
+from app.services.analyzer import _convert_stack_to_analysis
+from app.services.pipeline_generator import _render_input, generate_pipeline
+# Пакет stack_recognize доступен после импорта app.services.analyzer
+from stack_recognize.models import ProjectStack
+
+SETTINGS = {"platform": "gitlab", "project_name": "shop"}
+
+# Сводный стек: Python-бэкенд и фронтенд на TypeScript
+BLENDED = dict(
+    languages=["python", "typescript"],
+    frameworks=["django", "react"],
+    frontend_frameworks=["react"],
+    backend_frameworks=["django"],
+    package_manager="npm",
+    test_runner="jest",
+)
+
+COMPONENTS = [
+    ComponentAnalysis(path="backend", languages=["python"], frameworks=["django"],
+                      backend_frameworks=["django"], package_manager="pip", test_runner="pytest"),
+    ComponentAnalysis(path="frontend", languages=["typescript"], frameworks=["react"],
+                      frontend_frameworks=["react"], package_manager="npm", test_runner="jest"),
+]
+
+
+def test_stack_components_are_exposed_in_analysis():
+    stack = ProjectStack(languages=["python", "typescript"], test_runner=["pytest", "jest"])
+    stack.components["backend"] = ProjectStack(
+        languages=["python"], frameworks=["django"], package_manager="pip", test_runner=["pytest"])
+    stack.components["android"] = ProjectStack(languages=["kotlin"], package_manager="gradle")
+
+    analysis = _convert_stack_to_analysis(stack)
+
+    assert analysis.test_runner == "pytest"
+    assert analysis.components == [
+        ComponentAnalysis(path="backend", languages=["python"], frameworks=["django"],
+                          package_manager="pip", test_runner="pytest"),
+        ComponentAnalysis(path="android", languages=["java"], package_manager="gradle"),
+    ]
+    # Компоненты сохраняются вместе с анализом
+    assert ProjectAnalysis(**analysis.model_dump()) == analysis
+
+
+def test_monorepo_pipeline_uses_components_of_main_language():
+    _, stages, ctx = _render_input(ProjectAnalysis(**BLENDED, components=COMPONENTS), SETTINGS)
+    _, single_stages, _ = _render_input(ProjectAnalysis(
+        languages=["python"], frameworks=["django"], backend_frameworks=["django"],
+        package_manager="pip", test_runner="pytest",
+    ), SETTINGS)
+
+    assert ctx["language"] == "python"
+    analysis = ctx["analysis"]
+    assert analysis["package_manager"] == "pip"
+    assert analysis["test_runner"] == "pytest"
+    assert analysis["frameworks"] == ["django"]
+    assert analysis["frontend_frameworks"] == []
+    assert analysis["languages"] == ["python", "typescript"]
+    assert stages == single_stages
+
+
+def test_analysis_without_components_is_unchanged():
+    _, stages, ctx = _render_input(ProjectAnalysis(**BLENDED), SETTINGS)
+    assert ctx["analysis"]["package_manager"] == "npm"
+    assert ctx["analysis"]["test_runner"] == "jest"
+    assert ctx["analysis"]["frameworks"] == ["django", "react"]
+
+
+def test_monorepo_pipeline_caches_dependencies_of_main_language():
+    pipeline = generate_pipeline(ProjectAnalysis(**BLENDED, components=COMPONENTS), SETTINGS)
+    assert "prefix: pip" in pipeline
+    assert "prefix: npm" not in pipeline
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine
+
+from app import database, models, storage
+from app.schemas import ProjectAnalysis
+from app.services import pipeline_generator
+from app.services.regenerate import STATUS_DONE, STATUS_UNCHANGED, regenerate_all
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'regen.db'}", future=True)
+    database.Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(database, "_engine", engine)
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def rendered_settings(monkeypatch):
+    """Настройки, с которыми рендерился каждый проект (по project_name)."""
+    calls = {}
+    original = pipeline_generator.generate_pipeline
+
+    def recording(analysis, user_settings):
+        calls[user_settings.get("project_name")] = user_settings
+        return original(analysis, user_settings)
+
+    monkeypatch.setattr(pipeline_generator, "generate_pipeline", recording)
+    return calls
+
+
+def _add_project(db, name):
+    analysis = ProjectAnalysis(languages=["Python"], package_manager="pip")
+    project = models.ProjectORM(name=name, url=f"https://git.example/{name}.git", clone_token="",
+                                analysis_json=analysis.model_dump_json())
+    db.add(project)
+    db.commit()
+    return project.id
+
+
+def test_projects_use_their_own_settings(db, rendered_settings):
+    custom_id = _add_project(db, "custom")
+    legacy_id = _add_project(db, "legacy")
+    storage.save_project_settings(db, custom_id, {"platform": "gitlab", "project_name": "shop", "dag": False})
+    defaults = {"platform": "gitlab", "stages": [], "variables": {}}
+
+    results = []
+    summary = regenerate_all(defaults, workers=1, on_result=results.append)
+
+    assert summary.done == 2 and summary.saved == 2
+    assert rendered_settings["shop"]["dag"] is False
+    # Без сохраненных настроек - настройки по умолчанию с именем проекта
+    assert rendered_settings["legacy"] == dict(defaults, project_name="legacy")
+    assert {r.project_id: r.status for r in results} == {custom_id: STATUS_DONE, legacy_id: STATUS_DONE}
+
+
+def test_rerun_with_saved_settings_is_unchanged(db, rendered_settings):
+    project_id = _add_project(db, "custom")
+    storage.save_project_settings(db, project_id, {"platform": "gitlab", "project_name": "shop"})
+    regenerate_all({"platform": "gitlab"}, workers=1)
+
+    results = []
+    summary = regenerate_all({"platform": "jenkins"}, workers=1, on_result=results.append)
+
+    # Общие настройки не влияют на проект с сохраненными настройками
+    assert summary.unchanged == 1 and summary.saved == 0
+    assert [r.status for r in results] == [STATUS_UNCHANGED]
+
+
+def test_save_project_pipeline_stores_settings(db):
+    analysis = ProjectAnalysis(languages=["Go"])
+    generation = storage.save_project_pipeline(
+        db, "svc", "https://git.example/svc.git", "", analysis, "stages: []", settings={"project_name": "svc"}
+    )
+    assert storage.get_project_settings(db, generation.project_id) == {"project_name": "svc"}
+    [[(_, name, _, settings_json)]] = list(storage.iter_project_analyses(db))
+    assert name == "svc" and json.loads(settings_json) == {"project_name": "svc"}
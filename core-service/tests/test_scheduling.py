@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from app.services.scheduling import CostHistory, plan_order, predict_costs, simulate_makespan
+
+
+@pytest.mark.parametrize("costs, workers, expected", [
+    ([], 2, 0.0),
+    ([5.0], 0, 5.0),
+    ([3.0, 3.0, 3.0], 2, 6.0),
+    ([1.0, 2.0, 3.0, 4.0], 4, 4.0),
+    ([1.0, 3.0, 5.0], 2, 6.0),
+    # Задачи выдаются по порядку: долгая задача в конце растягивает запуск
+    ([1.0, 1.0, 1.0, 1.0, 10.0], 2, 12.0),
+    ([10.0, 1.0, 1.0, 1.0, 1.0], 2, 10.0),
+])
+def test_simulate_makespan(costs, workers, expected):
+    assert simulate_makespan(costs, workers) == expected
+
+
+SKEWED = {"a": 1.0, "b": 1.0, "c": 1.0, "d": 1.0, "e": 10.0}
+
+
+@pytest.mark.parametrize("costs, workers, window, expected_order, expected_makespan", [
+    # Без окна - SJF, равные длительности упорядочены по ключу
+    ({"a": 5.0, "b": 1.0, "c": 3.0}, 1, None, ["b", "c", "a"], 9.0),
+    ({"a": 5.0, "b": 1.0, "c": 3.0}, 2, None, ["b", "c", "a"], 6.0),
+    ({"y": 2.0, "x": 2.0}, 1, None, ["x", "y"], 4.0),
+    (SKEWED, 2, None, ["a", "b", "c", "d", "e"], 12.0),
+    # SJF укладывается в окно - порядок не меняется
+    (SKEWED, 2, 12.0, ["a", "b", "c", "d", "e"], 12.0),
+    # Тесное окно - самая долгая задача переносится в начало
+    (SKEWED, 2, 10.0, ["e", "a", "b", "c", "d"], 10.0),
+    ({"a": 1.0, "b": 2.0, "c": 8.0, "d": 9.0}, 2, 10.0, ["d", "c", "b", "a"], 10.0),
+    # Окно недостижимо - порядок с минимальным временем завершения
+    (SKEWED, 2, 5.0, ["e", "a", "b", "c", "d"], 10.0),
+])
+def test_plan_order(costs, workers, window, expected_order, expected_makespan):
+    assert plan_order(costs, workers, window) == (expected_order, expected_makespan)
+
+
+def test_plan_order_warns_when_window_is_unreachable(caplog):
+    with caplog.at_level("WARNING", logger="app.services.scheduling"):
+        plan_order(SKEWED, 2, 5.0)
+    assert "превышает окно" in caplog.text
+
+
+@pytest.mark.parametrize("observations, expected", [
+    ([10.0], 10.0),
+    ([10.0, 20.0], 15.0),
+    ([10.0, 20.0, 30.0], 22.5),
+    ([8.0, 8.0, 8.0], 8.0),
+])
+def test_history_smooths_total_seconds(observations, expected):
+    history = CostHistory(None)
+    for total in observations:
+        history.record("repo", {}, total)
+
+    assert history.predict("repo") == expected
+    assert history.repos["repo"]["runs"] == len(observations)
+
+
+def test_history_smooths_each_phase_and_keeps_last_size():
+    history = CostHistory(None)
+    history.record("repo", {"clone_seconds": 4.0, "analyze_seconds": 2.0, "repo_bytes": 100}, 6.0)
+    history.record("repo", {"clone_seconds": 2.0, "analyze_seconds": None, "repo_bytes": 300}, 3.0)
+
+    entry = history.repos["repo"]
+    assert entry["clone_seconds"] == 3.0
+    # Отсутствующее наблюдение этапа не сбрасывает сглаженное значение
+    assert entry["analyze_seconds"] == 2.0
+    assert entry["total_seconds"] == 4.5
+    assert entry["repo_bytes"] == 300
+
+
+def test_history_round_trip(tmp_path):
+    path = tmp_path / "history.json"
+    history = CostHistory.load(path)
+    assert history.repos == {}
+
+    history.record("repo", {"clone_seconds": 1.0}, 5.0)
+    history.save()
+
+    assert CostHistory.load(path).predict("repo") == 5.0
+    assert CostHistory.load(path).predict("other") is None
+
+
+@pytest.mark.parametrize("content", ["{not json", json.dumps({"repos": []}), json.dumps({})])
+def test_broken_history_starts_empty(tmp_path, content):
+    path = tmp_path / "history.json"
+    path.write_text(content, encoding="utf-8")
+    assert CostHistory.load(path).repos == {}
+
+
+HISTORY = {"a": {"total_seconds": 10.0}, "b": {"total_seconds": 30.0}, "c": {"total_seconds": 20.0}}
+
+
+@pytest.mark.parametrize("urls, expected", [
+    (["a", "b", "c"], {"a": 10.0, "b": 30.0, "c": 20.0}),
+    # Неизвестный репозиторий - медиана известных в этом запуске
+    (["a", "b", "c", "new"], {"a": 10.0, "b": 30.0, "c": 20.0, "new": 20.0}),
+    (["a", "b", "new"], {"a": 10.0, "b": 30.0, "new": 20.0}),
+    (["a", "new", "other"], {"a": 10.0, "new": 10.0, "other": 10.0}),
+    # Истории нет совсем - оценка по умолчанию
+    (["new"], {"new": 30.0}),
+])
+def test_predict_costs(urls, expected):
+    assert predict_costs(CostHistory(None, {k: dict(v) for k, v in HISTORY.items()}), urls) == expected
@@ -0,0 +1,61 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from app.services.ingest import IngestQueue
+from app.webhooks import HOOK_PATH, _WebhookServer
+
+
+@pytest.fixture
+def server():
+    queue = IngestQueue(lambda job: None)
+    server = _WebhookServer(("127.0.0.1", 0), queue, None)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(5)
+
+
+def _post(server, content_length, body=b""):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=5)
+    try:
+        conn.putrequest("POST", HOOK_PATH)
+        if content_length is not None:
+            conn.putheader("Content-Length", content_length)
+        conn.endheaders()
+        if body:
+            conn.send(body)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("content_length", ["abc", "-1", "+10", "1_0", "1.5", "²"])
+def test_malformed_content_length_is_rejected(server, content_length):
+    assert _post(server, content_length) == (400, {"error": "invalid content-length"})
+
+
+def test_valid_push_is_queued(server):
+    body = json.dumps({
+        "object_kind": "push",
+        "ref": "refs/heads/main",
+        "checkout_sha": "a" * 40,
+        "project": {"git_http_url": "https://git.example.com/team/app.git", "default_branch": "main"},
+        "commits": [{"modified": ["Dockerfile"]}],
+    }).encode()
+
+    status, data = _post(server, str(len(body)), body)
+    assert status == 202 and data == {"status": "queued", "sha": "a" * 40}
+    assert server.queue.pending_count() == 1
+
+
+def test_missing_body_is_not_a_push(server):
+    status, data = _post(server, None)
+    assert status == 400 and "URL" in data["error"]
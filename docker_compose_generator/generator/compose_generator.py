@@ -2,12 +2,18 @@
 import sys
 from pathlib import Path
 from typing import Dict, Any, List, Optional
-from jinja2 import Environment, FileSystemLoader
 
-# Добавляем путь к корню проекта
+# Добавляем путь к ci_generator: реестр шаблонов импортируется как
+# generator.renderer - тем же путем, что и в core-service, иначе в процессе
+# окажутся две копии модуля со своими реестрами и кэшами
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
-if str(PROJECT_ROOT) not in sys.path:
-    sys.path.insert(0, str(PROJECT_ROOT))
+CI_GENERATOR_PATH = PROJECT_ROOT / "ci_generator"
+if str(CI_GENERATOR_PATH) not in sys.path:
+    sys.path.insert(0, str(CI_GENERATOR_PATH))
+
+from generator.renderer import get_template_registry
+
+TEMPLATES_ROOT = Path(__file__).resolve().parents[1] / "templates"
 
 
 def _get_default_ports(analysis, service_name: str = "app") -> List[int]:
@@ -229,8 +235,8 @@ def _get_default_db_version(db: str) -> str:
 
 def generate_docker_compose(analysis, settings: Dict[str, Any]) -> str:
     """Сгенерировать docker-compose.yml файл."""
-    templates_root = Path(__file__).resolve().parents[1] / "templates"
-    env = Environment(loader=FileSystemLoader(str(templates_root)), trim_blocks=True, lstrip_blocks=True)
+    # Шаблоны скомпилированы один раз на процесс (общий реестр шаблонов)
+    env = get_template_registry(str(TEMPLATES_ROOT)).env
     
     # Строим сервисы
     app_services = build_app_services(analysis, settings)
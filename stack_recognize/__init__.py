@@ -1,7 +1,7 @@
 """Пакет для анализа технологического стека проекта."""
 from .detector import ProjectStackDetector
-from .models import ProjectStack, EntryPoint
+from .models import ProjectStack, EntryPoint, WorkspaceComponent
 
-__all__ = ['ProjectStackDetector', 'ProjectStack', 'EntryPoint']
+__all__ = ['ProjectStackDetector', 'ProjectStack', 'EntryPoint', 'WorkspaceComponent']
 __version__ = '1.0.0'
 
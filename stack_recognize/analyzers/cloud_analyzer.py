@@ -4,8 +4,10 @@ import logging
 from pathlib import Path
 
 from ..models import ProjectStack
-from ..config import ConfigLoader, PatternConfig
-from ..utils import get_relevant_files, read_file_sample
+from ..config import ConfigLoader
+from ..pattern_cache import get_pattern_hit_cache
+from ..ruleset import get_ruleset
+from ..utils import get_relevant_files, read_source_sample
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +23,8 @@ class CloudAnalyzer:
             config_loader: Загрузчик конфигурации
         """
         self.config_loader = config_loader
-        self.pattern_config = PatternConfig()
+        self.ruleset = get_ruleset(config_loader)
+        self.hit_cache = get_pattern_hit_cache(config_loader)
 
     def analyze(self, repo_path: Path, stack: ProjectStack):
         """
@@ -63,15 +66,16 @@ class CloudAnalyzer:
 
         for file_path in relevant_files:
             # Читаем только начало файла (достаточно для поиска паттернов облачных платформ)
-            content = read_file_sample(file_path, max_lines=50, max_bytes=4096)
+            content = read_source_sample(file_path, repo_path, max_lines=50, max_bytes=4096)
 
             if not content:
                 continue
+            hits = self.hit_cache.hits_for(content)
 
-            for cloud, patterns in self.pattern_config.CLOUD_PATTERNS.items():
+            for cloud, patterns in self.ruleset.cloud_patterns.items():
                 if cloud not in stack.cloud_platforms:
                     for pattern in patterns:
-                        if re.search(pattern, content, re.IGNORECASE):
+                        if hits.search(pattern, re.IGNORECASE):
                             stack.cloud_platforms.append(cloud)
                             break
 
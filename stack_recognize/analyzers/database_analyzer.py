@@ -4,8 +4,10 @@ import logging
 from pathlib import Path
 
 from ..models import ProjectStack
-from ..config import ConfigLoader, PatternConfig
-from ..utils import get_relevant_files, read_file_sample, get_language_by_extension
+from ..config import ConfigLoader
+from ..pattern_cache import get_pattern_hit_cache
+from ..ruleset import get_ruleset
+from ..utils import get_relevant_files, read_source_sample, get_language_by_extension
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +23,8 @@ class DatabaseAnalyzer:
             config_loader: Загрузчик конфигурации
         """
         self.config_loader = config_loader
-        self.pattern_config = PatternConfig()
+        self.ruleset = get_ruleset(config_loader)
+        self.hit_cache = get_pattern_hit_cache(config_loader)
 
     def analyze(self, repo_path: Path, stack: ProjectStack):
         """
@@ -68,15 +71,16 @@ class DatabaseAnalyzer:
 
         for file_path in relevant_files:
             # Читаем только начало файла (достаточно для поиска паттернов БД)
-            content = read_file_sample(file_path, max_lines=50, max_bytes=4096)
+            content = read_source_sample(file_path, repo_path, max_lines=50, max_bytes=4096)
 
             if not content:
                 continue
+            hits = self.hit_cache.hits_for(content)
 
             # Определяем язык файла по расширению
             file_lang = get_language_by_extension(file_path.suffix)
 
-            for db, patterns in self.pattern_config.DATABASE_PATTERNS.items():
+            for db, patterns in self.ruleset.database_patterns.items():
                 if db not in stack.databases:
                     # Проверяем паттерны с учетом языка файла
                     # Python-специфичные паттерны (psycopg2, pymysql и т.д.) применяются только к Python файлам
@@ -115,7 +119,7 @@ class DatabaseAnalyzer:
                                'redis.NewClient' in pattern:
                                 continue
                         
-                        if re.search(pattern, content, re.IGNORECASE):
+                        if hits.search(pattern, re.IGNORECASE):
                             stack.databases.append(db)
                             logger.info(f"Обнаружена БД {db} в файле {file_path.relative_to(repo_path)} по паттерну: {pattern}")
                             break
@@ -6,6 +6,7 @@ from typing import List, Optional, Dict
 from ..models import ProjectStack
 from ..config import ConfigLoader
 from ..utils import get_relevant_files, should_ignore_path
+from ..workspaces import detect_monorepo_structure, FRONTEND_DIRS, BACKEND_DIRS
 
 logger = logging.getLogger(__name__)
 
@@ -22,55 +23,6 @@ class DevOpsAnalyzer:
         """
         self.config_loader = config_loader
 
-    @staticmethod
-    def _detect_monorepo_structure(repo_path: Path) -> Dict[str, List[Path]]:
-        """Определить структуру монорепозитория.
-        
-        Returns:
-            Словарь с ключами: 'frontend', 'backend', 'root', 'apps'
-        """
-        structure = {
-            'frontend': [],
-            'backend': [],
-            'root': [],
-            'apps': [],
-            'packages': []
-        }
-        
-        # Типичные структуры монорепозиториев
-        frontend_dirs = ['frontend', 'web', 'client', 'ui', 'app']
-        backend_dirs = ['backend', 'server', 'api', 'services']
-        apps_dirs = ['apps', 'applications']
-        packages_dirs = ['packages', 'libs', 'libraries']
-        
-        for item in repo_path.iterdir():
-            if not item.is_dir():
-                continue
-            
-            dir_name = item.name.lower()
-            
-            if dir_name in frontend_dirs:
-                structure['frontend'].append(item)
-            elif dir_name in backend_dirs:
-                structure['backend'].append(item)
-            elif dir_name in apps_dirs:
-                structure['apps'].append(item)
-            elif dir_name in packages_dirs:
-                structure['packages'].append(item)
-        
-        # Проверяем apps/ на наличие frontend/backend подпапок
-        for apps_dir in structure['apps']:
-            for subdir in apps_dir.iterdir():
-                if not subdir.is_dir():
-                    continue
-                subdir_name = subdir.name.lower()
-                if subdir_name in frontend_dirs:
-                    structure['frontend'].append(subdir)
-                elif subdir_name in backend_dirs:
-                    structure['backend'].append(subdir)
-        
-        return structure
-
     @staticmethod
     def _categorize_dockerfiles(docker_files: List[Path], repo_path: Path, monorepo_structure: Dict[str, List[Path]]) -> Dict[str, List[Path]]:
         """Категоризировать Dockerfile по назначению (frontend, backend, root).
@@ -107,20 +59,20 @@ class DevOpsAnalyzer:
                 part_lower = part.lower()
                 
                 # Проверяем прямые совпадения
-                if part_lower in ['frontend', 'web', 'client', 'ui', 'app']:
+                if part_lower in FRONTEND_DIRS:
                     is_frontend = True
                     break
-                elif part_lower in ['backend', 'server', 'api', 'services']:
+                elif part_lower in BACKEND_DIRS:
                     is_backend = True
                     break
                 
                 # Проверяем в apps/
                 if part_lower == 'apps' and i + 1 < len(path_parts):
                     next_part = path_parts[i + 1].lower()
-                    if next_part in ['frontend', 'web', 'client', 'ui', 'app']:
+                    if next_part in FRONTEND_DIRS:
                         is_frontend = True
                         break
-                    elif next_part in ['backend', 'server', 'api', 'services']:
+                    elif next_part in BACKEND_DIRS:
                         is_backend = True
                         break
             
@@ -219,7 +171,7 @@ class DevOpsAnalyzer:
         
         # Дополнительный поиск Dockerfile и docker-compose через rglob (на случай, если они не попали в relevant_files)
         dockerfile_matches = list(repo_path.rglob('Dockerfile*'))
-        dockerfile_matches = [f for f in dockerfile_matches if f.is_file() and not should_ignore_path(f)]
+        dockerfile_matches = [f for f in dockerfile_matches if f.is_file() and not should_ignore_path(f.relative_to(repo_path))]
         logger.info(f"Найдено Dockerfile файлов через rglob: {len(dockerfile_matches)}")
         if dockerfile_matches:
             logger.info(f"Dockerfile файлы: {[str(f.relative_to(repo_path)) for f in dockerfile_matches]}")
@@ -229,7 +181,7 @@ class DevOpsAnalyzer:
             logger.info(f"Добавлено Dockerfile файлов в relevant_files: {after_count - before_count}, всего файлов: {after_count}")
         
         docker_compose_matches = list(repo_path.rglob('docker-compose.*'))
-        docker_compose_matches = [f for f in docker_compose_matches if f.is_file() and not should_ignore_path(f)]
+        docker_compose_matches = [f for f in docker_compose_matches if f.is_file() and not should_ignore_path(f.relative_to(repo_path))]
         logger.info(f"Найдено docker-compose файлов через rglob: {len(docker_compose_matches)}")
         if docker_compose_matches:
             logger.info(f"docker-compose файлы: {[str(f.relative_to(repo_path)) for f in docker_compose_matches]}")
@@ -248,7 +200,7 @@ class DevOpsAnalyzer:
             stack.docker = True
             
             # Определяем структуру монорепозитория
-            monorepo_structure = self._detect_monorepo_structure(repo_path)
+            monorepo_structure = detect_monorepo_structure(repo_path)
             is_monorepo = any(len(v) > 0 for v in monorepo_structure.values() if isinstance(v, list))
             
             if is_monorepo and len(docker_files) > 1:
@@ -6,11 +6,24 @@ from pathlib import Path
 from typing import Dict
 
 from ..models import ProjectStack, EntryPoint
-from ..config import ConfigLoader, PatternConfig
-from ..utils import get_language_by_extension, detect_language_from_command, get_relevant_files, read_file_sample
+from ..config import ConfigLoader
+from ..pattern_cache import get_pattern_hit_cache
+from ..ruleset import get_ruleset
+from ..utils import get_language_by_extension, detect_language_from_command, get_relevant_files, read_source_sample
+from ..manifests import read_json_keys, read_pom_sections, DEFAULT_MANIFEST_MAX_BYTES
 
 logger = logging.getLogger(__name__)
 
+# Паттерны разбора манифестов и Dockerfile (компилируются при импорте)
+NODE_SCRIPT_FILE_PATTERN = re.compile(r'(?:node|ts-node|tsx)\s+(\S+)')
+POETRY_SECTION_PATTERN = re.compile(r'\[tool\.poetry\]')
+POETRY_SCRIPT_PATTERN = re.compile(r'\[tool\.poetry\.scripts\]\s*(\w+)\s*=\s*[\'"]([^\'"]+)[\'"]')
+DOCKER_CMD_PATTERN = re.compile(r'CMD\s+\[?"?([^]"]+)"?\]?')
+DOCKER_ENTRYPOINT_PATTERN = re.compile(r'ENTRYPOINT\s+\[?"?([^]"]+)"?\]?')
+COMMAND_FILE_PATTERN = re.compile(r'(?:node|ts-node|tsx|python|java|go)\s+(\S+)')
+COMPOSE_SERVICES_PATTERN = re.compile(r'services:\s*\n(\s+\w+:\s*\n(?:\s+.*\n)*)')
+COMPOSE_BUILD_PATTERN = re.compile(r'build:\s*[\'"]?([^\s\'"]+)[\'"]?')
+
 
 class EntryPointAnalyzer:
     """Анализатор для определения точек входа в приложение."""
@@ -23,7 +36,9 @@ class EntryPointAnalyzer:
             config_loader: Загрузчик конфигурации
         """
         self.config_loader = config_loader
-        self.pattern_config = PatternConfig()
+        self.ruleset = get_ruleset(config_loader)
+        self.hit_cache = get_pattern_hit_cache(config_loader)
+        self.manifest_max_bytes = config_loader.limits.get('manifest_max_bytes', DEFAULT_MANIFEST_MAX_BYTES)
 
         # Конфигурационные файлы, указывающие на точку входа (только для поддерживаемых языков)
         self.config_files = {
@@ -60,6 +75,10 @@ class EntryPointAnalyzer:
         # 4. Анализ Docker файлов
         self._analyze_docker_entry_points(repo_path, stack)
 
+        # Пути из манифестов (package.json) - относительно корня репозитория,
+        # а не рабочей директории, в которую он склонирован
+        self._relativize_entry_points(repo_path, stack)
+
         # 5. Определение основной точки входа
         self._determine_main_entry_point(stack)
 
@@ -67,7 +86,7 @@ class EntryPointAnalyzer:
 
     def _find_standard_entry_points(self, repo_path: Path, stack: ProjectStack):
         """Поиск точек входа по стандартным именам файлов."""
-        for language, patterns in self.pattern_config.STANDARD_ENTRY_FILES.items():
+        for language, patterns in self.ruleset.standard_entry_files.items():
             for pattern in patterns:
                 matches = list(repo_path.rglob(pattern))
                 for match in matches:
@@ -104,17 +123,18 @@ class EntryPointAnalyzer:
 
         for file_path in relevant_files:
             # Читаем только начало файла (достаточно для поиска паттернов точек входа)
-            content = read_file_sample(file_path, max_lines=50, max_bytes=4096)
+            content = read_source_sample(file_path, repo_path, max_lines=50, max_bytes=4096)
 
             if not content:
                 continue
+            hits = self.hit_cache.hits_for(content)
 
             # Определяем язык файла по расширению
             file_lang = get_language_by_extension(file_path.suffix)
-            if file_lang and file_lang in self.pattern_config.ENTRY_POINT_PATTERNS:
-                patterns = self.pattern_config.ENTRY_POINT_PATTERNS[file_lang]
+            if file_lang and file_lang in self.ruleset.entry_point_patterns:
+                patterns = self.ruleset.entry_point_patterns[file_lang]
                 for pattern, framework, confidence in patterns:
-                    if re.search(pattern, content):
+                    if hits.search(pattern):
                         entry_point = EntryPoint(
                             type='app' if framework != 'main' else 'main',
                             file_path=str(file_path.relative_to(repo_path)),
@@ -138,8 +158,7 @@ class EntryPointAnalyzer:
     def _parse_package_json_entry(self, file_path: Path, stack: ProjectStack):
         """Анализ package.json для определения точки входа."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                package_data = json.load(f)
+            package_data = read_json_keys(file_path, ('main', 'scripts'), max_bytes=self.manifest_max_bytes)
 
             # Основная точка входа
             main_file = package_data.get('main')
@@ -161,7 +180,7 @@ class EntryPointAnalyzer:
             for script_name, script_command in scripts.items():
                 if script_name in ['start', 'dev', 'serve']:
                     # Пытаемся извлечь файл из команды
-                    file_match = re.search(r'(?:node|ts-node|tsx)\s+(\S+)', script_command)
+                    file_match = NODE_SCRIPT_FILE_PATTERN.search(script_command)
                     if file_match:
                         entry_file = file_match.group(1)
                         entry_path = Path(entry_file)
@@ -186,10 +205,10 @@ class EntryPointAnalyzer:
                 content = f.read()
 
             # Поиск конфигурации Poetry
-            poetry_match = re.search(r'\[tool\.poetry\]', content)
+            poetry_match = POETRY_SECTION_PATTERN.search(content)
             if poetry_match:
                 # Ищем scripts или main модуль
-                scripts_match = re.search(r'\[tool\.poetry\.scripts\]\s*(\w+)\s*=\s*[\'"]([^\'"]+)[\'"]', content)
+                scripts_match = POETRY_SCRIPT_PATTERN.search(content)
                 if scripts_match:
                     module_path = scripts_match.group(2)
                     entry_point = EntryPoint(
@@ -207,13 +226,9 @@ class EntryPointAnalyzer:
     def _parse_pom_xml_entry(self, file_path: Path, stack: ProjectStack):
         """Анализ pom.xml для определения точки входа."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
             # Ищем main class в плагинах
-            main_class_match = re.search(r'<mainClass>([^<]+)</mainClass>', content)
-            if main_class_match:
-                main_class = main_class_match.group(1)
+            main_class = read_pom_sections(file_path, ('mainClass',), max_bytes=self.manifest_max_bytes).get('mainClass')
+            if main_class:
                 class_path = main_class.replace('.', '/') + '.java'
                 entry_point = EntryPoint(
                     type='main',
@@ -255,8 +270,8 @@ class EntryPointAnalyzer:
                 content = f.read()
 
             # Ищем CMD и ENTRYPOINT инструкции
-            cmd_match = re.search(r'CMD\s+\[?"?([^]"]+)"?\]?', content)
-            entrypoint_match = re.search(r'ENTRYPOINT\s+\[?"?([^]"]+)"?\]?', content)
+            cmd_match = DOCKER_CMD_PATTERN.search(content)
+            entrypoint_match = DOCKER_ENTRYPOINT_PATTERN.search(content)
 
             command = cmd_match.group(1) if cmd_match else (
                 entrypoint_match.group(1) if entrypoint_match else None
@@ -264,7 +279,7 @@ class EntryPointAnalyzer:
 
             if command:
                 # Пытаемся извлечь файл из команды
-                file_match = re.search(r'(?:node|ts-node|tsx|python|java|go)\s+(\S+)', command)
+                file_match = COMMAND_FILE_PATTERN.search(command)
                 if file_match:
                     entry_file = file_match.group(1)
                     entry_point = EntryPoint(
@@ -286,11 +301,11 @@ class EntryPointAnalyzer:
                 content = f.read()
 
             # Ищем service configuration
-            services_match = re.search(r'services:\s*\n(\s+\w+:\s*\n(?:\s+.*\n)*)', content)
+            services_match = COMPOSE_SERVICES_PATTERN.search(content)
             if services_match:
                 services_content = services_match.group(1)
                 # Упрощенный анализ - ищем build context
-                build_match = re.search(r'build:\s*[\'"]?([^\s\'"]+)[\'"]?', services_content)
+                build_match = COMPOSE_BUILD_PATTERN.search(services_content)
                 if build_match:
                     build_context = build_match.group(1)
                     entry_point = EntryPoint(
@@ -349,6 +364,16 @@ class EntryPointAnalyzer:
         )
         self._add_entry_point(entry_point, stack)
 
+    def _relativize_entry_points(self, repo_path: Path, stack: ProjectStack):
+        """Заменить абсолютные пути точек входа внутри репозитория на относительные."""
+        for entry in stack.entry_points:
+            entry_path = Path(entry.file_path)
+            if entry_path.is_absolute():
+                try:
+                    entry.file_path = str(entry_path.relative_to(repo_path))
+                except ValueError:
+                    continue
+
     def _determine_main_entry_point(self, stack: ProjectStack):
         """Определение основной точки входа на основе уверенности и типа."""
         if not stack.entry_points:
@@ -4,11 +4,21 @@ import logging
 from pathlib import Path
 
 from ..models import ProjectStack
-from ..config import ConfigLoader, PatternConfig
-from ..utils import get_relevant_files, read_file_sample, get_language_by_extension
+from ..config import ConfigLoader
+from ..pattern_cache import get_pattern_hit_cache
+from ..ruleset import Rule, compile_rules, get_ruleset
+from ..utils import get_relevant_files, read_source_sample, get_language_by_extension
 
 logger = logging.getLogger(__name__)
 
+# Строгие паттерны для фреймворков с частыми ложными срабатываниями
+FLASK_STRICT_PATTERNS = compile_rules([r'\bFlask\(\)', r'@app\.route', r'from flask import'], re.IGNORECASE)
+VUE_STRICT_PATTERNS = compile_rules(
+    [r'Vue\.createApp\(', r'from [\'"]vue[\'"]', r'import.*vue', r'createApp\(.*vue'], re.IGNORECASE
+)
+DJANGO_STRICT_PATTERNS = compile_rules([r'from django', r'import django', r'DJANGO_SETTINGS'], re.IGNORECASE)
+EXPRESS_CREATE_APPLICATION = Rule(r'createApplication', re.IGNORECASE)
+
 
 class FrameworkAnalyzer:
     """Анализатор для определения фреймворков."""
@@ -21,7 +31,8 @@ class FrameworkAnalyzer:
             config_loader: Загрузчик конфигурации
         """
         self.config_loader = config_loader
-        self.pattern_config = PatternConfig()
+        self.ruleset = get_ruleset(config_loader)
+        self.hit_cache = get_pattern_hit_cache(config_loader)
 
     def analyze(self, repo_path: Path, stack: ProjectStack):
         """
@@ -89,10 +100,11 @@ class FrameworkAnalyzer:
         for file_path in relevant_files:
             # Читаем начало файла (достаточно для поиска импортов)
             # Увеличиваем лимит для лучшего обнаружения фреймворков
-            content = read_file_sample(file_path, max_lines=100, max_bytes=8192)
+            content = read_source_sample(file_path, repo_path, max_lines=100, max_bytes=8192)
 
             if not content:
                 continue
+            hits = self.hit_cache.hits_for(content)
             
             # Логируем первые несколько файлов для отладки
             file_rel = str(file_path.relative_to(repo_path))
@@ -102,7 +114,7 @@ class FrameworkAnalyzer:
             # Определяем язык файла по расширению
             file_lang = get_language_by_extension(file_path.suffix)
             
-            for framework, patterns in self.pattern_config.FRAMEWORK_PATTERNS.items():
+            for framework, patterns in self.ruleset.framework_patterns.items():
                 if framework not in stack.frameworks:
                     # Проверка совместимости языка файла и фреймворка
                     # Java/Kotlin фреймворки применяются только к Java/Kotlin файлам
@@ -142,10 +154,9 @@ class FrameworkAnalyzer:
                     # требуем более строгие признаки Flask (чтобы избежать ложных срабатываний)
                     if framework == 'flask' and 'django' in stack.frameworks:
                         # Для Flask при наличии Django требуем явные признаки: Flask() или @app.route
-                        flask_strict_patterns = [r'\bFlask\(\)', r'@app\.route', r'from flask import']
                         found_flask = False
-                        for pattern in flask_strict_patterns:
-                            if re.search(pattern, content, re.IGNORECASE):
+                        for pattern in FLASK_STRICT_PATTERNS:
+                            if hits.search(pattern, re.IGNORECASE):
                                 found_flask = True
                                 stack.frameworks.append(framework)
                                 logger.info(f"Обнаружен фреймворк {framework} в файле {file_rel} по строгому паттерну: {pattern}")
@@ -157,10 +168,9 @@ class FrameworkAnalyzer:
                     # Специальная логика для Vue: не путать createApp с createApplication
                     if framework == 'vue':
                         # Для Vue требуем более строгие признаки, чтобы не путать с Express createApplication
-                        vue_strict_patterns = [r'Vue\.createApp\(', r'from [\'"]vue[\'"]', r'import.*vue', r'createApp\(.*vue']
                         found_vue = False
-                        for pattern in vue_strict_patterns:
-                            if re.search(pattern, content, re.IGNORECASE):
+                        for pattern in VUE_STRICT_PATTERNS:
+                            if hits.search(pattern, re.IGNORECASE):
                                 found_vue = True
                                 stack.frameworks.append(framework)
                                 logger.info(f"Обнаружен фреймворк {framework} в файле {file_rel} по строгому паттерну: {pattern}")
@@ -168,7 +178,7 @@ class FrameworkAnalyzer:
                         if found_vue:
                             break
                         # Если найден createApplication (Express), не добавлять Vue
-                        if re.search(r'createApplication', content, re.IGNORECASE):
+                        if hits.search(EXPRESS_CREATE_APPLICATION, re.IGNORECASE):
                             logger.debug(f"Пропущен Vue в файле {file_rel}, так как найден createApplication (Express)")
                             continue
                         continue
@@ -177,10 +187,9 @@ class FrameworkAnalyzer:
                     # требуем явные признаки Django (manage.py уже проверен в _analyze_by_files)
                     if framework == 'django' and 'flask' in stack.frameworks:
                         # Для Django при наличии Flask требуем явные признаки: manage.py или from django
-                        django_strict_patterns = [r'from django', r'import django', r'DJANGO_SETTINGS']
                         found_django = False
-                        for pattern in django_strict_patterns:
-                            if re.search(pattern, content, re.IGNORECASE):
+                        for pattern in DJANGO_STRICT_PATTERNS:
+                            if hits.search(pattern, re.IGNORECASE):
                                 found_django = True
                                 # Django уже должен быть определен по manage.py, но на всякий случай
                                 if framework not in stack.frameworks:
@@ -193,7 +202,7 @@ class FrameworkAnalyzer:
                     
                     # Обычная проверка паттернов
                     for pattern in patterns:
-                        if re.search(pattern, content, re.IGNORECASE):
+                        if hits.search(pattern, re.IGNORECASE):
                             stack.frameworks.append(framework)
                             logger.info(f"Обнаружен фреймворк {framework} в файле {file_rel} по паттерну: {pattern}")
                             
@@ -217,13 +226,13 @@ class FrameworkAnalyzer:
     def _classify_frameworks(self, stack: ProjectStack):
         """Классификация фреймворков по типам."""
         for framework in stack.frameworks:
-            if framework in self.pattern_config.FRONTEND_FRAMEWORKS:
+            if framework in self.ruleset.frontend_frameworks:
                 if framework not in stack.frontend_frameworks:
                     stack.frontend_frameworks.append(framework)
-            elif framework in self.pattern_config.BACKEND_FRAMEWORKS:
+            elif framework in self.ruleset.backend_frameworks:
                 if framework not in stack.backend_frameworks:
                     stack.backend_frameworks.append(framework)
-            elif framework in self.pattern_config.MOBILE_FRAMEWORKS:
+            elif framework in self.ruleset.mobile_frameworks:
                 if framework not in stack.mobile_frameworks:
                     stack.mobile_frameworks.append(framework)
 
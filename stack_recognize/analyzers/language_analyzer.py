@@ -2,14 +2,18 @@
 import json
 import logging
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Tuple
 
 from ..models import ProjectStack
 from ..config import ConfigLoader
-from ..utils import get_language_extensions, get_relevant_files
+from ..utils import get_language_extensions, get_relevant_files, list_git_files, should_ignore_path
+from ..manifests import read_json_keys, DEFAULT_MANIFEST_MAX_BYTES
 
 logger = logging.getLogger(__name__)
 
+# Максимальный размер файла, учитываемого при анализе языков
+LANGUAGE_MAX_FILE_SIZE = 512 * 1024
+
 
 class LanguageAnalyzer:
     """Анализатор для определения языков программирования и менеджеров пакетов."""
@@ -23,6 +27,8 @@ class LanguageAnalyzer:
         """
         self.config_loader = config_loader
         self.language_extensions = get_language_extensions()
+        self.manifest_max_bytes = config_loader.limits.get('manifest_max_bytes', DEFAULT_MANIFEST_MAX_BYTES)
+        self.git_timeout = config_loader.limits.get('git_timeout', 30)
 
     def analyze(self, repo_path: Path, stack: ProjectStack):
         """
@@ -108,12 +114,13 @@ class LanguageAnalyzer:
                 self._detect_package_manager('package.json', package_json_path, repo_path, stack, detected_files)
                 logger.info(f"package_manager после обработки package.json: {stack.package_manager}")
 
-        # Используем оптимизированную функцию для получения релевантных файлов
+        # Список файлов с размерами: из метаданных git (без чтения файлов) или обходом директории
         # Ограничиваем размер файлов до 500KB для анализа языков
-        relevant_files = get_relevant_files(repo_path, max_file_size=512 * 1024)
+        relevant_files = self._collect_files(repo_path)
         logger.debug(f"Найдено релевантных файлов для анализа языков: {len(relevant_files)}")
 
-        for file_path in relevant_files:
+        census = {}
+        for file_path, file_size in relevant_files:
             filename = file_path.name
             file_path_str = str(file_path.relative_to(repo_path))
 
@@ -122,7 +129,9 @@ class LanguageAnalyzer:
             for language, extensions in self.language_extensions.items():
                 # Проверяем расширение файла (с точкой) или имя файла без расширения для специальных случаев
                 if file_suffix and file_suffix in extensions:
-                    self._add_language(language, stack)
+                    language_stats = census.setdefault(language, {'bytes': 0, 'files': 0})
+                    language_stats['bytes'] += file_size
+                    language_stats['files'] += 1
                     key = f'{language}_files'
                     detected_files[key] = detected_files.get(key, []) + [file_path_str]
                     logger.debug(f"Обнаружен файл {file_path_str} с языком {language} (расширение: {file_suffix})")
@@ -147,8 +156,52 @@ class LanguageAnalyzer:
             
             self._detect_package_manager(filename, file_path, repo_path, stack, detected_files)
 
+        # Основной язык определяется долей в байтах, а не порядком обхода файлов
+        for language in sorted(census, key=lambda lang: (-census[lang]['bytes'], -census[lang]['files'], lang)):
+            self._add_language(language, stack)
+        if census:
+            detected_files['language_census'] = self._census_shares(census)
+            logger.info(f"Доли языков: {detected_files['language_census']}")
+
         stack.files_detected.update(detected_files)
 
+    def _collect_files(self, repo_path: Path) -> List[Tuple[Path, int]]:
+        """Получить релевантные файлы и их размеры.
+
+        Если директория находится в git-репозитории, список и размеры берутся из
+        метаданных git без открытия файлов; иначе - обходом файловой системы.
+        """
+        git_files = list_git_files(repo_path, timeout=self.git_timeout)
+        if git_files is not None:
+            return [
+                (file_path, file_size) for file_path, file_size in git_files
+                if file_size <= LANGUAGE_MAX_FILE_SIZE
+                and not should_ignore_path(file_path.relative_to(repo_path))
+            ]
+
+        files = []
+        for file_path in get_relevant_files(repo_path, max_file_size=LANGUAGE_MAX_FILE_SIZE):
+            try:
+                files.append((file_path, file_path.stat().st_size))
+            except OSError:
+                continue
+        return files
+
+    @staticmethod
+    def _census_shares(census: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, float]]:
+        """Доли языков по объему кода и количеству файлов."""
+        total_bytes = sum(stats['bytes'] for stats in census.values())
+        total_files = sum(stats['files'] for stats in census.values())
+        return {
+            language: {
+                'bytes': stats['bytes'],
+                'files': stats['files'],
+                'bytes_share': round(stats['bytes'] / total_bytes, 4) if total_bytes else 0.0,
+                'files_share': round(stats['files'] / total_files, 4) if total_files else 0.0,
+            }
+            for language, stats in census.items()
+        }
+
     def _detect_package_manager(self, filename: str, file_path: Path, repo_path: Path, stack: ProjectStack, detected_files: Dict):
         """Определение менеджера пакетов по имени файла."""
         # Приоритетные менеджеры пакетов (не должны перезаписываться package.json)
@@ -279,8 +332,10 @@ class LanguageAnalyzer:
     def _analyze_package_json(self, file_path: Path, stack: ProjectStack):
         """Анализ package.json для определения менеджера пакетов и фреймворков."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                package_data = json.load(f)
+            # Читаем только нужные ключи, не загружая весь файл в память
+            package_data = read_json_keys(
+                file_path, ('dependencies', 'devDependencies'), max_bytes=self.manifest_max_bytes
+            )
 
             # Определение менеджера пакетов
             if (file_path.parent / 'yarn.lock').exists():
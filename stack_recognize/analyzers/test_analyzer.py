@@ -5,8 +5,11 @@ from pathlib import Path
 from typing import Dict, List
 
 from ..models import ProjectStack
-from ..config import ConfigLoader, PatternConfig
-from ..utils import get_relevant_files, read_file_sample, get_language_by_extension
+from ..config import ConfigLoader
+from ..pattern_cache import get_pattern_hit_cache
+from ..ruleset import get_ruleset
+from ..utils import get_relevant_files, read_source_sample, get_language_by_extension
+from ..workspaces import detect_monorepo_structure
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +25,8 @@ class TestAnalyzer:
             config_loader: Загрузчик конфигурации
         """
         self.config_loader = config_loader
-        self.pattern_config = PatternConfig()
+        self.ruleset = get_ruleset(config_loader)
+        self.hit_cache = get_pattern_hit_cache(config_loader)
 
     def analyze(self, repo_path: Path, stack: ProjectStack):
         """
@@ -33,7 +37,7 @@ class TestAnalyzer:
             stack: Объект ProjectStack для заполнения
         """
         # Определяем структуру монорепозитория (если есть)
-        monorepo_structure = self._detect_monorepo_structure(repo_path)
+        monorepo_structure = detect_monorepo_structure(repo_path)
         is_monorepo = any(len(v) > 0 for v in monorepo_structure.values() if isinstance(v, list))
         
         # Анализ по файлам
@@ -47,47 +51,6 @@ class TestAnalyzer:
         if is_monorepo:
             self._analyze_monorepo_tests(repo_path, stack, monorepo_structure)
     
-    @staticmethod
-    def _detect_monorepo_structure(repo_path: Path) -> Dict[str, List[Path]]:
-        """Определить структуру монорепозитория (используем ту же логику, что и в DevOpsAnalyzer)."""
-        structure = {
-            'frontend': [],
-            'backend': [],
-            'root': [],
-            'apps': [],
-            'packages': []
-        }
-        
-        frontend_dirs = ['frontend', 'web', 'client', 'ui', 'app']
-        backend_dirs = ['backend', 'server', 'api', 'services']
-        apps_dirs = ['apps', 'applications']
-        
-        for item in repo_path.iterdir():
-            if not item.is_dir():
-                continue
-            
-            dir_name = item.name.lower()
-            
-            if dir_name in frontend_dirs:
-                structure['frontend'].append(item)
-            elif dir_name in backend_dirs:
-                structure['backend'].append(item)
-            elif dir_name in apps_dirs:
-                structure['apps'].append(item)
-        
-        # Проверяем apps/ на наличие frontend/backend подпапок
-        for apps_dir in structure['apps']:
-            for subdir in apps_dir.iterdir():
-                if not subdir.is_dir():
-                    continue
-                subdir_name = subdir.name.lower()
-                if subdir_name in frontend_dirs:
-                    structure['frontend'].append(subdir)
-                elif subdir_name in backend_dirs:
-                    structure['backend'].append(subdir)
-        
-        return structure
-    
     def _analyze_monorepo_tests(self, repo_path: Path, stack: ProjectStack, monorepo_structure: Dict[str, List[Path]]):
         """Анализ тестов для монорепозиториев по категориям (frontend/backend)."""
         test_by_category = {}
@@ -117,13 +80,14 @@ class TestAnalyzer:
         relevant_files = get_relevant_files(directory, extensions=code_extensions, max_file_size=200 * 1024)
         
         for file_path in relevant_files:
-            content = read_file_sample(file_path, max_lines=50, max_bytes=4096)
+            content = read_source_sample(file_path, repo_path, max_lines=50, max_bytes=4096)
             if not content:
                 continue
+            hits = self.hit_cache.hits_for(content)
             
             file_lang = get_language_by_extension(file_path.suffix)
             
-            for runner, patterns in self.pattern_config.TEST_RUNNER_PATTERNS.items():
+            for runner, patterns in self.ruleset.test_runner_patterns.items():
                 if runner in found_runners:
                     continue
                 
@@ -143,7 +107,7 @@ class TestAnalyzer:
                     continue
                 
                 for pattern in patterns:
-                    if re.search(pattern, content, re.IGNORECASE):
+                    if hits.search(pattern, re.IGNORECASE):
                         found_runners.append(runner)
                         break
         
@@ -187,15 +151,16 @@ class TestAnalyzer:
 
         for file_path in relevant_files:
             # Читаем только начало файла (достаточно для поиска паттернов тестов)
-            content = read_file_sample(file_path, max_lines=50, max_bytes=4096)
+            content = read_source_sample(file_path, repo_path, max_lines=50, max_bytes=4096)
 
             if not content:
                 continue
+            hits = self.hit_cache.hits_for(content)
 
             # Определяем язык файла по расширению
             file_lang = get_language_by_extension(file_path.suffix)
             
-            for runner, patterns in self.pattern_config.TEST_RUNNER_PATTERNS.items():
+            for runner, patterns in self.ruleset.test_runner_patterns.items():
                 # Пропускаем, если этот раннер уже найден
                 if runner in stack.test_runner:
                     continue
@@ -233,7 +198,7 @@ class TestAnalyzer:
                 # E2E/BDD тестовые раннеры могут быть в любом языке
                 
                 for pattern in patterns:
-                    if re.search(pattern, content, re.IGNORECASE):
+                    if hits.search(pattern, re.IGNORECASE):
                         stack.test_runner.append(runner)
                         logger.info(f"Обнаружен тестовый раннер {runner} в файле {file_path.relative_to(repo_path)} по паттерну: {pattern}")
                         break  # Переходим к следующему раннеру, не выходим из цикла
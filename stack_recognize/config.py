@@ -21,6 +21,14 @@ class ConfigLoader:
         self.config_path = Path(config_path)
         self.config_data = self._load_config()
 
+    @classmethod
+    def from_data(cls, config_path: Path, config_data: Dict[str, Any]) -> 'ConfigLoader':
+        """Создать загрузчик из уже прочитанной конфигурации (без чтения файла)."""
+        loader = cls.__new__(cls)
+        loader.config_path = Path(config_path)
+        loader.config_data = config_data
+        return loader
+
     def _load_config(self) -> Dict[str, Any]:
         """Загрузка конфигурации из JSON файла."""
         try:
@@ -61,6 +69,21 @@ class ConfigLoader:
         """Получить конфигурацию DevOps инструментов."""
         return self.config_data.get('devops', {})
 
+    @property
+    def limits(self) -> Dict[str, Any]:
+        """Получить ограничения анализа (размеры файлов и т.п.)."""
+        return self.config_data.get('limits', {})
+
+    @property
+    def pattern_cache(self) -> Dict[str, Any]:
+        """Получить настройки кэша результатов паттернов."""
+        return self.config_data.get('pattern_cache', {})
+
+    @property
+    def worktree_pool(self) -> Dict[str, Any]:
+        """Получить настройки пула рабочих директорий и зеркал репозиториев."""
+        return self.config_data.get('worktree_pool', {})
+
 
 class PatternConfig:
     """Встроенные паттерны для определения технологий."""
@@ -0,0 +1,154 @@
+"""Ограничения времени и ресурсов для этапов анализа.
+
+Дедлайн этапа устанавливается на время его выполнения (contextvars) и
+проверяется кооперативно в циклах обхода и чтения файлов: при превышении
+бросается DeadlineExceeded, и детектор возвращает частично заполненный
+стек с причиной прерывания. Внешние процессы git запускаются в отдельной
+группе процессов и при превышении таймаута завершаются вместе со всеми
+дочерними процессами (git-remote-https, index-pack и т.п.).
+"""
+import contextvars
+import os
+import signal
+import subprocess
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class DeadlineExceeded(BaseException):
+    """
+    Превышен лимит времени этапа анализа.
+
+    Наследуется от BaseException (как KeyboardInterrupt), чтобы прерывание
+    не перехватывалось обработчиками `except Exception` в анализаторах.
+    """
+
+    def __init__(self, phase: str, seconds: float):
+        super().__init__(f"Превышен лимит времени этапа {phase} ({seconds:g} сек.)")
+        self.phase = phase
+        self.seconds = seconds
+
+
+class Deadline:
+    """Момент, к которому этап должен завершиться."""
+
+    def __init__(self, phase: str, seconds: float):
+        self.phase = phase
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def check(self):
+        if time.monotonic() >= self.expires_at:
+            raise DeadlineExceeded(self.phase, self.seconds)
+
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    'stack_recognize_deadline', default=None
+)
+
+
+@contextmanager
+def deadline_scope(phase: str, seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """Установить дедлайн этапа на время блока (None или 0 - без ограничения)."""
+    deadline = Deadline(phase, seconds) if seconds else None
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def check_deadline():
+    """Прервать этап, если его дедлайн истек (вызывается в циклах по файлам)."""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check()
+
+
+def _resource_limits(max_memory_mb: Optional[int], max_cpu_seconds: Optional[int]) -> List[tuple]:
+    """Пары (ресурс, (мягкий, жесткий лимит)) для setrlimit/prlimit."""
+    limits = []
+    if max_memory_mb:
+        limit = max_memory_mb * 1024 * 1024
+        limits.append((resource.RLIMIT_AS, (limit, limit)))
+    if max_cpu_seconds:
+        # Мягкий лимит - SIGXCPU, жесткий - SIGKILL
+        limits.append((resource.RLIMIT_CPU, (max_cpu_seconds, max_cpu_seconds + 5)))
+    return limits
+
+
+def run_limited(
+    args: List[str],
+    phase: str,
+    timeout: Optional[float] = None,
+    max_memory_mb: Optional[int] = None,
+    max_cpu_seconds: Optional[int] = None,
+) -> subprocess.CompletedProcess:
+    """
+    Запустить внешний процесс с таймаутом и ограничениями ресурсов.
+
+    Процесс запускается в новой группе процессов; при превышении таймаута
+    группа завершается целиком (SIGKILL).
+
+    Raises:
+        DeadlineExceeded: Превышен таймаут
+        subprocess.CalledProcessError: Процесс завершился с ошибкой
+    """
+    limits = _resource_limits(max_memory_mb, max_cpu_seconds) if resource is not None else []
+    use_prlimit = hasattr(resource, 'prlimit')
+
+    def preexec():
+        for limit_resource, values in limits:
+            resource.setrlimit(limit_resource, values)
+
+    process = subprocess.Popen(
+        args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        start_new_session=os.name == 'posix',
+        # preexec_fn небезопасен в многопоточном процессе - на Linux
+        # лимиты устанавливаются через prlimit сразу после запуска
+        preexec_fn=preexec if limits and not use_prlimit else None,
+    )
+    try:
+        if limits and use_prlimit:
+            try:
+                for limit_resource, values in limits:
+                    resource.prlimit(process.pid, limit_resource, values)
+            except ProcessLookupError:
+                # Процесс уже завершился
+                pass
+        stdout, stderr = process.communicate(timeout=timeout or None)
+    except subprocess.TimeoutExpired:
+        _kill_process_group(process)
+        process.communicate()
+        raise DeadlineExceeded(phase, timeout)
+    except BaseException:
+        _kill_process_group(process)
+        process.wait()
+        raise
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, args, stdout, stderr)
+    return subprocess.CompletedProcess(args, process.returncode, stdout, stderr)
+
+
+def _kill_process_group(process: subprocess.Popen):
+    """Завершить процесс и все его дочерние процессы."""
+    try:
+        if os.name == 'posix':
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
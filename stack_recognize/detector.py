@@ -1,15 +1,24 @@
 """Основной класс для определения технологического стека проекта."""
+import asyncio
+import contextvars
 import os
-import shutil
 import subprocess
 import tempfile
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
 try:
     from .models import ProjectStack
-    from .config import ConfigLoader
+    from .ruleset import load_ruleset
+    from .manifests import read_pom_sections, DEFAULT_MANIFEST_MAX_BYTES
+    from .workspaces import discover_workspace_components, iter_components
+    from .pattern_cache import get_pattern_hit_cache
+    from .deadline import DeadlineExceeded, check_deadline, deadline_scope, run_limited
+    from .worktrees import Worktree, background_remover, get_worktree_pool
     from .analyzers import (
         LanguageAnalyzer,
         FrameworkAnalyzer,
@@ -24,7 +33,12 @@ try:
     )
 except ImportError:
     from models import ProjectStack
-    from config import ConfigLoader
+    from ruleset import load_ruleset
+    from manifests import read_pom_sections, DEFAULT_MANIFEST_MAX_BYTES
+    from workspaces import discover_workspace_components, iter_components
+    from pattern_cache import get_pattern_hit_cache
+    from deadline import DeadlineExceeded, check_deadline, deadline_scope, run_limited
+    from worktrees import Worktree, background_remover, get_worktree_pool
     from analyzers import (
         LanguageAnalyzer,
         FrameworkAnalyzer,
@@ -38,13 +52,33 @@ except ImportError:
         HintsAnalyzer,
     )
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Количество потоков для параллельного анализа компонентов монорепозитория
+DEFAULT_COMPONENT_WORKERS = 4
+
+# Лимиты времени этапов по умолчанию (секунды)
+DEFAULT_CLONE_TIMEOUT = 600
+DEFAULT_ANALYZE_TIMEOUT = 300
+
+
+@dataclass
+class DetectionContext:
+    """Состояние одного вызова detect_stack (рабочая директория репозитория)."""
+    repo_url: str
+    temp_dir: Optional[str] = None
+    repo_path: Optional[Path] = None
+    worktree: Optional[Worktree] = None
+
 
 class ProjectStackDetector:
-    """Детектор технологического стека проекта по Git-репозиторию."""
+    """
+    Детектор технологического стека проекта по Git-репозиторию.
+
+    Детектор не хранит состояние вызова (оно в DetectionContext), поэтому
+    один экземпляр можно использовать одновременно из нескольких потоков
+    и asyncio-задач.
+    """
 
     def __init__(self, config_path: str = None):
         """
@@ -53,9 +87,9 @@ class ProjectStackDetector:
         Args:
             config_path: Путь к конфигурационному файлу (опционально)
         """
-        self.temp_dir = None
-        self.repo_path = None
-        self.config_loader = ConfigLoader(config_path)
+        # Общий для процесса скомпилированный набор правил и его конфигурация
+        self.ruleset = load_ruleset(config_path)
+        self.config_loader = self.ruleset.config_loader
 
         # Инициализация анализаторов
         self.language_analyzer = LanguageAnalyzer(self.config_loader)
@@ -69,111 +103,270 @@ class ProjectStackDetector:
         self.cicd_analyzer = CICDAnalyzer(self.config_loader)
         self.hints_analyzer = HintsAnalyzer(self.config_loader)
 
-    def detect_stack(self, repo_url: str) -> ProjectStack:
+        # Порядок запуска анализаторов (точки входа - последними)
+        self.analyzers = (
+            self.language_analyzer,
+            self.framework_analyzer,
+            self.devops_analyzer,
+            self.test_analyzer,
+            self.database_analyzer,
+            self.cloud_analyzer,
+            self.build_tools_analyzer,
+            self.cicd_analyzer,
+            self.hints_analyzer,
+            self.entry_point_analyzer,
+        )
+
+        # Общий кэш результатов паттернов анализаторов содержимого
+        self.hit_cache = get_pattern_hit_cache(self.config_loader)
+
+        # Общий пул рабочих директорий и зеркал (None - клонирование во временную директорию)
+        self.worktree_pool = get_worktree_pool(self.config_loader)
+
+    def detect_stack(
+        self,
+        repo_url: str,
+        clone_timeout: Optional[float] = None,
+        analyze_timeout: Optional[float] = None,
+    ) -> ProjectStack:
         """
         Основной метод для определения технологического стека.
 
+        При превышении лимита времени или памяти анализ прерывается и
+        возвращается частично заполненный стек с причиной в incomplete_reason.
+
         Args:
             repo_url: URL Git-репозитория
+            clone_timeout: Лимит времени клонирования (по умолчанию limits.clone_timeout)
+            analyze_timeout: Лимит времени анализа (по умолчанию limits.analyze_timeout)
 
         Returns:
             ProjectStack: Объект с информацией о стеке
         """
         stack = ProjectStack()
+        context = DetectionContext(repo_url)
+        limits = self.config_loader.limits
+        if clone_timeout is None:
+            clone_timeout = limits.get('clone_timeout', DEFAULT_CLONE_TIMEOUT)
+        if analyze_timeout is None:
+            analyze_timeout = limits.get('analyze_timeout', DEFAULT_ANALYZE_TIMEOUT)
 
         try:
             # Клонирование репозитория
-            self._clone_repository(repo_url)
-
-            # Анализ содержимого
-            self.language_analyzer.analyze(self.repo_path, stack)
-            self.framework_analyzer.analyze(self.repo_path, stack)
-            self.devops_analyzer.analyze(self.repo_path, stack)
-            self.test_analyzer.analyze(self.repo_path, stack)
-            self.database_analyzer.analyze(self.repo_path, stack)
-            self.cloud_analyzer.analyze(self.repo_path, stack)
-            self.build_tools_analyzer.analyze(self.repo_path, stack)
-            self.cicd_analyzer.analyze(self.repo_path, stack)
-            self.hints_analyzer.analyze(self.repo_path, stack)
-
-            # Анализ точек входа
-            self.entry_point_analyzer.analyze(self.repo_path, stack)
-            
-            # Определяем версию Java из pom.xml до очистки
-            java_version = self._extract_java_version_from_pom()
-            if java_version:
-                if not hasattr(stack, 'java_version'):
-                    stack.files_detected['java_version'] = java_version
-                else:
-                    stack.java_version = java_version
+            started = time.monotonic()
+            self._clone_repository(context, clone_timeout)
+            stack.stats['clone_seconds'] = round(time.monotonic() - started, 3)
+            stack.commit_sha = self._head_sha(context)
+            stack.stats['repo_bytes'] = self._repo_bytes(context)
+
+            started = time.monotonic()
+            with deadline_scope('analyze', analyze_timeout):
+                # Анализ всего репозитория - сводное представление
+                self._analyze_path(context.repo_path, stack)
+
+                # Анализ отдельных компонентов монорепозитория
+                self._analyze_components(context.repo_path, stack)
+            stack.stats['analyze_seconds'] = round(time.monotonic() - started, 3)
 
+        except DeadlineExceeded as e:
+            logger.error(f"Анализ репозитория прерван: {e}")
+            stack.incomplete_reason = str(e)
+            stack.hints.append(f"Анализ прерван: {e}")
+        except MemoryError:
+            logger.error("Анализ репозитория прерван: превышен лимит памяти")
+            stack.incomplete_reason = "Превышен лимит памяти"
+            stack.hints.append("Анализ прерван: превышен лимит памяти")
         except Exception as e:
             logger.error(f"Ошибка при анализе репозитория: {e}")
             stack.hints.append(f"Ошибка анализа: {str(e)}")
         finally:
-            # Очистка временных файлов
-            self._cleanup()
+            # Сохранение кэша паттернов и очистка временных файлов
+            self.hit_cache.flush()
+            self._cleanup(context)
 
         return stack
 
-    def _clone_repository(self, repo_url: str):
-        """Клонирование репозитория во временную директорию."""
-        self.temp_dir = tempfile.mkdtemp(prefix="repo_analyzer_")
-        logger.info(f"Клонирование репозитория {repo_url} в {self.temp_dir}")
+    async def detect_stack_async(
+        self,
+        repo_url: str,
+        clone_timeout: Optional[float] = None,
+        analyze_timeout: Optional[float] = None,
+    ) -> ProjectStack:
+        """
+        Асинхронный вариант detect_stack: анализ выполняется в пуле потоков
+        цикла событий, не блокируя его.
+        """
+        return await asyncio.to_thread(self.detect_stack, repo_url, clone_timeout, analyze_timeout)
+
+    def _analyze_path(self, path: Path, stack: ProjectStack):
+        """Запустить все анализаторы для директории и заполнить stack."""
+        for analyzer in self.analyzers:
+            # Проверка лимита времени между анализаторами
+            check_deadline()
+            analyzer.analyze(path, stack)
 
+        # Определяем версию Java из pom.xml до очистки
+        java_version = self._extract_java_version_from_pom(path)
+        if java_version:
+            if not hasattr(stack, 'java_version'):
+                stack.files_detected['java_version'] = java_version
+            else:
+                stack.java_version = java_version
+
+    def _analyze_components(self, repo_path: Path, stack: ProjectStack):
+        """Найти компоненты монорепозитория и параллельно проанализировать каждый.
+
+        Стек каждого компонента сохраняется в stack.components (пути в
+        files_detected компонента указываются относительно самого компонента),
+        дерево компонентов - в stack.component_tree.
+        """
+        limits = self.config_loader.limits
+        tree = discover_workspace_components(
+            repo_path, max_bytes=limits.get('manifest_max_bytes', DEFAULT_MANIFEST_MAX_BYTES)
+        )
+        components = list(iter_components(tree))
+
+        # Один компонент - это не монорепозиторий, сводного анализа достаточно
+        if len(components) < 2:
+            return
+
+        stack.component_tree = tree
+        logger.info(f"Монорепозиторий: найдено компонентов: {len(components)}")
+
+        max_workers = min(len(components), limits.get('component_workers', DEFAULT_COMPONENT_WORKERS))
+        with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+            futures = [
+                # Копия контекста передает в поток дедлайн этапа анализа
+                (component.path, executor.submit(
+                    contextvars.copy_context().run, self._analyze_component, repo_path / component.path
+                ))
+                for component in components
+            ]
+            for component_path, future in futures:
+                stack.components[component_path] = future.result()
+
+    def _analyze_component(self, component_path: Path) -> ProjectStack:
+        """Анализ одного компонента монорепозитория."""
+        component_stack = ProjectStack()
         try:
-            subprocess.run([
-                'git', 'clone', '--depth', '1', repo_url, self.temp_dir
-            ], check=True, capture_output=True, text=True)
+            self._analyze_path(component_path, component_stack)
+        except Exception as e:
+            logger.error(f"Ошибка при анализе компонента {component_path}: {e}")
+            component_stack.hints.append(f"Ошибка анализа: {str(e)}")
+        return component_stack
 
-            self.repo_path = Path(self.temp_dir)
+    def _clone_repository(self, context: DetectionContext, timeout: Optional[float] = None):
+        """Получение последнего коммита репозитория в рабочую директорию.
+
+        Если пул рабочих директорий включен, коммит загружается в зеркало
+        репозитория и выкладывается в директорию пула; иначе репозиторий
+        клонируется во временную директорию.
+
+        git запускается с лимитом времени и (если заданы limits.clone_max_memory_mb
+        и limits.clone_max_cpu_seconds) с ограничениями памяти и процессорного
+        времени; при превышении таймаута git завершается вместе с дочерними процессами.
+        """
+        limits = self.config_loader.limits
+        max_memory_mb = limits.get('clone_max_memory_mb')
+        max_cpu_seconds = limits.get('clone_max_cpu_seconds')
+
+        repo_url = context.repo_url
+
+        if self.worktree_pool is not None:
+            try:
+                context.worktree = self.worktree_pool.checkout(
+                    repo_url, timeout=timeout, max_memory_mb=max_memory_mb, max_cpu_seconds=max_cpu_seconds,
+                )
+            except subprocess.CalledProcessError as e:
+                raise Exception(f"Ошибка клонирования репозитория: {e.stderr}")
+            context.repo_path = context.worktree.path
+            logger.info(f"Репозиторий {repo_url} подготовлен в {context.repo_path}")
+            return
+
+        context.temp_dir = tempfile.mkdtemp(prefix="repo_analyzer_")
+        logger.info(f"Клонирование репозитория {repo_url} в {context.temp_dir}")
+
+        try:
+            run_limited(
+                ['git', 'clone', '--depth', '1', repo_url, context.temp_dir],
+                phase='clone',
+                timeout=timeout,
+                max_memory_mb=max_memory_mb,
+                max_cpu_seconds=max_cpu_seconds,
+            )
+
+            context.repo_path = Path(context.temp_dir)
         except subprocess.CalledProcessError as e:
             raise Exception(f"Ошибка клонирования репозитория: {e.stderr}")
 
-    def _extract_java_version_from_pom(self) -> Optional[str]:
-        """Извлечь версию Java из pom.xml файлов в репозитории.
+    def _head_sha(self, context: DetectionContext) -> Optional[str]:
+        """SHA коммита HEAD склонированного репозитория."""
+        try:
+            result = subprocess.run(
+                ['git', '-C', str(context.repo_path), 'rev-parse', 'HEAD'],
+                check=True, capture_output=True, text=True,
+            )
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return result.stdout.strip() or None
+
+    def _repo_bytes(self, context: DetectionContext) -> Optional[int]:
+        """Размер объектов склонированного репозитория (git count-objects)."""
+        # Объекты директории пула лежат в зеркале
+        git_path = context.worktree.mirror_path if context.worktree is not None else context.repo_path
+        try:
+            result = subprocess.run(
+                ['git', '-C', str(git_path), 'count-objects', '-v'],
+                check=True, capture_output=True, text=True,
+            )
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        sizes = dict(line.split(': ', 1) for line in result.stdout.splitlines() if ': ' in line)
+        try:
+            # Размеры в килобайтах: незапакованные объекты и pack-файлы
+            return (int(sizes.get('size', 0)) + int(sizes.get('size-pack', 0))) * 1024
+        except ValueError:
+            return None
+
+    def _extract_java_version_from_pom(self, repo_path: Optional[Path]) -> Optional[str]:
+        """Извлечь версию Java из pom.xml файлов в директории.
         
         Возвращает максимальную версию Java из всех найденных pom.xml файлов,
         чтобы образ поддерживал все модули монорепозитория.
         """
         import re
         
-        if not self.repo_path or not self.repo_path.exists():
+        if not repo_path or not repo_path.exists():
             return None
         
         # Ищем все pom.xml файлы
-        pom_files = list(self.repo_path.rglob("pom.xml"))
+        pom_files = list(repo_path.rglob("pom.xml"))
         if not pom_files:
             return None
         
         versions = []
         
+        max_bytes = self.config_loader.limits.get('manifest_max_bytes', DEFAULT_MANIFEST_MAX_BYTES)
+
+        # Свойства с версией Java в порядке приоритета
+        version_properties = [
+            'maven.compiler.release',
+            'maven.compiler.source',
+            'maven.compiler.target',
+            'java.version',
+            'javaVersion',
+        ]
+
         # Пробуем найти версию Java в каждом pom.xml
         for pom_file in pom_files:
             try:
-                with open(pom_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # Ищем maven.compiler.release, source, target или java.version
-                patterns = [
-                    r'<maven\.compiler\.release>(\d+)</maven\.compiler\.release>',
-                    r'<maven\.compiler\.source>(\d+)</maven\.compiler\.source>',
-                    r'<maven\.compiler\.target>(\d+)</maven\.compiler\.target>',
-                    r'<java\.version>(\d+)</java\.version>',
-                    r'<javaVersion>(\d+)</javaVersion>',
-                ]
-                
-                for pattern in patterns:
-                    match = re.search(pattern, content)
-                    if match:
-                        version = match.group(1)
-                        # Нормализуем версию (например, 21 -> 21, 1.8 -> 8)
-                        if version.startswith('1.'):
-                            version = version[2:]
-                        try:
-                            versions.append(int(version))
-                        except ValueError:
-                            pass
+                # Читаем только секцию <properties>, не загружая весь файл
+                properties = read_pom_sections(pom_file, ('properties',), max_bytes=max_bytes).get('properties', {})
+
+                for prop in version_properties:
+                    version = properties.get(prop, '')
+                    if re.fullmatch(r'\d+', version):
+                        versions.append(int(version))
                         break
             except Exception:
                 continue
@@ -184,9 +377,14 @@ class ProjectStackDetector:
         
         return None
 
-    def _cleanup(self):
-        """Очистка временных файлов."""
-        if self.temp_dir and os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
-            logger.info(f"Временная директория {self.temp_dir} удалена")
+    def _cleanup(self, context: DetectionContext):
+        """Возврат рабочей директории в пул или удаление временной директории в фоне."""
+        if context.worktree is not None:
+            self.worktree_pool.release(context.worktree)
+            context.worktree = None
+        elif context.temp_dir and os.path.exists(context.temp_dir):
+            background_remover.remove(Path(context.temp_dir))
+            logger.info(f"Временная директория {context.temp_dir} передана на удаление")
+        context.temp_dir = None
+        context.repo_path = None
 
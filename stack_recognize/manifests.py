@@ -0,0 +1,325 @@
+"""Потоковое чтение манифестов (package.json, pom.xml) с ограничением по размеру.
+
+Сгенерированные манифесты и lock-файлы в монорепозиториях бывают размером
+в десятки мегабайт, а анализаторам нужны только несколько ключей верхнего
+уровня. Функции этого модуля читают файл кусками, извлекают только нужные
+секции, останавливаются сразу после того, как все они найдены, и никогда
+не читают больше max_bytes байт.
+"""
+import codecs
+import json
+import logging
+import re
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+# Лимит по умолчанию на объем читаемых данных одного манифеста
+DEFAULT_MANIFEST_MAX_BYTES = 16 * 1024 * 1024
+
+# Размер куска при чтении файла
+_CHUNK_SIZE = 64 * 1024
+
+# Ключи package.json, нужные анализаторам
+PACKAGE_JSON_KEYS = ('dependencies', 'devDependencies', 'scripts', 'workspaces')
+
+# Секции pom.xml, нужные анализаторам
+POM_SECTIONS = ('properties', 'modules')
+
+_JSON_STRUCTURAL = re.compile(r'["{}\[\]:,]')
+_JSON_STRING_SPECIAL = re.compile(r'["\\]')
+# Остаток строки до закрывающей кавычки (если строка целиком в куске)
+_JSON_STRING_REST = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+# Внутри вложенных значений важны только строки и скобки
+_JSON_NESTED = re.compile(r'["{}\[\]]')
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def _store_value(result: Dict[str, Any], key: str, parts: List[str], wanted: set) -> bool:
+    """Декодировать собранный текст значения. True - найдены все нужные ключи."""
+    result[key] = json.loads(''.join(parts))
+    return wanted.issubset(result)
+
+
+def read_json_keys(
+    file_path: Path,
+    keys: Iterable[str] = PACKAGE_JSON_KEYS,
+    max_bytes: int = DEFAULT_MANIFEST_MAX_BYTES,
+) -> Dict[str, Any]:
+    """
+    Извлечь значения указанных ключей верхнего уровня из JSON-объекта.
+
+    Файл просматривается за один проход: состояние разбора (глубина,
+    строка, экранирование) переносится между кусками, поэтому каждый байт
+    читается один раз. Текст значения нужного ключа собирается по кускам
+    и декодируется один раз, когда значение закончилось; значения
+    ненужных ключей пропускаются без декодирования. Чтение прекращается,
+    как только найдены все ключи или закончился корневой объект. Если
+    достигнут лимит max_bytes, возвращаются ключи, найденные к этому моменту.
+
+    Для корректных файлов результат совпадает с json.load(...)[key]
+    (за исключением дублирующихся ключей: берется первое вхождение).
+
+    Args:
+        file_path: Путь к JSON файлу
+        keys: Ключи верхнего уровня, которые нужно извлечь
+        max_bytes: Максимальное количество байт для чтения
+
+    Returns:
+        Словарь с найденными ключами
+
+    Raises:
+        json.JSONDecodeError: Если файл не является корректным JSON-объектом
+        UnicodeDecodeError: Если файл не в кодировке UTF-8
+    """
+    wanted = set(keys)
+    result: Dict[str, Any] = {}
+    if not wanted:
+        return result
+
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    bytes_read = 0
+    capped = False
+
+    started = False
+    depth = 0
+    expect_key = False
+    in_string = False
+    # Кусок закончился обратной косой чертой внутри строки
+    escaped = False
+    # Текст читаемого ключа верхнего уровня и значения нужного ключа (по кускам)
+    key_parts = None
+    pending_key = None
+    value_parts = None
+    value_key = None
+
+    with open(file_path, 'rb') as f:
+        while True:
+            if bytes_read >= max_bytes:
+                logger.warning(f"Достигнут лимит {max_bytes} байт при чтении {file_path}, ключи прочитаны частично")
+                capped = True
+                break
+            chunk = f.read(min(_CHUNK_SIZE, max_bytes - bytes_read))
+            bytes_read += len(chunk)
+            buf = decoder.decode(chunk, final=not chunk)
+            pos = key_start = value_start = 0
+
+            while pos < len(buf):
+                if escaped:
+                    pos += 1
+                    escaped = False
+                    continue
+
+                if in_string:
+                    match = _JSON_STRING_SPECIAL.search(buf, pos)
+                    if match is None:
+                        pos = len(buf)
+                    elif match.group() == '\\':
+                        pos = match.end() + 1
+                        escaped = pos > len(buf)
+                    else:
+                        in_string = False
+                        pos = match.end()
+                        if key_parts is not None:
+                            key_parts.append(buf[key_start:pos])
+                            pending_key = json.loads(''.join(key_parts))
+                            key_parts = None
+                        elif value_parts is not None and depth == 1:
+                            value_parts.append(buf[value_start:pos])
+                            if _store_value(result, value_key, value_parts, wanted):
+                                return result
+                            value_parts = None
+                    continue
+
+                if not started:
+                    pos = _JSON_WHITESPACE.match(buf, pos).end()
+                    if pos >= len(buf):
+                        break
+                    if buf[pos] != '{':
+                        raise json.JSONDecodeError("Expecting '{'", buf, pos)
+                    started = True
+                    depth = 1
+                    expect_key = True
+                    pos += 1
+                    continue
+
+                match = (_JSON_STRUCTURAL if depth == 1 else _JSON_NESTED).search(buf, pos)
+                if match is None:
+                    pos = len(buf)
+                    break
+                token = match.group()
+                pos = match.end()
+
+                if token == '"':
+                    if depth == 1 and expect_key:
+                        key_parts = []
+                        key_start = match.start()
+                        expect_key = False
+                    elif depth > 1:
+                        rest = _JSON_STRING_REST.match(buf, pos)
+                        if rest is not None:
+                            pos = rest.end()
+                            continue
+                    in_string = True
+                    continue
+
+                if depth == 1 and value_parts is not None and token in ',}':
+                    # Число или литерал закончились
+                    value_parts.append(buf[value_start:match.start()])
+                    if _store_value(result, value_key, value_parts, wanted):
+                        return result
+                    value_parts = None
+
+                if token == ':' and depth == 1:
+                    if pending_key in wanted and pending_key not in result:
+                        value_parts = []
+                        value_key = pending_key
+                        value_start = pos
+                    pending_key = None
+                elif token == ',' and depth == 1:
+                    expect_key = True
+                elif token in '{[':
+                    depth += 1
+                elif token in '}]':
+                    depth -= 1
+                    if depth == 0:
+                        return result
+                    if depth == 1 and value_parts is not None:
+                        # Объект или массив закончился
+                        value_parts.append(buf[value_start:pos])
+                        if _store_value(result, value_key, value_parts, wanted):
+                            return result
+                        value_parts = None
+
+            # Незаконченные ключ и значение продолжатся в следующем куске
+            if key_parts is not None:
+                key_parts.append(buf[key_start:])
+            if value_parts is not None:
+                value_parts.append(buf[value_start:])
+            if not chunk:
+                break
+
+    if capped:
+        return result
+    if not started:
+        raise json.JSONDecodeError("Expecting value", '', 0)
+    raise json.JSONDecodeError("Unexpected end of JSON object", '', 0)
+
+
+def _local_name(tag: str) -> str:
+    """Имя XML-тега без пространства имен."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _element_text(elem: ET.Element) -> str:
+    return (elem.text or '').strip()
+
+
+def read_pom_sections(
+    file_path: Path,
+    sections: Iterable[str] = POM_SECTIONS,
+    max_bytes: int = DEFAULT_MANIFEST_MAX_BYTES,
+) -> Dict[str, Any]:
+    """
+    Извлечь секции из pom.xml потоковым XML-парсером.
+
+    Поддерживаемые секции:
+        'properties' - словарь {имя свойства: значение} из project/properties
+        'modules' - список модулей из project/modules
+        любое другое имя - текст первого непустого элемента с таким именем
+        (например, 'mainClass')
+
+    Чтение прекращается, как только найдены все секции, закрыт корневой
+    элемент или достигнут лимит max_bytes. Если XML некорректен,
+    используется разбор регулярными выражениями по прочитанным данным.
+
+    Args:
+        file_path: Путь к pom.xml
+        sections: Имена секций для извлечения
+        max_bytes: Максимальное количество байт для чтения
+
+    Returns:
+        Словарь с найденными секциями
+    """
+    wanted = set(sections)
+    result: Dict[str, Any] = {}
+    if not wanted:
+        return result
+
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    consumed = bytearray()
+    path = []
+    bytes_read = 0
+
+    with open(file_path, 'rb') as f:
+        while bytes_read < max_bytes:
+            chunk = f.read(min(_CHUNK_SIZE, max_bytes - bytes_read))
+            if not chunk:
+                return result
+            bytes_read += len(chunk)
+            consumed += chunk
+            try:
+                parser.feed(chunk)
+                for event, elem in parser.read_events():
+                    name = _local_name(elem.tag)
+                    if event == 'start':
+                        path.append(name)
+                        continue
+
+                    depth = len(path)
+                    path.pop()
+                    if depth == 2 and name == 'properties' and 'properties' in wanted:
+                        result.setdefault('properties', {
+                            _local_name(child.tag): _element_text(child)
+                            for child in elem if isinstance(child.tag, str)
+                        })
+                    elif depth == 2 and name == 'modules' and 'modules' in wanted:
+                        result.setdefault('modules', [
+                            _element_text(child)
+                            for child in elem
+                            if isinstance(child.tag, str) and _local_name(child.tag) == 'module'
+                        ])
+                    elif name in wanted and name not in POM_SECTIONS and name not in result:
+                        text = _element_text(elem)
+                        if text:
+                            result[name] = text
+
+                    if wanted.issubset(result) or depth == 1:
+                        return result
+                    if depth == 2:
+                        # Освобождаем память: содержимое прочитанных секций больше не нужно
+                        elem.clear()
+            except ET.ParseError as e:
+                logger.debug(f"Ошибка XML-разбора {file_path}: {e}, используем регулярные выражения")
+                text = bytes(consumed).decode('utf-8', errors='ignore')
+                # Дочитываем до лимита, чтобы регулярные выражения видели тот же объем данных
+                rest = f.read(max_bytes - bytes_read)
+                text += rest.decode('utf-8', errors='ignore')
+                return _read_pom_sections_regex(text, wanted)
+
+    logger.warning(f"Достигнут лимит {max_bytes} байт при чтении {file_path}, секции прочитаны частично")
+    return result
+
+
+def _read_pom_sections_regex(content: str, wanted: set) -> Dict[str, Any]:
+    """Разбор секций pom.xml регулярными выражениями (для некорректного XML)."""
+    result: Dict[str, Any] = {}
+    for name in wanted:
+        if name == 'properties':
+            match = re.search(r'<properties>(.*?)</properties>', content, re.DOTALL)
+            if match:
+                result['properties'] = {
+                    key: value.strip()
+                    for key, value in re.findall(r'<([\w.\-]+)>([^<]*)</\1>', match.group(1))
+                }
+        elif name == 'modules':
+            match = re.search(r'<modules>(.*?)</modules>', content, re.DOTALL)
+            if match:
+                result['modules'] = [m.strip() for m in re.findall(r'<module>([^<]+)</module>', match.group(1))]
+        else:
+            match = re.search(rf'<{re.escape(name)}>([^<]+)</{re.escape(name)}>', content)
+            if match and match.group(1).strip():
+                result[name] = match.group(1).strip()
+    return result
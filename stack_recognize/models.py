@@ -14,6 +14,14 @@ class EntryPoint:
     description: Optional[str] = None
 
 
+@dataclass
+class WorkspaceComponent:
+    """Компонент монорепозитория (workspace, модуль, сервис)."""
+    path: str  # Путь относительно корня репозитория
+    sources: List[str] = field(default_factory=list)  # 'npm', 'pnpm', 'go.work', 'maven', 'gradle', 'docker'
+    children: List['WorkspaceComponent'] = field(default_factory=list)
+
+
 @dataclass
 class ProjectStack:
     """Структура для хранения информации о технологическом стеке проекта."""
@@ -35,4 +43,14 @@ class ProjectStack:
     main_entry_point: Optional[EntryPoint] = None
     hints: List[str] = field(default_factory=list)
     files_detected: Dict[str, Any] = field(default_factory=dict)
+    # SHA проанализированного коммита (HEAD клона)
+    commit_sha: Optional[str] = None
+    # Метрики анализа: длительность этапов (clone_seconds, analyze_seconds)
+    # и размер клона в байтах (repo_bytes)
+    stats: Dict[str, Any] = field(default_factory=dict)
+    # Причина, по которой анализ прерван и стек заполнен частично
+    incomplete_reason: Optional[str] = None
+    # Дерево компонентов монорепозитория и стек каждого компонента (ключ - путь компонента)
+    component_tree: List[WorkspaceComponent] = field(default_factory=list)
+    components: Dict[str, 'ProjectStack'] = field(default_factory=dict)
 
@@ -0,0 +1,289 @@
+"""Персистентный кэш результатов поиска паттернов по содержимому файлов.
+
+Форки и общий vendored-код приводят к тому, что одни и те же файлы
+сканируются регулярными выражениями снова и снова. Кэш хранит для каждого
+содержимого (ключ - хэш прочитанного фрагмента файла и версия набора
+правил) результаты всех проверенных паттернов всех анализаторов, так что
+повторный анализ такого файла сводится к поиску в словаре.
+
+Хранилище - SQLite в режиме WAL: безопасно для нескольких процессов и
+потоков. Соединения открываются при первом обращении в каждом потоке;
+после fork дочерний процесс открывает свои, не трогая соединения
+родителя. Размер ограничен количеством записей, при превышении удаляются
+давно не использованные (LRU).
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from .ruleset import Rule, get_ruleset
+
+logger = logging.getLogger(__name__)
+
+# Значения по умолчанию
+DEFAULT_CACHE_PATH = Path.home() / '.cache' / 'stack_recognize' / 'pattern_hits.sqlite3'
+DEFAULT_MAX_ENTRIES = 100_000
+
+# Количество записей, хранимых в памяти процесса
+_MEMORY_ENTRIES = 4096
+
+# Количество отложенных записей, после которого они сбрасываются на диск
+_FLUSH_THRESHOLD = 512
+
+# Таймаут ожидания блокировки базы другим процессом (секунды)
+_BUSY_TIMEOUT = 5.0
+
+
+class ContentHits:
+    """Результаты проверки паттернов для одного фрагмента содержимого."""
+
+    def __init__(self, cache: 'PatternHitCache', key: str, content: str, hits: Dict[str, bool]):
+        self._cache = cache
+        self._key = key
+        self._content = content
+        self._hits = hits
+
+    def search(self, pattern: Union[Rule, str], flags: int = 0) -> bool:
+        """Аналог bool(re.search(pattern, content, flags)) с кэшированием результата.
+
+        Для скомпилированного паттерна (Rule с теми же флагами) используется
+        готовый regex, для строки - re.search.
+        """
+        if isinstance(pattern, Rule) and pattern.flags == flags:
+            hit_key = pattern.key
+            hit = self._hits.get(hit_key)
+            if hit is None:
+                hit = pattern.regex.search(self._content) is not None
+                self._cache._record(self._key, self._hits, hit_key, hit)
+            return hit
+
+        hit_key = f'{flags}:{pattern}'
+        hit = self._hits.get(hit_key)
+        if hit is None:
+            hit = re.search(pattern, self._content, flags) is not None
+            self._cache._record(self._key, self._hits, hit_key, hit)
+        return hit
+
+
+class PatternHitCache:
+    """Кэш результатов паттернов с ключом по хэшу содержимого."""
+
+    def __init__(self, path: Optional[Path], ruleset_version: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Инициализация кэша.
+
+        Args:
+            path: Путь к файлу базы SQLite (None - только кэш в памяти)
+            ruleset_version: Версия набора правил (часть ключа)
+            max_entries: Максимальное количество записей на диске
+        """
+        self.path = Path(path) if path else None
+        self.ruleset_version = ruleset_version
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._memory: 'OrderedDict[str, Dict[str, bool]]' = OrderedDict()
+        self._dirty: Dict[str, Dict[str, bool]] = {}
+        self._touched: Dict[str, float] = {}
+        self._local = threading.local()
+        _instances.add(self)
+
+        if self.path:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Кэш паттернов {self.path} недоступен, используется только память: {e}")
+                self.path = None
+
+    def hits_for(self, content: str) -> ContentHits:
+        """Получить (или создать) результаты паттернов для содержимого."""
+        digest = hashlib.blake2b(content.encode('utf-8', 'surrogatepass'), digest_size=20).hexdigest()
+        key = f'{self.ruleset_version}:{digest}'
+
+        with self._lock:
+            hits = self._memory.get(key)
+            if hits is not None:
+                self._memory.move_to_end(key)
+                self._touched[key] = time.time()
+                return ContentHits(self, key, content, hits)
+
+        hits = self._load(key)
+        if hits is None:
+            hits = {}
+
+        with self._lock:
+            # Другой поток мог загрузить ту же запись - используем общий словарь
+            hits = self._memory.setdefault(key, hits)
+            self._memory.move_to_end(key)
+            while len(self._memory) > _MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+        return ContentHits(self, key, content, hits)
+
+    def flush(self):
+        """Сохранить новые результаты на диск и применить ограничение размера."""
+        if not self.path:
+            with self._lock:
+                self._dirty.clear()
+                self._touched.clear()
+            return
+
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            touched, self._touched = self._touched, {}
+            rows = [(key, json.dumps(hits), time.time()) for key, hits in dirty.items()]
+
+        if not rows and not touched:
+            return
+
+        try:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO pattern_hits (key, hits, last_used) VALUES (?, ?, ?)',
+                    rows,
+                )
+                conn.executemany(
+                    'UPDATE pattern_hits SET last_used = ? WHERE key = ?',
+                    [(last_used, key) for key, last_used in touched.items() if key not in dirty],
+                )
+                self._evict(conn)
+        except sqlite3.Error as e:
+            # Кэш не критичен для анализа - при конфликте просто теряем запись
+            logger.debug(f"Не удалось сохранить кэш паттернов: {e}")
+
+    def _record(self, key: str, hits: Dict[str, bool], hit_key: str, hit: bool):
+        """Записать результат паттерна (словарь hits может быть общим для потоков)."""
+        with self._lock:
+            hits[hit_key] = hit
+            self._dirty[key] = hits
+            pending = len(self._dirty)
+        if pending >= _FLUSH_THRESHOLD:
+            self.flush()
+
+    def _load(self, key: str) -> Optional[Dict[str, bool]]:
+        if not self.path:
+            return None
+        try:
+            row = self._connection().execute(
+                'SELECT hits FROM pattern_hits WHERE key = ?', (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.debug(f"Ошибка чтения кэша паттернов: {e}")
+            return None
+        if row is None:
+            return None
+
+        with self._lock:
+            self._touched[key] = time.time()
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Удалить давно не использованные записи сверх лимита (с запасом 10%)."""
+        count = conn.execute('SELECT COUNT(*) FROM pattern_hits').fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * 0.9)
+        conn.execute(
+            'DELETE FROM pattern_hits WHERE key IN '
+            '(SELECT key FROM pattern_hits ORDER BY last_used, rowid LIMIT ?)',
+            (excess,),
+        )
+        logger.info(f"Кэш паттернов: удалено {excess} старых записей")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Отдельное соединение для каждого потока (открывается при первом обращении)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            try:
+                conn = sqlite3.connect(str(self.path), timeout=_BUSY_TIMEOUT)
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('PRAGMA synchronous=NORMAL')
+                self._init_schema(conn)
+            except sqlite3.Error as e:
+                logger.warning(f"Кэш паттернов {self.path} недоступен, используется только память: {e}")
+                self.path = None
+                raise
+            self._local.conn = conn
+        return conn
+
+    def _reset_after_fork(self):
+        """
+        Сбросить состояние, унаследованное от родителя при fork.
+
+        Соединение SQLite нельзя использовать в дочернем процессе: дочерний
+        процесс откроет свое. Соединения родителя не закрываются (закрытие
+        может выполнить checkpoint WAL из чужого процесса), а сохраняются
+        в _inherited_connections. Отложенные записи сохранит сам родитель.
+        """
+        _inherited_connections.append(self._local)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._dirty = {}
+        self._touched = {}
+
+    @staticmethod
+    def _init_schema(conn: sqlite3.Connection):
+        with conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS pattern_hits ('
+                'key TEXT PRIMARY KEY, hits TEXT NOT NULL, last_used REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pattern_hits_last_used ON pattern_hits (last_used)')
+
+
+_caches: Dict[tuple, PatternHitCache] = {}
+_caches_lock = threading.Lock()
+
+# Все кэши процесса (для сброса соединений после fork)
+_instances: 'weakref.WeakSet[PatternHitCache]' = weakref.WeakSet()
+
+# Соединения, унаследованные от родительского процесса (не используются и не закрываются)
+_inherited_connections: List[threading.local] = []
+
+
+def _reset_caches_after_fork():
+    global _caches_lock
+    for cache in list(_instances):
+        cache._reset_after_fork()
+    _caches_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_caches_after_fork)
+
+
+def get_pattern_hit_cache(config_loader) -> PatternHitCache:
+    """
+    Общий для процесса кэш паттернов для конфигурации детектора.
+
+    Настройки читаются из секции pattern_cache конфигурации:
+    enabled, path, max_entries. Путь также можно задать переменной
+    окружения STACK_RECOGNIZE_PATTERN_CACHE.
+    """
+    settings = config_loader.pattern_cache
+    path = None
+    if settings.get('enabled', True):
+        path = os.environ.get('STACK_RECOGNIZE_PATTERN_CACHE') or settings.get('path') or DEFAULT_CACHE_PATH
+        path = Path(path).expanduser()
+    max_entries = settings.get('max_entries', DEFAULT_MAX_ENTRIES)
+    ruleset_version = get_ruleset(config_loader).version
+
+    cache_key = (str(path), ruleset_version, max_entries)
+    with _caches_lock:
+        cache = _caches.get(cache_key)
+        if cache is None:
+            cache = PatternHitCache(path, ruleset_version, max_entries)
+            _caches[cache_key] = cache
+        return cache
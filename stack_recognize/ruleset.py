@@ -0,0 +1,248 @@
+"""Скомпилированный набор правил детектора.
+
+Набор правил объединяет конфигурацию detect_config.json и встроенные
+паттерны PatternConfig: все регулярные выражения компилируются один раз
+при построении набора (а не неявно через внутренний кэш модуля re на
+каждом поиске). Набор неизменяемый и строится один раз на процесс, поэтому
+его безопасно разделять между потоками, а после загрузки до fork - между
+дочерними процессами (страницы памяти остаются общими, copy-on-write).
+
+Для быстрого старта исходные данные набора (конфигурация, таблицы
+паттернов, версия) сохраняются в компактный файл (marshal) с ключом по
+хэшу конфигурации и встроенных паттернов: при следующем запуске не нужно
+разбирать JSON и вычислять версию.
+"""
+import hashlib
+import json
+import logging
+import marshal
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .config import ConfigLoader, PatternConfig
+
+logger = logging.getLogger(__name__)
+
+# Версия формата записей кэша паттернов и файла набора правил
+# (меняется при несовместимых изменениях)
+CACHE_FORMAT_VERSION = 1
+BUNDLE_FORMAT_VERSION = 1
+
+# Директория файлов наборов правил по умолчанию
+DEFAULT_BUNDLE_DIR = Path.home() / '.cache' / 'stack_recognize' / 'rulesets'
+
+# Таблицы паттернов PatternConfig, сравниваемые без учета регистра
+_IGNORECASE_TABLES = ('FRAMEWORK_PATTERNS', 'TEST_RUNNER_PATTERNS', 'DATABASE_PATTERNS', 'CLOUD_PATTERNS')
+
+
+class Rule(str):
+    """
+    Скомпилированный паттерн.
+
+    Является строкой с исходным паттерном, поэтому работает везде, где
+    раньше использовалась строка (проверки подстрок, логирование).
+    """
+
+    def __new__(cls, pattern: str, flags: int = 0):
+        rule = super().__new__(cls, pattern)
+        rule.flags = flags
+        rule.regex = re.compile(pattern, flags)
+        # Ключ результата в кэше паттернов (совпадает с ключом строкового паттерна)
+        rule.key = f'{flags}:{pattern}'
+        return rule
+
+    def __reduce__(self):
+        return (Rule, (str(self), self.flags))
+
+
+def compile_rules(patterns: Iterable[str], flags: int = 0) -> Tuple[Rule, ...]:
+    """Скомпилировать список паттернов."""
+    return tuple(Rule(pattern, flags) for pattern in patterns)
+
+
+def compute_ruleset_version(config_data: Dict[str, Any]) -> str:
+    """Версия набора правил: хэш встроенных паттернов и конфигурации детектора."""
+    payload = json.dumps(
+        [CACHE_FORMAT_VERSION, _builtin_patterns(), config_data],
+        sort_keys=True, default=sorted, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _builtin_patterns() -> Dict[str, Any]:
+    return {name: value for name, value in vars(PatternConfig).items() if name.isupper()}
+
+
+class Ruleset:
+    """Неизменяемый скомпилированный набор правил детектора."""
+
+    __slots__ = (
+        'config_path', 'config_data', 'version', 'config_loader',
+        'entry_point_patterns', 'standard_entry_files', 'framework_patterns',
+        'test_runner_patterns', 'database_patterns', 'cloud_patterns',
+        'frontend_frameworks', 'backend_frameworks', 'mobile_frameworks',
+    )
+
+    def __init__(self, config_path: Path, config_data: Dict[str, Any], patterns: Dict[str, Any], version: str):
+        """
+        Args:
+            config_path: Путь к файлу конфигурации
+            config_data: Конфигурация детектора
+            patterns: Таблицы паттернов (атрибуты PatternConfig)
+            version: Версия набора правил (часть ключей кэша паттернов)
+        """
+        fields = {
+            'config_path': config_path,
+            'config_data': config_data,
+            'version': version,
+            'config_loader': ConfigLoader.from_data(config_path, config_data),
+            'entry_point_patterns': MappingProxyType({
+                language: tuple((Rule(pattern), framework, confidence) for pattern, framework, confidence in rules)
+                for language, rules in patterns['ENTRY_POINT_PATTERNS'].items()
+            }),
+            'standard_entry_files': MappingProxyType({
+                language: tuple(files) for language, files in patterns['STANDARD_ENTRY_FILES'].items()
+            }),
+            'frontend_frameworks': frozenset(patterns['FRONTEND_FRAMEWORKS']),
+            'backend_frameworks': frozenset(patterns['BACKEND_FRAMEWORKS']),
+            'mobile_frameworks': frozenset(patterns['MOBILE_FRAMEWORKS']),
+        }
+        for table in _IGNORECASE_TABLES:
+            fields[table.lower()] = MappingProxyType({
+                name: compile_rules(rules, re.IGNORECASE) for name, rules in patterns[table].items()
+            })
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Набор правил неизменяем")
+
+    @classmethod
+    def from_config(cls, config_path: Path, config_data: Dict[str, Any]) -> 'Ruleset':
+        """Построить набор из конфигурации и встроенных паттернов."""
+        return cls(config_path, config_data, _builtin_patterns(), compute_ruleset_version(config_data))
+
+    def to_bundle(self, bundle_key: str) -> bytes:
+        """Сериализовать исходные данные набора (regex компилируются при загрузке)."""
+        return marshal.dumps((
+            BUNDLE_FORMAT_VERSION,
+            bundle_key,
+            self.version,
+            self.config_data,
+            _marshalable(_builtin_patterns()),
+        ))
+
+    @classmethod
+    def from_bundle(cls, config_path: Path, data: bytes, bundle_key: str) -> Optional['Ruleset']:
+        """Загрузить набор из файла (None - файл устарел или поврежден)."""
+        try:
+            bundle_format, key, version, config_data, patterns = marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            return None
+        if bundle_format != BUNDLE_FORMAT_VERSION or key != bundle_key:
+            return None
+        return cls(config_path, config_data, patterns, version)
+
+
+def _marshalable(value: Any) -> Any:
+    """Множества в таблицах паттернов - в отсортированные списки (для стабильного файла)."""
+    if isinstance(value, dict):
+        return {key: _marshalable(item) for key, item in value.items()}
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return value
+
+
+def _bundle_key(config_bytes: bytes) -> str:
+    """Ключ файла набора: хэш конфигурации и исходника встроенных паттернов."""
+    digest = hashlib.sha256()
+    digest.update(f'{BUNDLE_FORMAT_VERSION}:{CACHE_FORMAT_VERSION}\0'.encode())
+    digest.update(config_bytes)
+    digest.update(b'\0')
+    digest.update(Path(__file__).with_name('config.py').read_bytes())
+    return digest.hexdigest()[:24]
+
+
+def _bundle_dir() -> Optional[Path]:
+    """Директория файлов наборов (STACK_RECOGNIZE_RULESET_DIR; пустое значение - отключено)."""
+    value = os.environ.get('STACK_RECOGNIZE_RULESET_DIR')
+    if value is None:
+        return DEFAULT_BUNDLE_DIR
+    return Path(value).expanduser() if value else None
+
+
+def _build_ruleset(config_path: Path) -> Ruleset:
+    try:
+        config_bytes = config_path.read_bytes()
+    except FileNotFoundError:
+        return Ruleset.from_config(config_path, {})
+
+    bundle_key = _bundle_key(config_bytes)
+    bundle_dir = _bundle_dir()
+    bundle_path = bundle_dir / f'ruleset-{bundle_key}.bin' if bundle_dir else None
+
+    if bundle_path is not None:
+        try:
+            ruleset = Ruleset.from_bundle(config_path, bundle_path.read_bytes(), bundle_key)
+        except OSError:
+            ruleset = None
+        if ruleset is not None:
+            return ruleset
+
+    try:
+        config_data = json.loads(config_bytes.decode('utf-8'))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Ошибка парсинга конфигурационного файла: {e}")
+    ruleset = Ruleset.from_config(config_path, config_data)
+
+    if bundle_path is not None:
+        try:
+            bundle_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(bundle_dir), prefix='.ruleset-')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(ruleset.to_bundle(bundle_key))
+            os.replace(tmp_path, bundle_path)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Не удалось сохранить набор правил в {bundle_dir}: {e}")
+    return ruleset
+
+
+_rulesets: Dict[tuple, Ruleset] = {}
+_rulesets_lock = threading.Lock()
+
+
+def load_ruleset(config_path: Optional[str] = None) -> Ruleset:
+    """
+    Общий для процесса набор правил для файла конфигурации.
+
+    Набор перестраивается только при изменении файла конфигурации.
+
+    Args:
+        config_path: Путь к JSON файлу конфигурации. Если None, используется detect_config.json
+    """
+    if config_path is None:
+        config_path = Path(__file__).parent / "detect_config.json"
+    config_path = Path(config_path)
+    try:
+        stat = config_path.stat()
+        cache_key = (str(config_path.resolve()), stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        cache_key = (str(config_path), None, None)
+
+    with _rulesets_lock:
+        ruleset = _rulesets.get(cache_key)
+        if ruleset is None:
+            ruleset = _build_ruleset(config_path)
+            _rulesets[cache_key] = ruleset
+        return ruleset
+
+
+def get_ruleset(config_loader: ConfigLoader) -> Ruleset:
+    """Набор правил для конфигурации детектора (см. load_ruleset)."""
+    return load_ruleset(config_loader.config_path)
+
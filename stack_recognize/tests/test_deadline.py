@@ -0,0 +1,182 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextvars import copy_context
+
+import pytest
+
+from stack_recognize.deadline import (
+    Deadline, DeadlineExceeded, _current_deadline, check_deadline, deadline_scope, run_limited,
+)
+from stack_recognize.detector import ProjectStackDetector
+
+MONOREPO = {
+    "package.json": json.dumps({"name": "root", "private": True, "workspaces": ["packages/*"]}),
+    "packages/api/package.json": json.dumps({"name": "api", "dependencies": {"express": "^4.18.0"}}),
+    "packages/api/server.js": "const express = require('express');\n",
+    "packages/web/package.json": json.dumps({"name": "web", "dependencies": {"react": "^18.0.0"}}),
+    "packages/web/src/index.jsx": "import React from 'react';\n",
+}
+
+
+def test_check_deadline_without_scope_is_noop():
+    check_deadline()
+
+
+@pytest.mark.parametrize("seconds", [None, 0])
+def test_empty_scope_has_no_deadline(seconds):
+    with deadline_scope("analyze", seconds) as deadline:
+        assert deadline is None
+        check_deadline()
+
+
+def test_expired_deadline_raises_and_scope_is_restored():
+    with deadline_scope("outer", 60) as outer:
+        with deadline_scope("inner", 0.01) as inner:
+            time.sleep(0.02)
+            with pytest.raises(DeadlineExceeded) as exc_info:
+                check_deadline()
+            assert exc_info.value.phase == "inner" and exc_info.value.seconds == 0.01
+            assert inner.remaining() < 0
+        assert _current_deadline.get() is outer
+        check_deadline()
+    assert _current_deadline.get() is None
+
+
+def test_deadline_is_not_caught_by_except_exception():
+    with pytest.raises(DeadlineExceeded):
+        try:
+            Deadline("analyze", 0).check()
+        except Exception:
+            pytest.fail("DeadlineExceeded перехвачен как Exception")
+
+
+def test_deadline_reaches_threads_only_through_copied_context():
+    seen = {}
+
+    def probe(name):
+        seen[name] = _current_deadline.get()
+
+    with deadline_scope("analyze", 60) as deadline:
+        plain = threading.Thread(target=probe, args=("plain",))
+        copied = threading.Thread(target=copy_context().run, args=(probe, "copied"))
+        for thread in (plain, copied):
+            thread.start()
+            thread.join()
+
+    assert seen == {"plain": None, "copied": deadline}
+
+
+def _git(*args, cwd=None):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def monorepo_url(tmp_path):
+    repo = tmp_path / "origin"
+    for relative, content in MONOREPO.items():
+        path = repo / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+    _git("init", "--quiet", cwd=repo)
+    _git("add", ".", cwd=repo)
+    _git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "--quiet", "-m", "init", cwd=repo)
+    return repo.as_uri()
+
+
+@pytest.fixture
+def detector(tmp_path, monkeypatch):
+    monkeypatch.setenv("STACK_RECOGNIZE_WORK_ROOT", str(tmp_path / "work"))
+    monkeypatch.setenv("STACK_RECOGNIZE_PATTERN_CACHE", str(tmp_path / "pattern_hits.sqlite3"))
+    detector = ProjectStackDetector()
+    detector.worktree_pool = None
+    return detector
+
+
+class _ProbeAnalyzer:
+    """Анализатор, запоминающий дедлайн в потоке; в компонентах ждет истечения дедлайна."""
+
+    def __init__(self, stall_components=False):
+        self.stall_components = stall_components
+        self.seen = []
+
+    def analyze(self, path, stack):
+        deadline = _current_deadline.get()
+        component = path.parent.name == "packages"
+        self.seen.append((component, threading.current_thread() is threading.main_thread(), deadline))
+        if component and self.stall_components:
+            while True:
+                check_deadline()
+                time.sleep(0.01)
+
+
+def test_deadline_propagates_into_component_threads(detector, monorepo_url):
+    probe = _ProbeAnalyzer()
+    detector.analyzers = (*detector.analyzers, probe)
+
+    stack = detector.detect_stack(monorepo_url, analyze_timeout=60)
+
+    assert stack.incomplete_reason is None
+    assert set(stack.components) == {"packages/api", "packages/web"}
+    components = [(main, deadline) for component, main, deadline in probe.seen if component]
+    assert len(components) == 2
+    assert all(not main and deadline is not None and deadline.phase == "analyze" for main, deadline in components)
+
+
+def test_deadline_in_component_thread_returns_partial_stack(detector, monorepo_url):
+    detector.analyzers = (*detector.analyzers, _ProbeAnalyzer(stall_components=True))
+
+    started = time.monotonic()
+    stack = detector.detect_stack(monorepo_url, analyze_timeout=0.5)
+
+    assert time.monotonic() - started < 10
+    assert "analyze" in stack.incomplete_reason
+    assert any(hint.startswith("Анализ прерван") for hint in stack.hints)
+    # Сводный анализ успел завершиться, анализ компонентов - нет
+    assert stack.languages and stack.component_tree is not None
+    assert stack.components == {}
+    assert "clone_seconds" in stack.stats and "analyze_seconds" not in stack.stats
+
+
+def test_run_limited_returns_output():
+    result = run_limited([sys.executable, "-c", "print('ok')"], phase="clone", timeout=30)
+    assert result.returncode == 0 and result.stdout == "ok\n"
+
+
+def test_run_limited_raises_on_failure():
+    with pytest.raises(subprocess.CalledProcessError) as exc_info:
+        run_limited([sys.executable, "-c", "import sys; sys.exit('boom')"], phase="clone", timeout=30)
+    assert exc_info.value.returncode == 1 and "boom" in exc_info.value.stderr
+
+
+def _alive(pid):
+    """Процесс существует и не является зомби (зомби может не собрать init контейнера)."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            state = f.read().rsplit(")", 1)[1].split()[0]
+    except FileNotFoundError:
+        return False
+    return state not in ("Z", "X")
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="проверка процессов через /proc")
+def test_run_limited_kills_process_group_on_timeout(tmp_path):
+    pid_file = tmp_path / "child.pid"
+    script = f"sleep 60 & echo $! > {pid_file}; wait"
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded) as exc_info:
+        run_limited(["sh", "-c", script], phase="clone", timeout=0.5)
+
+    assert time.monotonic() - started < 10
+    assert exc_info.value.phase == "clone" and exc_info.value.seconds == 0.5
+    # Дочерний sleep завершен вместе с группой процессов, а не оставлен работать
+    child = int(pid_file.read_text())
+    for _ in range(100):
+        if not _alive(child):
+            break
+        time.sleep(0.05)
+    assert not _alive(child)
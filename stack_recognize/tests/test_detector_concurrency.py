@@ -0,0 +1,109 @@
+import asyncio
+import dataclasses
+import json
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from stack_recognize.detector import ProjectStackDetector
+
+# Каждый репозиторий анализируется несколько раз за прогон
+ROUNDS = 6
+
+REPOS = {
+    "flask-service": {
+        "requirements.txt": "flask==3.0.0\npsycopg2-binary==2.9.9\npytest==8.0.0\n",
+        "app.py": "from flask import Flask\napp = Flask(__name__)\n\nif __name__ == '__main__':\n    app.run()\n",
+        "tests/test_app.py": "def test_ok():\n    assert True\n",
+        "Dockerfile": "FROM python:3.12-slim\nCOPY . .\nCMD [\"python\", \"app.py\"]\n",
+    },
+    "node-monorepo": {
+        "package.json": json.dumps({"name": "root", "private": True, "workspaces": ["packages/*"]}),
+        "packages/api/package.json": json.dumps({
+            "name": "api", "main": "server.js",
+            "dependencies": {"express": "^4.18.0", "redis": "^4.0.0"},
+            "scripts": {"start": "node server.js", "test": "jest"},
+            "devDependencies": {"jest": "^29.0.0"},
+        }),
+        "packages/api/server.js": "const express = require('express');\nexpress().listen(3000);\n",
+        "packages/web/package.json": json.dumps({
+            "name": "web", "dependencies": {"react": "^18.0.0"}, "scripts": {"build": "vite build"},
+        }),
+        "packages/web/src/index.jsx": "import React from 'react';\n",
+    },
+    "go-service": {
+        "go.mod": "module example.com/svc\n\ngo 1.22\n\nrequire github.com/gin-gonic/gin v1.9.1\n",
+        "main.go": "package main\n\nimport \"github.com/gin-gonic/gin\"\n\nfunc main() { gin.Default().Run() }\n",
+        ".gitlab-ci.yml": "test:\n  script: go test ./...\n",
+    },
+}
+
+
+def _git(*args, cwd=None):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture(scope="module")
+def repo_urls(tmp_path_factory):
+    root = tmp_path_factory.mktemp("origin")
+    urls = []
+    for name, files in REPOS.items():
+        repo = root / name
+        for relative, content in files.items():
+            path = repo / relative
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content, encoding="utf-8")
+        _git("init", "--quiet", cwd=repo)
+        _git("add", ".", cwd=repo)
+        _git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "--quiet", "-m", "init", cwd=repo)
+        urls.append(repo.as_uri())
+    return urls
+
+
+@pytest.fixture(params=["pool", "temp-dir"])
+def detector(request, tmp_path, monkeypatch):
+    monkeypatch.setenv("STACK_RECOGNIZE_WORK_ROOT", str(tmp_path / "work"))
+    monkeypatch.setenv("STACK_RECOGNIZE_PATTERN_CACHE", str(tmp_path / "pattern_hits.sqlite3"))
+    detector = ProjectStackDetector()
+    if request.param == "pool":
+        assert detector.worktree_pool is not None
+    else:
+        detector.worktree_pool = None
+    return detector
+
+
+def _result(stack):
+    """Результат анализа без времени этапов."""
+    result = dataclasses.asdict(stack)
+    result.pop("stats")
+    return result
+
+
+def _sequential(detector, urls):
+    return {url: _result(detector.detect_stack(url)) for url in urls}
+
+
+def test_threads_match_sequential_run(detector, repo_urls):
+    expected = _sequential(detector, repo_urls)
+    assert all(result["languages"] for result in expected.values())
+
+    urls = repo_urls * ROUNDS
+    with ThreadPoolExecutor(max_workers=12) as executor:
+        results = list(executor.map(detector.detect_stack, urls))
+
+    for url, stack in zip(urls, results):
+        assert _result(stack) == expected[url]
+
+
+def test_asyncio_gather_matches_sequential_run(detector, repo_urls):
+    expected = _sequential(detector, repo_urls)
+
+    urls = repo_urls * ROUNDS
+
+    async def detect_all():
+        return await asyncio.gather(*(detector.detect_stack_async(url) for url in urls))
+
+    results = asyncio.run(detect_all())
+    for url, stack in zip(urls, results):
+        assert _result(stack) == expected[url]
@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import pytest
+
+from stack_recognize.utils import classify_generated_file, read_source_sample
+
+CERT = "MIIDdzCCAl+gAwIBAgIEAgAAuTANBgkqhkiG9w0BAQUFADBaMQswCQYDVQQGEwJJ" * 40
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("third_party/lib/x.py", "vendored"),
+    ("external/sdk/client.go", "vendored"),
+    ("bower_components/jquery/jquery.js", "vendored"),
+    # Пакеты проекта с "сторонними" именами глубже корня
+    ("src/main/java/com/acme/external/PaymentClient.java", None),
+    ("app/vendors/models.py", None),
+    ("external.py", None),
+    ("static/app.min.js", "minified"),
+    ("api/v1/service.pb.go", "generated"),
+    ("proto/service_pb2_grpc.py", "generated"),
+    ("src/main.py", None),
+])
+def test_classify_by_path(path, expected):
+    assert classify_generated_file(Path(path)) == expected
+
+
+@pytest.mark.parametrize("header", [
+    "// Code generated by protoc-gen-go. DO NOT EDIT.\npackage api\n",
+    "# Generated by the protocol buffer compiler.  DO NOT EDIT!\n# source: api.proto\n",
+    "/*\n * @generated SignedSource<<abc>>\n */\nexport const x = 1;\n",
+    "// Generated by the gRPC C++ plugin.\n",
+    "#!/usr/bin/env python\n# This file was automatically generated by SWIG\nimport os\n",
+    "<!-- Auto-generated by the build, changes will be lost -->\n<root/>\n",
+])
+def test_known_generator_headers(header):
+    assert classify_generated_file(Path("src/module.txt"), header) == "generated"
+
+
+@pytest.mark.parametrize("content", [
+    # DO NOT EDIT без заголовка генератора - обычный файл настроек
+    "# Settings for production. DO NOT EDIT without review\nDEBUG = False\n",
+    'HELP = "This value is auto-generated on first start"\n',
+    "import os\n\n\ndef main():\n    return os.getcwd()\n",
+    # Django-миграции пишутся и правятся вручную
+    "# Generated by Django 4.2 on 2024-01-01 10:00\nfrom django.db import migrations\n",
+])
+def test_regular_files_are_not_generated(content):
+    assert classify_generated_file(Path("app/settings.py"), content) is None
+
+
+def test_single_long_line_is_not_minified():
+    manifest = (
+        "apiVersion: v1\nkind: Secret\nmetadata:\n  name: tls\n  namespace: prod\n"
+        f"type: kubernetes.io/tls\ndata:\n  tls.crt: {CERT}\n  tls.key: c2VjcmV0\n"
+    )
+    assert classify_generated_file(Path("k8s/secret.yaml"), manifest) is None
+
+
+def test_mostly_long_lines_are_minified():
+    line = "var a=function(b){return b*2};" * 40
+    assert classify_generated_file(Path("static/app.js"), line) == "minified"
+    assert classify_generated_file(Path("static/app.js"), f"/*! v1 */\n{line}\n{line}\n") == "minified"
+
+
+def test_read_source_sample_skips_generated_content(tmp_path):
+    (tmp_path / "api.go").write_text("// Code generated by mockgen. DO NOT EDIT.\npackage api\n")
+    (tmp_path / "settings.py").write_text("# DO NOT EDIT by hand\nimport django\n")
+    assert read_source_sample(tmp_path / "api.go", tmp_path) == ""
+    assert "import django" in read_source_sample(tmp_path / "settings.py", tmp_path)
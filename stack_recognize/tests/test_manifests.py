@@ -0,0 +1,95 @@
+import json
+import random
+
+import pytest
+
+from stack_recognize import manifests
+from stack_recognize.manifests import read_json_keys, read_pom_sections
+
+
+@pytest.fixture(params=[1, 3, 64 * 1024])
+def chunk_size(request, monkeypatch):
+    """Маленькие куски проверяют значения, строки и экранирование на границах кусков."""
+    monkeypatch.setattr(manifests, "_CHUNK_SIZE", request.param)
+    return request.param
+
+
+def _write(tmp_path, text):
+    path = tmp_path / "package.json"
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def _random_value(rng, depth=0):
+    kind = rng.choice(["str", "num", "bool", "null", "list", "dict"] if depth < 3 else ["str", "num"])
+    if kind == "str":
+        return "".join(rng.choice('ab"\\/{}[]:,ю\n\t') for _ in range(rng.randint(0, 8)))
+    if kind == "num":
+        return rng.choice([0, -1, 12345678901234, 1.5e-7, 3.25])
+    if kind == "bool":
+        return rng.random() < 0.5
+    if kind == "null":
+        return None
+    if kind == "list":
+        return [_random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {f"k{i}\"}}": _random_value(rng, depth + 1) for i in range(rng.randint(0, 4))}
+
+
+def test_matches_json_load(tmp_path, chunk_size):
+    rng = random.Random(chunk_size)
+    for _ in range(30):
+        data = {key: _random_value(rng) for key in ("name", "dependencies", "scripts", "x\"y", "workspaces")}
+        path = _write(tmp_path, json.dumps(data, indent=rng.choice([None, 2]), ensure_ascii=rng.random() < 0.5))
+        keys = ("dependencies", "scripts", "workspaces", "x\"y", "missing")
+        assert read_json_keys(path, keys) == {key: data[key] for key in keys if key in data}
+
+
+def test_large_value_is_decoded_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifests, "_CHUNK_SIZE", 1024)
+    calls = []
+    original_loads = manifests.json.loads
+    monkeypatch.setattr(manifests.json, "loads", lambda text: calls.append(len(text)) or original_loads(text))
+    big = {f"pkg-{i}": "^1.0.0" for i in range(50_000)}
+    path = _write(tmp_path, json.dumps({"description": "x" * 500_000, "dependencies": big}))
+
+    assert read_json_keys(path, ["dependencies"]) == {"dependencies": big}
+    # Ключи верхнего уровня и одно декодирование значения
+    assert len(calls) == 3
+
+
+def test_stops_after_all_keys(tmp_path):
+    path = _write(tmp_path, '{"scripts": {"a": "b"}, "dependencies": {}, "devDependencies": {}, "workspaces": [] ' + "broken")
+    assert read_json_keys(path)["workspaces"] == []
+
+
+def test_first_duplicate_wins(tmp_path, chunk_size):
+    path = _write(tmp_path, '{"scripts": 1, "scripts": 2}')
+    assert read_json_keys(path, ["scripts"]) == {"scripts": 1}
+
+
+def test_byte_cap_returns_partial_result(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifests, "_CHUNK_SIZE", 16)
+    path = _write(tmp_path, json.dumps({"scripts": {"a": "b"}, "dependencies": {"x": "y" * 1000}}))
+    assert read_json_keys(path, ["scripts", "dependencies"], max_bytes=64) == {"scripts": {"a": "b"}}
+
+
+@pytest.mark.parametrize("text", ["", "[]", '{"scripts": {', '{"scripts": [1,]}'])
+def test_invalid_json(tmp_path, text):
+    with pytest.raises(json.JSONDecodeError):
+        read_json_keys(_write(tmp_path, text), ["scripts"])
+
+
+def test_pom_sections(tmp_path):
+    path = tmp_path / "pom.xml"
+    path.write_text(
+        '<project xmlns="http://maven.apache.org/POM/4.0.0"><modules><module>api</module><module>web</module></modules>'
+        "<properties><java.version>17</java.version></properties></project>",
+        encoding="utf-8",
+    )
+    assert read_pom_sections(path) == {"modules": ["api", "web"], "properties": {"java.version": "17"}}
+
+
+def test_pom_sections_fall_back_to_regex(tmp_path):
+    path = tmp_path / "pom.xml"
+    path.write_text("<project><properties><java.version>21</java.version></properties><broken", encoding="utf-8")
+    assert read_pom_sections(path, ["properties"]) == {"properties": {"java.version": "21"}}
@@ -0,0 +1,125 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+
+import pytest
+
+from stack_recognize.pattern_cache import PatternHitCache
+from stack_recognize.ruleset import compute_ruleset_version
+
+
+def _rows(path):
+    with sqlite3.connect(str(path)) as conn:
+        return dict(conn.execute("SELECT key, hits FROM pattern_hits").fetchall())
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="нужен fork")
+def test_forked_child_opens_its_own_connection(tmp_path):
+    path = tmp_path / "hits.sqlite3"
+    cache = PatternHitCache(path, "v1")
+    assert not path.exists()
+    parent_conn = cache._connection()
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_fd)
+            inherited = getattr(cache._local, "conn", None)
+            child_conn = cache._connection()
+            cache.hits_for("FROM python:3.12").search("python")
+            cache.flush()
+            report = {"inherited": inherited is not None, "same": child_conn is parent_conn}
+            os.write(write_fd, json.dumps(report).encode())
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        report = json.loads(pipe.read())
+    os.waitpid(pid, 0)
+
+    assert report == {"inherited": False, "same": False}
+    assert cache._connection() is parent_conn
+    assert list(_rows(path).values()) == ['{"0:python": true}']
+
+
+def test_ruleset_version_is_part_of_the_key(tmp_path):
+    path = tmp_path / "hits.sqlite3"
+    first = PatternHitCache(path, "v1")
+    assert first.hits_for("FROM python:3.12").search("python")
+    first.flush()
+
+    # Та же версия правил - результат читается с диска, без повторного поиска
+    same = PatternHitCache(path, "v1")
+    assert same.hits_for("FROM python:3.12")._hits == {"0:python": True}
+
+    # Новая версия правил не видит результаты старой
+    other = PatternHitCache(path, "v2")
+    assert other.hits_for("FROM python:3.12")._hits == {}
+    assert [key.split(":")[0] for key in _rows(path)] == ["v1"]
+
+
+def test_ruleset_version_changes_with_config():
+    base = compute_ruleset_version({"analyzers": {"python": True}})
+    assert compute_ruleset_version({"analyzers": {"python": True}}) == base
+    assert compute_ruleset_version({"analyzers": {"python": False}}) != base
+
+
+def test_max_entries_evicts_least_recently_used(tmp_path):
+    path = tmp_path / "hits.sqlite3"
+    cache = PatternHitCache(path, "v1", max_entries=10)
+    for i in range(10):
+        cache.hits_for(f"content {i}").search("content")
+    cache.flush()
+    assert len(_rows(path)) == 10
+
+    # Чтение записи с диска продлевает ее срок жизни
+    cache = PatternHitCache(path, "v1", max_entries=10)
+    assert cache.hits_for("content 0")._hits == {"0:content": True}
+    for i in range(10, 15):
+        cache.hits_for(f"content {i}").search("content")
+    cache.flush()
+
+    # 15 записей сверх лимита 10: остается 90% лимита, удаляются самые старые
+    survivors = PatternHitCache(path, "v1", max_entries=10)
+    kept = [i for i in range(15) if survivors.hits_for(f"content {i}")._hits]
+    assert kept == [0, 7, 8, 9, 10, 11, 12, 13, 14]
+
+
+def _write_entries(path, name, barrier, count):
+    cache = PatternHitCache(path, "v1")
+    barrier.wait()
+    for i in range(count):
+        cache.hits_for(f"{name} {i}").search(name)
+        cache.hits_for("shared").search(name)
+        if i % 10 == 0:
+            cache.flush()
+    cache.flush()
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="нужен fork")
+def test_concurrent_flush_from_two_processes(tmp_path):
+    path = tmp_path / "hits.sqlite3"
+    count = 200
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(2)
+    processes = [
+        context.Process(target=_write_entries, args=(path, name, barrier, count)) for name in ("alpha", "beta")
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+    assert [process.exitcode for process in processes] == [0, 0]
+
+    # Ни одна запись не потеряна из-за блокировки базы другим процессом
+    rows = _rows(path)
+    assert len(rows) == 2 * count + 1
+    cache = PatternHitCache(path, "v1")
+    for name in ("alpha", "beta"):
+        assert all(cache.hits_for(f"{name} {i}")._hits == {f"0:{name}": True} for i in range(count))
+    # Общая запись перезаписывается целиком: результаты другого процесса могут быть
+    # в ней, только если он сохранил их раньше
+    shared = json.loads(rows[cache.hits_for("shared")._key])
+    assert shared and set(shared) <= {"0:alpha", "0:beta"}
@@ -0,0 +1,84 @@
+import json
+
+from stack_recognize.workspaces import discover_workspace_components, iter_components
+
+
+def _tree(tmp_path, files):
+    for rel, content in files.items():
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+    return tmp_path
+
+
+def _paths(components):
+    return {c.path: sorted(c.sources) for c in iter_components(components)}
+
+
+def test_npm_workspaces_with_exclusions(tmp_path):
+    repo = _tree(tmp_path, {
+        "package.json": json.dumps({"workspaces": ["packages/*", "!packages/legacy", "../outside"]}),
+        "packages/a/package.json": "{}",
+        "packages/b/package.json": "{}",
+        "packages/legacy/package.json": "{}",
+        "packages/node_modules/x/package.json": "{}",
+    })
+    assert _paths(discover_workspace_components(repo)) == {"packages/a": ["npm"], "packages/b": ["npm"]}
+
+
+def test_yarn_object_form_and_pnpm(tmp_path):
+    repo = _tree(tmp_path, {
+        "package.json": json.dumps({"workspaces": {"packages": ["apps/*"], "nohoist": ["**"]}}),
+        "apps/web/package.json": "{}",
+        "pnpm-workspace.yaml": "packages:\n  - 'apps/*'\n  - \"tools/cli\"  # comment\n",
+        "tools/cli/package.json": "{}",
+    })
+    assert _paths(discover_workspace_components(repo)) == {"apps/web": ["npm", "pnpm"], "tools/cli": ["pnpm"]}
+
+
+def test_go_work(tmp_path):
+    repo = _tree(tmp_path, {
+        "go.work": "go 1.21\n\nuse (\n\t./api // main service\n\t./lib\n)\nuse ./tools\n",
+        "api/go.mod": "", "lib/go.mod": "", "tools/go.mod": "",
+    })
+    assert set(_paths(discover_workspace_components(repo))) == {"api", "lib", "tools"}
+
+
+def test_maven_modules_are_nested(tmp_path):
+    repo = _tree(tmp_path, {
+        "pom.xml": "<project><modules><module>services</module><module>common/pom.xml</module></modules></project>",
+        "services/pom.xml": "<project><modules><module>billing</module></modules></project>",
+        "services/billing/pom.xml": "<project/>",
+        "common/pom.xml": "<project/>",
+    })
+    components = discover_workspace_components(repo)
+    assert [c.path for c in components] == ["common", "services"]
+    assert [c.path for c in components[1].children] == ["services/billing"]
+
+
+def test_gradle_includes_with_project_dir(tmp_path):
+    repo = _tree(tmp_path, {
+        "settings.gradle.kts": (
+            'include(":app", ":lib:core")\n'
+            "// include(\":commented\")\n"
+            'project(":app").projectDir = file("apps/app")\n'
+        ),
+        "apps/app/build.gradle.kts": "",
+        "lib/core/build.gradle.kts": "",
+    })
+    assert set(_paths(discover_workspace_components(repo))) == {"apps/app", "lib/core"}
+
+
+def test_docker_dirs_skip_hidden_and_root(tmp_path):
+    repo = _tree(tmp_path, {
+        "Dockerfile": "FROM scratch",
+        "frontend/Dockerfile": "FROM node",
+        "worker/Dockerfile.dev": "FROM python",
+        ".devcontainer/Dockerfile": "FROM ubuntu",
+    })
+    assert _paths(discover_workspace_components(repo)) == {"frontend": ["docker"], "worker": ["docker"]}
+
+
+def test_invalid_manifest_is_ignored(tmp_path):
+    repo = _tree(tmp_path, {"package.json": "{broken", "api/Dockerfile": "FROM scratch"})
+    assert set(_paths(discover_workspace_components(repo))) == {"api"}
@@ -0,0 +1,111 @@
+import subprocess
+import threading
+import time
+
+import pytest
+
+from stack_recognize import worktrees
+from stack_recognize.worktrees import WorktreePool, background_remover, mirror_key
+
+pytestmark = pytest.mark.skipif(worktrees.fcntl is None, reason="нужен fcntl")
+
+
+def _git(*args, cwd=None):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def make_repo(tmp_path):
+    def make(name):
+        repo = tmp_path / "origin" / name
+        repo.mkdir(parents=True)
+        _git("init", "--quiet", cwd=repo)
+        (repo / "README.md").write_text(name, encoding="utf-8")
+        _git("add", ".", cwd=repo)
+        _git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "--quiet", "-m", "init", cwd=repo)
+        return repo.as_uri()
+    return make
+
+
+def _analyze(pool, url):
+    worktree = pool.checkout(url)
+    try:
+        return (worktree.path / "README.md").read_text(encoding="utf-8")
+    finally:
+        pool.release(worktree)
+
+
+def _lock(pool, url, name, operation):
+    return worktrees._lock_file(pool._lock_dir(mirror_key(url)) / name, operation)
+
+
+def test_mirror_used_by_another_process_is_not_evicted(tmp_path, make_repo):
+    pool = WorktreePool(tmp_path / "work", max_worktrees=0, max_mirrors=1)
+    first, second = make_repo("first"), make_repo("second")
+    assert _analyze(pool, first) == "first"
+
+    # Другой процесс с тем же work_root использует первое зеркало
+    other = _lock(pool, first, "users", worktrees.fcntl.LOCK_SH)
+    assert _analyze(pool, second) == "second"
+    assert (pool.mirrors_dir / f"{mirror_key(first)}.git").exists()
+
+    worktrees._unlock_file(other)
+    assert _analyze(pool, second) == "second"
+    background_remover.wait()
+    assert not (pool.mirrors_dir / f"{mirror_key(first)}.git").exists()
+    assert (pool.mirrors_dir / f"{mirror_key(second)}.git").exists()
+
+
+def test_mirror_in_use_holds_shared_lock(tmp_path, make_repo):
+    pool = WorktreePool(tmp_path / "work", max_worktrees=1)
+    url = make_repo("repo")
+    worktree = pool.checkout(url)
+    assert _lock(pool, url, "users", worktrees.fcntl.LOCK_EX | worktrees.fcntl.LOCK_NB) is None
+
+    # Директория в пуле продолжает ссылаться на зеркало
+    pool.release(worktree)
+    assert _lock(pool, url, "users", worktrees.fcntl.LOCK_EX | worktrees.fcntl.LOCK_NB) is None
+
+
+def test_fetch_waits_for_other_process(tmp_path, make_repo):
+    pool = WorktreePool(tmp_path / "work")
+    url = make_repo("repo")
+    other = _lock(pool, url, "fetch", worktrees.fcntl.LOCK_EX)
+    results = []
+    thread = threading.Thread(target=lambda: results.append(_analyze(pool, url)))
+    thread.start()
+    time.sleep(0.3)
+    assert thread.is_alive() and not results
+
+    worktrees._unlock_file(other)
+    thread.join(timeout=30)
+    assert results == ["repo"]
+
+
+def test_gc_runs_periodically(tmp_path, make_repo, monkeypatch):
+    calls = []
+    original = worktrees.run_limited
+
+    def recording(args, **kwargs):
+        calls.append(args)
+        return original(args, **kwargs)
+
+    monkeypatch.setattr(worktrees, "run_limited", recording)
+    pool = WorktreePool(tmp_path / "work", gc_interval=2)
+    url = make_repo("repo")
+    for _ in range(5):
+        _analyze(pool, url)
+
+    assert sum("gc" in args for args in calls) == 2
+
+
+def test_child_after_fork_drops_parent_locks(tmp_path, make_repo, monkeypatch):
+    monkeypatch.setattr(worktrees, "_lock_fds", set())
+    pool = WorktreePool(tmp_path / "work", max_worktrees=1)
+    url = make_repo("repo")
+    _analyze(pool, url)
+    assert worktrees._lock_fds
+
+    worktrees._reset_pools_after_fork()
+    assert not worktrees._lock_fds
+    assert _lock(pool, url, "users", worktrees.fcntl.LOCK_EX | worktrees.fcntl.LOCK_NB) is not None
@@ -1,9 +1,12 @@
 """Вспомогательные функции для проекта."""
 import re
 import os
-from typing import Optional, List
+import subprocess
+from typing import Optional, List, Tuple
 from pathlib import Path
 
+from .deadline import check_deadline
+
 
 def get_language_by_extension(extension: str) -> Optional[str]:
     """Определение языка по расширению файла.
@@ -159,12 +162,13 @@ def get_relevant_files(
             # Проверка лимита файлов
             if max_files and file_count >= max_files:
                 break
+            check_deadline()
             
             if not file_path.is_file():
                 continue
             
             # Пропустить игнорируемые пути
-            if should_ignore_path(file_path):
+            if should_ignore_path(file_path.relative_to(repo_path)):
                 continue
             
             # Проверка размера файла
@@ -209,6 +213,7 @@ def read_file_sample(
     Returns:
         Строка с содержимым начала файла
     """
+    check_deadline()
     try:
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
             content = ''
@@ -234,3 +239,183 @@ def read_file_sample(
         # Если файл бинарный или недоступен, возвращаем пустую строку
         return ''
 
+
+# Директории со сторонним кодом, которые не попали в should_ignore_path
+# (учитываются только в корне анализируемого репозитория или компонента:
+# src/main/java/com/acme/external - обычный пакет проекта)
+VENDORED_DIR_NAMES = {
+    'third_party', 'third-party', 'thirdparty', 'vendors', 'external', 'externals',
+    'Godeps', 'jspm_packages', 'web_modules', 'bower_components',
+}
+
+# Имена сгенерированных файлов (protobuf/gRPC стабы, сборки, кодогенерация)
+GENERATED_FILE_PATTERNS = [
+    re.compile(r'_pb2(_grpc)?\.pyi?$'),
+    re.compile(r'\.pb(\.gw|\.validate)?\.go$'),
+    re.compile(r'_grpc\.pb\.go$'),
+    re.compile(r'_(grpc_)?pb\.(js|d\.ts)$'),
+    re.compile(r'\.(pb|grpc\.pb)\.(cc|h)$'),
+    re.compile(r'(Grpc|OuterClass)\.java$'),
+    re.compile(r'\.generated\.\w+$'),
+    re.compile(r'(^|[._-])(bundle|chunk|vendor)(\.[0-9a-f]{6,})?\.js$'),
+    re.compile(r'\.[0-9a-f]{8,}\.(js|mjs)$'),
+]
+
+# Минифицированные файлы по имени
+MINIFIED_FILE_PATTERN = re.compile(r'[.-]min\.(js|mjs|cjs)$')
+
+# Заголовки генераторов кода: строка комментария в известной форме
+# (Go, protoc, gRPC, @generated, "This file was automatically generated by ...")
+GENERATED_HEADER_PATTERN = re.compile(
+    r'^[ \t]*(?:#+|//+|/\*+|\*|<!--|--|;+)[ \t]*(?:'
+    r'Code generated .{0,120}DO NOT EDIT\.?'
+    r'|@generated\b'
+    r'|Generated by the protocol buffer compiler\.'
+    r'|Generated by the gRPC\b'
+    r'|(?:This (?:file|code) (?:is|was|has been) )?(?:automatically|auto-?)[ \t-]?generated (?:by|from|with)\b'
+    r')',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Минифицированный код: большая часть строк начала файла длиннее порога
+# (одна длинная строка - например, base64-сертификат в YAML - не в счет)
+MINIFIED_LINE_LENGTH = 500
+MINIFIED_LONG_LINES_SHARE = 0.5
+
+
+def classify_generated_file(rel_path: Path, content: Optional[str] = None) -> Optional[str]:
+    """
+    Дешевая классификация сгенерированных, сторонних и минифицированных файлов.
+
+    Используются эвристики по пути, заголовки известных генераторов кода
+    и доля длинных строк в начале файла (если передано content).
+
+    Args:
+        rel_path: Путь к файлу относительно корня анализируемого репозитория
+            или компонента
+        content: Начало файла (опционально)
+
+    Returns:
+        'vendored', 'generated', 'minified' или None для обычного исходного кода
+    """
+    if len(rel_path.parts) > 1 and rel_path.parts[0] in VENDORED_DIR_NAMES:
+        return 'vendored'
+
+    name = rel_path.name
+    if MINIFIED_FILE_PATTERN.search(name):
+        return 'minified'
+    if any(pattern.search(name) for pattern in GENERATED_FILE_PATTERNS):
+        return 'generated'
+
+    if not content:
+        return None
+
+    # Заголовок генератора находится в первых строках файла
+    header = '\n'.join(content.splitlines()[:10])
+    if GENERATED_HEADER_PATTERN.search(header):
+        return 'generated'
+
+    lines = [line for line in content.splitlines() if line.strip()]
+    if lines:
+        long_lines = sum(1 for line in lines if len(line) > MINIFIED_LINE_LENGTH)
+        if long_lines / len(lines) > MINIFIED_LONG_LINES_SHARE:
+            return 'minified'
+
+    return None
+
+
+def read_source_sample(
+    file_path: Path,
+    repo_path: Path,
+    max_lines: int = 100,
+    max_bytes: int = 8192
+) -> str:
+    """
+    Прочитать начало файла исходного кода для поиска паттернов.
+
+    Для сгенерированных, сторонних и минифицированных файлов возвращает
+    пустую строку: паттерны в них дают ложные срабатывания, а их
+    сканирование тратит время. В подсчете долей языков такие файлы
+    по-прежнему учитываются.
+
+    Args:
+        file_path: Путь к файлу
+        repo_path: Корневой путь репозитория
+        max_lines: Максимальное количество строк для чтения
+        max_bytes: Максимальное количество байт для чтения
+
+    Returns:
+        Строка с содержимым начала файла или '' для пропускаемых файлов
+    """
+    rel_path = file_path.relative_to(repo_path)
+    if classify_generated_file(rel_path):
+        return ''
+
+    content = read_file_sample(file_path, max_lines=max_lines, max_bytes=max_bytes)
+    if content and classify_generated_file(rel_path, content):
+        return ''
+    return content
+
+
+def _run_git(repo_path: Path, args: List[str], timeout: int) -> Optional[str]:
+    """Выполнить git-команду в директории; None при любой ошибке."""
+    try:
+        result = subprocess.run(
+            ['git', '-C', str(repo_path), *args],
+            capture_output=True, text=True, timeout=timeout,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout
+
+
+def list_git_files(repo_path: Path, timeout: int = 30) -> Optional[List[Tuple[Path, int]]]:
+    """
+    Получить список файлов и их размеры из git без чтения содержимого.
+
+    Размеры берутся из дерева HEAD (git ls-tree -r -l). Для partial/blob-less
+    клонов, где размеры блобов неизвестны без их загрузки, используется
+    список файлов индекса (git ls-files) и размеры из stat рабочей копии.
+    Пути ограничены поддеревом repo_path.
+
+    Args:
+        repo_path: Путь к директории внутри рабочей копии git
+        timeout: Таймаут выполнения git в секундах
+
+    Returns:
+        Список (путь, размер в байтах) или None, если git недоступен
+    """
+    partial_clone = _run_git(repo_path, ['config', '--get', 'extensions.partialclone'], timeout)
+    if not partial_clone:
+        output = _run_git(repo_path, ['ls-tree', '-r', '-l', '-z', 'HEAD'], timeout)
+        if output is not None:
+            files = []
+            for entry in output.split('\0'):
+                if not entry:
+                    continue
+                meta, _, rel_path = entry.partition('\t')
+                mode, obj_type, _, size = meta.split()
+                # Пропускаем подмодули и символические ссылки
+                if obj_type != 'blob' or mode == '120000':
+                    continue
+                files.append((repo_path / rel_path, int(size)))
+            return files
+
+    output = _run_git(repo_path, ['ls-files', '-z'], timeout)
+    if output is None:
+        return None
+
+    files = []
+    for rel_path in output.split('\0'):
+        if not rel_path:
+            continue
+        file_path = repo_path / rel_path
+        try:
+            if file_path.is_symlink() or not file_path.is_file():
+                continue
+            files.append((file_path, file_path.stat().st_size))
+        except OSError:
+            continue
+    return files
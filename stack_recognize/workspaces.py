@@ -0,0 +1,343 @@
+"""Обнаружение компонентов монорепозитория (workspaces, модули, сервисы)."""
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set
+
+from .models import WorkspaceComponent
+from .manifests import read_json_keys, read_pom_sections, DEFAULT_MANIFEST_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Типичные имена директорий монорепозиториев
+FRONTEND_DIRS = ['frontend', 'web', 'client', 'ui', 'app']
+BACKEND_DIRS = ['backend', 'server', 'api', 'services']
+APPS_DIRS = ['apps', 'applications']
+PACKAGES_DIRS = ['packages', 'libs', 'libraries']
+
+# Директории, внутри которых компоненты не ищутся (зависимости, служебные файлы)
+_NEVER_COMPONENT_DIRS = {'node_modules', 'bower_components', 'vendor', '.git'}
+
+# Ограничение глубины рекурсии по Maven модулям
+_MAX_MAVEN_DEPTH = 10
+
+
+def detect_monorepo_structure(repo_path: Path) -> Dict[str, List[Path]]:
+    """Определить структуру монорепозитория по типичным именам директорий.
+
+    Returns:
+        Словарь с ключами: 'frontend', 'backend', 'root', 'apps', 'packages'
+    """
+    structure = {
+        'frontend': [],
+        'backend': [],
+        'root': [],
+        'apps': [],
+        'packages': []
+    }
+
+    for item in repo_path.iterdir():
+        if not item.is_dir():
+            continue
+
+        dir_name = item.name.lower()
+
+        if dir_name in FRONTEND_DIRS:
+            structure['frontend'].append(item)
+        elif dir_name in BACKEND_DIRS:
+            structure['backend'].append(item)
+        elif dir_name in APPS_DIRS:
+            structure['apps'].append(item)
+        elif dir_name in PACKAGES_DIRS:
+            structure['packages'].append(item)
+
+    # Проверяем apps/ на наличие frontend/backend подпапок
+    for apps_dir in structure['apps']:
+        for subdir in apps_dir.iterdir():
+            if not subdir.is_dir():
+                continue
+            subdir_name = subdir.name.lower()
+            if subdir_name in FRONTEND_DIRS:
+                structure['frontend'].append(subdir)
+            elif subdir_name in BACKEND_DIRS:
+                structure['backend'].append(subdir)
+
+    return structure
+
+
+def discover_workspace_components(
+    repo_path: Path,
+    max_bytes: int = DEFAULT_MANIFEST_MAX_BYTES,
+) -> List[WorkspaceComponent]:
+    """
+    Найти компоненты монорепозитория по манифестам.
+
+    Источники:
+        npm/yarn - поле workspaces в package.json
+        pnpm - pnpm-workspace.yaml
+        go.work - директивы use
+        maven - <modules> в pom.xml (рекурсивно)
+        gradle - include в settings.gradle / settings.gradle.kts
+        docker - директории с собственным Dockerfile
+
+    Args:
+        repo_path: Корневой путь репозитория
+        max_bytes: Лимит чтения одного манифеста
+
+    Returns:
+        Список компонентов верхнего уровня; вложенные компоненты находятся
+        в children ближайшего родительского компонента
+    """
+    found: Dict[str, List[str]] = {}
+
+    def add(paths: Set[str], source: str):
+        for rel in paths:
+            sources = found.setdefault(rel, [])
+            if source not in sources:
+                sources.append(source)
+
+    discoverers = [
+        ('npm', lambda: _npm_workspaces(repo_path, max_bytes)),
+        ('pnpm', lambda: _pnpm_workspaces(repo_path)),
+        ('go.work', lambda: _go_work_uses(repo_path)),
+        ('maven', lambda: _maven_modules(repo_path, repo_path, max_bytes, 0)),
+        ('gradle', lambda: _gradle_includes(repo_path)),
+        ('docker', lambda: _dockerfile_dirs(repo_path)),
+    ]
+    for source, discover in discoverers:
+        try:
+            paths = discover()
+        except Exception as e:
+            logger.warning(f"Не удалось определить компоненты ({source}): {e}")
+            continue
+        if paths:
+            logger.info(f"Компоненты ({source}): {sorted(paths)}")
+            add(paths, source)
+
+    return _build_tree(found)
+
+
+def iter_components(components: List[WorkspaceComponent]) -> Iterator[WorkspaceComponent]:
+    """Обход дерева компонентов в глубину (родитель перед детьми)."""
+    for component in components:
+        yield component
+        yield from iter_components(component.children)
+
+
+def _build_tree(found: Dict[str, List[str]]) -> List[WorkspaceComponent]:
+    """Построить дерево компонентов по вложенности путей."""
+    nodes: Dict[str, WorkspaceComponent] = {}
+    roots: List[WorkspaceComponent] = []
+
+    # Сортировка по пути гарантирует, что родитель создается раньше детей
+    for rel in sorted(found, key=lambda p: (p.count('/'), p)):
+        node = WorkspaceComponent(path=rel, sources=found[rel])
+        nodes[rel] = node
+
+        parent = None
+        parts = rel.split('/')
+        for i in range(len(parts) - 1, 0, -1):
+            parent = nodes.get('/'.join(parts[:i]))
+            if parent:
+                break
+
+        if parent:
+            parent.children.append(node)
+        else:
+            roots.append(node)
+
+    for node in nodes.values():
+        node.children.sort(key=lambda c: c.path)
+    roots.sort(key=lambda c: c.path)
+    return roots
+
+
+def _to_component_path(repo_path: Path, directory: Path) -> Optional[str]:
+    """Относительный путь директории компонента или None, если это не компонент."""
+    try:
+        resolved = directory.resolve()
+        rel = resolved.relative_to(repo_path.resolve())
+    except (OSError, ValueError):
+        # Путь за пределами репозитория
+        return None
+
+    if not rel.parts or not resolved.is_dir():
+        return None
+    if any(part in _NEVER_COMPONENT_DIRS for part in rel.parts):
+        return None
+    return rel.as_posix()
+
+
+def _expand_patterns(repo_path: Path, patterns: List[str]) -> Set[str]:
+    """Раскрыть glob-шаблоны workspaces (с поддержкой исключений через '!')."""
+    included: Set[str] = set()
+    excluded: Set[str] = set()
+
+    for pattern in patterns:
+        if not isinstance(pattern, str) or not pattern.strip():
+            continue
+        pattern = pattern.strip()
+        target = included
+        if pattern.startswith('!'):
+            target = excluded
+            pattern = pattern[1:]
+        pattern = pattern.strip('/')
+        if pattern.startswith('./'):
+            pattern = pattern[2:]
+        if not pattern or pattern.startswith('/') or '..' in Path(pattern).parts:
+            continue
+
+        for match in repo_path.glob(pattern):
+            rel = _to_component_path(repo_path, match)
+            if rel:
+                target.add(rel)
+
+    return included - excluded
+
+
+def _npm_workspaces(repo_path: Path, max_bytes: int) -> Set[str]:
+    """Workspaces из корневого package.json (npm, yarn)."""
+    package_json = repo_path / 'package.json'
+    if not package_json.is_file():
+        return set()
+
+    try:
+        workspaces = read_json_keys(package_json, ('workspaces',), max_bytes=max_bytes).get('workspaces')
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        logger.debug(f"Ошибка чтения {package_json}: {e}")
+        return set()
+
+    # yarn допускает форму {"packages": [...], "nohoist": [...]}
+    if isinstance(workspaces, dict):
+        workspaces = workspaces.get('packages')
+    if not isinstance(workspaces, list):
+        return set()
+
+    return _expand_patterns(repo_path, workspaces)
+
+
+def _pnpm_workspaces(repo_path: Path) -> Set[str]:
+    """Пакеты из pnpm-workspace.yaml (список packages)."""
+    workspace_file = repo_path / 'pnpm-workspace.yaml'
+    if not workspace_file.is_file():
+        return set()
+
+    content = workspace_file.read_text(encoding='utf-8', errors='ignore')
+    patterns = []
+    in_packages = False
+    for line in content.splitlines():
+        stripped = line.split('#', 1)[0].rstrip()
+        if not stripped:
+            continue
+        if not line[0].isspace() and not stripped.startswith('-'):
+            in_packages = stripped.startswith('packages:')
+            # Инлайн-список: packages: ['a/*', 'b']
+            inline = stripped[len('packages:'):].strip() if in_packages else ''
+            if inline.startswith('['):
+                patterns.extend(re.findall(r'["\']([^"\']+)["\']', inline))
+            continue
+        if in_packages:
+            item = re.match(r'\s*-\s*["\']?([^"\']+?)["\']?\s*$', stripped)
+            if item:
+                patterns.append(item.group(1))
+
+    return _expand_patterns(repo_path, patterns)
+
+
+def _go_work_uses(repo_path: Path) -> Set[str]:
+    """Модули из директив use в go.work."""
+    go_work = repo_path / 'go.work'
+    if not go_work.is_file():
+        return set()
+
+    content = go_work.read_text(encoding='utf-8', errors='ignore')
+    content = re.sub(r'//[^\n]*', '', content)
+
+    uses = []
+    for block in re.findall(r'^\s*use\s*\(([^)]*)\)', content, re.MULTILINE):
+        uses.extend(block.split())
+    uses.extend(re.findall(r'^\s*use\s+([^\s(]+)', content, re.MULTILINE))
+
+    paths = set()
+    for use in uses:
+        rel = _to_component_path(repo_path, repo_path / use.strip('"`'))
+        if rel:
+            paths.add(rel)
+    return paths
+
+
+def _maven_modules(repo_path: Path, module_dir: Path, max_bytes: int, depth: int) -> Set[str]:
+    """Модули из <modules> в pom.xml, рекурсивно по вложенным агрегаторам."""
+    pom = module_dir / 'pom.xml'
+    if depth > _MAX_MAVEN_DEPTH or not pom.is_file():
+        return set()
+
+    paths = set()
+    for module in read_pom_sections(pom, ('modules',), max_bytes=max_bytes).get('modules', []):
+        if not module:
+            continue
+        child = module_dir / module
+        # Модуль может быть указан путем к pom-файлу
+        if module.endswith('.xml'):
+            child = child.parent
+        rel = _to_component_path(repo_path, child)
+        if rel and rel not in paths:
+            paths.add(rel)
+            paths |= _maven_modules(repo_path, repo_path / rel, max_bytes, depth + 1)
+    return paths
+
+
+def _gradle_includes(repo_path: Path) -> Set[str]:
+    """Проекты из include в settings.gradle / settings.gradle.kts."""
+    for name in ('settings.gradle.kts', 'settings.gradle'):
+        settings = repo_path / name
+        if settings.is_file():
+            break
+    else:
+        return set()
+
+    content = settings.read_text(encoding='utf-8', errors='ignore')
+    content = re.sub(r'/\*.*?\*/', '', content, flags=re.DOTALL)
+    content = re.sub(r'//[^\n]*', '', content)
+
+    # Переопределения: project(':app').projectDir = file('apps/app')
+    project_dirs = {
+        name.lstrip(':'): directory
+        for name, directory in re.findall(
+            r'project\(\s*["\']([^"\']+)["\']\s*\)\.projectDir\s*=\s*(?:file\(\s*)?(?:File\(\s*\w+\s*,\s*)?["\']([^"\']+)["\']',
+            content,
+        )
+    }
+
+    projects = []
+    # include("a", "b") - в том числе многострочный
+    statements = re.findall(r'^\s*include\s*\(([^)]*)\)', content, re.MULTILINE)
+    # include 'a', ':b:c' - с продолжением на следующих строках после запятой
+    statements += re.findall(r'^\s*include\s+((?:[^\n(]*,\s*\n)*[^\n(]*)', content, re.MULTILINE)
+    for statement in statements:
+        projects.extend(re.findall(r'["\']([^"\']+)["\']', statement))
+
+    paths = set()
+    for project in projects:
+        name = project.lstrip(':')
+        directory = project_dirs.get(name, name.replace(':', '/'))
+        rel = _to_component_path(repo_path, repo_path / directory)
+        if rel:
+            paths.add(rel)
+    return paths
+
+
+def _dockerfile_dirs(repo_path: Path) -> Set[str]:
+    """Директории с собственным Dockerfile (кроме корня репозитория)."""
+    paths = set()
+    for dockerfile in repo_path.rglob('Dockerfile*'):
+        if not dockerfile.is_file():
+            continue
+        # Служебные директории (.devcontainer, .github и т.п.) - не сервисы
+        if any(part.startswith('.') for part in dockerfile.relative_to(repo_path).parts[:-1]):
+            continue
+        rel = _to_component_path(repo_path, dockerfile.parent)
+        if rel:
+            paths.add(rel)
+    return paths
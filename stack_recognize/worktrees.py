@@ -0,0 +1,525 @@
+"""Пул рабочих директорий для анализа репозиториев.
+
+Вместо mkdtemp + git clone + shutil.rmtree на каждый анализ используются:
+
+* зеркала - bare-репозитории (по одному на URL), в которые загружается только
+  последний коммит ветки по умолчанию (git fetch --depth 1). Повторная
+  загрузка того же репозитория скачивает только изменения;
+* рабочие директории пула - git-репозитории, берущие объекты из зеркала
+  (objects/info/alternates). Перед анализом директория приводится к нужному
+  коммиту через git checkout --force и git clean, при этом файлы, не
+  изменившиеся с прошлого анализа того же репозитория, не переписываются.
+
+Директории, вытесненные из пула (и лишние зеркала), удаляются фоновым
+потоком - удаление больших деревьев не задерживает анализ. Корневую
+директорию пула можно вынести на tmpfs (limits/worktree_pool.work_root или
+переменная окружения STACK_RECOGNIZE_WORK_ROOT).
+
+Зеркала общие для всех процессов с тем же work_root (воркеры, параллельные
+пакетные запуски), поэтому доступ к ним согласуется блокировками fcntl.flock
+в mirrors/<ключ>.lock/:
+
+* users - разделяемая блокировка, пока зеркало используется процессом
+  (идет анализ или на зеркало ссылается рабочая директория процесса).
+  Зеркало удаляется только под исключительной блокировкой, то есть когда
+  его не использует ни один процесс;
+* fetch - исключительная блокировка на время загрузки в зеркало и его
+  периодической очистки (git gc --auto).
+
+На платформах без fcntl у каждого процесса своя корневая директория.
+"""
+import hashlib
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .deadline import run_limited
+
+logger = logging.getLogger(__name__)
+
+# Значения по умолчанию
+DEFAULT_MAX_WORKTREES = 4
+DEFAULT_MAX_MIRRORS = 32
+# Через сколько загрузок в зеркало запускается git gc --auto
+DEFAULT_GC_INTERVAL = 20
+
+# Ссылка в зеркале на загруженный коммит
+_MIRROR_REF = 'refs/heads/stack-recognize-head'
+
+
+def mirror_key(repo_url: str) -> str:
+    """Ключ зеркала: хэш URL без учетных данных (токен не попадает на диск)."""
+    parts = urlsplit(repo_url)
+    if parts.username or parts.password:
+        netloc = parts.hostname or ''
+        if parts.port:
+            netloc = f'{netloc}:{parts.port}'
+        repo_url = urlunsplit(parts._replace(netloc=netloc))
+    return hashlib.sha256(repo_url.rstrip('/').encode('utf-8')).hexdigest()[:24]
+
+
+class BackgroundRemover:
+    """Фоновое удаление директорий."""
+
+    def __init__(self):
+        self._queue: 'queue.Queue[Path]' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def remove(self, path: Path, trash_dir: Optional[Path] = None):
+        """Поставить директорию в очередь на удаление.
+
+        Если указан trash_dir, директория сначала мгновенно переименовывается
+        в него: исходный путь сразу освобождается.
+        """
+        path = Path(path)
+        if trash_dir is not None:
+            try:
+                trash_dir.mkdir(parents=True, exist_ok=True)
+                target = trash_dir / f'{path.name}-{uuid.uuid4().hex[:8]}'
+                path.rename(target)
+                path = target
+            except OSError as e:
+                logger.debug(f"Не удалось переместить {path} в корзину: {e}")
+
+        self._queue.put(path)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='stack-recognize-remover', daemon=True)
+                self._thread.start()
+
+    def wait(self):
+        """Дождаться удаления всех поставленных в очередь директорий."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            try:
+                shutil.rmtree(path, ignore_errors=True)
+                logger.debug(f"Директория {path} удалена")
+            finally:
+                self._queue.task_done()
+
+
+# Общий для процесса поток удаления
+background_remover = BackgroundRemover()
+
+
+# Дескрипторы полученных блокировок: дочерний процесс после fork закрывает
+# их, иначе унаследованная копия удерживала бы блокировку родителя
+_lock_fds = set()
+
+
+def _lock_file(path: Path, operation: int) -> Optional[int]:
+    """
+    Открыть файл блокировки и заблокировать его (fcntl.flock).
+
+    Файл блокировки может быть удален процессом, удаляющим зеркало; если
+    после получения блокировки путь указывает на другой файл, попытка
+    повторяется с новым файлом.
+
+    Returns:
+        Дескриптор файла или None, если блокировка занята (LOCK_NB)
+    """
+    while True:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(path), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, operation)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        except BaseException:
+            os.close(fd)
+            raise
+        try:
+            if os.stat(path).st_ino == os.fstat(fd).st_ino:
+                _lock_fds.add(fd)
+                return fd
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+
+def _unlock_file(fd: int):
+    """Снять блокировку, закрыв дескриптор."""
+    _lock_fds.discard(fd)
+    os.close(fd)
+
+
+class Worktree:
+    """Рабочая директория пула, выданная для анализа."""
+
+    def __init__(self, path: Path, pooled: bool = True):
+        self.path = path
+        self.pooled = pooled
+        # Ключ зеркала, коммит которого сейчас в директории
+        self.mirror_key: Optional[str] = None
+        self.mirror_path: Optional[Path] = None
+        self.sha: Optional[str] = None
+
+
+class WorktreePool:
+    """Пул рабочих директорий и зеркал репозиториев."""
+
+    def __init__(self, work_root: Path, max_worktrees: int = DEFAULT_MAX_WORKTREES,
+                 max_mirrors: int = DEFAULT_MAX_MIRRORS, gc_interval: int = DEFAULT_GC_INTERVAL):
+        """
+        Args:
+            work_root: Корневая директория пула (зеркала, рабочие директории, корзина)
+            max_worktrees: Количество рабочих директорий, сохраняемых между анализами
+            max_mirrors: Количество сохраняемых зеркал (лишние удаляются, LRU)
+            gc_interval: Через сколько загрузок в зеркало запускать git gc --auto (0 - не запускать)
+        """
+        self.work_root = Path(work_root)
+        self.max_worktrees = max_worktrees
+        self.max_mirrors = max_mirrors
+        self.gc_interval = gc_interval
+
+        self.mirrors_dir = self.work_root / 'mirrors'
+        self.worktrees_dir = self.work_root / 'worktrees'
+        self.trash_dir = self.work_root / 'trash'
+        for directory in (self.mirrors_dir, self.worktrees_dir, self.trash_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._idle: List[Worktree] = []
+        self._busy = 0
+        self._mirror_locks: Dict[str, threading.Lock] = {}
+        # Зеркала в порядке использования и количество ссылок процесса на каждое
+        # (анализы в процессе загрузки и рабочие директории с этим зеркалом)
+        self._mirrors: 'OrderedDict[str, int]' = OrderedDict(
+            (path.stem, 0) for path in sorted(self.mirrors_dir.glob('*.git'), key=lambda p: p.stat().st_mtime)
+        )
+        # Дескрипторы разделяемых блокировок users используемых зеркал
+        self._mirror_holds: Dict[str, int] = {}
+        # Количество загрузок в зеркало с последнего git gc --auto
+        self._fetches: Dict[str, int] = {}
+
+        # Остатки завершившихся процессов: недоудаленная корзина и рабочие директории
+        # (директории работающих процессов с тем же work_root не трогаем)
+        for leftover in self.trash_dir.iterdir():
+            background_remover.remove(leftover)
+        for leftover in self.worktrees_dir.iterdir():
+            if not _owner_alive(leftover.name):
+                background_remover.remove(leftover, self.trash_dir)
+
+    def checkout(self, repo_url: str, timeout: Optional[float] = None,
+                 max_memory_mb: Optional[int] = None, max_cpu_seconds: Optional[int] = None) -> Worktree:
+        """
+        Загрузить последний коммит репозитория в зеркало и подготовить рабочую директорию.
+
+        Args:
+            repo_url: URL репозитория (может содержать токен)
+            timeout: Лимит времени загрузки и подготовки
+            max_memory_mb: Лимит памяти процессов git
+            max_cpu_seconds: Лимит процессорного времени процессов git
+
+        Returns:
+            Рабочая директория; после анализа ее нужно вернуть через release()
+
+        Raises:
+            DeadlineExceeded: Превышен лимит времени
+            subprocess.CalledProcessError: Ошибка git
+        """
+        started = time.monotonic()
+        limits = {'max_memory_mb': max_memory_mb, 'max_cpu_seconds': max_cpu_seconds}
+
+        def remaining() -> Optional[float]:
+            return max(timeout - (time.monotonic() - started), 0.001) if timeout else None
+
+        key = mirror_key(repo_url)
+        mirror = self.mirrors_dir / f'{key}.git'
+        with self._lock:
+            mirror_lock = self._mirror_locks.setdefault(key, threading.Lock())
+        self._acquire_mirror(key)
+
+        worktree = None
+        try:
+            # Загрузка в одно зеркало выполняется по очереди (в процессе и между процессами)
+            with mirror_lock, self._fetch_lock(key):
+                if not (mirror / 'HEAD').exists():
+                    run_limited(['git', 'init', '--bare', '--quiet', str(mirror)], phase='clone', timeout=remaining())
+                run_limited(
+                    ['git', '-C', str(mirror), 'fetch', '--quiet', '--depth', '1', '--force', '--no-tags',
+                     repo_url, f'+HEAD:{_MIRROR_REF}'],
+                    phase='clone', timeout=remaining(), **limits,
+                )
+                sha = run_limited(
+                    ['git', '-C', str(mirror), 'rev-parse', _MIRROR_REF], phase='clone', timeout=remaining()
+                ).stdout.strip()
+                self._maybe_gc(key, mirror, remaining, limits)
+
+            worktree = self._take(key)
+            self._prepare(worktree, key, mirror, sha, remaining, limits)
+            return worktree
+        except BaseException:
+            if worktree is not None:
+                if worktree.mirror_key != key:
+                    # Ссылка анализа на зеркало не перешла к рабочей директории
+                    self._release_mirror(key)
+                # Директория в неизвестном состоянии - не возвращаем ее в пул
+                worktree.pooled = False
+                self.release(worktree)
+            else:
+                self._release_mirror(key)
+            raise
+
+    def release(self, worktree: Worktree):
+        """Вернуть рабочую директорию в пул (или удалить в фоне, если пул полон)."""
+        with self._lock:
+            self._busy -= 1
+            keep = worktree.pooled and len(self._idle) < self.max_worktrees
+            if keep:
+                self._idle.append(worktree)
+        if keep:
+            # Директория в пуле продолжает ссылаться на зеркало
+            self._evict_mirrors()
+            return
+        background_remover.remove(worktree.path, self.trash_dir)
+        if worktree.mirror_key:
+            self._release_mirror(worktree.mirror_key)
+
+    def _take(self, key: str) -> Worktree:
+        """Взять свободную директорию: лучше ту, где уже лежит этот же репозиторий."""
+        with self._lock:
+            self._busy += 1
+            for i, worktree in enumerate(self._idle):
+                if worktree.mirror_key == key:
+                    return self._idle.pop(i)
+            if self._idle:
+                return self._idle.pop(0)
+        path = Path(tempfile.mkdtemp(prefix=f'wt-{os.getpid()}-', dir=str(self.worktrees_dir)))
+        return Worktree(path)
+
+    def _prepare(self, worktree: Worktree, key: str, mirror: Path, sha: str, remaining, limits):
+        """Привести рабочую директорию к коммиту sha из зеркала."""
+        path = worktree.path
+        git_dir = path / '.git'
+        if not (git_dir / 'HEAD').exists():
+            run_limited(['git', 'init', '--quiet', str(path)], phase='clone', timeout=remaining())
+
+        same_repo = worktree.mirror_key == key
+        previous_key = worktree.mirror_key
+        worktree.mirror_key = key
+        worktree.mirror_path = mirror
+        # Ссылка анализа на зеркало переходит к рабочей директории, прежняя
+        # ссылка директории снимается
+        if previous_key:
+            self._release_mirror(previous_key)
+
+        alternates = git_dir / 'objects' / 'info' / 'alternates'
+        alternates.parent.mkdir(parents=True, exist_ok=True)
+        alternates.write_text(str((mirror / 'objects').resolve()) + '\n', encoding='utf-8')
+
+        if not same_repo:
+            # Индекс и HEAD ссылаются на объекты другого зеркала - начинаем с чистого индекса
+            try:
+                (git_dir / 'index').unlink()
+            except FileNotFoundError:
+                pass
+            run_limited(['git', '-C', str(path), 'update-ref', '--no-deref', 'HEAD', sha],
+                        phase='clone', timeout=remaining())
+
+        run_limited(['git', '-C', str(path), 'checkout', '--quiet', '--force', '--detach', sha],
+                    phase='clone', timeout=remaining(), **limits)
+        run_limited(['git', '-C', str(path), 'clean', '-ffdxq'], phase='clone', timeout=remaining())
+        worktree.sha = sha
+
+    def _acquire_mirror(self, key: str):
+        """Добавить ссылку процесса на зеркало (первая ссылка берет блокировку users)."""
+        with self._lock:
+            self._mirrors[key] = self._mirrors.get(key, 0) + 1
+            self._mirrors.move_to_end(key)
+            if fcntl is not None and key not in self._mirror_holds:
+                # Исключительную блокировку держит только процесс, удаляющий
+                # зеркало, и недолго - ожидание под self._lock допустимо
+                self._mirror_holds[key] = _lock_file(self._lock_dir(key) / 'users', fcntl.LOCK_SH)
+
+    def _release_mirror(self, key: str):
+        """Снять ссылку процесса на зеркало и удалить лишние неиспользуемые зеркала."""
+        with self._lock:
+            if key in self._mirrors:
+                self._mirrors[key] = max(self._mirrors[key] - 1, 0)
+                if self._mirrors[key] == 0:
+                    self._drop_hold(key)
+        self._evict_mirrors()
+
+    def _drop_hold(self, key: str):
+        """Снять разделяемую блокировку зеркала (под self._lock)."""
+        fd = self._mirror_holds.pop(key, None)
+        if fd is not None:
+            _unlock_file(fd)
+
+    def _evict_mirrors(self):
+        """Удалить лишние зеркала (LRU), не используемые ни одним процессом."""
+        evicted = []
+        with self._lock:
+            for candidate, users in list(self._mirrors.items()):
+                if len(self._mirrors) <= self.max_mirrors:
+                    break
+                if users:
+                    continue
+                lock_dir = self._lock_dir(candidate)
+                fd = _lock_file(lock_dir / 'users', fcntl.LOCK_EX | fcntl.LOCK_NB) if fcntl is not None else None
+                if fcntl is not None and fd is None:
+                    # Зеркало использует другой процесс
+                    continue
+                try:
+                    mirror = self.mirrors_dir / f'{candidate}.git'
+                    if mirror.exists():
+                        # Переименование освобождает путь до снятия блокировки
+                        target = self.trash_dir / f'{mirror.name}-{uuid.uuid4().hex[:8]}'
+                        mirror.rename(target)
+                        evicted.append(target)
+                    if fd is not None:
+                        shutil.rmtree(lock_dir, ignore_errors=True)
+                except OSError as e:
+                    logger.debug(f"Не удалось удалить зеркало {candidate}: {e}")
+                    continue
+                finally:
+                    if fd is not None:
+                        _unlock_file(fd)
+                del self._mirrors[candidate]
+                self._mirror_locks.pop(candidate, None)
+                self._fetches.pop(candidate, None)
+        for path in evicted:
+            background_remover.remove(path)
+
+    def _lock_dir(self, key: str) -> Path:
+        return self.mirrors_dir / f'{key}.lock'
+
+    @contextmanager
+    def _fetch_lock(self, key: str) -> Iterator[None]:
+        """Исключительная блокировка загрузки в зеркало между процессами."""
+        if fcntl is None:
+            yield
+            return
+        fd = _lock_file(self._lock_dir(key) / 'fetch', fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            _unlock_file(fd)
+
+    def _maybe_gc(self, key: str, mirror: Path, remaining, limits):
+        """
+        Периодически запускать git gc --auto в зеркале (под блокировкой fetch).
+
+        Каждая загрузка с --depth 1 добавляет в зеркало новый pack-файл;
+        git gc --auto объединяет их, когда pack-файлов становится много.
+        Недостижимые объекты git удаляет только по истечении gc.pruneExpire
+        (по умолчанию две недели), поэтому коммиты, с которыми работают
+        рабочие директории других процессов, остаются доступны.
+        """
+        if self.gc_interval <= 0:
+            return
+        with self._lock:
+            self._fetches[key] = self._fetches.get(key, 0) + 1
+            if self._fetches[key] < self.gc_interval:
+                return
+            self._fetches[key] = 0
+        try:
+            # Без фонового режима: gc завершается до снятия блокировки зеркала
+            run_limited(['git', '-C', str(mirror), '-c', 'gc.autoDetach=false', 'gc', '--auto', '--quiet'],
+                        phase='clone', timeout=remaining(), **limits)
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.warning(f"git gc в зеркале {mirror} завершился с ошибкой: {e}")
+
+
+def _owner_alive(name: str) -> bool:
+    """Жив ли процесс, создавший рабочую директорию (имя wt-<PID>-...)."""
+    parts = name.split('-')
+    if len(parts) < 3 or not parts[1].isdigit():
+        return False
+    pid = int(parts[1])
+    if pid == os.getpid():
+        return False
+    if os.name != 'posix':
+        # Проверка через os.kill возможна только на POSIX - директорию оставляем
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_pools: Dict[tuple, WorktreePool] = {}
+_pools_lock = threading.Lock()
+
+
+def _reset_pools_after_fork():
+    """
+    Дочерний процесс начинает с новым пулом: состояние пула родителя (ссылки
+    на зеркала, рабочие директории) относится к другому процессу.
+    """
+    global _pools_lock
+    for fd in list(_lock_fds):
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    _lock_fds.clear()
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
+def get_worktree_pool(config_loader) -> Optional[WorktreePool]:
+    """
+    Общий для процесса пул рабочих директорий (None - пул отключен).
+
+    Настройки читаются из секции worktree_pool конфигурации: enabled,
+    work_root, max_worktrees, max_mirrors, gc_interval. Корневую директорию
+    также можно задать переменной окружения STACK_RECOGNIZE_WORK_ROOT.
+    """
+    settings = config_loader.worktree_pool
+    if not settings.get('enabled', True):
+        return None
+
+    work_root = (
+        os.environ.get('STACK_RECOGNIZE_WORK_ROOT')
+        or settings.get('work_root')
+        or Path(tempfile.gettempdir()) / f'stack_recognize-{os.getuid() if hasattr(os, "getuid") else "user"}'
+    )
+    work_root = Path(work_root).expanduser()
+    if fcntl is None:
+        # Без межпроцессных блокировок зеркала не разделяются между процессами
+        work_root = work_root / f'pid-{os.getpid()}'
+    max_worktrees = settings.get('max_worktrees', DEFAULT_MAX_WORKTREES)
+    max_mirrors = settings.get('max_mirrors', DEFAULT_MAX_MIRRORS)
+    gc_interval = settings.get('gc_interval', DEFAULT_GC_INTERVAL)
+
+    pool_key = (str(work_root), max_worktrees, max_mirrors, gc_interval)
+    with _pools_lock:
+        pool = _pools.get(pool_key)
+        if pool is None:
+            try:
+                pool = WorktreePool(work_root, max_worktrees, max_mirrors, gc_interval)
+            except OSError as e:
+                logger.warning(f"Пул рабочих директорий {work_root} недоступен, используется клонирование: {e}")
+                return None
+            _pools[pool_key] = pool
+        return pool